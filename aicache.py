@@ -0,0 +1,171 @@
+"""
+AI answer cache for DBBasic TextBrowser
+
+Asking the same thing about the same page again should not cost another
+round-trip to the model. Finished answers (their text and any tool calls,
+so a navigate_to_url is replayed exactly) are kept under a key made of the
+model, the command with case, spacing and trailing punctuation evened out,
+and a digest of everything else sent: the system prompt, tools and page
+context. Entries expire after a TTL and live in a memory-bounded LRU and,
+optionally, a directory that gateway sessions share.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from httpcache import DiskLRU, default_cache_dir
+
+
+# Bump when the stored entries change shape
+FORMAT_VERSION = 1
+
+DEFAULT_TTL = 24 * 60 * 60  # Seconds an answer is reused
+DEFAULT_MEMORY_BYTES = 4 * 1024 * 1024
+DEFAULT_DISK_BYTES = 32 * 1024 * 1024
+
+SPACE = re.compile(r'\s+')
+
+
+def open_ai_cache():
+    """The answer cache under the cache directory, or None if it is turned off
+
+    TEXTBROWSER_AI_CACHE_TTL=0 turns it off, and TEXTBROWSER_CACHE_DIR=
+    (empty) keeps it in memory only.
+    """
+    try:
+        ttl = float(os.getenv('TEXTBROWSER_AI_CACHE_TTL') or DEFAULT_TTL)
+    except ValueError:
+        ttl = DEFAULT_TTL
+    if ttl <= 0:
+        return None
+    cache_dir = os.getenv('TEXTBROWSER_CACHE_DIR', default_cache_dir())
+    return AICache(os.path.join(cache_dir, 'ai') if cache_dir else None, ttl)
+
+
+def normalize_command(command: str) -> str:
+    """The command as compared for reuse: "Summarize this page." == "summarize  this page" """
+    command = unicodedata.normalize('NFKC', command).casefold()
+    return SPACE.sub(' ', command).strip().rstrip('.!?;: ')
+
+
+def ai_key(model: str, command: str, *context: str) -> str:
+    """Cache key for command sent to model along with context"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in context:
+        digest.update(part.encode('utf-8', 'surrogatepass'))
+        digest.update(b'\0')
+    return f"{FORMAT_VERSION}:{model}:{digest.hexdigest()}:{normalize_command(command)}"
+
+
+class AIAnswer:
+    """A finished answer: its text and tool calls as (name, JSON arguments)"""
+
+    __slots__ = ('text', 'tool_calls', 'stored_at')
+
+    def __init__(self, text: str, tool_calls: list, stored_at: float):
+        self.text = text
+        self.tool_calls = tool_calls
+        self.stored_at = stored_at
+
+    @property
+    def size(self) -> int:
+        return len(self.text) + sum(len(name) + len(arguments) for name, arguments in self.tool_calls) + 256
+
+
+class AICache:
+    """LRU of AI answers that expire after ttl seconds, in memory and optionally on disk"""
+
+    def __init__(self, directory: str = None, ttl: float = DEFAULT_TTL,
+                 memory_bytes: int = DEFAULT_MEMORY_BYTES, disk_bytes: int = DEFAULT_DISK_BYTES):
+        self.ttl = ttl
+        self.memory_bytes = memory_bytes
+        self.disk = DiskLRU(directory, disk_bytes, suffix='.ai') if directory else None
+
+        self._memory = OrderedDict()  # key -> AIAnswer, least recent first
+        self._memory_used = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _memory_put(self, key: str, answer: AIAnswer):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_used -= old.size
+        if answer.size > self.memory_bytes:
+            return
+        self._memory[key] = answer
+        self._memory_used += answer.size
+        while self._memory_used > self.memory_bytes:
+            evicted = self._memory.popitem(last=False)[1]
+            self._memory_used -= evicted.size
+            self.evictions += 1
+
+    def _memory_remove(self, key: str):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_used -= old.size
+
+    def get(self, key: str, now: float = None):
+        """The answer stored for key if it has not expired, or None"""
+        now = now or time.time()
+        with self._lock:
+            answer = self._memory.get(key)
+            if answer is not None:
+                self._memory.move_to_end(key)
+            elif self.disk is not None:
+                name = self.disk.name_for(key)
+                data = self.disk.read(name)
+                if data is not None:
+                    try:
+                        stored = json.loads(data)
+                        if stored['key'] == key:
+                            answer = AIAnswer(stored['text'], [tuple(call) for call in stored['tool_calls']],
+                                              stored['stored_at'])
+                    except (ValueError, KeyError, TypeError):
+                        answer = None
+                    if answer is not None and now - answer.stored_at < self.ttl:
+                        self._memory_put(key, answer)
+
+            if answer is not None and now - answer.stored_at >= self.ttl:
+                # Expired: forget it everywhere
+                self._memory_remove(key)
+                if self.disk is not None:
+                    self.disk.remove(self.disk.name_for(key))
+                answer = None
+            if answer is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return answer
+
+    def put(self, key: str, text: str, tool_calls, now: float = None) -> AIAnswer:
+        """Store a finished answer"""
+        answer = AIAnswer(text, [tuple(call) for call in tool_calls], now or time.time())
+        if self.ttl <= 0:
+            return answer
+        with self._lock:
+            self._memory_put(key, answer)
+            if self.disk is not None:
+                data = json.dumps({'key': key, 'text': answer.text, 'tool_calls': answer.tool_calls,
+                                   'stored_at': answer.stored_at})
+                self.disk.write(self.disk.name_for(key), data.encode('utf-8'))
+        return answer
+
+    def stats(self) -> dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions + (self.disk.evictions if self.disk else 0),
+            'memory_entries': len(self._memory),
+            'memory_bytes': self._memory_used,
+            'disk_entries': len(self.disk) if self.disk else 0,
+            'disk_bytes': self.disk.used if self.disk else 0,
+        }
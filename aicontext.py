@@ -0,0 +1,175 @@
+"""
+Page context for AI requests in DBBasic TextBrowser
+
+Rather than the first 12,000 characters of a page, an AI request gets the
+parts of the page that matter to it. The converted text is cut into
+chunks at its headings (long sections at paragraph breaks), the chunks
+are ranked against the request with BM25, and the best are packed into a
+token budget and sent in page order. Link numbers count against a chunk's
+score, and chunks that are mostly links (menus, footers, the link list)
+come after everything else that matches as little, so a request with no
+telling words, like "summarize this page", gets the page's content from
+the top rather than its navigation. A request whose words do match gets
+only the matching chunks and the page's opening, which is fewer tokens.
+"""
+
+import math
+import re
+from collections import Counter
+
+from search import display_text
+
+
+DEFAULT_TOKENS = 3000  # Budget for the page context of one request
+MAX_CHUNK_CHARS = 1600
+CHARS_PER_TOKEN = 4    # Rough size of a token in English text
+WORDS_PER_LINK = 3     # Rough length of a link's text
+
+# BM25 parameters (the usual defaults)
+K1 = 1.2
+B = 0.75
+
+HEADING = re.compile(r'#{1,6} ')
+RULE = re.compile(r'[=\-_*]{10,}$')
+LINK_NUMBER = re.compile(r'\[\d+\]')
+WORD = re.compile(r'\w+')
+
+# Words that say nothing about which part of a page is wanted
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be been before being below but by
+can could did do does doing down during each few for from further had has have having he her
+here hers him his how i if in into is it its just me more most my no nor not now of off on once
+only or other our out over own same she should so some such than that the their them then there
+these they this those through to too under until up very was we were what when where which while
+who whom why will with would you your
+page article site text tell give show explain summarize summarise summary describe list find
+please say says said main points key mentioned
+""".split())
+
+OMITTED = "[...]"
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def terms(text: str) -> list:
+    """Lowercased words of text, without stopwords or lone digits"""
+    return [word for word in WORD.findall(text.lower())
+            if word not in STOPWORDS and not (len(word) == 1 and word.isdigit())]
+
+
+class Chunk:
+    """A heading's section of a page, or a piece of a long one"""
+
+    def __init__(self, index: int, heading: str, lines: list):
+        self.index = index
+        self.heading = heading
+        self.text = '\n'.join(lines).strip('\n')
+        if heading and not HEADING.match(self.text):
+            # A long section's later pieces say whose they are
+            self.text = f"# {heading} (continued)\n{self.text}"
+        self.tokens = estimate_tokens(self.text)
+        words = WORD.findall(self.text)
+        # Rough share of the chunk's words that are links: menus, footers, link lists
+        links = len(LINK_NUMBER.findall(self.text))
+        self.link_density = min(1.0, links * WORDS_PER_LINK / max(len(words) - links, 1))
+        # Heading words count twice: they say what the section is about
+        self.terms = Counter(terms(self.text) + terms(heading))
+        self.length = sum(self.terms.values())
+
+    @property
+    def navigation(self) -> bool:
+        return self.link_density > 0.5
+
+
+def page_chunks(text: str, max_chars: int = MAX_CHUNK_CHARS) -> list:
+    """The page's text cut at headings, and long sections at paragraph breaks"""
+    chunks = []
+    heading = ''
+    lines = []
+    size = 0
+
+    def close():
+        if any(line.strip() for line in lines):
+            chunks.append(Chunk(len(chunks), heading, lines))
+        lines.clear()
+
+    for line in display_text(text).split('\n'):
+        if RULE.match(line.strip()):
+            close()  # Separators (like the link list's) end a section
+            size = 0
+            continue
+        if HEADING.match(line):
+            close()
+            heading = line.lstrip('#').strip()
+            size = 0
+        elif size + len(line) > max_chars and (not line.strip() or size > 2 * max_chars):
+            # Long section: continue in a new chunk at a paragraph break
+            close()
+            size = 0
+        lines.append(line)
+        size += len(line) + 1
+    close()
+    return chunks
+
+
+def bm25_scores(chunks: list, query: list) -> list:
+    """BM25 score of each chunk for the query terms"""
+    if not chunks or not query:
+        return [0.0] * len(chunks)
+    count = len(chunks)
+    average = sum(chunk.length for chunk in chunks) / count or 1.0
+    scores = [0.0] * count
+    for term in set(query):
+        df = sum(1 for chunk in chunks if term in chunk.terms)
+        if not df or (df > count / 2 and count > 2):
+            continue  # Words in most chunks do not tell them apart
+        idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+        for i, chunk in enumerate(chunks):
+            tf = chunk.terms.get(term, 0)
+            if tf:
+                scores[i] += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * chunk.length / average))
+    return scores
+
+
+def build_context(text: str, command: str, max_tokens: int = DEFAULT_TOKENS) -> tuple:
+    """The parts of a page's text most relevant to command, within max_tokens
+
+    Returns (context, complete): the chosen chunks in page order with [...]
+    where sections were left out, and whether the whole page fitted.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return display_text(text).strip('\n'), True
+
+    chunks = page_chunks(text, min(MAX_CHUNK_CHARS, max_tokens * CHARS_PER_TOKEN))
+    scores = bm25_scores(chunks, terms(command))
+    weight = {chunk.index: scores[chunk.index] * (1 - chunk.link_density) for chunk in chunks}
+    # Best matches first, then content before navigation, then the order of the page
+    ranked = sorted(chunks, key=lambda chunk: (-weight[chunk.index], chunk.navigation, chunk.index))
+    if any(weight[chunk.index] > 0 and not chunk.navigation for chunk in chunks):
+        # A pointed request: only what matches, and the page's opening for context
+        lead = next(chunk for chunk in chunks if not chunk.navigation)
+        ranked = [chunk for chunk in ranked if weight[chunk.index] > 0 and not chunk.navigation]
+        if lead not in ranked:
+            ranked.append(lead)
+
+    chosen = []
+    budget = max_tokens
+    for chunk in ranked:
+        if chunk.tokens <= budget:
+            chosen.append(chunk)
+            budget -= chunk.tokens
+        if budget < 50:
+            break
+
+    parts = []
+    previous = -1
+    for chunk in sorted(chosen, key=lambda chunk: chunk.index):
+        if chunk.index != previous + 1:
+            parts.append(OMITTED)
+        parts.append(chunk.text)
+        previous = chunk.index
+    if previous != len(chunks) - 1:
+        parts.append(OMITTED)
+    return '\n\n'.join(parts), False
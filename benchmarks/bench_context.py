@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Benchmark: page context sent with AI requests
+
+For a long synthetic article, compares the prompt size of the old
+first-12,000-characters excerpt with the sections chosen for each
+request, and times choosing them.
+
+Usage:
+    python benchmarks/bench_context.py [sections]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from aicontext import DEFAULT_TOKENS, build_context, estimate_tokens
+
+OLD_EXCERPT_CHARS = 12000
+
+REQUESTS = ['summarize this page', 'what is in section 37?', 'tell me about volcanoes',
+            'compare the glaciers and the rivers']
+
+TOPICS = ['rivers', 'glaciers', 'volcanoes', 'deserts', 'forests', 'oceans', 'mountains', 'lakes']
+
+
+def synthetic_page(sections: int) -> str:
+    menu = '\n'.join(f"[{n}] Portal {n}" for n in range(60))
+    parts = [f"# Geography of Somewhere\n\n{menu}"]
+    for n in range(sections):
+        topic = TOPICS[n % len(TOPICS)]
+        body = '\n\n'.join(f"Section {n} describes {topic} in paragraph {k}, with [{n * 10 + k}] "
+                           f"citations and ordinary prose filling out the line." for k in range(8))
+        parts.append(f"## Section {n}: {topic.title()}\n\n{body}")
+    return '\n\n'.join(parts)
+
+
+def main():
+    sections = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    page = synthetic_page(sections)
+    old = estimate_tokens(page[:OLD_EXCERPT_CHARS])
+    print(f"{len(page) // 1024} KB page, about {estimate_tokens(page)} tokens; "
+          f"old excerpt {old} tokens, budget {DEFAULT_TOKENS}")
+
+    print(f"{'request':<38} {'tokens':>7} {'vs old':>7} {'build':>9}")
+    for request in REQUESTS:
+        start = time.perf_counter()
+        context, complete = build_context(page, request)
+        elapsed = time.perf_counter() - start
+        tokens = estimate_tokens(context)
+        print(f"{request:<38} {tokens:7d} {tokens / old:6.0%} {elapsed * 1000:7.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark: legacy BeautifulSoup + html2text pipeline vs single-pass converter
+
+Usage:
+    pip install -e .[bench]
+    python benchmarks/bench_convert.py [page.html ...]
+
+Without arguments a synthetic page of roughly 2 MB is generated.
+"""
+
+import os
+import sys
+import time
+from urllib.parse import urljoin
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from htmltext import available_parsers, convert_html
+
+COLORS = {'red', 'green', 'blue', 'yellow', 'cyan', 'magenta', 'white', 'black'}
+
+
+def synthetic_page(target_bytes: int = 2 * 1024 * 1024) -> str:
+    """Build a docs/Wikipedia-like page of about target_bytes"""
+    section = (
+        "<h2>Section {n}</h2>"
+        "<p>Lorem ipsum dolor sit amet, <b>consectetur</b> adipiscing elit, "
+        "sed do <a href=\"/wiki/Item_{n}\">eiusmod tempor</a> incididunt ut "
+        "labore et dolore <i>magna aliqua</i>. Ut enim ad minim veniam, quis "
+        "nostrud <a href=\"https://example.org/{n}\">exercitation</a> ullamco "
+        "<font color=\"red\">laboris</font> nisi ut aliquip ex ea commodo.</p>"
+        "<ul><li><a href=\"#ref{n}\">ref</a> one</li><li>two <code>x = {n}</code></li></ul>"
+        "<table><tr><th>Key</th><th>Value</th></tr><tr><td>{n}</td><td>v{n}</td></tr></table>"
+        "<script>var s{n} = {n};</script>"
+    )
+    form = ("<form action=\"/search\" method=\"get\"><input name=\"q\" placeholder=\"Search\">"
+            "<input type=\"submit\"></form>")
+    parts = ["<html><head><title>Bench</title><style>p{color:red}</style></head><body>", form]
+    size = 0
+    n = 0
+    while size < target_bytes:
+        chunk = section.format(n=n)
+        parts.append(chunk)
+        size += len(chunk)
+        n += 1
+    parts.append("</body></html>")
+    return ''.join(parts)
+
+
+def legacy_convert(html: str, url: str, width: int):
+    """The multi-walk pipeline fetch_page used before the single-pass converter"""
+    from bs4 import BeautifulSoup
+    import html2text
+
+    soup = BeautifulSoup(html, 'html.parser')
+    for script in soup(["script", "style"]):
+        script.decompose()
+
+    links = []
+    for link in soup.find_all('a', href=True):
+        href = link.get('href')
+        if href and not href.startswith(('#', 'javascript:', 'mailto:')):
+            link_text = link.get_text(strip=True)
+            if link_text:
+                links.append({'url': urljoin(url, href), 'text': link_text[:50]})
+
+    forms = []
+    for idx, form in enumerate(soup.find_all('form')):
+        fields = []
+        for input_tag in form.find_all(['input', 'textarea']):
+            input_type = input_tag.get('type', 'text')
+            if input_type not in ['hidden', 'submit', 'button']:
+                fields.append({'name': input_tag.get('name', ''), 'type': input_type})
+        if fields:
+            forms.append({'index': idx, 'fields': fields})
+
+    for font_tag in soup.find_all('font'):
+        color = font_tag.get('color', '').lower()
+        if color and color in COLORS:
+            font_tag.string = f"«{color}»{font_tag.get_text()}«/{color}»"
+
+    counter = 0
+    for link in soup.find_all('a', href=True):
+        href = link.get('href')
+        if href and not href.startswith(('#', 'javascript:', 'mailto:')):
+            link_text = link.get_text(strip=True)
+            if link_text and counter < len(links):
+                link.string = f"[{counter}] {link_text}"
+                counter += 1
+
+    h = html2text.HTML2Text()
+    h.ignore_links = True
+    h.ignore_images = True
+    h.body_width = width
+    h.unicode_snob = True
+    h.mark_code = True
+    text = h.handle(str(soup))
+    return text.split('\n'), links, forms
+
+
+def best_of(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv):
+    if argv:
+        pages = []
+        for path in argv:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                pages.append((os.path.basename(path), f.read()))
+    else:
+        pages = [('synthetic', synthetic_page())]
+
+    url = 'https://example.org/wiki/Page'
+    width = 76
+    for name, html in pages:
+        old = best_of(lambda: legacy_convert(html, url, width), 3)
+        print(f"{name}: {len(html) / 1024 / 1024:.2f} MB | legacy {old * 1000:.0f} ms")
+        for parser in available_parsers():
+            new = best_of(lambda: convert_html(html, url, width, COLORS, parser), 3)
+            print(f"  {parser:<12} {new * 1000:6.0f} ms | {old / new:.1f}x faster")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
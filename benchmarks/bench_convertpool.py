@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: converting pages on threads vs in a pool of worker processes
+
+Converts a batch of synthetic pages from several threads at once (as
+gateway sessions would), first in-process and then through ConversionPools
+of 1, 2, 4 ... CPU-count workers, and reports pages per second. It also
+times a small page converted while the big ones are running: the delay
+another user sees when someone loads a huge page.
+
+Usage:
+    python benchmarks/bench_convertpool.py [pages [page KB]]
+"""
+
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_convert import COLORS, synthetic_page
+from convertpool import ConversionPool
+from htmltext import convert_blocks
+
+
+def run_batch(convert, html: str, pages: int, threads: int) -> tuple:
+    """(pages per second, small-page delays in ms) for pages conversions of html"""
+    small = synthetic_page(8 * 1024)
+    delays = []
+    done = threading.Event()
+
+    def other_user():
+        # Someone else's small page, converted in-process, again and again
+        while not done.is_set():
+            start = time.perf_counter()
+            convert_blocks(small, 'https://example.com/', COLORS)
+            delays.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.02)
+
+    watcher = threading.Thread(target=other_user)
+    watcher.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(lambda n: convert(html, f"https://example.com/{n}", COLORS),
+                          range(pages)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    watcher.join()
+    return pages / elapsed, delays
+
+
+def report(label: str, rate: float, delays: list, baseline: float):
+    p95 = sorted(delays)[int(len(delays) * 0.95)] if delays else 0.0
+    print(f"  {label:<18} {rate:7.1f} pages/s  x{rate / baseline:4.2f}   "
+          f"other user: median {statistics.median(delays or [0]):6.1f} ms, p95 {p95:6.1f} ms")
+
+
+def main(argv):
+    pages = int(argv[0]) if argv else 40
+    size_kb = int(argv[1]) if len(argv) > 1 else 256
+    cpus = os.cpu_count() or 1
+    html = synthetic_page(size_kb * 1024)
+
+    print(f"Converting {pages} pages of {size_kb} KB on {cpus} CPU(s)")
+    idle = run_batch(lambda *args: None, html, 1, 1)[1]
+    print(f"  other user's page alone: median {statistics.median(idle):.1f} ms")
+
+    baseline, delays = run_batch(convert_blocks, html, pages, cpus * 2)
+    report('threads (GIL)', baseline, delays, baseline)
+
+    workers = 1
+    while True:
+        pool = ConversionPool(workers)
+        try:
+            pool.convert(html)  # Warm up the workers' imports
+            rate, delays = run_batch(pool.convert, html, pages, workers * 2)
+        finally:
+            pool.close()
+        report(f"{workers} process(es)", rate, delays, baseline)
+        if workers >= cpus:
+            break
+        workers = min(workers * 2, cpus)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Load test: many telnet users on one gateway process
+
+Starts the gateway in a child process, serves a synthetic page from a
+local HTTP server, and connects fake telnet clients that report a window
+size, wait for the page, then press scrolling keys. Reports the latency
+from key press to the first byte of the redraw, bytes per key, and the
+gateway's memory and thread count at full load.
+
+Usage:
+    python benchmarks/bench_gateway.py [sessions [keys per session]]
+"""
+
+import asyncio
+import http.server
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_convert import synthetic_page
+from gateway import IAC, NAWS, SB, SE
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+KEYS = [b'\x1b[B', b'\x1b[B', b'\x1b[6~', b'\x1b[A', b'\x1b[5~']
+
+QUIET = 0.25  # A screen update is over once the connection goes this quiet
+
+# Status bar text once a page has loaded (it shows a spinner while loading)
+LOADED = b'DBBasic TextBrowser | http'
+
+
+def serve_page(html: str) -> int:
+    """Serve html at /page.html on a local port, returning the port"""
+    body = html.encode('utf-8')
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Cache-Control', 'max-age=600')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def gateway_usage(pid: int) -> tuple:
+    """(resident MB, threads) of the gateway process"""
+    with open(f"/proc/{pid}/status") as f:
+        status = f.read()
+    rss = int(re.search(r'VmRSS:\s+(\d+)', status).group(1)) / 1024
+    threads = int(re.search(r'Threads:\s+(\d+)', status).group(1))
+    return rss, threads
+
+
+async def read_update(reader, timeout: float):
+    """(seconds to first byte, bytes) of the next screen update"""
+    start = time.monotonic()
+    try:
+        data = await asyncio.wait_for(reader.read(65536), timeout)
+    except asyncio.TimeoutError:
+        return None, 0
+    first = time.monotonic() - start
+    total = len(data)
+    while data:
+        try:
+            data = await asyncio.wait_for(reader.read(65536), QUIET)
+        except asyncio.TimeoutError:
+            break
+        total += len(data)
+    return first, total
+
+
+async def user(port: int, presses: int, results: dict, ready: asyncio.Event,
+               loaded: list, sessions: int):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(bytes([IAC, SB, NAWS, 0, 80, 0, 24, IAC, SE]))
+
+    # Wait for the status bar to show the loaded page, then for the page
+    start = time.monotonic()
+    seen = b''
+    while LOADED not in seen:
+        try:
+            data = await asyncio.wait_for(reader.read(65536), 60)
+        except asyncio.TimeoutError:
+            data = b''
+        if not data:
+            results['failed'] += 1
+            writer.close()
+            return
+        seen = seen[-len(LOADED):] + data
+    while (await read_update(reader, QUIET))[1]:
+        pass
+    results['load'].append(time.monotonic() - start)
+
+    # Everyone presses keys at once, so the measurements are under full load
+    loaded.append(1)
+    if len(loaded) + results['failed'] >= sessions:
+        ready.set()
+    await ready.wait()
+
+    for n in range(presses):
+        writer.write(KEYS[n % len(KEYS)])
+        latency, size = await read_update(reader, 10)
+        if latency is None:
+            results['timeouts'] += 1
+            continue
+        results['latency'].append(latency)
+        results['bytes'].append(size)
+    writer.write(b'q')
+    await asyncio.sleep(0.1)
+    writer.close()
+
+
+async def run_load(port: int, sessions: int, presses: int, pid: int) -> dict:
+    results = {'load': [], 'latency': [], 'bytes': [], 'failed': 0, 'timeouts': 0}
+    ready = asyncio.Event()
+    loaded = []
+
+    async def sample():
+        await ready.wait()
+        results['usage'] = gateway_usage(pid)
+
+    users = [user(port, presses, results, ready, loaded, sessions) for _ in range(sessions)]
+    await asyncio.gather(sample(), *users)
+    return results
+
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def main(argv):
+    sessions = int(argv[0]) if argv else 200
+    presses = int(argv[1]) if len(argv) > 1 else 10
+
+    page_url = f"http://127.0.0.1:{serve_page(synthetic_page(200 * 1024))}/page.html"
+    port = free_port()
+    env = dict(os.environ, OPENAI_API_KEY='', TEXTBROWSER_CACHE_DIR='', TEXTBROWSER_PAGE_CACHE_DIR='')
+    gateway = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'gateway.py'), '--port', str(port),
+         '--url', page_url, '--max-sessions', str(sessions)],
+        env=env, stdout=subprocess.PIPE, text=True)
+    try:
+        gateway.stdout.readline()  # Listening
+        idle_rss, idle_threads = gateway_usage(gateway.pid)
+        results = asyncio.run(run_load(port, sessions, presses, gateway.pid))
+    finally:
+        gateway.terminate()
+        gateway.wait()
+
+    rss, threads = results.get('usage', (0, 0))
+    latency = [value * 1000 for value in results['latency']]
+    print(f"Gateway load test: {sessions} telnet sessions, {presses} keys each")
+    print(f"  sessions loaded       {len(results['load'])} ({results['failed']} failed)")
+    print(f"  page load             median {statistics.median(results['load'] or [0]):.2f}s, "
+          f"max {max(results['load'] or [0]):.2f}s")
+    print(f"  key to redraw         p50 {percentile(latency, 0.5):.1f} ms, "
+          f"p95 {percentile(latency, 0.95):.1f} ms, p99 {percentile(latency, 0.99):.1f} ms "
+          f"({results['timeouts']} timeouts)")
+    print(f"  bytes per key         {statistics.mean(results['bytes'] or [0]):.0f}")
+    print(f"  gateway memory        {idle_rss:.0f} MB idle, {rss:.0f} MB loaded "
+          f"({(rss - idle_rss) / max(sessions, 1) * 1024:.0f} KB per session)")
+    print(f"  gateway threads       {idle_threads} idle, {threads} loaded")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark: terminal bytes sent per key press
+
+Runs the browser under a pseudo-terminal on a long synthetic page, presses
+scrolling keys and counts the bytes written to the terminal after each one.
+The diffing screen is compared with a full redraw per frame (the old
+stdscr.clear() on every key press).
+
+Usage:
+    python benchmarks/bench_keystroke.py [rows cols]
+"""
+
+import curses
+import fcntl
+import os
+import pty
+import select
+import struct
+import sys
+import termios
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_convert import synthetic_page
+
+TERM = 'xterm-256color'
+
+# (label, terminfo capability or literal bytes, presses)
+KEYS = [
+    ('Down', 'kcud1', 20),
+    ('Up', 'kcuu1', 20),
+    ('PgDn', 'knp', 5),
+    ('PgUp', 'kpp', 5),
+    ('End', 'kend', 1),
+    ('Home', 'khome', 1),
+]
+
+
+def run_browser(mode: str, rows: int, cols: int, html: str):
+    """Child side: the browser on the pty, drawing a frame per key"""
+    fcntl.ioctl(0, termios.TIOCSWINSZ, struct.pack('HHHH', rows, cols, 0, 0))
+    os.environ.update({'TERM': TERM, 'OPENAI_API_KEY': '', 'TEXTBROWSER_CACHE_DIR': ''})
+
+    from browser import Browser
+
+    def main(stdscr):
+        browser = Browser(stdscr)
+        browser.load_html(html, 'https://example.org/wiki/Page')
+        if mode == 'full':
+            render = browser.render
+
+            def full_render():
+                browser.screen.invalidate()
+                render()
+            browser.render = full_render
+
+        while browser.running:
+            browser.render()
+            browser.handle_input(stdscr.getch())
+
+    curses.wrapper(main)
+
+
+def drain(fd: int, quiet: float = 0.05) -> int:
+    """Read terminal output until it goes quiet, returning the byte count"""
+    total = 0
+    while select.select([fd], [], [], quiet)[0]:
+        try:
+            data = os.read(fd, 65536)
+        except OSError:
+            break
+        if not data:
+            break
+        total += len(data)
+    return total
+
+
+def measure(mode: str, rows: int, cols: int, html: str) -> dict:
+    """Bytes per press for each key, plus the first paint"""
+    pid, fd = pty.fork()
+    if pid == 0:
+        try:
+            run_browser(mode, rows, cols, html)
+        finally:
+            os._exit(0)
+
+    results = {'first paint': drain(fd, 1.0)}
+    for label, capability, presses in KEYS:
+        sequence = curses.tigetstr(capability)
+        total = 0
+        for _ in range(presses):
+            os.write(fd, sequence)
+            total += drain(fd)
+        results[label] = total / presses
+
+    os.write(fd, b'q')
+    drain(fd)
+    os.waitpid(pid, 0)
+    os.close(fd)
+    return results
+
+
+def main(argv):
+    rows, cols = (int(argv[0]), int(argv[1])) if len(argv) == 2 else (24, 80)
+    curses.setupterm(TERM, sys.stdout.fileno() if sys.stdout.isatty() else -1)
+    html = synthetic_page(256 * 1024)
+
+    full = measure('full', rows, cols, html)
+    diff = measure('diff', rows, cols, html)
+
+    print(f"Bytes sent per key press, {cols}x{rows} {TERM}")
+    print(f"  {'key':<12} {'full redraw':>12} {'diffed':>10}")
+    for label in full:
+        ratio = f"{full[label] / diff[label]:.1f}x less" if diff[label] else ""
+        print(f"  {label:<12} {full[label]:12.0f} {diff[label]:10.0f}   {ratio}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
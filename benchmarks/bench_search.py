@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark: in-page search on a long page
+
+Builds the search index of a synthetic page once, then times each
+keystroke of typing queries the way the / prompt handles it (find from
+the screen top, which match of how many) against the frame budget.
+
+Usage:
+    python benchmarks/bench_search.py [lines]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from search import PageIndex
+
+FRAME = 1 / 60  # Seconds per frame at 60 Hz
+
+QUERIES = ['needle', 'item 42', 'the', 'zzz']
+
+
+def synthetic_lines(count: int) -> list:
+    lines = [f"Line {n}: «blue»some text«/blue» about item {n % 977} and the words after it"
+             for n in range(count)]
+    lines[count - 10] = "The needle is near the bottom."
+    return lines
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    lines = synthetic_lines(count)
+
+    start = time.perf_counter()
+    index = PageIndex(lines)
+    build = time.perf_counter() - start
+    print(f"{count} lines, {len(index.buffer) // 1024} KB indexed in {build * 1000:.1f} ms (once per page)")
+
+    print(f"{'query':<10} {'worst key':>10} {'mean key':>10}  matches")
+    for query in QUERIES:
+        times = []
+        for end in range(1, len(query) + 1):
+            typed = query[:end]
+            start = time.perf_counter()
+            found = index.find(typed, index.offset_of(count // 2))
+            total = index.total(typed)
+            if found is not None:
+                index.ordinal(typed, found)
+            times.append(time.perf_counter() - start)
+        worst = max(times)
+        print(f"{query:<10} {worst * 1000:9.2f}ms {sum(times) / len(times) * 1000:9.2f}ms  {total}"
+              f"{'' if worst < FRAME else '  (over a frame)'}")
+
+
+if __name__ == '__main__':
+    main()
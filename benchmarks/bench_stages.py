@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: time every stage of showing a page, per page of a corpus
+
+Serves a corpus of pages from a local keep-alive HTTP server and times each
+stage separately:
+
+    fetch         HTTP GET of the page (no cache)
+    parse         the HTML parser backend alone, with no converter behind it
+    convert       the single conversion pass: text, numbered links and forms
+    wrap          splitting the converted blocks into screen lines
+    fetch_page    fetch + convert + wrap as the browser does it, end to end
+    submit_form   POSTing a form and converting the response
+    first_render  the first frame of the page on an 80x24 virtual terminal
+    scroll_frame  one Down-arrow frame (averaged over 20 presses)
+
+The corpus is the pages shipped with the browser plus synthetic wiki-style
+pages of 20 KB, 200 KB and 2 MB; --corpus DIR adds saved pages (*.html).
+Results are printed as a table on stderr and written as JSON (stdout or
+--output) with the version, Python, parser and machine, so runs can be
+kept and compared between releases: --compare OLD.json reports every
+stage that got slower than --threshold times the old median, and exits
+with status 1 if any did.
+
+Usage:
+    python benchmarks/bench_stages.py [--corpus DIR] [--repeat N]
+                                      [--output FILE] [--compare OLD.json]
+"""
+
+import argparse
+import curses
+import glob
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+from html.parser import HTMLParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+os.environ.update({'OPENAI_API_KEY': '', 'TEXTBROWSER_CACHE_DIR': '', 'TEXTBROWSER_PREFETCH': ''})
+
+from bench_convert import synthetic_page
+from browser import Browser
+from core import BrowserCore, COLOR_MAP
+from document import Document
+from fetcher import Fetcher
+from htmltext import PARSERS, best_parser, convert_blocks
+from pagecache import PageCache
+from terminal import Terminal
+
+SHIPPED_PAGES = ['homepage.html', 'help.html', 'demo.html', 'demo/index.html']
+SYNTHETIC_KB = [20, 200, 2048]
+WIDTH = 76  # An 80-column terminal less the margin
+SCROLLS = 20
+
+STAGES = ['fetch', 'parse', 'convert', 'wrap', 'fetch_page', 'submit_form',
+          'first_render', 'scroll_frame']
+
+
+def load_corpus(directory: str = None) -> dict:
+    """name -> html for the built-in pages and any saved ones"""
+    corpus = {}
+    for name in SHIPPED_PAGES:
+        with open(os.path.join(ROOT, name), encoding='utf-8') as f:
+            corpus[name] = f.read()
+    for kb in SYNTHETIC_KB:
+        corpus[f"synthetic-{kb}k.html"] = synthetic_page(kb * 1024)
+    if directory:
+        for path in sorted(glob.glob(os.path.join(directory, '**', '*.htm*'), recursive=True)):
+            with open(path, encoding='utf-8', errors='replace') as f:
+                corpus[os.path.relpath(path, directory)] = f.read()
+    return corpus
+
+
+def serve(corpus: dict) -> str:
+    """Serve the corpus on a local port, returning its base URL"""
+    pages = {'/' + name: html.encode('utf-8') for name, html in corpus.items()}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body in one send, so small pages don't wait on delayed ACKs
+        wbufsize = 64 * 1024
+        disable_nagle_algorithm = True
+
+        def respond(self):
+            body = pages.get(self.path.split('?')[0])
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Cache-Control', 'no-store')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self.respond()
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            self.respond()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+class NullConverter(HTMLParser):
+    """Receives parser events and does nothing with them"""
+
+    def finish(self):
+        pass
+
+
+def timed(function, repeat: int) -> list:
+    """Seconds taken by each of repeat calls of function"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def bench_page(name: str, html: str, base_url: str, fetcher: Fetcher, parser: str,
+               repeat: int) -> dict:
+    """Timings in seconds for every stage of one page"""
+    url = base_url + name
+    times = {}
+
+    times['fetch'] = timed(lambda: fetcher.get(url).content, repeat)
+    times['parse'] = timed(lambda: PARSERS[parser](NullConverter(), html), repeat)
+    times['convert'] = timed(lambda: convert_blocks(html, url, COLOR_MAP, parser), repeat)
+    blocks, links, forms = convert_blocks(html, url, COLOR_MAP, parser)
+    times['wrap'] = timed(lambda: list(Document(list(blocks), WIDTH)), repeat)
+
+    def fetch_page():
+        core = BrowserCore(fetcher, PageCache(), WIDTH)
+        core.fetch_page(url)
+        core.complete_page()
+    times['fetch_page'] = timed(fetch_page, repeat)
+
+    form = {'action': url, 'method': 'POST', 'fields': []}
+
+    def submit_form():
+        core = BrowserCore(fetcher, PageCache(), WIDTH)
+        core.current_url = url
+        html_content, final_url = core.send_form(form, {'q': 'benchmark'})
+        core.render_html(html_content, final_url, WIDTH)[0].finish()
+    times['submit_form'] = timed(submit_form, repeat)
+
+    first, scroll, sent = [], [], []
+    for _ in range(repeat):
+        terminal = Terminal(lambda data: None, 24, 80)
+        browser = Browser(terminal.stdscr, fetcher, PageCache(), term=terminal)
+        browser.show_page(*browser.render_html(html, url, WIDTH))
+        start = time.perf_counter()
+        browser.render()
+        first.append(time.perf_counter() - start)
+
+        bytes_before = terminal.bytes_sent
+        start = time.perf_counter()
+        for _ in range(SCROLLS):
+            browser.handle_input(curses.KEY_DOWN)
+            browser.render()
+        scroll.append((time.perf_counter() - start) / SCROLLS)
+        sent.append((terminal.bytes_sent - bytes_before) / SCROLLS)
+    times['first_render'] = first
+    times['scroll_frame'] = scroll
+
+    result = {
+        'bytes': len(html.encode('utf-8')),
+        'links': len(links),
+        'forms': len(forms),
+        'lines': len(list(Document(list(blocks), WIDTH))),
+        'scroll_bytes': statistics.mean(sent),
+        'stages': {},
+    }
+    for stage in STAGES:
+        values = times[stage]
+        result['stages'][stage] = {
+            'median_ms': round(statistics.median(values) * 1000, 4),
+            'min_ms': round(min(values) * 1000, 4),
+        }
+    return result
+
+
+def version() -> str:
+    with open(os.path.join(ROOT, 'pyproject.toml')) as f:
+        for line in f:
+            if line.startswith('version'):
+                return line.split('=', 1)[1].strip().strip('"')
+    return 'unknown'
+
+
+def compare(results: dict, baseline: dict, threshold: float, floor_ms: float) -> list:
+    """(page, stage, old ms, new ms) for stages over threshold times slower
+
+    Differences under floor_ms are timer noise, not regressions.
+    """
+    slower = []
+    for name, page in results['pages'].items():
+        old_page = baseline.get('pages', {}).get(name)
+        if old_page is None:
+            continue
+        for stage, timing in page['stages'].items():
+            old = old_page['stages'].get(stage)
+            if (old and timing['median_ms'] > old['median_ms'] * threshold
+                    and timing['median_ms'] - old['median_ms'] >= floor_ms):
+                slower.append((name, stage, old['median_ms'], timing['median_ms']))
+    return slower
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Time each stage of showing a page')
+    parser.add_argument('--corpus', help='directory of saved pages to add to the corpus')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per stage (default 5)')
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    parser.add_argument('--compare', metavar='OLD.json', help='earlier results to check against')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='slowdown that counts as a regression (default 1.25)')
+    parser.add_argument('--floor-ms', type=float, default=0.5,
+                        help='ignore differences smaller than this (default 0.5 ms)')
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.corpus)
+    base_url = serve(corpus)
+    fetcher = Fetcher()
+    html_parser = best_parser(os.getenv('TEXTBROWSER_PARSER'))
+    results = {
+        'version': version(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'parser': html_parser,
+        'repeat': args.repeat,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'pages': {},
+    }
+
+    header = f"{'page':<24} {'KB':>6} " + ' '.join(f"{stage:>12}" for stage in STAGES)
+    print(f"Median ms per stage, {html_parser} parser, {args.repeat} runs", file=sys.stderr)
+    print(header, file=sys.stderr)
+    for name, html in corpus.items():
+        page = bench_page(name, html, base_url, fetcher, html_parser, args.repeat)
+        results['pages'][name] = page
+        print(f"{name[:24]:<24} {page['bytes'] / 1024:6.0f} "
+              + ' '.join(f"{page['stages'][stage]['median_ms']:12.2f}" for stage in STAGES),
+              file=sys.stderr)
+    fetcher.close()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        slower = compare(results, baseline, args.threshold, args.floor_ms)
+        print(f"\nAgainst {args.compare} (version {baseline.get('version')}): "
+              f"{len(slower)} stage(s) over {args.threshold}x slower", file=sys.stderr)
+        for name, stage, old, new in slower:
+            print(f"  {name}: {stage} {old:.2f} ms -> {new:.2f} ms ({new / old:.2f}x)", file=sys.stderr)
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
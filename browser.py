@@ -3,29 +3,140 @@
 DBBasic TextBrowser: A text-mode web browser with AI assistance
 """
 
+import codecs
 import curses
-import requests
-from bs4 import BeautifulSoup
 from typing import Optional
-import html2text
 import sys
 import os
 from openai import OpenAI
 import re
 import json
+import socket
+import threading
+import time
+
+from aicache import AICache, ai_key, open_ai_cache
+from convertpool import ConversionPool
+from core import BrowserCore
+from fetcher import Fetcher
+from document import Document
+from pagecache import PageCache
+from screen import Screen
+from htmltext import style_runs
+from metrics import Timings, timing
+from search import PageIndex, line_matches
+from textindex import TextIndex, open_text_index, visited_url
+
+
+# Status bar animation while a page loads
+LOADING_SPINNER = '|/-\\'
+LOADING_POLL_MS = 100
+AI_POLL_MS = 25  # Often enough that streamed words appear as they arrive
+
+AI_MODEL = "gpt-5-nano"
+
+AI_SYSTEM_PROMPT = ("You are a helpful assistant for a text-mode web browser. You can navigate to URLs "
+                    "using the navigate_to_url function when appropriate. Provide clear, concise "
+                    "responses formatted for a terminal browser.")
+
+# Function tools the AI may call
+AI_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "navigate_to_url",
+            "description": "Navigate the browser to a specific URL. Use this when the user wants to visit a website or when you need to look up information that requires visiting a specific page.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "url": {
+                        "type": "string",
+                        "description": "The full URL to navigate to (e.g., 'https://en.wikipedia.org/wiki/WebDAV')"
+                    },
+                    "reason": {
+                        "type": "string",
+                        "description": "Brief explanation of why navigating to this URL"
+                    }
+                },
+                "required": ["url", "reason"]
+            }
+        }
+    }
+]
+
+
+def abort_stream(stream):
+    """Shut down a streamed completion's connection, waking a thread blocked reading it"""
+    response = getattr(stream, 'response', None)
+    extensions = getattr(response, 'extensions', None) or {}
+    network = extensions.get('network_stream')
+    sock = network.get_extra_info('socket') if network is not None else None
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
 
 
-class Browser:
-    def __init__(self, stdscr):
+def tool_arguments(arguments: str) -> dict:
+    """Arguments of a streamed tool call; ValueError if they were cut short or malformed"""
+    try:
+        args = json.loads(arguments or '{}')
+    except ValueError as e:
+        raise ValueError(f"Malformed tool call from the AI: {e}") from None
+    if not isinstance(args, dict):
+        raise ValueError(f"Malformed tool call from the AI: {arguments}")
+    return args
+
+
+class AIRequest:
+    """An AI answer being streamed in on a worker thread"""
+
+    def __init__(self, command: str, prompt: str, header: int):
+        self.command = command
+        self.prompt = prompt
+        self.started = time.monotonic()
+        self.lines = []        # The page showing the answer
+        self.header = header   # Lines above the answer
+        self.parts = []        # Text received so far, appended by the worker
+        self.shown = 0         # Parts already in lines
+        self.tool_calls = {}   # index -> (function name, JSON arguments)
+        self.stream = None
+        self.error = None
+        self.key = None        # Where the finished answer is cached
+        self.cached = None     # The cached AIAnswer being replayed, if any
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+        self.timings = Timings('ai')
+
+
+class Browser(BrowserCore):
+    """Curses frontend: draws a BrowserCore's page and turns keys into actions"""
+
+    def __init__(self, stdscr, fetcher: Optional[Fetcher] = None,
+                 page_cache: Optional[PageCache] = None, term=None,
+                 converter: Optional[ConversionPool] = None,
+                 text_index: Optional[TextIndex] = None,
+                 ai_cache: Optional[AICache] = None):
         self.stdscr = stdscr
-        self.current_url = ""
-        self.page_content = []
-        self.page_text = ""  # Raw text content for AI processing
-        self.scroll_offset = 0
+        # Source of colors, popup windows and cursor control: the curses
+        # module, or a gateway session's virtual terminal
+        self.term = curses if term is None else term
+        super().__init__(fetcher, page_cache, converter=converter, text_index=text_index)
         self.running = True
-        self.forms = []  # Store forms found on the page
-        self.current_soup = None  # Store parsed HTML for form submission
-        self.links = []  # Store numbered links from the page
+
+        # T toggles the last action's stage breakdown in the status bar
+        self.show_timings = os.getenv('TEXTBROWSER_TIMINGS', '') not in ('', '0')
+        self._unrendered_timings = None  # Finished action whose first frame is still to be timed
+
+        # In-page search: / finds as you type, n/N go to the next/previous match
+        self.search_query = ''
+        self.search_prompt = None  # Query being typed while the / prompt is open
+        self.search_match = None   # Offset of the current match in _search_index
+        self._search_index = None
+
+        # AI answer streaming in while the main loop runs
+        self.ai_request = None
 
         # Initialize OpenAI client if API key is available
         api_key = os.getenv('OPENAI_API_KEY')
@@ -35,226 +146,57 @@ class Browser:
         else:
             self.client = None
 
+        # Answers already given, reused for the same command on the same page
+        # (shared when running in a gateway; TEXTBROWSER_AI_CACHE_TTL=0 turns it off)
+        if ai_cache is None and self.ai_enabled:
+            ai_cache = open_ai_cache()
+        self.ai_cache = ai_cache
+
         # Initialize colors
-        curses.init_pair(1, curses.COLOR_CYAN, curses.COLOR_BLACK)     # Status bar / cyan
-        curses.init_pair(2, curses.COLOR_GREEN, curses.COLOR_BLACK)    # Command box, links / green
-        curses.init_pair(3, curses.COLOR_YELLOW, curses.COLOR_BLACK)   # Help bar / yellow
-        curses.init_pair(4, curses.COLOR_MAGENTA, curses.COLOR_BLACK)  # Headings / magenta
-        curses.init_pair(5, curses.COLOR_WHITE, curses.COLOR_BLACK)    # Bold text / white
-        curses.init_pair(6, curses.COLOR_BLUE, curses.COLOR_BLACK)     # Secondary links / blue
-        curses.init_pair(7, curses.COLOR_RED, curses.COLOR_BLACK)      # Emphasis / red
-
-        # Color name to curses color pair mapping
-        self.color_map = {
-            'red': 7,
-            'green': 2,
-            'blue': 6,
-            'yellow': 3,
-            'cyan': 1,
-            'magenta': 4,
-            'white': 5,
-            'black': 0,  # Will need special handling
-            # Extended colors (map to closest)
-            'orange': 3,  # Yellow
-            'purple': 4,  # Magenta
-            'pink': 4,    # Magenta
-            'brown': 3,   # Yellow
-            'gray': 5,    # White
-            'grey': 5,    # White
+        self.term.init_pair(1, curses.COLOR_CYAN, curses.COLOR_BLACK)     # Status bar / cyan
+        self.term.init_pair(2, curses.COLOR_GREEN, curses.COLOR_BLACK)    # Command box, links / green
+        self.term.init_pair(3, curses.COLOR_YELLOW, curses.COLOR_BLACK)   # Help bar / yellow
+        self.term.init_pair(4, curses.COLOR_MAGENTA, curses.COLOR_BLACK)  # Headings / magenta
+        self.term.init_pair(5, curses.COLOR_WHITE, curses.COLOR_BLACK)    # Bold text / white
+        self.term.init_pair(6, curses.COLOR_BLUE, curses.COLOR_BLACK)     # Secondary links / blue
+        self.term.init_pair(7, curses.COLOR_RED, curses.COLOR_BLACK)      # Emphasis / red
+        self.term.init_pair(8, curses.COLOR_BLACK, curses.COLOR_YELLOW)   # Search matches
+
+        # Curses attribute for each style_runs() style
+        self.style_attrs = {
+            None: curses.A_NORMAL,
+            'heading': self.term.color_pair(4) | curses.A_BOLD,
+            'link': self.term.color_pair(2),
+            'bold': self.term.color_pair(5) | curses.A_BOLD,
+            'emphasis': self.term.color_pair(7),
+            'rule': self.term.color_pair(3),
         }
+        self.style_attrs.update((name, self.term.color_pair(pair))
+                                for name, pair in self.color_map.items())
 
-        # Hide cursor
-        curses.curs_set(0)
-
-    def fetch_page(self, url: str) -> bool:
-        """Fetch and parse a web page"""
-        try:
-            # Handle local file:// URLs or .html files
-            if url.startswith('file://'):
-                file_path = url.replace('file://', '')
-                with open(file_path, 'r') as f:
-                    html_content = f.read()
-                soup = BeautifulSoup(html_content, 'html.parser')
-            elif url.endswith('.html') and not url.startswith('http'):
-                # Local file path
-                import os
-                file_path = os.path.join(os.path.dirname(__file__), url)
-                with open(file_path, 'r') as f:
-                    html_content = f.read()
-                soup = BeautifulSoup(html_content, 'html.parser')
-                url = f"file://{file_path}"
-            else:
-                # Add https:// if no protocol specified
-                if not url.startswith(('http://', 'https://')):
-                    url = 'https://' + url
-
-                headers = {
-                    'User-Agent': 'Lynx/2.9.0dev.6 libwww-FM/2.14 SSL-MM/1.4.1'
-                }
-
-                response = requests.get(url, headers=headers, timeout=10)
-                response.raise_for_status()
-
-                # Parse HTML to text
-                soup = BeautifulSoup(response.text, 'html.parser')
+        # Styled runs per line of the current page, filled in as lines are shown
+        self._styled_page = None
+        self._styled = []
 
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-
-            # Store soup for form handling
-            self.current_soup = soup
-
-            # Extract links with numbering
-            self.links = []
-            for link in soup.find_all('a', href=True):
-                href = link.get('href')
-                if href and not href.startswith(('#', 'javascript:', 'mailto:')):
-                    # Convert relative URLs to absolute
-                    from urllib.parse import urljoin
-                    abs_url = urljoin(url, href)
-                    link_text = link.get_text(strip=True)
-                    if link_text:  # Only add links with visible text
-                        self.links.append({
-                            'url': abs_url,
-                            'text': link_text[:50]  # Truncate long link text
-                        })
-
-            # Extract forms
-            self.forms = []
-            for idx, form in enumerate(soup.find_all('form')):
-                form_data = {
-                    'index': idx,
-                    'action': form.get('action', ''),
-                    'method': form.get('method', 'get').upper(),
-                    'fields': []
-                }
-
-                # Get all input fields
-                for input_tag in form.find_all(['input', 'textarea']):
-                    input_type = input_tag.get('type', 'text')
-                    if input_type not in ['hidden', 'submit', 'button']:
-                        form_data['fields'].append({
-                            'name': input_tag.get('name', ''),
-                            'type': input_type,
-                            'placeholder': input_tag.get('placeholder', ''),
-                            'value': input_tag.get('value', '')
-                        })
-
-                if form_data['fields']:  # Only add forms with visible fields
-                    self.forms.append(form_data)
-
-            # Get terminal width for wrapping
-            try:
-                height, width = self.stdscr.getmaxyx()
-                wrap_width = width - 4  # Leave some margin
-            except:
-                wrap_width = 78  # Default fallback
-
-            # Process font color tags before conversion
-            for font_tag in soup.find_all('font'):
-                color = font_tag.get('color', '').lower()
-                if color and color in self.color_map:
-                    # Wrap text with special markers that we can detect later
-                    text = font_tag.get_text()
-                    font_tag.string = f"«{color}»{text}«/{color}»"
-
-            # Number the links in the HTML before conversion
-            link_counter = 0
-            for link in soup.find_all('a', href=True):
-                href = link.get('href')
-                if href and not href.startswith(('#', 'javascript:', 'mailto:')):
-                    link_text = link.get_text(strip=True)
-                    if link_text and link_counter < len(self.links):
-                        # Add number before the link
-                        link.string = f"[{link_counter}] {link_text}"
-                        link_counter += 1
-
-            # Convert to text using html2text for better formatting
-            h = html2text.HTML2Text()
-            h.ignore_links = True  # We're handling links ourselves
-            h.ignore_images = True
-            h.body_width = wrap_width  # Wrap to terminal width
-            h.unicode_snob = True  # Use unicode characters
-            h.mark_code = True  # Mark code blocks
-            text = h.handle(str(soup))
-
-            # Add links list at the end
-            if self.links:
-                text += "\n\n" + "=" * 60 + "\n"
-                text += f"LINKS: {len(self.links)} link(s) found\n"
-                text += "=" * 60 + "\n"
-                text += "Type a number (0-{}) to follow a link\n\n".format(len(self.links) - 1)
-
-                # Show first 20 links in the list
-                for idx, link in enumerate(self.links[:20]):
-                    text += f"[{idx}] {link['text']}\n"
-
-                if len(self.links) > 20:
-                    text += f"\n... and {len(self.links) - 20} more links (see inline numbers)\n"
-
-            # Add form information to the display
-            if self.forms:
-                text += "\n\n" + "=" * 60 + "\n"
-                text += f"FORMS DETECTED: {len(self.forms)} form(s) found\n"
-                text += "=" * 60 + "\n"
-                for idx, form in enumerate(self.forms):
-                    text += f"\n[Form {idx}] {form['method']} → {form['action'] or '(same page)'}\n"
-                    for field in form['fields']:
-                        placeholder = f" ({field['placeholder']})" if field['placeholder'] else ""
-                        text += f"  - {field['name']}: {field['type']}{placeholder}\n"
-                text += f"\nPress 'F' to fill out a form\n"
-
-            self.page_content = text.split('\n')
-            self.page_text = text  # Store for AI processing
-
-            # Detect if page is too empty (likely JS-heavy)
-            content_lines = [line.strip() for line in self.page_content if line.strip()]
-            if len(content_lines) < 10:
-                self.page_content = [
-                    "⚠️  JAVASCRIPT-HEAVY SITE DETECTED",
-                    "",
-                    f"URL: {url}",
-                    "",
-                    "This site appears to require JavaScript to display content.",
-                    "Text browsers cannot execute JavaScript.",
-                    "",
-                    "Possible solutions:",
-                    "",
-                    "1. Ask AI for help (Ctrl-K):",
-                    "   - 'find a text-friendly alternative to this site'",
-                    "   - 'search for [topic] on a simpler site'",
-                    "   - 'what is this site about?'",
-                    "",
-                    "2. Try alternative sites:",
-                    "   - YouTube → Invidious instances (yewtu.be, inv.riverside.rocks)",
-                    "   - Twitter → Nitter instances (nitter.net)",
-                    "   - Reddit → old.reddit.com or teddit instances",
-                    "   - Instagram → bibliogram instances",
-                    "",
-                    "3. Use yt-dlp for YouTube:",
-                    "   - Command line tool to download/stream videos",
-                    "",
-                    "Press Ctrl-K to try a different site or ask AI for alternatives.",
-                    "",
-                    "=" * 60,
-                    "",
-                    "Raw content detected:",
-                    ""
-                ] + self.page_content[:50]  # Show first 50 lines for debugging
+        # Hide cursor
+        self.term.curs_set(0)
 
-            self.current_url = url
-            self.scroll_offset = 0
+        # Only rows that changed since the last frame are sent to the terminal
+        self.screen = Screen(stdscr, self.term)
+        self._drawn = (None, 0)  # Page and scroll offset of the last frame
 
-            return True
+    def complete_timings(self, timings: Timings):
+        """Record an action's timings once its first frame has been drawn"""
+        timings.finish()
+        self._unrendered_timings = timings
 
-        except Exception as e:
-            self.page_content = [
-                f"Error loading page: {str(e)}",
-                "",
-                "Press Ctrl-K to enter a new URL"
-            ]
-            return False
+    def wrap_width(self) -> int:
+        """Width to wrap page text to"""
+        try:
+            height, width = self.stdscr.getmaxyx()
+            return width - 4  # Leave some margin
+        except:
+            return 78  # Default fallback
 
     def is_url(self, text: str) -> bool:
         """Check if the input looks like a URL"""
@@ -267,7 +209,14 @@ class Browser:
         return bool(url_pattern.match(text.strip()))
 
     def process_ai_command(self, command: str):
-        """Process an AI command on the current page"""
+        """Process an AI command on the current page, showing the answer as it streams in
+
+        An answer given before to the same command on the same page is shown
+        again at once; starting the command with ! asks the model anew.
+        """
+        self.cancel_ai()
+        fresh = command.startswith('!')
+        command = command.lstrip('!').strip()
         if not self.ai_enabled:
             self.page_content = [
                 "AI features are not enabled!",
@@ -284,125 +233,209 @@ class Browser:
 
         # Allow AI commands even without a loaded page for navigation
         page_context = ""
-        if self.page_text:
-            # Truncate page content if too long (OpenAI has token limits)
-            max_chars = 12000
-            truncated_content = self.page_text[:max_chars]
-            if len(self.page_text) > max_chars:
-                truncated_content += "\n\n[Content truncated...]"
-            page_context = f"Current page URL: {self.current_url}\n\nPage content:\n{truncated_content}\n\n"
-
-        # Show loading message
-        self.page_content = [
-            f"AI Processing: {command}",
-            "",
-            "Please wait..."
-        ]
+        # The parts of the page that matter to the command, within a token budget
+        context, complete = self.ai_context(command)
+        if context:
+            if not complete:
+                context = ("(The sections of the page most relevant to the request, in page order; "
+                           "[...] marks sections left out.)\n\n" + context)
+            page_context = f"Current page URL: {self.current_url}\n\nPage content:\n{context}\n\n"
+
+        # The answer goes under this heading as it arrives
+        header = [f"AI Response to: {command}"]
+        if self.current_url:
+            header.append(f"Page: {self.current_url}")
+        header.extend(["=" * 60, ""])
+        request = AIRequest(command, f"{page_context}User request: {command}", len(header))
+        request.key = ai_key(AI_MODEL, command, AI_SYSTEM_PROMPT, json.dumps(AI_TOOLS), page_context)
+        request.lines = header + ["Please wait..."]
+        self.page_content = request.lines
         self.scroll_offset = 0
-        self.render()
 
-        try:
-            # Define function tools for the AI
-            tools = [
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "navigate_to_url",
-                        "description": "Navigate the browser to a specific URL. Use this when the user wants to visit a website or when you need to look up information that requires visiting a specific page.",
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "url": {
-                                    "type": "string",
-                                    "description": "The full URL to navigate to (e.g., 'https://en.wikipedia.org/wiki/WebDAV')"
-                                },
-                                "reason": {
-                                    "type": "string",
-                                    "description": "Brief explanation of why navigating to this URL"
-                                }
-                            },
-                            "required": ["url", "reason"]
-                        }
-                    }
-                }
-            ]
+        if self.ai_cache is not None and not fresh:
+            with request.timings.stage('read'):
+                answer = self.ai_cache.get(request.key)
+            if answer is not None:
+                # Asked before on this very page: replay the answer and its tool calls
+                request.cached = answer
+                request.parts = [answer.text] if answer.text else []
+                request.tool_calls = dict(enumerate(answer.tool_calls))
+                request.done.set()
+                self.finish_ai(request)
+                return
 
-            # Call OpenAI API with function calling
-            response = self.client.chat.completions.create(
-                model="gpt-5-nano",
+        if self.background_loads:
+            # Streamed on a worker thread; the main loop shows it with poll_ai
+            self.ai_request = request
+            thread = threading.Thread(target=self._run_ai, args=(request,), daemon=True)
+            thread.start()
+            return
+        self.render()
+        self._run_ai(request)
+        self.finish_ai(request)
+
+    def _run_ai(self, request: 'AIRequest'):
+        """Read a streamed completion into request (on a worker thread)"""
+        timings = request.timings
+        timings.count('prompt', len(request.prompt.encode('utf-8')))
+        start = time.perf_counter()
+        first = None
+        try:
+            stream = self.client.chat.completions.create(
+                model=AI_MODEL,
                 messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful assistant for a text-mode web browser. You can navigate to URLs using the navigate_to_url function when appropriate. Provide clear, concise responses formatted for a terminal browser."
-                    },
-                    {
-                        "role": "user",
-                        "content": f"{page_context}User request: {command}"
-                    }
+                    {"role": "system", "content": AI_SYSTEM_PROMPT},
+                    {"role": "user", "content": request.prompt}
                 ],
-                tools=tools,
-                max_completion_tokens=2000
+                tools=AI_TOOLS,
+                max_completion_tokens=2000,
+                stream=True
             )
+            request.stream = stream
+            for chunk in stream:
+                if request.cancelled.is_set():
+                    break
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if first is None and (delta.content or delta.tool_calls):
+                    # Time to the first token is what the reader waits through
+                    first = time.perf_counter()
+                    timings.add('wait', first - start)
+                if delta.content:
+                    request.parts.append(delta.content)
+                    timings.count('response', len(delta.content.encode('utf-8')))
+                for call in delta.tool_calls or ():
+                    # Calls arrive in pieces: a name, then the arguments a fragment at a time
+                    name, arguments = request.tool_calls.get(call.index, ('', ''))
+                    if call.function is not None:
+                        name += call.function.name or ''
+                        arguments += call.function.arguments or ''
+                    request.tool_calls[call.index] = (name, arguments)
+        except Exception as e:
+            if not request.cancelled.is_set():
+                request.error = e
+        finally:
+            if request.stream is not None:
+                try:
+                    request.stream.close()
+                except Exception:
+                    pass
+            end = time.perf_counter()
+            if first is None:
+                timings.add('wait', end - start)
+            else:
+                timings.add('ai', end - first)
+            request.done.set()
 
-            # Check if AI wants to call a function
-            message = response.choices[0].message
-
-            if message.tool_calls:
-                # Handle function calls
-                for tool_call in message.tool_calls:
-                    if tool_call.function.name == "navigate_to_url":
-                        args = json.loads(tool_call.function.arguments)
-                        url = args.get("url")
-                        reason = args.get("reason", "AI navigation")
-
-                        # Show what we're doing
-                        self.page_content = [
-                            f"AI Action: Navigating to URL",
-                            "",
-                            f"Reason: {reason}",
-                            f"URL: {url}",
-                            "",
-                            "Loading page..."
-                        ]
-                        self.scroll_offset = 0
-                        self.render()
-
-                        # Actually navigate
-                        self.fetch_page(url)
-                        return
-
-            # No function call, just display the text response
-            ai_response = message.content if message.content else "No response from AI."
-
-            # Format the response
-            result = [
-                f"AI Response to: {command}",
-            ]
-            if self.current_url:
-                result.append(f"Page: {self.current_url}")
-            result.extend([
-                "=" * 60,
-                "",
-            ])
-            result.extend(ai_response.split('\n'))
-            result.extend([
-                "",
-                "=" * 60,
-                "Press Ctrl-K to enter a new command or URL"
-            ])
+    def poll_ai(self) -> bool:
+        """Show what has arrived of a streamed AI answer. Returns True if the page changed"""
+        request = self.ai_request
+        if request is None:
+            return False
+        if self.page_content is not request.lines:
+            # Navigated away meanwhile: the answer is no longer wanted
+            self.cancel_ai()
+            return False
+        if request.done.is_set():
+            self.finish_ai(request)
+            return True
+        return self.show_answer(request)
 
-            self.page_content = result
-            self.scroll_offset = 0
+    def show_answer(self, request: 'AIRequest') -> bool:
+        """Append the streamed text so far to the answer's lines"""
+        count = len(request.parts)
+        if count == request.shown:
+            return False
+        if request.shown == 0:
+            del request.lines[request.header:]  # "Please wait..."
+            request.lines.append('')
+        # The last line may still be growing: rebuild it along with the new ones
+        changed = len(request.lines) - 1
+        text = request.lines.pop() + ''.join(request.parts[request.shown:count])
+        request.lines.extend(text.split('\n'))
+        request.shown = count
+        if self._styled_page is request.lines:
+            del self._styled[changed:]  # Styled before it was complete
+        return True
+
+    def finish_ai(self, request: 'AIRequest'):
+        """Complete the page for a finished (or cancelled) AI request"""
+        if self.ai_request is request:
+            self.ai_request = None
+        self.complete_timings(request.timings)
+        if request.error is not None:
+            self.show_ai_error(request.error)
+            return
 
-        except Exception as e:
-            self.page_content = [
-                "AI Error!",
-                "",
-                f"Error: {str(e)}",
-                "",
-                "Press Ctrl-K to try again."
-            ]
-            self.scroll_offset = 0
+        if not request.cancelled.is_set():
+            try:
+                calls = [(name, tool_arguments(arguments)) for name, arguments in request.tool_calls.values()]
+            except ValueError as e:
+                self.show_ai_error(e)
+                return
+            # Only a complete, well-formed answer is worth asking for again
+            if request.cached is None and self.ai_cache is not None and (request.parts or request.tool_calls):
+                self.ai_cache.put(request.key, ''.join(request.parts),
+                                  [request.tool_calls[index] for index in sorted(request.tool_calls)])
+            for name, args in calls:
+                if name == "navigate_to_url":
+                    url = args.get("url")
+                    reason = args.get("reason", "AI navigation")
+
+                    # Show what we're doing
+                    self.page_content = [
+                        f"AI Action: Navigating to URL",
+                        "",
+                        f"Reason: {reason}",
+                        f"URL: {url}",
+                        "",
+                        "Loading page..."
+                    ]
+                    self.scroll_offset = 0
+                    self.render()
+
+                    # Actually navigate
+                    self.fetch_page(url)
+                    return
+
+        self.show_answer(request)
+        if request.shown == 0:
+            del request.lines[request.header:]
+            request.lines.append("Stopped." if request.cancelled.is_set() else "No response from AI.")
+        elif request.cancelled.is_set():
+            request.lines.extend(["", "[Stopped]"])
+        if request.cached is not None:
+            minutes = int(time.time() - request.cached.stored_at) // 60
+            request.lines.extend(["", f"(Saved answer from {minutes} min ago; "
+                                      "start the command with ! to ask again)"])
+        request.lines.extend([
+            "",
+            "=" * 60,
+            "Press Ctrl-K to enter a new command or URL"
+        ])
+
+    def show_ai_error(self, error: Exception):
+        self.page_content = [
+            "AI Error!",
+            "",
+            f"Error: {str(error)}",
+            "",
+            "Press Ctrl-K to try again."
+        ]
+        self.scroll_offset = 0
+
+    def cancel_ai(self):
+        """Stop a streaming AI answer, keeping what has arrived"""
+        request = self.ai_request
+        if request is None:
+            return
+        request.cancelled.set()
+        abort_stream(request.stream)
+        if self.page_content is request.lines:
+            self.finish_ai(request)
+        else:
+            self.ai_request = None
 
     def show_help(self):
         """Load and display the help page"""
@@ -414,52 +447,8 @@ class Browser:
             with open(help_path, 'r') as f:
                 help_html = f.read()
 
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(help_html, 'html.parser')
-            self.current_soup = soup
             self.current_url = f"file://{help_path}"
-
-            # Extract links (though help page shouldn't have many)
-            self.links = []
-            for link in soup.find_all('a', href=True):
-                href = link.get('href')
-                if href:
-                    link_text = link.get_text(strip=True)
-                    if link_text:
-                        self.links.append({
-                            'url': href,
-                            'text': link_text[:50]
-                        })
-
-            # Number the links
-            link_counter = 0
-            for link in soup.find_all('a', href=True):
-                href = link.get('href')
-                if href:
-                    link_text = link.get_text(strip=True)
-                    if link_text and link_counter < len(self.links):
-                        link.string = f"[{link_counter}] {link_text}"
-                        link_counter += 1
-
-            # Get terminal width
-            try:
-                height, width = self.stdscr.getmaxyx()
-                wrap_width = width - 4
-            except:
-                wrap_width = 78
-
-            # Convert to text
-            import html2text
-            h = html2text.HTML2Text()
-            h.ignore_links = True
-            h.ignore_images = True
-            h.body_width = wrap_width
-            h.unicode_snob = True
-            text = h.handle(str(soup))
-
-            self.page_content = text.split('\n')
-            self.page_text = text
-            self.forms = []  # Help page has no forms
+            self.load_html(help_html, self.current_url, footer=False)
             self.scroll_offset = 0
         else:
             # Fallback inline help
@@ -470,10 +459,17 @@ class Browser:
                 "  Ctrl-K    - Address/AI command box",
                 "  0-9       - Follow numbered links",
                 "  G         - Go to link by number",
+                "  ← / B     - Back",
+                "  →         - Forward",
                 "  F         - Fill out forms",
                 "  H         - Show this help",
+                "  T         - Show load timings in the status bar",
+                "  /         - Find in page (n/N: next/previous match)",
                 "  Q         - Quit",
                 "",
+                "Visited Pages (Ctrl-K):",
+                "  ^words    - Find pages you have read before, without the network",
+                "",
                 "AI Commands (Ctrl-K):",
                 "  summarize this page",
                 "  what are the main points?",
@@ -496,28 +492,28 @@ class Browser:
         height, width = self.stdscr.getmaxyx()
 
         # Create input window
-        input_win = curses.newwin(5, width - 4, height // 2 - 2, 2)
+        input_win = self.term.newwin(5, width - 4, height // 2 - 2, 2)
         input_win.box()
-        input_win.addstr(0, 2, " Go to Link ", curses.color_pair(2) | curses.A_BOLD)
+        input_win.addstr(0, 2, " Go to Link ", self.term.color_pair(2) | curses.A_BOLD)
         input_win.addstr(2, 2, f"Enter link number (0-{len(self.links)-1}): ")
         input_win.refresh()
 
-        curses.echo()
-        curses.curs_set(1)
+        self.term.echo()
+        self.term.curs_set(1)
         try:
             link_num_str = input_win.getstr(2, 40, 10).decode('utf-8')
             link_num = int(link_num_str)
 
             if 0 <= link_num < len(self.links):
-                curses.noecho()
-                curses.curs_set(0)
+                self.term.noecho()
+                self.term.curs_set(0)
                 self.fetch_page(self.links[link_num]['url'])
                 return
         except:
             pass
 
-        curses.noecho()
-        curses.curs_set(0)
+        self.term.noecho()
+        self.term.curs_set(0)
 
     def fill_form(self):
         """Interactive form filling"""
@@ -532,9 +528,9 @@ class Browser:
         else:
             # Show form selection
             height, width = self.stdscr.getmaxyx()
-            select_win = curses.newwin(len(self.forms) + 4, width - 4, 2, 2)
+            select_win = self.term.newwin(len(self.forms) + 4, width - 4, 2, 2)
             select_win.box()
-            select_win.addstr(0, 2, " Select Form ", curses.color_pair(2) | curses.A_BOLD)
+            select_win.addstr(0, 2, " Select Form ", self.term.color_pair(2) | curses.A_BOLD)
 
             for idx, form in enumerate(self.forms):
                 select_win.addstr(idx + 2, 2, f"{idx}: {form['method']} → {form['action'] or '(same page)'}"[:width-8])
@@ -542,18 +538,18 @@ class Browser:
             select_win.addstr(len(self.forms) + 2, 2, "Enter form number: ")
             select_win.refresh()
 
-            curses.echo()
-            curses.curs_set(1)
+            self.term.echo()
+            self.term.curs_set(1)
             try:
                 form_idx = int(select_win.getstr().decode('utf-8'))
                 if form_idx < 0 or form_idx >= len(self.forms):
                     raise ValueError()
             except:
-                curses.noecho()
-                curses.curs_set(0)
+                self.term.noecho()
+                self.term.curs_set(0)
                 return
-            curses.noecho()
-            curses.curs_set(0)
+            self.term.noecho()
+            self.term.curs_set(0)
 
         # Fill out the selected form
         form = self.forms[form_idx]
@@ -563,23 +559,23 @@ class Browser:
 
         for field in form['fields']:
             # Create input window
-            input_win = curses.newwin(5, width - 4, height // 2 - 2, 2)
+            input_win = self.term.newwin(5, width - 4, height // 2 - 2, 2)
             input_win.box()
 
             label = f" {field['name']} "
             if field['placeholder']:
                 label += f"({field['placeholder']}) "
-            input_win.addstr(0, 2, label[:width-8], curses.color_pair(2) | curses.A_BOLD)
+            input_win.addstr(0, 2, label[:width-8], self.term.color_pair(2) | curses.A_BOLD)
             input_win.addstr(2, 2, f"Type: {field['type']}")
             input_win.addstr(3, 2, "Value: ")
 
             input_win.refresh()
 
-            curses.echo()
-            curses.curs_set(1)
+            self.term.echo()
+            self.term.curs_set(1)
             value = input_win.getstr(3, 9, width - 16).decode('utf-8')
-            curses.noecho()
-            curses.curs_set(0)
+            self.term.noecho()
+            self.term.curs_set(0)
 
             if value:
                 form_values[field['name']] = value
@@ -590,59 +586,20 @@ class Browser:
     def submit_form(self, form, values):
         """Submit a form with the given values"""
         try:
-            # Construct the target URL
-            action = form['action']
-            if not action:
-                action = self.current_url
-            elif not action.startswith('http'):
-                # Relative URL
-                from urllib.parse import urljoin
-                action = urljoin(self.current_url, action)
-
-            headers = {
-                'User-Agent': 'Lynx/2.9.0dev.6 libwww-FM/2.14 SSL-MM/1.4.1'
-            }
-
             # Show loading message
-            self.page_content = ["Submitting form...", "", f"Target: {action}"]
+            self.page_content = ["Submitting form...", "", f"Target: {form['action'] or self.current_url}"]
             self.scroll_offset = 0
             self.render()
 
-            # Submit based on method
-            if form['method'] == 'POST':
-                response = requests.post(action, data=values, headers=headers, timeout=10)
-            else:  # GET
-                response = requests.get(action, params=values, headers=headers, timeout=10)
-
-            response.raise_for_status()
-
             # Parse the response
-            soup = BeautifulSoup(response.text, 'html.parser')
-            self.current_soup = soup
-
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-
-            # Get terminal width
+            timings = Timings('form')
             try:
-                height, width = self.stdscr.getmaxyx()
-                wrap_width = width - 4
-            except:
-                wrap_width = 78
-
-            # Convert to text
-            h = html2text.HTML2Text()
-            h.ignore_links = False
-            h.ignore_images = True
-            h.body_width = wrap_width
-            h.unicode_snob = True
-            h.mark_code = True
-            text = h.handle(str(soup))
-
-            self.page_content = text.split('\n')
-            self.page_text = text
-            self.current_url = response.url
+                with timing(timings):
+                    html_content, url = self.send_form(form, values)
+                    self.load_html(html_content, url)
+            finally:
+                self.complete_timings(timings)
+            self.current_url = url
             self.scroll_offset = 0
 
         except Exception as e:
@@ -660,13 +617,13 @@ class Browser:
         height, width = self.stdscr.getmaxyx()
 
         # Create a window for input at the bottom
-        input_win = curses.newwin(3, width - 4, height - 4, 2)
+        input_win = self.term.newwin(3, width - 4, height - 4, 2)
         input_win.box()
-        input_win.addstr(0, 2, " Address / AI Command ", curses.color_pair(2) | curses.A_BOLD)
+        input_win.addstr(0, 2, " Address / AI Command ", self.term.color_pair(2) | curses.A_BOLD)
 
         # Enable cursor for input
-        curses.curs_set(1)
-        curses.echo()
+        self.term.curs_set(1)
+        self.term.echo()
 
         input_win.refresh()
         input_win.move(1, 2)
@@ -675,124 +632,228 @@ class Browser:
         user_input = input_win.getstr(1, 2, width - 8).decode('utf-8')
 
         # Restore cursor state
-        curses.noecho()
-        curses.curs_set(0)
+        self.term.noecho()
+        self.term.curs_set(0)
 
         return user_input.strip() if user_input else None
 
-    def render_line_with_formatting(self, y: int, line: str, width: int):
-        """Render a single line with markdown formatting and colors"""
-        if not line:
-            return
-
-        x = 0
-        line = line[:width]  # Truncate to screen width
-
-        # Check for font color markers
-        if '«' in line and '»' in line:
-            # Line contains color markers, render with colors
-            import re
-            parts = re.split(r'(«[a-z]+»|«/[a-z]+»)', line)
-            current_color = None
-
-            for part in parts:
-                if part.startswith('«') and part.endswith('»'):
-                    color_name = part[1:-1]
-                    if color_name.startswith('/'):
-                        # End color tag
-                        current_color = None
-                    else:
-                        # Start color tag
-                        current_color = color_name
-                else:
-                    # Regular text, render with current color
-                    if part and x < width:
-                        try:
-                            if current_color and current_color in self.color_map:
-                                color_pair = self.color_map[current_color]
-                                self.stdscr.addstr(y, x, part[:width-x], curses.color_pair(color_pair))
-                            else:
-                                self.stdscr.addstr(y, x, part[:width-x])
-                            x += len(part)
-                        except curses.error:
-                            pass
-            return
-
-        # Detect heading lines (starting with #)
-        if line.startswith('#'):
-            try:
-                self.stdscr.addstr(y, x, line, curses.color_pair(4) | curses.A_BOLD)
-            except curses.error:
-                pass
-            return
-
-        # Detect links [text](url)
-        if '[' in line and '](' in line:
-            try:
-                self.stdscr.addstr(y, x, line, curses.color_pair(2))
-            except curses.error:
-                pass
-            return
-
-        # Detect bold text **text**
-        if '**' in line:
-            try:
-                self.stdscr.addstr(y, x, line, curses.color_pair(5) | curses.A_BOLD)
-            except curses.error:
-                pass
-            return
+    def search_page(self):
+        """Find as you type from the top of the screen; Enter keeps the match, Esc goes back"""
+        origin = self.scroll_offset
+        index = self._search_index = self.page_index()
+        start = index.offset_of(origin)
+        decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        query = ''
+        self.stdscr.timeout(-1)
+        while True:
+            self.search_prompt = self.search_query = query
+            self.search_match = index.find(query, start)
+            if self.search_match is None:
+                self.scroll_offset = origin
+            else:
+                self.show_match(index)
+            self.render()
 
-        # Detect emphasis _text_
-        if line.startswith('_') or '_' in line:
-            try:
-                self.stdscr.addstr(y, x, line, curses.color_pair(7))
-            except curses.error:
-                pass
+            key = self.stdscr.getch()
+            if key in (10, 13, curses.KEY_ENTER):
+                break
+            if key in (27, -1):
+                self.search_query = ''
+                self.search_match = None
+                self.scroll_offset = origin
+                break
+            if key in (curses.KEY_BACKSPACE, 127, 8):
+                query = query[:-1]
+            elif 32 <= key < 256:
+                query += decoder.decode(bytes([key]))
+        self.search_prompt = None
+
+    def next_match(self, backwards: bool = False):
+        """Go to the next (or previous) match of the last search"""
+        if not self.search_query:
             return
+        index = self.page_index()
+        if self.search_match is None or self._search_index is not index:
+            # New page (or re-wrapped): search from the top of the screen
+            self._search_index = index
+            start = index.offset_of(self.scroll_offset)
+        else:
+            start = self.search_match if backwards else self.search_match + 1
+        self.search_match = index.find(self.search_query, start, backwards)
+        if self.search_match is not None:
+            self.show_match(index)
+
+    def show_match(self, index: PageIndex):
+        """Scroll the current match into view, a third of the way down if it was off screen"""
+        line = index.line_of(self.search_match)
+        content_height = self.stdscr.getmaxyx()[0] - 2
+        if not self.scroll_offset <= line < self.scroll_offset + content_height:
+            last = max(0, len(self.page_content) - content_height)
+            self.scroll_offset = max(0, min(line - content_height // 3, last))
+
+    def search_status(self) -> str:
+        """Help bar text for the open / prompt"""
+        query = self.search_prompt
+        if not query:
+            return f" /{query}  (type to search, Enter: keep, Esc: cancel)"
+        if self.search_match is None:
+            return f" /{query}  not found"
+        index = self._search_index
+        return (f" /{query}  match {index.ordinal(query, self.search_match)} "
+                f"of {index.total(query)}")
+
+    def highlight_runs(self, runs: tuple, spans: list) -> tuple:
+        """runs with the columns in spans drawn as search matches"""
+        attr = self.term.color_pair(8)
+        highlighted = []
+        for x, text, run_attr in runs:
+            end = x + len(text)
+            position = x
+            for start, stop in spans:
+                if stop <= position or start >= end:
+                    continue
+                if start > position:
+                    highlighted.append((position, text[position - x:start - x], run_attr))
+                start, stop = max(start, position), min(stop, end)
+                highlighted.append((start, text[start - x:stop - x], attr))
+                position = stop
+            if position < end:
+                highlighted.append((position, text[position - x:], run_attr))
+        return tuple(highlighted)
+
+    def styled_line(self, line: str) -> tuple:
+        """(x, text, attr) runs for a page line, and its display width"""
+        attrs = self.style_attrs
+        runs = tuple((x, text, attrs.get(style, curses.A_NORMAL))
+                     for x, text, style in style_runs(line))
+        return runs, (runs[-1][0] + len(runs[-1][1]) if runs else 0)
+
+    def line_runs(self, line: str, width: int) -> tuple:
+        """(x, text, attr) runs for a page line, cut to width"""
+        return self.clip_runs(*self.styled_line(line), width)
+
+    def clip_runs(self, runs: tuple, length: int, width: int) -> tuple:
+        if length <= width:
+            return runs
+        return tuple((x, text[:width - x], attr) for x, text, attr in runs if x < width)
+
+    def page_runs(self, start: int, stop: int, width: int) -> list:
+        """Runs for page lines start..stop, styled once per page"""
+        lines = self.page_content
+        if isinstance(lines, Document):
+            lines.ensure(stop)
+        if self._styled_page is not lines:
+            self._styled_page = lines
+            self._styled = []
+        styled = self._styled
+        stop = min(stop, len(lines))
+        if len(styled) < stop:
+            styled.extend([None] * (stop - len(styled)))
+
+        rows = []
+        for i in range(start, stop):
+            entry = styled[i]
+            if entry is None:
+                entry = styled[i] = self.styled_line(lines[i])
+            rows.append(self.clip_runs(entry[0], entry[1], width))
+        return rows
 
-        # Detect separator lines (===, ---, etc)
-        if line.strip() and all(c in '=-_*' for c in line.strip()):
+    def render_line_with_formatting(self, y: int, line: str, width: int):
+        """Render a single line with markdown formatting and colors"""
+        for x, text, attr in self.line_runs(line, width):
             try:
-                self.stdscr.addstr(y, x, line, curses.color_pair(3))
+                self.stdscr.addstr(y, x, text, attr)
             except curses.error:
                 pass
-            return
-
-        # Regular text
-        try:
-            self.stdscr.addstr(y, x, line)
-        except curses.error:
-            pass
-
-    def render(self):
-        """Render the current page"""
-        self.stdscr.clear()
-        height, width = self.stdscr.getmaxyx()
-
-        # Draw status bar at top
-        status = f" DBBasic TextBrowser | {self.current_url or 'No page loaded'} "
-        self.stdscr.addstr(0, 0, status[:width], curses.color_pair(1) | curses.A_BOLD)
 
-        # Draw help bar at bottom
+    def frame(self, height: int, width: int) -> list:
+        """Rows of (x, text, attr) runs for the whole screen"""
+        # Status bar at top
+        if self.loading is not None:
+            elapsed = time.monotonic() - self.loading.started
+            spinner = LOADING_SPINNER[int(elapsed * 10) % len(LOADING_SPINNER)]
+            received = f" {self.loading.received // 1024} KB" if self.loading.received else ""
+            status = f" {spinner} Loading {self.loading.url}{received} ({elapsed:.1f}s) | Esc: Cancel "
+            rows = [((0, status[:width], self.term.color_pair(3) | curses.A_BOLD),)]
+        elif self.ai_request is not None:
+            request = self.ai_request
+            elapsed = time.monotonic() - request.started
+            spinner = LOADING_SPINNER[int(elapsed * 10) % len(LOADING_SPINNER)]
+            state = "AI answering" if request.parts else "Asking AI"
+            status = f" {spinner} {state}: {request.command} ({elapsed:.1f}s) | Esc: Stop "
+            rows = [((0, status[:width], self.term.color_pair(3) | curses.A_BOLD),)]
+        else:
+            partial = "(partial) " if self.partial else ""
+            status = f" DBBasic TextBrowser | {self.current_url or 'No page loaded'} {partial}"
+            row = [(0, status[:width], self.term.color_pair(1) | curses.A_BOLD)]
+            if self.show_timings and self.last_timings is not None:
+                readout = f" {self.last_timings.summary()} "
+                if len(status) + len(readout) <= width:
+                    row.append((width - len(readout), readout, self.term.color_pair(3)))
+            rows = [tuple(row)]
+
+        # Page content with formatting
+        content_height = height - 2  # Minus status and help bars
+        visible = self.page_runs(self.scroll_offset, self.scroll_offset + content_height, width)
+        if self.search_query:
+            # Only the rows on screen are searched for highlighting
+            for i, runs in enumerate(visible):
+                spans = line_matches(self.page_content[self.scroll_offset + i], self.search_query)
+                if spans:
+                    visible[i] = self.highlight_runs(runs, spans)
+        rows.extend(visible)
+        rows.extend(() for _ in range(content_height - len(visible)))
+
+        # Help bar at bottom, with a scroll indicator if needed
         link_hint = " | 0-9/G: Links" if self.links else ""
         form_hint = " | F: Form" if self.forms else ""
-        help_text = f" Ctrl-K: URL/AI{link_hint}{form_hint} | H: Help | Q: Quit "
-        self.stdscr.addstr(height - 1, 0, help_text[:width], curses.color_pair(3))
-
-        # Render page content with formatting
-        content_height = height - 2  # Minus status and help bars
-        visible_lines = self.page_content[self.scroll_offset:self.scroll_offset + content_height]
-
-        for i, line in enumerate(visible_lines):
-            self.render_line_with_formatting(i + 1, line, width)
-
-        # Show scroll indicator if needed
+        back_hint = " | ←: Back" if self.history.can_go_back else ""
+        search_hint = " | n/N: Next/Prev match" if self.search_query else " | /: Find"
+        help_text = f" Ctrl-K: URL/AI{link_hint}{form_hint}{back_hint}{search_hint} | H: Help | Q: Quit "
+        if self.search_prompt is not None:
+            help_text = self.search_status()
+        help_row = [(0, help_text[:width], self.term.color_pair(3))]
         if len(self.page_content) > content_height:
             scroll_pct = int((self.scroll_offset / len(self.page_content)) * 100)
             indicator = f" [{scroll_pct}%] "
-            self.stdscr.addstr(height - 1, width - len(indicator) - 1, indicator, curses.color_pair(2))
+            help_row.append((width - len(indicator) - 1, indicator, self.term.color_pair(2)))
+        rows.append(tuple(help_row))
+        return rows
+
+    def fit_page(self, width: int):
+        """Re-wrap the page for a new terminal width, keeping the reader's paragraph"""
+        lines = self.page_content
+        if not isinstance(lines, Document) or lines.width == width - 4:
+            return
+        # Only the blocks are re-wrapped: no fetch and no HTML parsing
+        self.scroll_offset = lines.reflow(width - 4, self.scroll_offset)
+        self._styled_page = None
+        self._drawn = (None, 0)
 
-        self.stdscr.refresh()
+    def render(self):
+        """Render the current page, redrawing only what changed since the last frame"""
+        start = time.perf_counter()
+        height, width = self.stdscr.getmaxyx()
+        self.fit_page(width)
+
+        # Same page moved by a few lines: shift it with the terminal's
+        # scroll region instead of rewriting every row
+        drawn_page, drawn_offset = self._drawn
+        if drawn_page is self.page_content and drawn_offset != self.scroll_offset:
+            self.screen.scroll(1, height - 2, self.scroll_offset - drawn_offset)
+        self._drawn = (self.page_content, self.scroll_offset)
+
+        self.screen.draw(self.frame(height, width))
+
+        timings, self._unrendered_timings = self._unrendered_timings, None
+        if timings is not None:
+            # The first frame of the result counts towards the action
+            elapsed = time.perf_counter() - start
+            timings.add('render', elapsed)
+            timings.total += elapsed
+            BrowserCore.complete_timings(self, timings)
+            if self.show_timings:
+                self.screen.draw(self.frame(height, width))  # Show the new breakdown
 
     def handle_input(self, key: int):
         """Handle keyboard input"""
@@ -803,31 +864,73 @@ class Browser:
         # Ctrl-K: Show command box
         if key == 11:  # Ctrl-K
             command = self.show_command_box()
+            self.screen.touch()  # Repaint where the box was
             if command:
-                # Detect if input is a URL or AI command
-                if self.is_url(command):
-                    self.fetch_page(command)
+                # ^words searches the pages visited before; otherwise a URL or AI command
+                if command.startswith('^'):
+                    self.navigate(self.fetch_page, visited_url(command[1:]))
+                elif command.startswith('about:') or self.is_url(command):
+                    self.navigate(self.fetch_page, command)
                 else:
                     # It's an AI command
-                    self.process_ai_command(command)
+                    self.navigate(self.process_ai_command, command)
+
+        # Terminal resized: the next render re-wraps the page
+        elif key == curses.KEY_RESIZE:
+            self.screen.invalidate()
+
+        # Left arrow / B: Back
+        elif key in (curses.KEY_LEFT, ord('b'), ord('B')):
+            self.go_back()
+
+        # Right arrow: Forward
+        elif key == curses.KEY_RIGHT:
+            self.go_forward()
 
         # F: Fill form
         elif key in (ord('f'), ord('F')):
-            self.fill_form()
+            self.complete_page()
+            self.navigate(self.fill_form)
+            self.screen.touch()
 
         # H: Show help
         elif key in (ord('h'), ord('H')):
-            self.show_help()
+            self.navigate(self.show_help)
 
         # G: Go to link by number
         elif key in (ord('g'), ord('G')):
-            self.goto_link()
+            self.navigate(self.goto_link)
+            self.screen.touch()
 
         # Number keys 0-9: Quick link access
         elif ord('0') <= key <= ord('9'):
             link_num = key - ord('0')
             if link_num < len(self.links):
-                self.fetch_page(self.links[link_num]['url'])
+                self.navigate(self.fetch_page, self.links[link_num]['url'])
+
+        # T: Toggle the timing breakdown in the status bar
+        elif key in (ord('t'), ord('T')):
+            self.show_timings = not self.show_timings
+
+        # /: Find in page
+        elif key == ord('/'):
+            self.search_page()
+
+        # n / N: Next / previous match
+        elif key == ord('n'):
+            self.next_match()
+        elif key == ord('N'):
+            self.next_match(backwards=True)
+
+        # Esc: Cancel a page load or AI answer, or clear the search highlight
+        elif key == 27:
+            if self.loading is not None:
+                self.cancel_load()
+            elif self.ai_request is not None:
+                self.cancel_ai()
+            else:
+                self.search_query = ''
+                self.search_match = None
 
         # Q: Quit
         elif key in (ord('q'), ord('Q')):
@@ -855,64 +958,38 @@ class Browser:
 
         # End
         elif key == curses.KEY_END:
-            self.scroll_offset = max_scroll
+            self.complete_page()
+            self.scroll_offset = max(0, len(self.page_content) - content_height)
+
+    def run(self, start_url: Optional[str] = None):
+        """Main browser loop, starting at start_url or the homepage"""
+        self.start(start_url)
+        while self.running:
+            self.poll_load()
+            self.poll_ai()
+            self.render()
+            self.stdscr.timeout(self.poll_interval())
+            key = self.stdscr.getch()
+            if key != -1:
+                self.handle_input(key)
 
-    def run(self):
-        """Main browser loop"""
+        self.close()
+
+    def start(self, start_url: Optional[str] = None):
+        """Show the homepage and begin loading start_url, if given"""
         # Load homepage
         import os
         homepage_path = os.path.join(os.path.dirname(__file__), 'homepage.html')
 
-        if os.path.exists(homepage_path):
+        if start_url:
+            self.current_url = start_url
+        elif os.path.exists(homepage_path):
             # Load local homepage
             with open(homepage_path, 'r') as f:
                 homepage_html = f.read()
 
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(homepage_html, 'html.parser')
-            self.current_soup = soup
             self.current_url = f"file://{homepage_path}"
-
-            # Extract links
-            self.links = []
-            for link in soup.find_all('a', href=True):
-                href = link.get('href')
-                if href:
-                    link_text = link.get_text(strip=True)
-                    if link_text:
-                        self.links.append({
-                            'url': href,
-                            'text': link_text[:50]
-                        })
-
-            # Number the links
-            link_counter = 0
-            for link in soup.find_all('a', href=True):
-                href = link.get('href')
-                if href:
-                    link_text = link.get_text(strip=True)
-                    if link_text and link_counter < len(self.links):
-                        link.string = f"[{link_counter}] {link_text}"
-                        link_counter += 1
-
-            # Get terminal width
-            try:
-                height, width = self.stdscr.getmaxyx()
-                wrap_width = width - 4
-            except:
-                wrap_width = 78
-
-            # Convert to text
-            import html2text
-            h = html2text.HTML2Text()
-            h.ignore_links = True
-            h.ignore_images = True
-            h.body_width = wrap_width
-            h.unicode_snob = True
-            text = h.handle(str(soup))
-
-            self.page_content = text.split('\n')
-            self.page_text = text
+            self.load_html(homepage_html, self.current_url, footer=False)
         else:
             # Fallback to welcome message
             ai_status = "ENABLED" if self.ai_enabled else "DISABLED (set OPENAI_API_KEY to enable)"
@@ -931,22 +1008,50 @@ class Browser:
                 "  ↑ ↓       - Scroll up/down",
                 "  PgUp/PgDn - Scroll page up/down",
                 "  Home/End  - Jump to top/bottom",
+                "  ← / →     - Back/forward",
                 "  Q         - Quit",
             ]
 
-        while self.running:
-            self.render()
-            key = self.stdscr.getch()
-            self.handle_input(key)
+        # Page loads now happen off the UI thread
+        self.background_loads = True
+        if start_url:
+            self.fetch_page(start_url)
+
+    def poll_interval(self) -> int:
+        """Milliseconds to wait for a key before polling again, -1 for no limit"""
+        # While loading, wake up regularly to animate and pick up the page
+        if self.ai_request is not None:
+            return AI_POLL_MS
+        return LOADING_POLL_MS if self.loading is not None else -1
+
+    def close(self):
+        self.cancel_ai()
+        super().close()
 
 
 def main(stdscr):
-    browser = Browser(stdscr)
-    browser.run()
+    text_index = open_text_index()
+    browser = Browser(stdscr, text_index=text_index)
+    try:
+        browser.run()
+    finally:
+        if text_index is not None:
+            text_index.close()
 
 
 def cli():
     """Entry point for console script."""
+    if sys.argv[1:2] == ['--gateway']:
+        # Serve many telnet users instead of this terminal
+        from gateway import main as gateway_main
+        return gateway_main(sys.argv[2:])
+    if sys.argv[1:2] == ['render']:
+        # Convert pages to text without a terminal
+        from render import main as render_main
+        return render_main(sys.argv[2:])
+
+    # Make Esc (cancel load) respond immediately instead of after 1s
+    os.environ.setdefault('ESCDELAY', '25')
     curses.wrapper(main)
 
 
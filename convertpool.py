@@ -0,0 +1,184 @@
+"""
+Process-pool HTML conversion for DBBasic TextBrowser
+
+Converting HTML is pure-Python and CPU-bound, so in a gateway serving many
+users one huge page would hold the GIL while everybody else waits. A
+ConversionPool converts pages in worker processes instead: the HTML goes
+over a pipe as UTF-8 bytes and the converted page (blocks, links, forms)
+comes back marshalled. Workers are replaced after a number of jobs, killed
+and replaced when a job runs past its timeout, and oversized pages are
+refused before they are sent.
+"""
+
+import marshal
+import multiprocessing
+import os
+import queue
+import threading
+
+from htmltext import convert_blocks
+
+
+DEFAULT_MAX_JOBS = 500        # Jobs per worker before it is replaced
+DEFAULT_TIMEOUT = 10.0        # Seconds a single page may take
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+
+# Smaller pages convert faster than the round trip to a worker
+DEFAULT_MIN_BYTES = 16 * 1024
+
+
+class ConversionError(Exception):
+    """A page could not be converted by the pool"""
+
+
+class ConversionTimeout(ConversionError):
+    """A page took longer than the pool's timeout to convert"""
+
+
+class PageTooLarge(ConversionError):
+    """A page is over the pool's size limit"""
+
+
+def _serve(conn):
+    """Worker process: convert pages from conn until it closes"""
+    while True:
+        try:
+            request = conn.recv_bytes()
+        except (EOFError, OSError):
+            return
+        url, colors, parser, data = marshal.loads(request)
+        try:
+            html = data.decode('utf-8', 'surrogatepass')
+            reply = (True, convert_blocks(html, url, colors, parser))
+        except Exception as e:
+            reply = (False, f"{type(e).__name__}: {e}")
+        conn.send_bytes(marshal.dumps(reply))
+
+
+class _Worker:
+    """One conversion process and our end of its pipe"""
+
+    def __init__(self, context):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child,),
+                                       name='textbrowser-convert', daemon=True)
+        self.process.start()
+        child.close()
+        self.jobs = 0
+
+    def stop(self, kill: bool = False):
+        self.conn.close()
+        if kill:
+            self.process.kill()
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+
+class ConversionPool:
+    """Worker processes converting HTML documents to (blocks, links, forms)"""
+
+    def __init__(self, processes: int = None, max_jobs: int = DEFAULT_MAX_JOBS,
+                 timeout: float = DEFAULT_TIMEOUT, max_bytes: int = DEFAULT_MAX_BYTES,
+                 min_bytes: int = DEFAULT_MIN_BYTES):
+        self.processes = processes or os.cpu_count() or 1
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.min_bytes = min_bytes
+
+        # Spawned rather than forked: the gateway forking from its many threads could deadlock
+        self._context = multiprocessing.get_context('spawn')
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        for _ in range(self.processes):
+            self._idle.put(_Worker(self._context))
+
+        self.jobs = 0
+        self.timeouts = 0
+        self.refused = 0
+        self.recycled = 0
+
+    def wants(self, html: str) -> bool:
+        """Whether html is big enough to be worth sending to a worker"""
+        return len(html) >= self.min_bytes
+
+    def convert(self, html: str, base_url: str = '', colors=(), parser: str = None):
+        """Convert an HTML document in a worker, returning (blocks, links, forms)
+
+        Blocks until a worker is free. Raises PageTooLarge, ConversionTimeout
+        or ConversionError. Safe to call from many threads.
+        """
+        data = html.encode('utf-8', 'surrogatepass')
+        if len(data) > self.max_bytes:
+            with self._lock:
+                self.refused += 1
+            raise PageTooLarge(f"page is {len(data) // 1024} KB, over the "
+                               f"{self.max_bytes // 1024} KB conversion limit")
+        request = marshal.dumps((base_url, list(colors), parser, data))
+
+        worker = self._idle.get()
+        healthy = False
+        try:
+            if self._closed:
+                raise ConversionError('conversion pool is closed')
+            worker.conn.send_bytes(request)
+            if not worker.conn.poll(self.timeout):
+                with self._lock:
+                    self.timeouts += 1
+                raise ConversionTimeout(f"page took over {self.timeout:g}s to convert")
+            ok, result = marshal.loads(worker.conn.recv_bytes())
+            healthy = True
+        except (EOFError, OSError) as e:
+            raise ConversionError(f"conversion worker failed: {e}")
+        finally:
+            self._release(worker, healthy)
+
+        if not ok:
+            raise ConversionError(result)
+        blocks, links, forms = result
+        with self._lock:
+            self.jobs += 1
+        return blocks, links, forms
+
+    def _release(self, worker: _Worker, healthy: bool):
+        """Return a worker to the pool, replacing it if it is stuck or worn out"""
+        worker.jobs += 1
+        if self._closed:
+            worker.stop(kill=not healthy)
+            self._idle.put(worker)  # Let other waiting threads see the pool is closed
+            return
+        if not healthy or worker.jobs >= self.max_jobs:
+            worker.stop(kill=not healthy)
+            if healthy:
+                with self._lock:
+                    self.recycled += 1
+            worker = _Worker(self._context)
+        self._idle.put(worker)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'processes': self.processes,
+                'jobs': self.jobs,
+                'timeouts': self.timeouts,
+                'refused': self.refused,
+                'recycled': self.recycled,
+            }
+
+    def close(self):
+        """Stop the idle workers; busy ones stop when their job returns"""
+        self._closed = True
+        stopped = []
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop()
+            stopped.append(worker)
+        # Handed back stopped, so threads still waiting for a worker wake up and fail
+        for worker in stopped:
+            self._idle.put(worker)
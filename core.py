@@ -0,0 +1,889 @@
+"""
+UI-free browser core for DBBasic TextBrowser
+
+Fetching, converting and the state of the current page (URL, lines,
+links, forms, history), with no terminal attached. Blocking work - HTTP
+through the pooled Fetcher and HTML conversion - runs on worker threads
+behind coroutines, so many cores can share one event loop and an idle
+core holds no thread at all. The curses Browser is a frontend on top of
+BrowserCore; other frontends await open() and submit() directly.
+"""
+
+import asyncio
+import codecs
+import os
+import threading
+import time
+from typing import Optional
+from urllib.parse import urljoin
+
+from convertpool import ConversionError, ConversionPool
+from fetcher import Fetcher
+from httpcache import HTTPCache, default_cache_dir
+from document import Document, lazy_document
+from history import History, HistoryEntry
+from pagecache import PageCache, page_key
+from prefetch import Prefetcher
+from htmltext import StreamConverter, best_parser, convert_blocks
+from aicontext import DEFAULT_TOKENS as AI_CONTEXT_TOKENS, build_context
+from search import PageIndex
+from textindex import TextIndex, visited_query
+from metrics import METRICS, Timings, current, format_bytes, stage, timing
+
+
+# Bigger pages are converted and wrapped lazily as they are read
+LAZY_PAGE_BYTES = 1024 * 1024
+
+# Pages are cut off after this much, so a huge response can't exhaust memory
+MAX_PAGE_BYTES = 8 * 1024 * 1024
+
+# Most of a page ranked for an AI request's context
+CONTEXT_SOURCE_CHARS = 400 * 1024
+
+# Local pages shipped with the browser, readable even with local files off
+BUNDLED_PAGES = ('help.html', 'homepage.html')
+
+# Wrap width when there is no terminal to measure
+DEFAULT_WIDTH = 78
+
+# Color names in pages to the color pairs set up by frontends
+COLOR_MAP = {
+    'red': 7,
+    'green': 2,
+    'blue': 6,
+    'yellow': 3,
+    'cyan': 1,
+    'magenta': 4,
+    'white': 5,
+    'black': 0,  # Will need special handling
+    # Extended colors (map to closest)
+    'orange': 3,  # Yellow
+    'purple': 4,  # Magenta
+    'pink': 4,    # Magenta
+    'brown': 3,   # Yellow
+    'gray': 5,    # White
+    'grey': 5,    # White
+}
+
+
+class PageLoad:
+    """A page being fetched and converted on a worker thread"""
+
+    def __init__(self, url: str, width: int):
+        self.url = url
+        self.width = width
+        self.final_url = url
+        self.started = time.monotonic()
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+        self.result = None  # (lines, links, forms)
+        self.error = None
+        self.record_history = False
+        self.stream = None  # StreamConverter while the body downloads
+        self.received = 0   # Bytes downloaded so far
+        self.shown = 0      # Streamed lines already on screen
+        self.lines = None   # The page those lines went into
+        self.partial = False  # Cut off at max_page_bytes
+        self.timings = Timings('load')
+
+
+def local_path(url: str) -> Optional[str]:
+    """The file read_page reads url from, or None for a web URL"""
+    if url.startswith('file://'):
+        return url.replace('file://', '')
+    if url.endswith('.html') and not url.startswith('http'):
+        return os.path.join(os.path.dirname(__file__), url)
+    return None
+
+
+def partial_notice(limit: int, total: str = '') -> str:
+    """HTML appended to a page cut off after limit bytes"""
+    of = f" of {format_bytes(int(total))}" if total.isdigit() else ''
+    return (f"<hr><p><b>Partial page:</b> only the first {format_bytes(limit)}{of} "
+            f"was loaded.</p>")
+
+
+class BrowserCore:
+    """Pages, links, forms and history, fetched and converted without a UI"""
+
+    def __init__(self, fetcher: Optional[Fetcher] = None,
+                 page_cache: Optional[PageCache] = None, width: int = DEFAULT_WIDTH,
+                 converter: Optional[ConversionPool] = None,
+                 text_index: Optional[TextIndex] = None):
+        self.width = width
+        self.current_url = ""
+        self.page_content = []
+        self.page_text = ""  # Raw text content for AI processing
+        self.scroll_offset = 0
+        self.forms = []  # Store forms found on the page
+        self.links = []  # Store numbered links from the page
+        self.last_error = None  # Why the last failed load failed
+        self.partial = False  # Whether the current page was cut off at max_page_bytes
+        self.color_map = dict(COLOR_MAP)
+
+        # Fastest installed HTML parser, TEXTBROWSER_PARSER picks a specific one
+        self.parser = best_parser(os.getenv('TEXTBROWSER_PARSER'))
+
+        # Pooled keep-alive HTTP session (shared when running in a gateway)
+        self.owns_fetcher = fetcher is None
+        if fetcher is None:
+            # TEXTBROWSER_CACHE_DIR= (empty) keeps the HTTP cache in memory only
+            cache_dir = os.getenv('TEXTBROWSER_CACHE_DIR', default_cache_dir())
+            fetcher = Fetcher(
+                cookie_file=os.getenv('TEXTBROWSER_COOKIE_FILE'),
+                cache=HTTPCache(os.path.join(cache_dir, 'http') if cache_dir else None)
+            )
+        self.fetcher = fetcher
+
+        # Rendered pages, so revisits skip conversion. In memory unless
+        # TEXTBROWSER_PAGE_CACHE_DIR is set (or a gateway passes a shared one)
+        if page_cache is None:
+            page_cache = PageCache(os.getenv('TEXTBROWSER_PAGE_CACHE_DIR') or None)
+        self.page_cache = page_cache
+
+        # Whether read_page opens any local file. Gateway sessions, whose users
+        # are remote, turn this off and can then only read local_pages
+        self.local_files = True
+        self.local_pages = {os.path.realpath(os.path.join(os.path.dirname(__file__), name))
+                            for name in BUNDLED_PAGES}
+
+        # Worker processes that convert big pages off this process's GIL (gateway mode)
+        self.converter = converter
+
+        # Back/forward stacks of rendered pages
+        self.history = History()
+
+        # HTML size above which pages become lazily converted Documents
+        try:
+            self.lazy_bytes = int(os.getenv('TEXTBROWSER_LAZY_BYTES') or LAZY_PAGE_BYTES)
+        except ValueError:
+            self.lazy_bytes = LAZY_PAGE_BYTES
+
+        # Most of a response read per page (TEXTBROWSER_MAX_PAGE_BYTES)
+        try:
+            self.max_page_bytes = int(os.getenv('TEXTBROWSER_MAX_PAGE_BYTES') or MAX_PAGE_BYTES)
+        except ValueError:
+            self.max_page_bytes = MAX_PAGE_BYTES
+
+        # TEXTBROWSER_PREFETCH=N fetches and pre-renders the first N links
+        # of each page in the background, so following them is instant
+        try:
+            prefetch_links = int(os.getenv('TEXTBROWSER_PREFETCH') or 0)
+        except ValueError:
+            prefetch_links = 0
+        self.prefetcher = Prefetcher(self.fetcher, max_links=prefetch_links) if prefetch_links > 0 else None
+        self._prefetch_page = None  # Page whose links are being prefetched
+
+        # Page loads run on a worker thread once the interactive loop starts
+        self.background_loads = False
+        self.loading = None  # PageLoad in progress
+
+        # Worker threads for open() and submit(); None is the event loop's default pool
+        self.executor = None
+
+        # Per-stage timings of loads, form submissions and AI requests
+        self.metrics = METRICS
+        self.last_timings = None
+
+        # Search index of the current page, built on the first search
+        self._page_index = None
+
+        # Page context sent with an AI request (TEXTBROWSER_AI_CONTEXT_TOKENS)
+        try:
+            self.ai_context_tokens = int(os.getenv('TEXTBROWSER_AI_CONTEXT_TOKENS') or AI_CONTEXT_TOKENS)
+        except ValueError:
+            self.ai_context_tokens = AI_CONTEXT_TOKENS
+
+        # Full-text index of visited pages across sessions (^words in Ctrl-K)
+        self.text_index = text_index
+
+    @property
+    def page_text(self) -> str:
+        """Text of the current page for AI processing, joined on first use"""
+        if self._page_text is None:
+            self._page_text = '\n'.join(self._page_text_lines)
+        return self._page_text
+
+    @page_text.setter
+    def page_text(self, text: str):
+        self._page_text = text
+        self._page_text_lines = None
+
+    def page_excerpt(self, max_chars: int):
+        """Up to max_chars of the page text and whether it was cut, converting no further"""
+        if isinstance(self._page_text_lines, Document):
+            text = self._page_text_lines.text(max_chars + 1)
+        else:
+            text = self.page_text
+        return text[:max_chars], len(text) > max_chars
+
+    def ai_context(self, command: str):
+        """The parts of the page most relevant to an AI command, and whether that is all of it
+
+        Only the first CONTEXT_SOURCE_CHARS of a huge page are considered.
+        """
+        text, truncated = self.page_excerpt(CONTEXT_SOURCE_CHARS)
+        context, complete = build_context(text, command, self.ai_context_tokens)
+        return context, complete and not truncated
+
+    def page_index(self) -> PageIndex:
+        """Search index of the current page, rebuilt only when the page changes"""
+        index = self._page_index
+        if index is None or not index.covers(self.page_content):
+            index = self._page_index = PageIndex(self.page_content)
+        return index
+
+    def complete_page(self):
+        """Convert the rest of a lazily converted page (for End and forms)"""
+        if isinstance(self.page_content, Document):
+            self.page_content.finish()
+
+    def set_page_lines(self, lines: list):
+        """Show lines as the current page, also used as its AI text"""
+        self.page_content = lines
+        self._page_text = None
+        self._page_text_lines = lines
+        self.partial = False
+
+    def page_state(self) -> HistoryEntry:
+        """Snapshot of the current page for the history"""
+        text = self._page_text_lines if self._page_text_lines is not None else self._page_text
+        return HistoryEntry(self.current_url, self.page_content, text,
+                            self.links, self.forms, self.scroll_offset)
+
+    def restore_page(self, entry: HistoryEntry):
+        """Make a history entry the current page"""
+        self.current_url = entry.url
+        self.page_content = entry.lines
+        if isinstance(entry.text, list):
+            self._page_text = None
+            self._page_text_lines = entry.text
+        else:
+            self.page_text = entry.text
+        self.links = entry.links
+        self.forms = entry.forms
+        self.scroll_offset = entry.scroll_offset
+        self.partial = False
+
+    def navigate(self, action, *args):
+        """Run a page-changing action, recording the page it leaves"""
+        loading = self.loading
+        state = self.page_state()
+        action(*args)
+        if self.loading is not None and self.loading is not loading:
+            # Background load: recorded when the page arrives
+            self.loading.record_history = True
+        elif self.page_content is not state.lines:
+            # The action showed a page itself (help, an AI answer): a load still
+            # running, or prefetches for the old page, must not replace it
+            self.cancel_load()
+            if self._prefetch_page is not self.page_content:
+                self.cancel_prefetch()
+            if state.lines or state.url:
+                self.history.visit(state)
+
+    def go_back(self):
+        """Return to the previous page without refetching it"""
+        self.cancel_load()
+        self.cancel_prefetch()
+        entry = self.history.back(self.page_state())
+        if entry is not None:
+            self.restore_page(entry)
+
+    def go_forward(self):
+        """Return to the page we came back from"""
+        self.cancel_load()
+        self.cancel_prefetch()
+        entry = self.history.forward(self.page_state())
+        if entry is not None:
+            self.restore_page(entry)
+
+    def wrap_width(self) -> int:
+        """Width to wrap page text to (frontends measure their screen)"""
+        return self.width
+
+    def page_footer(self, links: list = None, forms: list = None) -> list:
+        """Link and form summary lines shown below a fetched page"""
+        links = self.links if links is None else links
+        forms = self.forms if forms is None else forms
+        lines = []
+
+        # Add links list at the end
+        if links:
+            lines.extend([
+                "",
+                "",
+                "=" * 60,
+                f"LINKS: {len(links)} link(s) found",
+                "=" * 60,
+                "Type a number (0-{}) to follow a link".format(len(links) - 1),
+                "",
+            ])
+
+            # Show first 20 links in the list
+            for idx, link in enumerate(links[:20]):
+                lines.append(f"[{idx}] {link['text']}")
+
+            if len(links) > 20:
+                lines.append("")
+                lines.append(f"... and {len(links) - 20} more links (see inline numbers)")
+
+        # Add form information to the display
+        if forms:
+            lines.extend([
+                "",
+                "",
+                "=" * 60,
+                f"FORMS DETECTED: {len(forms)} form(s) found",
+                "=" * 60,
+            ])
+            for idx, form in enumerate(forms):
+                lines.append("")
+                lines.append(f"[Form {idx}] {form['method']} → {form['action'] or '(same page)'}")
+                for field in form['fields']:
+                    placeholder = f" ({field['placeholder']})" if field['placeholder'] else ""
+                    lines.append(f"  - {field['name']}: {field['type']}{placeholder}")
+            lines.append("")
+            lines.append("Press 'F' to fill out a form")
+
+        return lines
+
+    def render_html(self, html: str, url: str, width: int):
+        """Convert an HTML document to (lines, links, forms), via the page cache
+
+        The lines are a Document, so the page can be re-wrapped to a new
+        width without converting it again. Safe to call from a loader thread.
+        """
+        if len(html) > self.lazy_bytes:
+            # Huge page: wrapped only as it is read and kept out of the page cache.
+            # A conversion pool converts it whole, off this process's GIL;
+            # without one, or if the pool fails, it is converted only as far as it is read
+            with stage('convert'):
+                if self.converter is None or not self.converter.wants(html):
+                    return lazy_document(html, url, width, self.color_map, self.parser)
+                try:
+                    blocks, links, forms = self.converter.convert(html, url, self.color_map, self.parser)
+                except ConversionError:
+                    return lazy_document(html, url, width, self.color_map, self.parser)
+            return Document(list(blocks), width, lazy=True), links, forms
+
+        key = page_key(url, html)
+        cached = self.page_cache.get(key)
+        if cached is None:
+            # One pass builds the text, numbered links, forms and color markers
+            with stage('convert'):
+                cached = self.convert(html, url)
+            self.page_cache.put(key, *cached)
+        blocks, links, forms = cached
+        return Document(list(blocks), width), links, forms
+
+    def convert(self, html: str, url: str):
+        """(blocks, links, forms) for html, in a worker process if it is big enough
+
+        The pool only speeds things up: if it refuses the page, times out or
+        has lost its worker, the page is converted here instead.
+        """
+        if self.converter is not None and self.converter.wants(html):
+            try:
+                return self.converter.convert(html, url, self.color_map, self.parser)
+            except ConversionError:
+                pass
+        return convert_blocks(html, url, self.color_map, self.parser)
+
+    def show_page(self, lines: list, links: list, forms: list, footer: bool = True):
+        """Make a rendered page the current page"""
+        self.links = links
+        self.forms = forms
+        if footer and isinstance(lines, Document):
+            lines.add_footer(lambda: self.page_footer(links, forms))
+        elif footer:
+            lines.extend(self.page_footer())
+        self.set_page_lines(lines)  # Also the text for AI processing
+
+    def load_html(self, html: str, url: str, footer: bool = True):
+        """Convert an HTML document and make it the current page"""
+        lines, links, forms = self.render_html(html, url, self.wrap_width())
+        self.show_page(lines, links, forms, footer)
+
+    def read_page(self, url: str, load: PageLoad = None):
+        """Read a page from disk or the network, returning (html, url)
+
+        At most max_page_bytes are read; load, if given, is marked partial
+        when the page was cut off. Safe to call from a loader thread.
+        """
+        # Handle local file:// URLs or .html files
+        path = local_path(url)
+        if path is not None:
+            if not self.local_files and os.path.realpath(path) not in self.local_pages:
+                raise PermissionError(f"Local files can't be opened here: {url}")
+            return self.read_file(path, load), url if url.startswith('file://') else f"file://{path}"
+
+        url = self.http_url(url)
+        response = self.fetcher.get(url, stream=True)
+        try:
+            response.raise_for_status()
+            return self.read_body(response, load), url
+        finally:
+            response.close()
+
+    def read_file(self, path: str, load: PageLoad = None) -> str:
+        with open(path, 'r') as f:
+            html = f.read(self.max_page_bytes + 1)
+        if len(html) > self.max_page_bytes:
+            if load is not None:
+                load.partial = True
+            html = html[:self.max_page_bytes] + partial_notice(self.max_page_bytes,
+                                                              str(os.path.getsize(path)))
+        return html
+
+    def read_body(self, response, load: PageLoad = None) -> str:
+        """A streamed response's text, up to max_page_bytes
+
+        Raises NotAPage for images, archives and other binaries.
+        """
+        chunks = []
+        for chunk in self.fetcher.iter_page(response, self.max_page_bytes):
+            if load is not None:
+                if load.cancelled.is_set():
+                    break
+                load.received += len(chunk)
+            chunks.append(chunk)
+        html = b''.join(chunks).decode(response.encoding or 'utf-8', 'replace')
+        if response.truncated:
+            if load is not None:
+                load.partial = True
+            html += partial_notice(self.max_page_bytes, response.headers.get('Content-Length', ''))
+        return html
+
+    def http_url(self, url: str) -> str:
+        """url with https:// added if no protocol is specified"""
+        if not url.startswith(('http://', 'https://')):
+            url = 'https://' + url
+        return url
+
+    def is_local(self, url: str) -> bool:
+        """Whether read_page reads url from disk"""
+        return local_path(url) is not None
+
+    def show_fetched_page(self, url: str, lines: list, links: list, forms: list,
+                          scroll_offset: int = 0, partial: bool = False):
+        """Show a fetched page, warning if it looks JavaScript-only"""
+        self.show_page(lines, links, forms)
+
+        # Detect if page is too empty (likely JS-heavy)
+        content_lines = 0
+        for line in self.page_content:
+            if line.strip():
+                content_lines += 1
+                if content_lines >= 10:
+                    break
+        if content_lines >= 10:
+            self.index_page(url)
+        else:
+            # The warning is the page now, for AI processing and history too
+            self.set_page_lines([
+                "⚠️  JAVASCRIPT-HEAVY SITE DETECTED",
+                "",
+                f"URL: {url}",
+                "",
+                "This site appears to require JavaScript to display content.",
+                "Text browsers cannot execute JavaScript.",
+                "",
+                "Possible solutions:",
+                "",
+                "1. Ask AI for help (Ctrl-K):",
+                "   - 'find a text-friendly alternative to this site'",
+                "   - 'search for [topic] on a simpler site'",
+                "   - 'what is this site about?'",
+                "",
+                "2. Try alternative sites:",
+                "   - YouTube → Invidious instances (yewtu.be, inv.riverside.rocks)",
+                "   - Twitter → Nitter instances (nitter.net)",
+                "   - Reddit → old.reddit.com or teddit instances",
+                "   - Instagram → bibliogram instances",
+                "",
+                "3. Use yt-dlp for YouTube:",
+                "   - Command line tool to download/stream videos",
+                "",
+                "Press Ctrl-K to try a different site or ask AI for alternatives.",
+                "",
+                "=" * 60,
+                "",
+                "Raw content detected:",
+                ""
+            ] + list(self.page_content[:50]))  # Show first 50 lines for debugging
+            scroll_offset = 0
+
+        self.partial = partial
+        self.current_url = url
+        self.scroll_offset = scroll_offset
+        self.start_prefetch()
+
+    def index_page(self, url: str):
+        """Queue the current page's text for the full-text index of visited pages"""
+        if self.text_index is None:
+            return
+        lines = self._page_text_lines
+        # Blocks rather than lines: the writer thread must not wrap a Document
+        parts = list(lines.blocks) if isinstance(lines, Document) else list(lines or ())
+        self.text_index.add(url, parts)
+
+    def show_load_error(self, error: Exception):
+        """Replace the page with a load error"""
+        self.last_error = error
+        self.partial = False
+        self.page_content = [
+            f"Error loading page: {str(error)}",
+            "",
+            "Press Ctrl-K to enter a new URL"
+        ]
+
+    def fetch_page(self, url: str) -> bool:
+        """Fetch and parse a web page
+
+        In the interactive loop this starts a background load and returns at
+        once; the page is swapped in by poll_load when it arrives.
+        """
+        if url.startswith('about:'):
+            self.cancel_load()
+            self.show_about(url)
+            return True
+
+        if self.prefetcher is not None:
+            html_content = self.prefetcher.take(url)
+            self.cancel_prefetch()
+            if html_content is not None:
+                # Fetched (and most likely rendered) while the last page was read
+                self.cancel_load()
+                timings = Timings('load')
+                with timing(timings):
+                    lines, links, forms = self.render_html(html_content, url, self.wrap_width())
+                self.show_fetched_page(url, lines, links, forms)
+                self.complete_timings(timings)
+                return True
+
+        if self.background_loads:
+            self.start_load(url)
+            return True
+
+        load = PageLoad(url, self.wrap_width())
+        timings = load.timings
+        try:
+            with timing(timings):
+                with stage('request'):
+                    html_content, url = self.read_page(url, load)
+                timings.count('received', len(html_content))
+                lines, links, forms = self.render_html(html_content, url, self.wrap_width())
+            self.show_fetched_page(url, lines, links, forms, partial=load.partial)
+            return True
+
+        except Exception as e:
+            self.show_load_error(e)
+            return False
+        finally:
+            self.complete_timings(timings)
+
+    def start_prefetch(self):
+        """Prefetch the pages behind the current page's first numbered links"""
+        if self.prefetcher is None or not self.links:
+            return
+        width = self.wrap_width()
+        self._prefetch_page = self.page_content
+        self.prefetcher.start(self.current_url, [link['url'] for link in self.links],
+                              render=lambda html, url: self.render_html(html, url, width))
+
+    def cancel_prefetch(self):
+        if self.prefetcher is not None:
+            self.prefetcher.cancel()
+
+    def start_load(self, url: str) -> PageLoad:
+        """Fetch and convert url on a worker thread, keeping the current page usable"""
+        self.cancel_load()
+        load = PageLoad(url, self.wrap_width())
+        self.loading = load
+        thread = threading.Thread(target=self._run_load, args=(load,), daemon=True)
+        thread.start()
+        return load
+
+    def _run_load(self, load: PageLoad):
+        try:
+            with timing(load.timings):
+                if self.is_local(load.url):
+                    with stage('read'):
+                        html_content, load.final_url = self.read_page(load.url, load)
+                    if not load.cancelled.is_set():
+                        load.result = self.render_html(html_content, load.final_url, load.width)
+                else:
+                    self._stream_load(load)
+        except Exception as e:
+            load.error = e
+        finally:
+            load.timings.count('received', load.received)
+            load.timings.finish()
+            load.done.set()
+
+    def _stream_load(self, load: PageLoad):
+        """Download and convert a page together, so poll_load can show its top early"""
+        url = load.final_url = self.http_url(load.url)
+        with stage('wait'):
+            response = self.fetcher.get(url, stream=True)
+        try:
+            response.raise_for_status()
+            if getattr(response, 'from_cache', False):
+                # Whole body already here, and maybe already rendered
+                load.result = self.render_html(self.read_body(response), url, load.width)
+                return
+            if self.converter is not None:
+                # Converted whole in a worker process rather than on this thread
+                self._download_load(load, response)
+                return
+
+            decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')('replace')
+            stream = StreamConverter(url, load.width, self.color_map, self.parser)
+            load.stream = stream
+            parts = []
+            # Download time is the loop's, less the conversion done inside it
+            with stage('download'):
+                for chunk in self.fetcher.iter_page(response, self.max_page_bytes):
+                    if load.cancelled.is_set():
+                        return
+                    load.received += len(chunk)
+                    with stage('convert'):
+                        text = decoder.decode(chunk)
+                        parts.append(text)
+                        stream.feed(text)
+            with stage('convert'):
+                text = decoder.decode(b'', True)
+                if response.truncated:
+                    # Close whatever was open where the page was cut off
+                    load.partial = True
+                    text += partial_notice(self.max_page_bytes,
+                                           response.headers.get('Content-Length', ''))
+                parts.append(text)
+                stream.feed(text)
+                lines, links, forms = stream.close()
+
+            huge = load.received > self.lazy_bytes
+            if not huge:
+                self.page_cache.put(page_key(url, ''.join(parts)), stream.blocks, links, forms)
+            # Blocks rather than the streamed lines, so the page can be re-wrapped;
+            # huge pages are wrapped only as they are read
+            load.result = (Document(list(stream.blocks), load.width, lazy=huge), list(links), forms)
+        finally:
+            response.close()
+
+    def _download_load(self, load: PageLoad, response):
+        with stage('download'):
+            text = self.read_body(response, load)
+        if not load.cancelled.is_set():
+            load.result = self.render_html(text, load.final_url, load.width)
+
+    def cancel_load(self):
+        """Abandon the load in progress; its result will be ignored"""
+        if self.loading is not None:
+            self.loading.cancelled.set()
+            self.loading = None
+
+    def poll_load(self) -> bool:
+        """Swap in a finished background load. Returns True if the page changed"""
+        load = self.loading
+        if load is None:
+            return False
+        if not load.done.is_set():
+            return self.show_partial(load)
+        self.loading = None
+        if load.shown and self.page_content is not load.lines:
+            return False  # The streamed page was replaced meanwhile
+
+        leaving = self.page_state()
+        self.complete_timings(load.timings)
+        if load.error is not None:
+            self.show_load_error(load.error)
+        elif load.shown:
+            # Already on screen and maybe scrolled: keep the reader's place
+            self.show_fetched_page(load.final_url, *load.result, scroll_offset=self.scroll_offset,
+                                   partial=load.partial)
+            return True
+        else:
+            self.show_fetched_page(load.final_url, *load.result, partial=load.partial)
+        if load.record_history and (leaving.lines or leaving.url):
+            self.history.visit(leaving)
+        return True
+
+    def show_partial(self, load: PageLoad) -> bool:
+        """Show the lines a streaming load has converted so far"""
+        stream = load.stream
+        if stream is None:
+            return False
+        if load.shown and self.page_content is not load.lines:
+            # Something else replaced the streamed page: it is not wanted any more
+            self.cancel_load()
+            return False
+        count = len(stream.lines)
+        if count <= load.shown:
+            return False
+
+        if not load.shown:
+            # First lines in: leave the old page for the new one
+            leaving = self.page_state()
+            if load.record_history and (leaving.lines or leaving.url):
+                self.history.visit(leaving)
+            self.current_url = load.final_url
+            self.forms = []
+            self.scroll_offset = 0
+            load.lines = stream.lines[:count]
+            self.set_page_lines(load.lines)
+        else:
+            self.page_content.extend(stream.lines[load.shown:count])
+            self._page_text = None
+        self.links = stream.links[:]
+        load.shown = count
+        return True
+
+    async def open(self, url: str) -> bool:
+        """Fetch and show url without blocking the event loop
+
+        Like following a link: the page left behind goes on the history.
+        Returns False (showing the error as the page) if the load failed.
+        Cancelling the awaiting task abandons the load.
+        """
+        if url.startswith('about:'):
+            leaving = self.page_state()
+            self.cancel_load()
+            self.show_about(url)
+            self._record(leaving)
+            return True
+
+        if self.prefetcher is not None:
+            html_content = self.prefetcher.take(url)
+            self.cancel_prefetch()
+            if html_content is not None:
+                self.cancel_load()
+                leaving = self.page_state()
+                timings = Timings('load')
+                lines, links, forms = await self._in_thread(
+                    self._timed, timings, self.render_html, html_content, url, self.wrap_width())
+                self.show_fetched_page(url, lines, links, forms)
+                self._record(leaving)
+                self.complete_timings(timings)
+                return True
+
+        self.cancel_load()
+        load = PageLoad(url, self.wrap_width())
+        load.record_history = True
+        self.loading = load
+        try:
+            await self._in_thread(self._run_load, load)
+        except asyncio.CancelledError:
+            load.cancelled.set()
+            if self.loading is load:
+                self.loading = None
+            raise
+        if self.loading is not load:
+            return False  # Replaced or cancelled meanwhile
+        self.poll_load()
+        return load.error is None
+
+    async def submit(self, form: dict, values: dict) -> bool:
+        """Submit a form and show the response, without blocking the event loop"""
+        leaving = self.page_state()
+        self.cancel_load()
+        timings = Timings('form')
+        try:
+            html_content, url = await self._in_thread(self._timed, timings, self.send_form, form, values)
+            lines, links, forms = await self._in_thread(
+                self._timed, timings, self.render_html, html_content, url, self.wrap_width())
+        except Exception as e:
+            self.show_load_error(e)
+            return False
+        finally:
+            self.complete_timings(timings)
+        self.current_url = url
+        self.show_page(lines, links, forms)
+        self.scroll_offset = 0
+        self._record(leaving)
+        return True
+
+    def send_form(self, form: dict, values: dict):
+        """Submit a form, returning the response's (html, url)
+
+        Safe to call from a worker thread.
+        """
+        # Construct the target URL
+        action = form['action']
+        if not action:
+            action = self.current_url
+        elif not action.startswith('http'):
+            # Relative URL
+            action = urljoin(self.current_url, action)
+
+        # Submit based on method
+        with stage('request'):
+            if form['method'] == 'POST':
+                response = self.fetcher.post(action, data=values, stream=True)
+            else:  # GET
+                response = self.fetcher.get(action, params=values, stream=True)
+            try:
+                response.raise_for_status()
+                text = self.read_body(response)
+            finally:
+                response.close()
+        timings = current()
+        if timings is not None:
+            timings.count('received', len(text))
+        return text, response.url
+
+    def complete_timings(self, timings: Timings):
+        """Record a finished action's timings"""
+        timings.finish()
+        self.last_timings = timings
+        self.metrics.record(timings)
+
+    def show_about(self, url: str):
+        """Show an internal about: page"""
+        if url.startswith('about:visited'):
+            self.show_visited(url)
+            return
+        if url == 'about:perf':
+            lines = self.metrics.perf_page()
+        else:
+            lines = [f"Unknown page: {url}", "", "Internal pages: about:perf, about:visited?q=words"]
+        self.current_url = url
+        self.set_page_lines(lines)
+        self.links = []
+        self.forms = []
+        self.scroll_offset = 0
+
+    def show_visited(self, url: str):
+        """Show the visited pages matching an about:visited?q= query, best first"""
+        query = visited_query(url)
+        if self.text_index is None:
+            lines = [f"Visited pages: {query}", "",
+                     "The local index of visited pages is turned off "
+                     "(TEXTBROWSER_CACHE_DIR or TEXTBROWSER_INDEX_BYTES)."]
+            self.set_page_lines(lines)
+            self.links = []
+            self.forms = []
+        else:
+            self.load_html(self.text_index.results_html(query), url)
+        self.current_url = url
+        self.scroll_offset = 0
+
+    def _timed(self, timings: Timings, function, *args):
+        with timing(timings):
+            return function(*args)
+
+    def _record(self, leaving: HistoryEntry):
+        if leaving.lines or leaving.url:
+            self.history.visit(leaving)
+
+    def _in_thread(self, function, *args):
+        return asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    def close(self):
+        """Stop background work and release connections we own"""
+        self.cancel_load()
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+        if self.owns_fetcher:
+            self.fetcher.close()
@@ -0,0 +1,268 @@
+"""
+Lazily wrapped documents for DBBasic TextBrowser
+
+A Document holds a page as unwrapped blocks and behaves like the list of
+its wrapped lines. Lines are wrapped a chunk of blocks at a time as they
+are asked for, and only a window of recently used chunks is kept, so a
+50,000-line page costs one copy of its text plus a few screens of lines.
+Huge pages can also be converted lazily: a source adds blocks as reading
+approaches the end of what has been converted so far.
+"""
+
+import bisect
+from collections import OrderedDict
+
+from htmltext import StreamConverter, wrap_block
+
+
+CHUNK_BLOCKS = 256
+DEFAULT_WINDOW_CHUNKS = 8
+
+# Lines converted ahead of what has been asked for
+READ_AHEAD_LINES = 200
+
+# HTML converted per step of a lazy conversion
+CONVERT_CHARS = 128 * 1024
+
+
+class Document:
+    """Sequence of a page's lines, wrapped on demand from its blocks
+
+    len() counts the lines known so far; it is exact once complete is True.
+    Documents without a source are counted up front unless lazy is set.
+    """
+
+    def __init__(self, blocks: list, width: int, source=None, footer=None,
+                 window: int = DEFAULT_WINDOW_CHUNKS, lazy: bool = False):
+        self.blocks = blocks
+        self.width = width
+        self.source = source  # Adds more blocks; returns False when there are no more
+        self.footer = footer  # Lines to add after the last block
+        self.window = window
+        self.lazy = lazy or source is not None
+        self.complete = False
+        self._starts = [0]    # First line of each counted chunk, plus the end
+        self._chunks = OrderedDict()  # chunk index -> wrapped lines, least recent first
+        if source is None:
+            self._finish_source()
+            if not self.lazy:
+                self.finish()
+
+    # Conversion
+
+    def _finish_source(self):
+        self.source = None
+        if self.footer is not None:
+            self.blocks.extend(('', '', line, True) for line in self.footer())
+            self.footer = None
+
+    def _chunk_ready(self, chunk: int) -> bool:
+        """Whether the blocks of chunk are all there, pulling more if needed"""
+        # A chunk is only final once a block after it exists: the converter
+        # drops trailing blank blocks when it finishes
+        while self.source is not None and len(self.blocks) <= (chunk + 1) * CHUNK_BLOCKS:
+            if not self.source():
+                self._finish_source()
+        return chunk * CHUNK_BLOCKS < len(self.blocks)
+
+    def _count_to(self, line: int) -> bool:
+        """Count chunks until line is known; False if the document ends first"""
+        while self._starts[-1] <= line:
+            chunk = len(self._starts) - 1
+            if not self._chunk_ready(chunk):
+                self.complete = True
+                return False
+            lines = self._wrap(chunk)
+            self._starts.append(self._starts[-1] + len(lines))
+        return True
+
+    def _wrap(self, chunk: int) -> list:
+        lines = self._chunks.get(chunk)
+        if lines is not None:
+            self._chunks.move_to_end(chunk)
+            return lines
+
+        lines = []
+        width = self.width
+        for block in self.blocks[chunk * CHUNK_BLOCKS:(chunk + 1) * CHUNK_BLOCKS]:
+            lines.extend(wrap_block(block, width))
+        self._chunks[chunk] = lines
+        while len(self._chunks) > self.window:
+            self._chunks.popitem(last=False)
+        return lines
+
+    def ensure(self, stop: int):
+        """Convert and count lines up to stop, plus some read-ahead"""
+        self._count_to(stop + READ_AHEAD_LINES)
+
+    def add_footer(self, footer):
+        """Add footer() lines after the last block once it is converted"""
+        if self.source is not None:
+            self.footer = footer
+            return
+        # Only the last chunk and the ones after it change
+        chunk = len(self.blocks) // CHUNK_BLOCKS
+        self.blocks.extend(('', '', line, True) for line in footer())
+        del self._starts[chunk + 1:]
+        for stale in [c for c in self._chunks if c >= chunk]:
+            del self._chunks[stale]
+        self.complete = False
+        if not self.lazy:
+            self.finish()
+
+    def finish(self):
+        """Convert and count the whole document"""
+        while self._count_to(self._starts[-1]):
+            pass
+
+    # Sequence protocol
+
+    def __len__(self) -> int:
+        return self._starts[-1]
+
+    def __bool__(self) -> bool:
+        return bool(self.blocks) or self._count_to(0)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.start, index.stop, index.step
+            if (start is not None and start < 0) or (stop is not None and stop < 0) or stop is None:
+                self.finish()
+            start, stop, step = index.indices(len(self) if self.complete else stop)
+            self.ensure(stop - 1)
+            if step != 1:
+                return [self[i] for i in range(start, min(stop, len(self)), step)]
+            return self._lines(start, min(stop, len(self)))
+
+        if index < 0:
+            self.finish()
+            index += len(self)
+        if index < 0 or not self._count_to(index):
+            raise IndexError('document index out of range')
+        self.ensure(index)
+        return self._lines(index, index + 1)[0]
+
+    def _lines(self, start: int, stop: int) -> list:
+        lines = []
+        chunk = bisect.bisect_right(self._starts, start) - 1
+        while start < stop and chunk < len(self._starts) - 1:
+            chunk_start = self._starts[chunk]
+            wrapped = self._wrap(chunk)
+            lines.extend(wrapped[start - chunk_start:stop - chunk_start])
+            start = self._starts[chunk + 1]
+            chunk += 1
+        return lines
+
+    def __iter__(self):
+        """Every line, wrapped as it is reached without growing the window"""
+        position = 0
+        chunk = 0
+        while self._chunk_ready(chunk):
+            cached = self._chunks.get(chunk)
+            if cached is None:
+                cached = []
+                for block in self.blocks[chunk * CHUNK_BLOCKS:(chunk + 1) * CHUNK_BLOCKS]:
+                    cached.extend(wrap_block(block, self.width))
+            if chunk == len(self._starts) - 1:
+                self._starts.append(position + len(cached))
+            position += len(cached)
+            yield from cached
+            chunk += 1
+        self.complete = True
+
+    def __contains__(self, line) -> bool:
+        return any(line == candidate for candidate in self)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, Document)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = object.__hash__
+
+    # Text and positions
+
+    def text(self, max_chars: int = None) -> str:
+        """The page as text, up to about max_chars, converting only that much"""
+        parts = []
+        size = 0
+        for line in self:
+            parts.append(line)
+            size += len(line) + 1
+            if max_chars is not None and size > max_chars:
+                break
+        return '\n'.join(parts)
+
+    @property
+    def size(self) -> int:
+        """Approximate memory held, for history budgets"""
+        text = sum(len(block[2]) + 80 for block in self.blocks)
+        return text + sum(sum(map(len, lines)) + 56 * len(lines)
+                          for lines in self._chunks.values())
+
+    def block_at(self, line: int):
+        """(block index, line within the block) of line"""
+        if not self._count_to(line):
+            line = max(0, len(self) - 1)
+        chunk = bisect.bisect_right(self._starts, line) - 1
+        position = self._starts[chunk]
+        index = chunk * CHUNK_BLOCKS
+        for index in range(index, min((chunk + 1) * CHUNK_BLOCKS, len(self.blocks))):
+            count = len(wrap_block(self.blocks[index], self.width))
+            if line < position + count:
+                return index, line - position
+            position += count
+        return index, 0
+
+    def line_of(self, block: int) -> int:
+        """First line of block at the current width"""
+        chunk = block // CHUNK_BLOCKS
+        while len(self._starts) <= chunk and self._count_to(self._starts[-1]):
+            pass
+        if chunk >= len(self._starts):
+            return len(self)
+        position = self._starts[chunk]
+        for index in range(chunk * CHUNK_BLOCKS, block):
+            position += len(wrap_block(self.blocks[index], self.width))
+        return position
+
+    def reflow(self, width: int, line: int = 0) -> int:
+        """Re-wrap at width, returning where line's paragraph now starts"""
+        block, offset = self.block_at(line) if self.blocks else (0, 0)
+        self.width = width
+        self._starts = [0]
+        self._chunks.clear()
+        self.complete = False
+        # Keep the top line inside the same paragraph
+        start = self.line_of(block)
+        if offset:
+            start += min(offset, len(wrap_block(self.blocks[block], width)) - 1)
+        if self.lazy:
+            self.ensure(start)
+        else:
+            self.finish()
+        return start
+
+    def release(self):
+        """Drop wrapped lines; they are rebuilt on demand"""
+        self._chunks.clear()
+
+
+def lazy_document(html: str, base_url: str, width: int, colors=(), parser: str = None,
+                  footer=None):
+    """Document converting html as it is read, with its (growing) links and forms"""
+    stream = StreamConverter(base_url, width, colors, parser, wrap_lines=False)
+    position = 0
+
+    def convert_more() -> bool:
+        nonlocal position
+        if position >= len(html):
+            stream.close()
+            return False
+        stream.feed(html[position:position + CONVERT_CHARS])
+        position += CONVERT_CHARS
+        return True
+
+    document = Document(stream.blocks, width, source=convert_more, footer=footer)
+    document.ensure(0)
+    return document, stream.links, stream.forms
@@ -0,0 +1,315 @@
+"""
+Pooled HTTP fetching for DBBasic TextBrowser
+
+A Fetcher wraps one requests.Session, so following links on the same site
+reuses kept-alive connections instead of paying a TCP+TLS handshake per page.
+Each Browser gets its own Fetcher; a gateway process can share one between
+all of its sessions with shared_fetcher(), or give each session a fork()
+that shares the connection pools and cache but keeps its own cookies.
+
+With an HTTPCache attached, plain GETs are answered from the cache while
+fresh and revalidated with a conditional request once stale. Streamed GETs
+are read with iter_content(), which caches the body once it is complete.
+Pages are read with iter_page(), which turns away images, archives and
+other binaries from their Content-Type or first bytes, and stops at a
+size limit so one huge response cannot exhaust the process.
+"""
+
+import os
+import threading
+from http.cookiejar import LWPCookieJar
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from httpcache import HTTPCache
+from metrics import format_bytes, stage
+
+
+USER_AGENT = 'Lynx/2.9.0dev.6 libwww-FM/2.14 SSL-MM/1.4.1'
+
+DEFAULT_TIMEOUT = 10
+
+# Small enough that the top of a page renders after the first few KB
+STREAM_CHUNK_SIZE = 4 * 1024
+
+# Content-Types that are pages whatever their first bytes look like, and
+# ones that may be (mislabelled) text, decided by sniffing the body
+PAGE_TYPES = ('text/', 'application/xhtml+xml', 'application/xml', 'application/json')
+SNIFFED_TYPES = ('', 'application/octet-stream', 'binary/octet-stream')
+
+# Leading bytes of common binary formats
+BINARY_SIGNATURES = (
+    b'%PDF-', b'PK\x03\x04', b'\x89PNG', b'GIF8', b'\xff\xd8\xff', b'\x1f\x8b',
+    b'BZh', b'\xfd7zXZ', b'7z\xbc\xaf', b'Rar!', b'\x7fELF', b'MZ', b'OggS', b'ID3',
+    b'RIFF', b'\x00\x00\x01\x00', b'wOFF', b'wOF2',
+)
+
+
+class NotAPage(Exception):
+    """A response that is not text the browser can show"""
+
+
+def sniff_content(content_type: str, head: bytes = None):
+    """Why a response can't be shown as a page, or None if it can
+
+    With head (the first bytes of the body), also rejects binaries whose
+    Content-Type claims they are text.
+    """
+    media_type = content_type.split(';', 1)[0].strip().lower()
+    if not (media_type in SNIFFED_TYPES or media_type.endswith('+xml')
+            or media_type.startswith(PAGE_TYPES)):
+        return media_type
+    if head is None:
+        return None
+    if head.startswith(BINARY_SIGNATURES) or b'\x00' in head[:1024]:
+        return f"binary data labelled {media_type or 'with no type'}"
+    return None
+
+
+class ConnectionStats:
+    """Thread-safe counters of requests sent and sockets opened"""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def add(self, requests: int = 0, connections: int = 0):
+        with self._lock:
+            self.requests += requests
+            self.connections += connections
+
+
+class CountingAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections report to a ConnectionStats
+
+    Connection setup is also timed, as the 'connect' (DNS and TCP) and
+    'tls' stages of the action running on the thread (see metrics.py).
+    """
+
+    def __init__(self, stats: ConnectionStats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        stats = self.stats
+
+        def counting(conn_cls, tls: bool):
+            class CountingConnection(conn_cls):
+                def connect(self):
+                    stats.add(connections=1)
+                    if not tls:
+                        return super().connect()
+                    # Less the DNS and TCP time charged to 'connect' below
+                    with stage('tls'):
+                        return super().connect()
+
+                def _new_conn(self):
+                    with stage('connect'):
+                        return super()._new_conn()
+
+                def request(self, *args, **kwargs):
+                    stats.add(requests=1)
+                    return super().request(*args, **kwargs)
+
+            return CountingConnection
+
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': type('CountingHTTPConnectionPool', (HTTPConnectionPool,),
+                         {'ConnectionCls': counting(HTTPConnection, False)}),
+            'https': type('CountingHTTPSConnectionPool', (HTTPSConnectionPool,),
+                          {'ConnectionCls': counting(HTTPSConnection, True)}),
+        }
+
+
+class Fetcher:
+    """Keep-alive HTTP session with per-host pool sizes and cookie persistence"""
+
+    def __init__(self, pool_connections: int = 20, pool_maxsize: int = 10,
+                 host_pool_sizes: dict = None, keep_alive: bool = True,
+                 cookie_file: str = None, timeout: float = DEFAULT_TIMEOUT,
+                 cache: HTTPCache = None):
+        self.timeout = timeout
+        self.cookie_file = cookie_file
+        self.cache = cache
+
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+
+        # pool_connections is the number of hosts kept, pool_maxsize the
+        # connections kept per host
+        self.connection_stats = ConnectionStats()
+        adapter = CountingAdapter(self.connection_stats, pool_connections=pool_connections,
+                                  pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._adapters = [adapter]
+
+        # Hosts that need more (or fewer) parallel connections
+        for host, size in (host_pool_sizes or {}).items():
+            host_adapter = CountingAdapter(self.connection_stats, pool_connections=1,
+                                           pool_maxsize=size)
+            self.session.mount(f"http://{host}/", host_adapter)
+            self.session.mount(f"https://{host}/", host_adapter)
+            self._adapters.append(host_adapter)
+
+        if cookie_file:
+            jar = LWPCookieJar(cookie_file)
+            if os.path.exists(cookie_file):
+                try:
+                    jar.load(ignore_discard=True)
+                except Exception:
+                    pass  # Unreadable cookie file, start fresh
+            self.session.cookies = jar
+
+    def fork(self) -> 'Fetcher':
+        """Fetcher with its own cookies that shares this one's pools and cache"""
+        fork = Fetcher.__new__(Fetcher)
+        fork.timeout = self.timeout
+        fork.cookie_file = None
+        fork.cache = self.cache
+        fork.connection_stats = self.connection_stats
+        fork._adapters = self._adapters
+
+        fork.session = requests.Session()
+        fork.session.headers.update(self.session.headers)
+        for prefix, adapter in self.session.adapters.items():
+            fork.session.mount(prefix, adapter)
+        return fork
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """GET through the pooled session (and the cache, if any)"""
+        kwargs.setdefault('timeout', self.timeout)
+        if self.cache is not None and not kwargs.get('params'):
+            return self._cached_get(url, kwargs)
+        response = self.session.get(url, **kwargs)
+        self._response_received(response)
+        return response
+
+    def _cached_get(self, url: str, kwargs: dict) -> requests.Response:
+        cache = self.cache
+        entry = cache.lookup(url)
+        if entry is not None and entry.is_fresh():
+            cache.count('hits')
+            return entry.to_response()
+
+        if entry is not None:
+            # Stale: ask the server whether our copy is still good
+            headers = dict(kwargs.get('headers') or {})
+            headers.update(entry.validators())
+            kwargs['headers'] = headers
+
+        response = self.session.get(url, **kwargs)
+        self._response_received(response)
+
+        if entry is not None and response.status_code == 304:
+            cache.count('revalidated')
+            response.close()  # A 304 has no body: hand its connection back to the pool
+            return cache.update(entry, response).to_response()
+
+        cache.count('misses')
+        if kwargs.get('stream'):
+            response.cache_url = url  # Stored by iter_content once read
+        else:
+            cache.store(url, response)
+        return response
+
+    def iter_content(self, response, chunk_size: int = STREAM_CHUNK_SIZE):
+        """Yield a streamed response body as it arrives, caching it once complete"""
+        chunks = []
+        for chunk in response.iter_content(chunk_size):
+            chunks.append(chunk)
+            yield chunk
+
+        response._content = b''.join(chunks)
+        response._content_consumed = True
+        url = getattr(response, 'cache_url', None)
+        if url and self.cache is not None:
+            self.cache.store(url, response)
+
+    def iter_page(self, response, max_bytes: int = None, chunk_size: int = STREAM_CHUNK_SIZE):
+        """Yield a page's body like iter_content, up to max_bytes
+
+        Raises NotAPage before reading the body if the Content-Type is not
+        text, or at the first chunk if the body turns out to be binary. A
+        body cut off at max_bytes sets response.truncated and is not cached.
+        """
+        content_type = response.headers.get('Content-Type', '')
+        reason = sniff_content(content_type)
+        if reason is not None:
+            raise NotAPage(f"Not a web page: {reason}{self._size(response)}")
+
+        response.truncated = False
+        received = 0
+        for chunk in self.iter_content(response, chunk_size):
+            if not received:
+                reason = sniff_content(content_type, chunk)
+                if reason is not None:
+                    raise NotAPage(f"Not a web page: {reason}{self._size(response)}")
+            if max_bytes is not None and received + len(chunk) > max_bytes:
+                response.truncated = True
+                if received < max_bytes:
+                    yield chunk[:max_bytes - received]
+                return
+            received += len(chunk)
+            yield chunk
+
+    def _size(self, response) -> str:
+        length = response.headers.get('Content-Length', '')
+        return f" ({format_bytes(int(length))})" if length.isdigit() else ''
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """POST through the pooled session"""
+        kwargs.setdefault('timeout', self.timeout)
+        response = self.session.post(url, **kwargs)
+        self._response_received(response)
+        return response
+
+    def _response_received(self, response):
+        # Only write the cookie file when the server actually set cookies
+        if self.cookie_file and getattr(response, 'cookies', None):
+            self.save_cookies()
+
+    def save_cookies(self):
+        """Write persistent cookies to cookie_file"""
+        if self.cookie_file:
+            try:
+                self.session.cookies.save(ignore_discard=True)
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        """Connection reuse counters since this Fetcher was created"""
+        hosts = sum(len(adapter.poolmanager.pools) for adapter in self._adapters)
+        sent = self.connection_stats.requests
+        connections = self.connection_stats.connections
+        return {
+            'hosts': hosts,
+            'requests': sent,
+            'connections': connections,
+            'reused': max(sent - connections, 0),
+        }
+
+    def close(self):
+        """Save cookies and close all pooled connections"""
+        self.save_cookies()
+        self.session.close()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_fetcher(**kwargs) -> Fetcher:
+    """Process-wide Fetcher, created on first use (for gateway mode)"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Fetcher(**kwargs)
+        return _shared
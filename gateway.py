@@ -0,0 +1,393 @@
+"""
+Multi-session telnet gateway for DBBasic TextBrowser
+
+One process serves many telnet users. Each connection gets its own Browser
+drawing on a virtual Terminal (see terminal.py), driven by a coroutine on
+the gateway's asyncio loop: keys are handled on a shared pool of worker
+threads and pages load on the core's loader threads, so a session holds a
+thread only while it is busy and an idle one holds none.
+
+Sessions share what is safe to share: the HTTP connection pools and cache
+(each session keeps its own cookies, and pages marked private or setting
+cookies are not cached) and the converted-page cache, so a page read by
+many users is fetched and converted once. With --convert-workers, big
+pages are converted in a pool of worker processes, so one user's huge
+page does not hold up everybody else's typing. With --metrics-port, the
+sessions' per-stage timings and the gateway's counters are served over
+HTTP in the Prometheus text format.
+
+Usage:
+    dbbasic-textbrowser --gateway [--host HOST] [--port PORT] [--url URL]
+                                  [--convert-workers N] [--metrics-port PORT]
+"""
+
+import argparse
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from aicache import AICache, open_ai_cache
+from browser import Browser
+from core import local_path
+from convertpool import ConversionPool
+from fetcher import Fetcher
+from httpcache import HTTPCache, default_cache_dir
+from metrics import METRICS
+from pagecache import PageCache
+from terminal import Terminal
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 2323
+DEFAULT_MAX_SESSIONS = 500
+DEFAULT_METRICS_PORT = 9323
+
+# How long a new client gets to report its window size before the first frame
+NAWS_WAIT = 0.3
+
+# Telnet commands (RFC 854) and the options we negotiate
+IAC, DONT, DO, WONT, WILL, SB, SE = 255, 254, 253, 252, 251, 250, 240
+ECHO, SGA, NAWS = 1, 3, 31
+
+# We echo, characters are sent as typed, and the client reports its size
+NEGOTIATION = bytes([IAC, WILL, ECHO, IAC, WILL, SGA, IAC, DO, SGA, IAC, DO, NAWS])
+
+
+class TelnetParser:
+    """Separates typed bytes from telnet commands, noting window sizes"""
+
+    def __init__(self):
+        self.size = None  # (rows, cols) from the client's last NAWS report
+        self._state = 'data'
+        self._sub = bytearray()
+
+    def feed(self, data: bytes) -> bytes:
+        """Return the typed bytes in data"""
+        typed = bytearray()
+        for byte in data:
+            state = self._state
+            if state == 'data':
+                if byte == IAC:
+                    self._state = 'iac'
+                else:
+                    typed.append(byte)
+            elif state == 'iac':
+                if byte == IAC:
+                    typed.append(IAC)
+                    self._state = 'data'
+                elif byte in (WILL, WONT, DO, DONT):
+                    self._state = 'option'
+                elif byte == SB:
+                    self._sub.clear()
+                    self._state = 'sub'
+                else:
+                    self._state = 'data'
+            elif state == 'option':
+                self._state = 'data'
+            elif state == 'sub':
+                if byte == IAC:
+                    self._state = 'sub-iac'
+                else:
+                    self._sub.append(byte)
+            elif state == 'sub-iac':
+                if byte == SE:
+                    self._subnegotiation(bytes(self._sub))
+                    self._state = 'data'
+                else:
+                    self._sub.append(byte)
+                    self._state = 'sub'
+        return bytes(typed)
+
+    def _subnegotiation(self, sub: bytes):
+        if len(sub) >= 5 and sub[0] == NAWS:
+            cols = sub[1] << 8 | sub[2]
+            rows = sub[3] << 8 | sub[4]
+            if rows and cols:
+                self.size = (rows, cols)
+
+
+class Session:
+    """One connected user: a Browser on a Terminal, driven from the gateway's loop"""
+
+    def __init__(self, gateway: 'Gateway', writer, rows: int, cols: int):
+        self.gateway = gateway
+        self.writer = writer
+        self.loop = asyncio.get_running_loop()
+        self.terminal = Terminal(self.send, rows, cols)
+        self.browser = None
+        self.stopped = False
+        self.typed = asyncio.Event()  # Keys arrived, or the client went away
+
+    def send(self, data: bytes):
+        """Queue output for the client (called from the loop or a worker thread)"""
+        data = data.replace(b'\xff', b'\xff\xff')
+        self.loop.call_soon_threadsafe(self.writer.write, data)
+
+    def feed(self, data: bytes):
+        """Bytes typed by the client"""
+        self.terminal.feed(data)
+        self.typed.set()
+
+    def resize(self, rows: int, cols: int):
+        self.terminal.resize(rows, cols)
+        self.typed.set()
+
+    async def next_key(self, timeout_ms: int) -> int:
+        """The next key typed, or -1 after timeout_ms (-1 waits for one)"""
+        self.typed.clear()
+        key = self.terminal.read_key(0)
+        if key != -1 or self.stopped:
+            return key
+        try:
+            await asyncio.wait_for(self.typed.wait(), timeout_ms / 1000 if timeout_ms >= 0 else None)
+        except asyncio.TimeoutError:
+            return -1
+        return self.terminal.read_key(0)
+
+    def step(self, key: int):
+        """One turn of Browser.run's loop, on a worker thread"""
+        browser = self.browser
+        if key != -1:
+            # Prompts opened by the key read what follows on this thread
+            browser.handle_input(key)
+        browser.poll_load()
+        browser.poll_ai()
+        if browser.running:
+            browser.render()
+
+    async def run(self):
+        """Browser.run as a coroutine: wait for keys here, handle them on a worker thread"""
+        try:
+            self.browser = browser = self.gateway.new_browser(self.terminal)
+            browser.start(self.gateway.start_url)
+            await self.loop.run_in_executor(self.gateway.executor, self.step, -1)
+            while browser.running and not self.stopped:
+                key = await self.next_key(browser.poll_interval())
+                if not self.stopped:
+                    await self.loop.run_in_executor(self.gateway.executor, self.step, key)
+            browser.close()
+        except Exception as e:
+            self.gateway.errors += 1
+            self.send(f"\x1b[0m\x1b[H\x1b[2JSession error: {e}\r\n".encode('utf-8'))
+        finally:
+            self.writer.close()
+
+    def stop(self):
+        """The client went away: end the browser loop"""
+        self.stopped = True
+        if self.browser is not None:
+            self.browser.running = False
+            self.browser.cancel_load()
+        self.terminal.close()
+        self.typed.set()
+
+
+class Gateway:
+    """Telnet server hosting a Browser per connection"""
+
+    def __init__(self, start_url: str = None, max_sessions: int = DEFAULT_MAX_SESSIONS,
+                 fetcher: Fetcher = None, page_cache: PageCache = None,
+                 converter: ConversionPool = None, ai_cache: AICache = None):
+        self.start_url = start_url
+        self.max_sessions = max_sessions
+
+        # One set of connection pools and one HTTP cache for everybody
+        if fetcher is None:
+            cache_dir = os.getenv('TEXTBROWSER_CACHE_DIR', default_cache_dir())
+            cache = HTTPCache(os.path.join(cache_dir, 'http') if cache_dir else None, shared=True)
+            fetcher = Fetcher(pool_connections=100, pool_maxsize=max(10, max_sessions // 10),
+                              cache=cache)
+        self.fetcher = fetcher
+        if page_cache is None:
+            page_cache = PageCache(os.getenv('TEXTBROWSER_PAGE_CACHE_DIR') or None)
+        self.page_cache = page_cache
+        self.converter = converter
+        # Threads that handle a key at a time for any session; there are only
+        # as many as sessions busy at once
+        self.executor = ThreadPoolExecutor(max_workers=max_sessions, thread_name_prefix='gateway-keys')
+        # One cache of AI answers, so a question asked in one session is answered at once in the next
+        self.ai_cache = ai_cache if ai_cache is not None else open_ai_cache()
+
+        self.sessions = set()
+        self.connections = 0  # Including ones still negotiating
+        self.served = 0
+        self.refused = 0
+        self.errors = 0
+
+    def new_browser(self, terminal: Terminal) -> Browser:
+        """Browser for a session: its own cookies, shared pools and caches"""
+        browser = Browser(terminal.stdscr, self.fetcher.fork(), self.page_cache,
+                          term=terminal, converter=self.converter, ai_cache=self.ai_cache)
+        # Remote users get the bundled pages and the start page, not the server's files
+        browser.local_files = False
+        start_path = local_path(self.start_url or '')
+        if start_path is not None:
+            browser.local_pages.add(os.path.realpath(start_path))
+        return browser
+
+    async def handle(self, reader, writer):
+        """Serve one telnet connection until it closes or the user quits"""
+        if self.connections >= self.max_sessions:
+            self.refused += 1
+            writer.write(b"Too many users right now, please try again later.\r\n")
+            await writer.drain()
+            try:
+                # Closing with the client's negotiation unread would reset the connection
+                await asyncio.wait_for(reader.read(4096), NAWS_WAIT)
+            except (asyncio.TimeoutError, ConnectionError):
+                pass
+            writer.close()
+            return
+        self.connections += 1
+        session = None
+
+        try:
+            writer.write(NEGOTIATION)
+            parser = TelnetParser()
+            typed = b''
+            try:
+                typed = parser.feed(await asyncio.wait_for(reader.read(4096), NAWS_WAIT))
+            except asyncio.TimeoutError:
+                pass
+            size = parser.size
+            session = Session(self, writer, *(size or (24, 80)))
+            self.sessions.add(session)
+            self.served += 1
+            session.feed(typed)
+            task = asyncio.ensure_future(session.run())
+
+            while not task.done():
+                data = await reader.read(4096)
+                if not data:
+                    break
+                typed = parser.feed(data)
+                if parser.size != size:
+                    size = parser.size
+                    session.resize(*size)
+                if typed:
+                    session.feed(typed)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.connections -= 1
+            if session is not None:
+                session.stop()
+                self.sessions.discard(session)
+            writer.close()
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        """Start listening; returns the asyncio server"""
+        return await asyncio.start_server(self.handle, host, port)
+
+    def metrics_text(self, prefix: str = 'textbrowser') -> str:
+        """Every session's timings and the gateway's counters, for Prometheus"""
+        gauges = [
+            ('sessions', 'gauge', 'Sessions connected.', len(self.sessions)),
+            ('sessions_served_total', 'counter', 'Sessions started.', self.served),
+            ('sessions_refused_total', 'counter', 'Connections refused at the session limit.', self.refused),
+            ('session_errors_total', 'counter', 'Sessions ended by an error.', self.errors),
+        ]
+        fetcher = self.fetcher.stats()
+        gauges.append(('http_requests_total', 'counter', 'HTTP requests sent.', fetcher['requests']))
+        gauges.append(('http_connections_total', 'counter', 'HTTP connections opened.',
+                       fetcher['connections']))
+        page_cache = self.page_cache.stats()
+        gauges.append(('page_cache_hits_total', 'counter', 'Converted pages found in the cache.',
+                       page_cache['hits']))
+        gauges.append(('page_cache_misses_total', 'counter', 'Pages converted afresh.',
+                       page_cache['misses']))
+
+        out = []
+        for name, kind, help_text, value in gauges:
+            out.extend([f"# HELP {prefix}_{name} {help_text}",
+                        f"# TYPE {prefix}_{name} {kind}",
+                        f"{prefix}_{name} {value}"])
+        return '\n'.join(out) + '\n' + METRICS.prometheus(prefix)
+
+    async def handle_metrics(self, reader, writer):
+        """Answer one HTTP request with metrics_text()"""
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 5)
+            path = request.split(b' ')[1] if request.count(b' ') >= 2 else b''
+            if path.split(b'?')[0] == b'/metrics':
+                status, body = '200 OK', self.metrics_text().encode('utf-8')
+            else:
+                status, body = '404 Not Found', b'Metrics are at /metrics\n'
+            writer.write(f"HTTP/1.1 {status}\r\n"
+                         f"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         f"Content-Length: {len(body)}\r\n"
+                         f"Connection: close\r\n\r\n".encode('ascii') + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve_metrics(self, host: str = DEFAULT_HOST, port: int = DEFAULT_METRICS_PORT):
+        """Start the Prometheus endpoint; returns the asyncio server"""
+        return await asyncio.start_server(self.handle_metrics, host, port)
+
+    def stats(self) -> dict:
+        return {
+            'sessions': len(self.sessions),
+            'served': self.served,
+            'refused': self.refused,
+            'errors': self.errors,
+            'threads': threading.active_count(),
+            'fetcher': self.fetcher.stats(),
+            'page_cache': self.page_cache.stats(),
+            'converter': self.converter.stats() if self.converter is not None else None,
+        }
+
+    def close(self):
+        for session in list(self.sessions):
+            session.stop()
+        self.executor.shutdown(wait=False)
+        self.fetcher.close()
+        if self.converter is not None:
+            self.converter.close()
+
+
+async def serve_forever(gateway: Gateway, host: str, port: int, metrics_port: int = None):
+    server = await gateway.serve(host, port)
+    address = server.sockets[0].getsockname()
+    print(f"DBBasic TextBrowser gateway on telnet://{address[0]}:{address[1]} "
+          f"(up to {gateway.max_sessions} sessions)")
+    if metrics_port is not None:
+        metrics = await gateway.serve_metrics(host, metrics_port)
+        address = metrics.sockets[0].getsockname()
+        print(f"Prometheus metrics on http://{address[0]}:{address[1]}/metrics")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='dbbasic-textbrowser --gateway',
+                                     description='Serve the browser to telnet clients')
+    parser.add_argument('--host', default=DEFAULT_HOST,
+                        help=f"address to listen on (default {DEFAULT_HOST}; 0.0.0.0 for all)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help=f"port to listen on (default {DEFAULT_PORT})")
+    parser.add_argument('--url', help='page each session starts on (default: the homepage)')
+    parser.add_argument('--max-sessions', type=int, default=DEFAULT_MAX_SESSIONS,
+                        help=f"connections served at once (default {DEFAULT_MAX_SESSIONS})")
+    parser.add_argument('--convert-workers', type=int, default=0,
+                        help='processes converting big pages (default 0: on the page loader threads)')
+    parser.add_argument('--metrics-port', type=int, nargs='?', const=DEFAULT_METRICS_PORT,
+                        help=f"serve Prometheus metrics on this port (default {DEFAULT_METRICS_PORT})")
+    args = parser.parse_args(argv)
+
+    converter = ConversionPool(args.convert_workers) if args.convert_workers > 0 else None
+    gateway = Gateway(args.url, args.max_sessions, converter=converter)
+    try:
+        asyncio.run(serve_forever(gateway, args.host, args.port, args.metrics_port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        gateway.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Back/forward history for DBBasic TextBrowser
+
+Each entry holds a page's rendered state (lines, links, forms, scroll
+offset), so going back or forward restores it without the network or a
+re-render. The most recent entries stay as plain references for instant
+restore; older ones are zlib-packed (Documents as their unwrapped blocks;
+lazily converted ones just drop their wrapped lines) and the oldest
+dropped to stay within a memory budget.
+"""
+
+import json
+import zlib
+
+from document import Document
+from pagecache import page_size
+
+
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+
+# Entries this close to the current page are never packed
+DEFAULT_KEEP_UNPACKED = 4
+
+
+class HistoryEntry:
+    """Rendered state of one visited page"""
+
+    __slots__ = ('url', 'lines', 'text', 'links', 'forms', 'scroll_offset', 'packed')
+
+    def __init__(self, url, lines, text, links, forms, scroll_offset=0):
+        self.url = url
+        self.lines = lines
+        self.text = text  # AI text: a string, or a list of lines to join
+        self.links = links
+        self.forms = forms
+        self.scroll_offset = scroll_offset
+        self.packed = None
+
+    @property
+    def size(self) -> int:
+        if self.packed is not None:
+            return len(self.packed) + 256
+        if isinstance(self.lines, Document):
+            return self.lines.size + page_size((), self.links, self.forms)
+        size = page_size(self.lines, self.links, self.forms)
+        if isinstance(self.text, str):
+            size += len(self.text)
+        elif self.text is not None and self.text is not self.lines:
+            size += page_size(self.text, (), ())
+        return size
+
+    def pack(self):
+        """Compress the page state"""
+        if self.packed is not None:
+            return
+        text = True if self.text is self.lines else self.text
+        if isinstance(text, Document):
+            if text.lazy:
+                text.release()
+                return
+            text = {'blocks': text.blocks, 'width': text.width}
+        state = [self.lines, text, self.links, self.forms]
+        if isinstance(self.lines, Document):
+            if self.lines.lazy:
+                self.lines.release()  # Already compact; drop its wrapped lines
+                return
+            state[0] = self.lines.blocks
+            state.append(self.lines.width)
+        self.packed = zlib.compress(json.dumps(state).encode('utf-8'), 1)
+        self.lines = self.text = self.links = self.forms = None
+
+    def unpack(self):
+        """Restore a packed page state"""
+        if self.packed is None:
+            return
+        state = json.loads(zlib.decompress(self.packed))
+        self.lines, text, self.links, self.forms = state[:4]
+        if len(state) > 4:
+            self.lines = Document([tuple(block) for block in self.lines], state[4])
+        if isinstance(text, dict):
+            text = Document([tuple(block) for block in text['blocks']], text['width'])
+        self.text = self.lines if text is True else text
+        self.packed = None
+
+
+class History:
+    """Back and forward stacks of HistoryEntry within a byte budget"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES,
+                 keep_unpacked: int = DEFAULT_KEEP_UNPACKED):
+        self.max_bytes = max_bytes
+        self.keep_unpacked = keep_unpacked
+        self.back_stack = []     # Oldest first
+        self.forward_stack = []  # Furthest first
+
+    def __len__(self) -> int:
+        return len(self.back_stack) + len(self.forward_stack)
+
+    @property
+    def can_go_back(self) -> bool:
+        return bool(self.back_stack)
+
+    @property
+    def can_go_forward(self) -> bool:
+        return bool(self.forward_stack)
+
+    def visit(self, left: HistoryEntry):
+        """Record the page being left for a new one"""
+        self.back_stack.append(left)
+        self.forward_stack.clear()
+        self._trim()
+
+    def back(self, current: HistoryEntry):
+        """Step back: returns the previous page, or None"""
+        if not self.back_stack:
+            return None
+        self.forward_stack.append(current)
+        entry = self.back_stack.pop()
+        entry.unpack()
+        self._trim()
+        return entry
+
+    def forward(self, current: HistoryEntry):
+        """Step forward: returns the next page, or None"""
+        if not self.forward_stack:
+            return None
+        self.back_stack.append(current)
+        entry = self.forward_stack.pop()
+        entry.unpack()
+        self._trim()
+        return entry
+
+    def used_bytes(self) -> int:
+        return sum(entry.size for entry in self.back_stack + self.forward_stack)
+
+    def _trim(self):
+        # Pack everything but the nearest entries on each side
+        for stack in (self.back_stack, self.forward_stack):
+            for entry in stack[:-self.keep_unpacked or None]:
+                entry.pack()
+
+        # Then drop the furthest entries until within budget
+        used = self.used_bytes()
+        while used > self.max_bytes and len(self) > 1:
+            if len(self.back_stack) >= len(self.forward_stack):
+                dropped = self.back_stack.pop(0)
+            else:
+                dropped = self.forward_stack.pop(0)
+            used -= dropped.size
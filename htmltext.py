@@ -0,0 +1,599 @@
+"""
+Single-pass HTML to text conversion for DBBasic TextBrowser
+
+One walk over the document builds the numbered link table, the form table,
+the «color» spans and the wrapped text lines. Nothing is re-serialised and
+re-parsed, so a page costs exactly one parse.
+
+The walk is driven by a parser backend. The stdlib html.parser always works;
+lxml, html5-parser and selectolax are used when installed because their C
+parsers are much faster on big pages. All backends produce the same output
+for well-formed markup; misnested markup is repaired by each parser's own
+rules, which can move styling and line breaks and renumber reopened links.
+
+StreamConverter takes the document in pieces as it downloads, so the top of
+a page can be shown before the rest has arrived. style_runs() splits a
+finished line into styled runs once, so drawing it is just output.
+"""
+
+import re
+from html import unescape
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+# Optional C-backed parsers
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+try:
+    import html5_parser
+except Exception:  # Also raises RuntimeError when its libxml2 differs from lxml's
+    html5_parser = None
+
+
+# Links with these prefixes are not numbered
+SKIP_LINK_PREFIXES = ('#', 'javascript:', 'mailto:')
+
+# Input types that are not shown as form fields
+HIDDEN_INPUT_TYPES = ('hidden', 'submit', 'button')
+
+# Elements whose content is never displayed
+SKIP_TAGS = {'script', 'style', 'title', 'template'}
+
+# Elements separated from their neighbours by a blank line
+PARAGRAPH_TAGS = {
+    'p', 'div', 'section', 'article', 'header', 'footer', 'nav', 'main',
+    'aside', 'form', 'dl', 'figure', 'figcaption', 'address', 'center',
+    'fieldset', 'table', 'ul', 'ol', 'blockquote', 'pre', 'body',
+}
+
+# Elements that start a new line
+LINE_TAGS = {'tr', 'li', 'dt', 'dd', 'br', 'option'}
+
+HEADING_TAGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+
+# Elements whose end closes a link left open inside them, as tree-building
+# parsers do
+BLOCK_TAGS = (PARAGRAPH_TAGS | LINE_TAGS | set(HEADING_TAGS) | {'td', 'th'}) - {'br'}
+
+# Inline markdown markers (matches what render_line_with_formatting detects)
+INLINE_MARKERS = {
+    'b': '**', 'strong': '**',
+    'i': '_', 'em': '_',
+    'code': '`', 'tt': '`', 'kbd': '`',
+}
+
+_WHITESPACE = re.compile(r'\s+')
+
+# «color» and «/color» markers left in lines for <font color>
+COLOR_MARKER = re.compile(r'(«[a-z]+»|«/[a-z]+»)')
+
+RULE_CHARS = frozenset('=-_*')
+
+
+# An empty line between blocks
+BLANK_BLOCK = ('', '', '', True)
+
+
+def wrap(text: str, width: int, first: str = '', rest: str = '') -> list:
+    """Greedy word wrap; long words are never broken"""
+    if len(first) + len(text) <= width:
+        return [first + text]
+
+    lines = []
+    line = first
+    at_start = True
+    for word in text.split(' '):
+        if not word:
+            continue
+        if at_start:
+            line += word
+            at_start = False
+        elif len(line) + 1 + len(word) <= width:
+            line += ' ' + word
+        else:
+            lines.append(line)
+            line = rest + word
+    lines.append(line)
+    return lines
+
+
+def wrap_block(block: tuple, width: int) -> list:
+    """Lines of a (first, rest, text, nowrap) block at width"""
+    first, rest, text, nowrap = block
+    if nowrap:
+        return [first + text]
+    return wrap(text, width, first, rest)
+
+
+class HTMLToText(HTMLParser):
+    """Convert HTML to wrapped text lines, links and forms in one pass"""
+
+    # Textarea content is raw text, as tree-building parsers read it
+    CDATA_CONTENT_ELEMENTS = HTMLParser.CDATA_CONTENT_ELEMENTS + ('textarea',)
+
+    def __init__(self, base_url: str = '', width: int = 78, colors=(), wrap_lines: bool = True):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.width = width
+        self.colors = set(colors)
+        self.wrap_lines = wrap_lines
+
+        self.blocks = []  # Unwrapped (first, rest, text, nowrap) per paragraph or line
+        self.lines = []   # blocks wrapped to width, unless wrap_lines is off
+        self.links = []
+        self.forms = []
+        self._blank = True  # Nothing output yet, or the last line is empty
+
+        self._inline = []        # Text of the block being built
+        self._break = 0          # Pending break: 1 = newline, 2 = blank line
+        self._skip = 0           # Depth inside script/style/...
+        self._pre = 0            # Depth inside <pre>
+        self._heading = False
+        self._quote = ''         # '> ' per open blockquote
+        self._lists = []         # [tag, counter, saved indent] per open list
+        self._indent = ''        # Indent of text inside the current list item
+        self._marker = ''        # Pending list item marker
+        self._fonts = []         # Color (or None) per open <font>
+        self._link = None        # [inline start, href, text parts, blocks opened inside]
+        self._form = None
+        self._form_count = 0
+        self._cells = 0
+
+    # Output
+
+    def _emit(self, first: str, rest: str, text: str, nowrap: bool):
+        block = (first, rest, text, nowrap)
+        self.blocks.append(block)
+        if self.wrap_lines:
+            self.lines.extend(wrap_block(block, self.width))
+        self._blank = not (first or text)
+
+    def _add_lines(self, text: str, nowrap: bool = False):
+        if self._break == 2 and not self._blank:
+            self._emit('', '', '', True)
+        self._break = 0
+
+        if self._marker:
+            first = self._quote + self._marker
+            self._marker = ''
+        else:
+            first = self._quote + self._indent
+        rest = self._quote + self._indent
+        self._emit(first, rest, text, nowrap)
+
+    def _flush(self, brk: int = 0):
+        """Finish the current block and request a break before the next one"""
+        if self._inline:
+            if self._link is not None:
+                # Link spans a block boundary, number it at its end instead
+                self._link[0] = None
+            text = _WHITESPACE.sub(' ', ''.join(self._inline)).strip()
+            self._inline = []
+            if text:
+                self._add_lines(text, nowrap=self._heading)
+        if brk > self._break:
+            self._break = brk
+
+    def _add_pre(self, text: str):
+        if self._break and not self._blank:
+            self._emit('', '', '', True)
+        self._break = 0
+        prefix = self._quote + self._indent
+        for line in text.split('\n'):
+            if line:
+                self._emit(prefix, prefix, line, True)
+            else:
+                self._emit('', '', '', True)
+
+    # Parser callbacks
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip += 1
+            return
+        if self._skip:
+            return
+        if self._link is not None and tag in BLOCK_TAGS:
+            self._link[3] += 1
+
+        if tag in INLINE_MARKERS:
+            if not self._pre:
+                self._inline.append(INLINE_MARKERS[tag])
+        elif tag == 'a':
+            self._start_link(attrs)
+        elif tag == 'font':
+            color = (dict(attrs).get('color') or '').lower()
+            if color in self.colors:
+                self._inline.append(f"«{color}»")
+                self._fonts.append(color)
+            else:
+                self._fonts.append(None)
+        elif tag == 'br':
+            if self._pre:
+                self._inline.append('\n')
+            else:
+                self._flush(1)
+        elif tag in HEADING_TAGS:
+            self._flush(2)
+            self._heading = True
+            self._inline.append('#' * HEADING_TAGS[tag] + ' ')
+        elif tag == 'li':
+            self._flush(1)
+            depth = max(len(self._lists) - 1, 0)
+            if self._lists and self._lists[-1][0] == 'ol':
+                self._lists[-1][1] += 1
+                marker = f"{self._lists[-1][1]}. "
+            else:
+                marker = '* '
+            self._marker = '  ' * (depth + 1) + marker
+            self._indent = ' ' * len(self._marker)
+        elif tag in ('ul', 'ol'):
+            self._flush(1 if self._lists else 2)
+            self._lists.append([tag, 0, self._indent])
+        elif tag == 'pre':
+            self._flush(2)
+            self._add_pre('[code]')
+            self._pre += 1
+        elif tag == 'blockquote':
+            self._flush(2)
+            self._quote += '> '
+        elif tag == 'hr':
+            self._flush(2)
+            self._add_lines('* * *', nowrap=True)
+            self._break = 2
+        elif tag == 'tr':
+            self._flush(1)
+            self._cells = 0
+        elif tag in ('td', 'th'):
+            if self._cells:
+                self._inline.append(' | ')
+            self._cells += 1
+        elif tag == 'form':
+            self._flush(2)
+            attrs = dict(attrs)
+            self._form = {
+                'index': self._form_count,
+                'action': attrs.get('action') or '',
+                'method': (attrs.get('method') or 'get').upper(),
+                'fields': []
+            }
+            self._form_count += 1
+        elif tag in ('input', 'textarea'):
+            self._add_field(attrs)
+        elif tag in PARAGRAPH_TAGS:
+            self._flush(2)
+        elif tag in LINE_TAGS:
+            self._flush(1)
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            if self._skip:
+                self._skip -= 1
+            return
+        if self._skip:
+            return
+        if self._link is not None and tag in BLOCK_TAGS:
+            if self._link[3]:
+                self._link[3] -= 1
+            else:
+                # The block the link was opened in ends, so does the link
+                self._end_link()
+
+        if tag in INLINE_MARKERS:
+            if not self._pre:
+                self._inline.append(INLINE_MARKERS[tag])
+        elif tag == 'a':
+            self._end_link()
+        elif tag == 'font':
+            if self._fonts:
+                color = self._fonts.pop()
+                if color:
+                    self._inline.append(f"«/{color}»")
+        elif tag in HEADING_TAGS:
+            self._flush(2)
+            self._heading = False
+        elif tag in ('ul', 'ol'):
+            self._flush(2 if len(self._lists) <= 1 else 1)
+            if self._lists:
+                self._indent = self._lists.pop()[2]
+            self._marker = ''
+        elif tag == 'pre':
+            if self._pre:
+                self._pre -= 1
+            text = ''.join(self._inline).strip('\n')
+            self._inline = []
+            if text:
+                self._add_pre(text)
+            self._add_pre('[/code]')
+            self._break = 2
+        elif tag == 'blockquote':
+            self._flush(2)
+            self._quote = self._quote[:-2]
+        elif tag == 'form':
+            self._flush(2)
+            if self._form is not None and self._form['fields']:
+                self.forms.append(self._form)
+            self._form = None
+        elif tag in PARAGRAPH_TAGS:
+            self._flush(2)
+        elif tag in LINE_TAGS:
+            self._flush(1)
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        if self.cdata_elem == 'textarea':
+            # Raw text, so character references are left to us
+            data = unescape(data)
+        self._inline.append(data)
+        if self._link is not None:
+            self._link[2].append(data)
+
+    # Links and forms
+
+    def _start_link(self, attrs):
+        if self._link is not None:
+            self._end_link()
+        href = dict(attrs).get('href')
+        if href and not href.startswith(SKIP_LINK_PREFIXES):
+            self._link = [len(self._inline), href, [], 0]
+
+    def _end_link(self):
+        link = self._link
+        if link is None:
+            return
+        self._link = None
+
+        start, href, parts, _ = link
+        text = _WHITESPACE.sub(' ', ''.join(parts)).strip()
+        if not text:
+            return
+
+        number = len(self.links)
+        self.links.append({
+            'url': urljoin(self.base_url, href),
+            'text': text[:50]  # Truncate long link text
+        })
+
+        if start is None:
+            self._inline.append(f" [{number}]")
+        else:
+            raw = ''.join(self._inline[start:])
+            lead = ' ' if raw[:1].isspace() else ''
+            trail = ' ' if raw[-1:].isspace() else ''
+            self._inline[start:] = [f"{lead}[{number}] {text}{trail}"]
+
+    def _add_field(self, attrs):
+        if self._form is None:
+            return
+        attrs = dict(attrs)
+        input_type = attrs.get('type') or 'text'
+        if input_type not in HIDDEN_INPUT_TYPES:
+            self._form['fields'].append({
+                'name': attrs.get('name') or '',
+                'type': input_type,
+                'placeholder': attrs.get('placeholder') or '',
+                'value': attrs.get('value') or ''
+            })
+
+    def close(self):
+        super().close()
+        self.finish()
+
+    def finish(self):
+        """Flush pending output once the whole document has been walked"""
+        self._end_link()
+        self._flush()
+        if self._form is not None and self._form['fields']:
+            self.forms.append(self._form)
+            self._form = None
+        while self.blocks and self.blocks[-1] == BLANK_BLOCK:
+            self.blocks.pop()
+            if self.wrap_lines:
+                self.lines.pop()
+
+
+def style_runs(line: str) -> tuple:
+    """Split a line into (x, text, style) runs with its markers removed
+
+    style is a «color» name, 'heading', 'link', 'bold', 'emphasis', 'rule'
+    or None for plain text.
+    """
+    if not line:
+        return ()
+
+    if '«' in line and '»' in line:
+        runs = []
+        x = 0
+        color = None
+        for part in COLOR_MARKER.split(line):
+            if part.startswith('«') and part.endswith('»'):
+                name = part[1:-1]
+                color = None if name.startswith('/') else name
+            elif part:
+                runs.append((x, part, color))
+                x += len(part)
+        return tuple(runs)
+
+    if line.startswith('#'):
+        style = 'heading'
+    elif '[' in line and '](' in line:
+        style = 'link'
+    elif '**' in line:
+        style = 'bold'
+    elif '_' in line:
+        style = 'emphasis'
+    elif line.strip() and RULE_CHARS.issuperset(line.strip()):
+        style = 'rule'
+    else:
+        style = None
+    return ((0, line, style),)
+
+
+# Parser backends
+#
+# Each backend walks a document and calls the converter's handle_starttag,
+# handle_endtag and handle_data callbacks in document order.
+
+def _parse_html_parser(converter, html: str):
+    converter.feed(html)
+    converter.close()
+
+
+def _walk_lxml(converter, root):
+    for event, el in etree.iterwalk(root, events=('start', 'end', 'comment', 'pi')):
+        tag = el.tag
+        if not isinstance(tag, str):
+            # Comments and processing instructions only contribute their tail
+            if el.tail:
+                converter.handle_data(el.tail)
+            continue
+        if event == 'start':
+            converter.handle_starttag(tag, el.items())
+            if el.text:
+                converter.handle_data(el.text)
+        else:
+            converter.handle_endtag(tag)
+            if el.tail:
+                converter.handle_data(el.tail)
+    converter.finish()
+
+
+def _parse_lxml(converter, html: str):
+    if not html.strip():
+        converter.finish()
+        return
+    root = etree.fromstring(html, etree.HTMLParser())
+    if root is None:
+        converter.finish()
+        return
+    _walk_lxml(converter, root)
+
+
+def _parse_html5_parser(converter, html: str):
+    _walk_lxml(converter, html5_parser.parse(html, treebuilder='lxml'))
+
+
+def _parse_selectolax(converter, html: str):
+    root = LexborHTMLParser(html).root
+    stack = [(root, False)] if root is not None else []
+    while stack:
+        node, closing = stack.pop()
+        tag = node.tag
+        if closing:
+            converter.handle_endtag(tag)
+        elif tag == '-text':
+            converter.handle_data(node.text_content)
+        elif tag and not tag.startswith('-'):  # Skip comments, doctypes and PIs
+            converter.handle_starttag(tag, list(node.attributes.items()))
+            stack.append((node, True))
+            children = list(node.iter(include_text=True))
+            stack.extend((child, False) for child in reversed(children))
+    converter.finish()
+
+
+# Fastest first, parse plus walk (see benchmarks/bench_convert.py)
+PARSERS = {
+    'lxml': _parse_lxml,
+    'html5-parser': _parse_html5_parser,
+    'selectolax': _parse_selectolax,
+    'html.parser': _parse_html_parser,
+}
+
+
+def available_parsers() -> list:
+    """Names of the installed parser backends, fastest first"""
+    installed = {
+        'lxml': etree is not None,
+        'html5-parser': html5_parser is not None,
+        'selectolax': LexborHTMLParser is not None,
+        'html.parser': True,
+    }
+    return [name for name in PARSERS if installed[name]]
+
+
+def best_parser(preferred: str = None) -> str:
+    """Return preferred if installed, else the fastest installed backend"""
+    available = available_parsers()
+    if preferred in available:
+        return preferred
+    return available[0]
+
+
+def convert_html(html: str, base_url: str = '', width: int = 78, colors=(),
+                 parser: str = None):
+    """Convert an HTML document, returning (lines, links, forms)"""
+    converter = HTMLToText(base_url, width, colors)
+    PARSERS[best_parser(parser)](converter, html)
+    return converter.lines, converter.links, converter.forms
+
+
+def convert_blocks(html: str, base_url: str = '', colors=(), parser: str = None):
+    """Convert an HTML document without wrapping, returning (blocks, links, forms)"""
+    converter = HTMLToText(base_url, colors=colors, wrap_lines=False)
+    PARSERS[best_parser(parser)](converter, html)
+    return converter.blocks, converter.links, converter.forms
+
+
+class _LxmlTarget:
+    """Forwards lxml feed-parser events to an HTMLToText"""
+
+    def __init__(self, converter):
+        self.converter = converter
+
+    def start(self, tag, attrib):
+        self.converter.handle_starttag(tag, list(attrib.items()))
+
+    def end(self, tag):
+        self.converter.handle_endtag(tag)
+
+    def data(self, data):
+        self.converter.handle_data(data)
+
+    def close(self):
+        pass
+
+
+class StreamConverter:
+    """Convert an HTML document fed in pieces
+
+    lines and links grow as each block is parsed and may be read from
+    another thread meanwhile. lxml's push parser is used when installed;
+    the other C backends need the whole document, so html.parser stands in.
+    """
+
+    def __init__(self, base_url: str = '', width: int = 78, colors=(), parser: str = None,
+                 wrap_lines: bool = True):
+        self.converter = HTMLToText(base_url, width, colors, wrap_lines)
+        self.blocks = self.converter.blocks
+        self.lines = self.converter.lines
+        self.links = self.converter.links
+        self.forms = self.converter.forms
+        if best_parser(parser) == 'lxml':
+            self._parser = etree.HTMLParser(target=_LxmlTarget(self.converter))
+        else:
+            self._parser = self.converter
+
+    def feed(self, text: str):
+        if text:
+            self._parser.feed(text)
+
+    def close(self):
+        """Finish the document, returning (lines, links, forms)"""
+        if self._parser is self.converter:
+            self.converter.close()
+        else:
+            try:
+                self._parser.close()
+            except etree.XMLSyntaxError:
+                pass  # Empty document
+            self.converter.finish()
+        return self.lines, self.links, self.forms
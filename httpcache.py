@@ -0,0 +1,361 @@
+"""
+HTTP response cache for DBBasic TextBrowser
+
+Responses are kept in an in-memory LRU and, optionally, an on-disk store,
+each bounded by a byte budget. Freshness follows Cache-Control / Expires
+(with the usual Last-Modified heuristic), and stale entries are revalidated
+with If-None-Match / If-Modified-Since so an unchanged page costs a 304.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+DEFAULT_MEMORY_BYTES = 32 * 1024 * 1024
+DEFAULT_DISK_BYTES = 256 * 1024 * 1024
+
+# Cap for the Last-Modified freshness heuristic (RFC 9111 section 4.2.2)
+MAX_HEURISTIC_SECONDS = 24 * 60 * 60
+
+
+def default_cache_dir() -> str:
+    """Base directory for the browser's on-disk caches"""
+    base = os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'dbbasic-textbrowser')
+
+
+def parse_cache_control(value: str) -> dict:
+    """Parse a Cache-Control header into {directive: value or True}"""
+    directives = {}
+    for part in (value or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, arg = part.partition('=')
+        directives[name.strip().lower()] = arg.strip().strip('"') if arg else True
+    return directives
+
+
+def _http_date(value: str):
+    """Seconds since the epoch for an HTTP date header, or None"""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def freshness_lifetime(headers, now: float):
+    """Seconds a response stays fresh, or None if it must not be stored"""
+    cc = parse_cache_control(headers.get('Cache-Control'))
+    if 'no-store' in cc or headers.get('Vary', '').strip() == '*':
+        return None
+
+    date = _http_date(headers.get('Date')) or now
+    try:
+        age = max(int(headers.get('Age', 0)), 0)
+    except ValueError:
+        age = 0
+
+    if 'no-cache' in cc:
+        lifetime = 0
+    elif 'max-age' in cc:
+        try:
+            lifetime = int(cc['max-age'])
+        except (TypeError, ValueError):
+            lifetime = 0
+    elif headers.get('Expires'):
+        expires = _http_date(headers.get('Expires'))
+        lifetime = expires - date if expires else 0
+    elif headers.get('Last-Modified'):
+        modified = _http_date(headers.get('Last-Modified'))
+        lifetime = min((date - modified) / 10, MAX_HEURISTIC_SECONDS) if modified else 0
+    else:
+        lifetime = 0
+
+    return max(lifetime - age, 0)
+
+
+class CacheEntry:
+    """A stored response"""
+
+    __slots__ = ('url', 'status', 'headers', 'body', 'stored_at', 'fresh_until')
+
+    def __init__(self, url, status, headers, body, stored_at, fresh_until):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.stored_at = stored_at
+        self.fresh_until = fresh_until
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + 512  # Rough allowance for url and headers
+
+    def is_fresh(self, now: float = None) -> bool:
+        return (now or time.time()) < self.fresh_until
+
+    def validators(self) -> dict:
+        """Conditional request headers for revalidating this entry"""
+        headers = {}
+        if self.headers.get('ETag'):
+            headers['If-None-Match'] = self.headers['ETag']
+        if self.headers.get('Last-Modified'):
+            headers['If-Modified-Since'] = self.headers['Last-Modified']
+        return headers
+
+    def to_response(self) -> Response:
+        """Rebuild a requests Response from the stored entry"""
+        response = Response()
+        response.status_code = self.status
+        response.reason = 'OK'
+        response.url = self.url
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = self.body
+        response._content_consumed = True
+        response.from_cache = True
+        return response
+
+    def dump(self) -> bytes:
+        meta = {
+            'url': self.url,
+            'status': self.status,
+            'headers': self.headers,
+            'stored_at': self.stored_at,
+            'fresh_until': self.fresh_until,
+        }
+        return json.dumps(meta).encode('utf-8') + b'\n' + self.body
+
+    @classmethod
+    def load(cls, data: bytes) -> 'CacheEntry':
+        meta, _, body = data.partition(b'\n')
+        meta = json.loads(meta.decode('utf-8'))
+        return cls(meta['url'], meta['status'], meta['headers'], body,
+                   meta['stored_at'], meta['fresh_until'])
+
+
+class DiskLRU:
+    """Directory of cache files evicted least-recently-used within a byte budget
+
+    Several processes may share one directory: reads go to the file system
+    rather than trusting this process's index, and writes are atomic.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, suffix: str = '.cache'):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.evictions = 0
+        self._files = OrderedDict()  # file name -> size, least recent first
+        self.used = 0
+
+        if os.path.isdir(directory):
+            found = []
+            for name in os.listdir(directory):
+                if name.endswith(suffix):
+                    try:
+                        st = os.stat(os.path.join(directory, name))
+                    except OSError:
+                        continue
+                    found.append((st.st_mtime, name, st.st_size))
+            for mtime, name, size in sorted(found):
+                self._files[name] = size
+                self.used += size
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def name_for(self, key: str) -> str:
+        return hashlib.sha256(key.encode('utf-8')).hexdigest() + self.suffix
+
+    def read(self, name: str):
+        """Contents of a cache file, or None"""
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            self.used -= self._files.pop(name, 0)
+            return None
+
+        self.used += len(data) - self._files.get(name, 0)
+        self._files[name] = len(data)
+        self._files.move_to_end(name)
+        return data
+
+    def write(self, name: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        path = os.path.join(self.directory, name)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            return
+
+        self.used -= self._files.pop(name, 0)
+        self._files[name] = len(data)
+        self.used += len(data)
+        while self.used > self.max_bytes and len(self._files) > 1:
+            self.remove(next(iter(self._files)))
+            self.evictions += 1
+
+    def remove(self, name: str):
+        self.used -= self._files.pop(name, 0)
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+    def clear(self):
+        for name in list(self._files):
+            self.remove(name)
+
+
+class HTTPCache:
+    """Two-level (memory + disk) LRU cache of GET responses"""
+
+    def __init__(self, directory: str = None, memory_bytes: int = DEFAULT_MEMORY_BYTES,
+                 disk_bytes: int = DEFAULT_DISK_BYTES, shared: bool = False):
+        self.memory_bytes = memory_bytes
+        self.shared = shared  # Serves several users: keep personal responses out
+        self.disk = DiskLRU(directory, disk_bytes) if directory else None
+
+        self._memory = OrderedDict()  # url -> CacheEntry, least recent first
+        self._memory_used = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.stores = 0
+        self.evictions = 0
+
+    # Disk store
+
+    def _disk_read(self, url: str):
+        name = self.disk.name_for(url)
+        data = self.disk.read(name)
+        if data is None:
+            return None
+        try:
+            entry = CacheEntry.load(data)
+        except (ValueError, KeyError):
+            self.disk.remove(name)
+            return None
+        return entry if entry.url == url else None
+
+    def _disk_write(self, entry: CacheEntry):
+        self.disk.write(self.disk.name_for(entry.url), entry.dump())
+
+    # Memory store
+
+    def _memory_put(self, entry: CacheEntry):
+        old = self._memory.pop(entry.url, None)
+        if old is not None:
+            self._memory_used -= old.size
+        if entry.size > self.memory_bytes:
+            return
+        self._memory[entry.url] = entry
+        self._memory_used += entry.size
+        while self._memory_used > self.memory_bytes:
+            url, evicted = self._memory.popitem(last=False)
+            self._memory_used -= evicted.size
+            self.evictions += 1
+
+    # Public API
+
+    def lookup(self, url: str):
+        """Return the stored entry for url (fresh or stale), or None"""
+        with self._lock:
+            entry = self._memory.get(url)
+            if entry is not None:
+                self._memory.move_to_end(url)
+                return entry
+            if self.disk is not None:
+                entry = self._disk_read(url)
+                if entry is not None:
+                    self._memory_put(entry)
+            return entry
+
+    def store(self, url: str, response) -> bool:
+        """Store a 200 response if its headers allow it"""
+        if response.status_code != 200:
+            return False
+        now = time.time()
+        headers = dict(response.headers)
+        lifetime = freshness_lifetime(response.headers, now)
+        if lifetime is None:
+            return False
+        if lifetime <= 0 and not ('ETag' in response.headers or 'Last-Modified' in response.headers):
+            return False  # Never fresh and cannot be revalidated
+        if self.shared and ('private' in parse_cache_control(response.headers.get('Cache-Control', ''))
+                            or 'Set-Cookie' in response.headers):
+            return False
+
+        entry = CacheEntry(url, 200, headers, response.content, now, now + lifetime)
+        with self._lock:
+            self._memory_put(entry)
+            if self.disk is not None:
+                self._disk_write(entry)
+            self.stores += 1
+        return True
+
+    def update(self, entry: CacheEntry, not_modified) -> CacheEntry:
+        """Refresh an entry from a 304 Not Modified response"""
+        now = time.time()
+        headers = dict(entry.headers)
+        for name in ('Cache-Control', 'Expires', 'ETag', 'Last-Modified', 'Date', 'Age'):
+            if name in not_modified.headers:
+                headers[name] = not_modified.headers[name]
+        headers.setdefault('Date', formatdate(now, usegmt=True))
+        lifetime = freshness_lifetime(CaseInsensitiveDict(headers), now) or 0
+
+        fresh = CacheEntry(entry.url, entry.status, headers, entry.body, now, now + lifetime)
+        with self._lock:
+            self._memory_put(fresh)
+            if self.disk is not None:
+                self._disk_write(fresh)
+        return fresh
+
+    def count(self, counter: str):
+        """Bump one of the hits/misses/revalidated counters"""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def clear(self):
+        """Drop every entry from memory and disk"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_used = 0
+            if self.disk is not None:
+                self.disk.clear()
+
+    def stats(self) -> dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidated': self.revalidated,
+            'stores': self.stores,
+            'evictions': self.evictions + (self.disk.evictions if self.disk else 0),
+            'memory_entries': len(self._memory),
+            'memory_bytes': self._memory_used,
+            'disk_entries': len(self.disk) if self.disk else 0,
+            'disk_bytes': self.disk.used if self.disk else 0,
+        }
@@ -0,0 +1,254 @@
+"""
+Per-stage timing for DBBasic TextBrowser
+
+Each page load, form submission and AI request gets a Timings: seconds per
+stage (connect, tls, wait, download, convert, render, ...) and byte
+counts. Stages nest exclusively - time spent in an inner stage is not
+counted again in the outer one - so a breakdown adds up to the total. The
+Timings of the action running on a thread is reachable with current(), so
+the fetcher can charge connection setup to it without being passed it.
+
+Finished Timings are recorded in a Metrics registry. It keeps a rolling
+window for the about:perf page and cumulative histograms that a gateway
+exports in the Prometheus text format.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+# Upper bounds of the histogram buckets, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+DEFAULT_WINDOW = 200  # Actions kept for about:perf
+
+# Stage order for display; unknown stages follow in the order they ran
+STAGE_ORDER = ('read', 'connect', 'tls', 'wait', 'download', 'request', 'ai', 'convert', 'render')
+
+_local = threading.local()
+
+
+def current():
+    """The Timings of the action running on this thread, if any"""
+    return getattr(_local, 'timings', None)
+
+
+@contextmanager
+def timing(timings):
+    """Make timings current on this thread for the duration of the block"""
+    previous = current()
+    _local.timings = timings
+    try:
+        yield timings
+    finally:
+        _local.timings = previous
+
+
+@contextmanager
+def stage(name: str):
+    """Time a stage of the current action, if there is one"""
+    timings = current()
+    if timings is None:
+        yield
+    else:
+        with timings.stage(name):
+            yield
+
+
+def format_bytes(count: int) -> str:
+    if count >= 1024 * 1024:
+        return f"{count / (1024 * 1024):.1f} MB"
+    if count >= 1024:
+        return f"{count // 1024} KB"
+    return f"{count} B"
+
+
+class Timings:
+    """Seconds per stage and byte counts for one action"""
+
+    def __init__(self, action: str):
+        self.action = action  # 'load', 'form' or 'ai'
+        self.stages = {}
+        self.bytes = {}
+        self.started = time.perf_counter()
+        self.total = None
+        self._spent = 0.0  # Seconds added to any stage so far
+
+    def add(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        self._spent += seconds
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block, less whatever inner stages it contained"""
+        start = time.perf_counter()
+        inner = self._spent
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start - (self._spent - inner))
+
+    def count(self, name: str, amount: int):
+        self.bytes[name] = self.bytes.get(name, 0) + amount
+
+    def finish(self):
+        """Stop the clock for the total"""
+        if self.total is None:
+            self.total = time.perf_counter() - self.started
+
+    def ordered(self) -> list:
+        """(stage, seconds) in display order"""
+        known = [(name, self.stages[name]) for name in STAGE_ORDER if name in self.stages]
+        return known + [(name, seconds) for name, seconds in self.stages.items()
+                        if name not in STAGE_ORDER]
+
+    def summary(self) -> str:
+        """One-line breakdown for the status bar"""
+        total = self.total if self.total is not None else time.perf_counter() - self.started
+        parts = [f"{self.action} {total * 1000:.0f}ms:"]
+        parts.extend(f"{name} {seconds * 1000:.0f}" for name, seconds in self.ordered()
+                     if seconds >= 0.0005)
+        received = self.bytes.get('received')
+        if received:
+            parts.append(f"| {format_bytes(received)}")
+        return ' '.join(parts)
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram of seconds"""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.sum += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+class Metrics:
+    """Thread-safe record of finished actions"""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.recent = deque(maxlen=window)  # Latest Timings, oldest first
+        self.histograms = {}  # (action, stage) -> Histogram; stage 'total' for the whole action
+        self.actions = {}     # action -> count
+        self.bytes = {}       # (action, name) -> total
+        self._lock = threading.Lock()
+
+    def record(self, timings: Timings):
+        timings.finish()
+        with self._lock:
+            self.recent.append(timings)
+            self.actions[timings.action] = self.actions.get(timings.action, 0) + 1
+            for name, seconds in list(timings.stages.items()) + [('total', timings.total)]:
+                key = (timings.action, name)
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram()
+                self.histograms[key].observe(seconds)
+            for name, amount in timings.bytes.items():
+                key = (timings.action, name)
+                self.bytes[key] = self.bytes.get(key, 0) + amount
+
+    def perf_page(self) -> list:
+        """Lines of the about:perf page: rolling per-stage figures and histograms"""
+        with self._lock:
+            recent = list(self.recent)
+        lines = [
+            f"Performance: last {len(recent)} actions (of {self.recent.maxlen} kept)",
+            "=" * 60,
+        ]
+        if not recent:
+            lines.extend(["", "Nothing measured yet: load a page and come back."])
+            return lines
+
+        for action in sorted({timings.action for timings in recent}):
+            runs = [timings for timings in recent if timings.action == action]
+            totals = [timings.total for timings in runs]
+            lines.extend([
+                "",
+                f"## {action}: {len(runs)} in window, median {percentile(totals, 0.5) * 1000:.0f} ms, "
+                f"p95 {percentile(totals, 0.95) * 1000:.0f} ms",
+                "",
+                f"  {'stage':<10} {'median':>8} {'p95':>8} {'max':>8}  share",
+            ])
+            stages = []
+            for timings in runs:
+                stages.extend(name for name, seconds in timings.ordered() if name not in stages)
+            grand = sum(totals) or 1.0
+            for name in stages:
+                values = [timings.stages.get(name, 0.0) for timings in runs]
+                share = sum(values) / grand
+                lines.append(f"  {name:<10} {percentile(values, 0.5) * 1000:8.1f} "
+                             f"{percentile(values, 0.95) * 1000:8.1f} {max(values) * 1000:8.1f}  "
+                             f"{'#' * round(share * 20):<20} {share * 100:3.0f}%")
+
+            # Where the totals fall, one bar per bucket
+            lines.extend(["", f"  {action} time histogram:"])
+            counts = [0] * (len(BUCKETS) + 1)
+            for total in totals:
+                counts[next((i for i, bound in enumerate(BUCKETS) if total <= bound), len(BUCKETS))] += 1
+            most = max(counts)
+            used = [i for i, count in enumerate(counts) if count]
+            for i in range(used[0], used[-1] + 1):
+                count = counts[i]
+                label = f"<= {BUCKETS[i] * 1000:g} ms" if i < len(BUCKETS) else f"> {BUCKETS[-1]:g} s"
+                lines.append(f"  {label:>12}  {'#' * max(1 if count else 0, count * 30 // most):<30} {count}")
+
+            byte_names = sorted({name for timings in runs for name in timings.bytes})
+            for name in byte_names:
+                amount = sum(timings.bytes.get(name, 0) for timings in runs)
+                lines.append(f"  {name} bytes: {format_bytes(amount)} in window")
+
+        lines.extend(["", "Press T to show the last action's breakdown in the status bar."])
+        return lines
+
+    def prometheus(self, prefix: str = 'textbrowser') -> str:
+        """Counters and histograms in the Prometheus text exposition format"""
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            actions = sorted(self.actions.items())
+            byte_counts = sorted(self.bytes.items())
+            out = [
+                f"# HELP {prefix}_actions_total Page loads, form submissions and AI requests finished.",
+                f"# TYPE {prefix}_actions_total counter",
+            ]
+            out.extend(f'{prefix}_actions_total{{action="{action}"}} {count}' for action, count in actions)
+
+            out.extend([
+                f"# HELP {prefix}_stage_seconds Time spent per stage of an action.",
+                f"# TYPE {prefix}_stage_seconds histogram",
+            ])
+            for (action, name), histogram in histograms:
+                labels = f'action="{action}",stage="{name}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    out.append(f'{prefix}_stage_seconds_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+                out.append(f'{prefix}_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                out.append(f'{prefix}_stage_seconds_sum{{{labels}}} {histogram.sum:.6f}')
+                out.append(f'{prefix}_stage_seconds_count{{{labels}}} {histogram.count}')
+
+            out.extend([
+                f"# HELP {prefix}_bytes_total Bytes counted per action (received, prompt, response).",
+                f"# TYPE {prefix}_bytes_total counter",
+            ])
+            out.extend(f'{prefix}_bytes_total{{action="{action}",kind="{name}"}} {amount}'
+                       for (action, name), amount in byte_counts)
+        return '\n'.join(out) + '\n'
+
+
+# Process-wide registry: in a gateway, every session records here
+METRICS = Metrics()
@@ -0,0 +1,124 @@
+"""
+Rendered-page cache for DBBasic TextBrowser
+
+Converting HTML is the expensive part of showing a page. Converted pages
+(unwrapped blocks, links and forms) are kept under a key made of the URL
+and a digest of the HTML, so revisiting a page or loading it from the HTTP
+cache skips conversion entirely, at any terminal width. Entries live in a
+memory-bounded LRU and, optionally, as zlib-compressed JSON in a directory
+that gateway sessions can share.
+"""
+
+import copy
+import hashlib
+import json
+import threading
+import zlib
+from collections import OrderedDict
+
+from httpcache import DiskLRU
+
+
+# Bump when the converter's output changes so stale renderings are ignored
+FORMAT_VERSION = 2
+
+DEFAULT_MEMORY_BYTES = 16 * 1024 * 1024
+DEFAULT_DISK_BYTES = 64 * 1024 * 1024
+
+
+def page_key(url: str, html: str) -> str:
+    """Cache key for a page converted from html"""
+    digest = hashlib.blake2b(html.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+    return f"{FORMAT_VERSION}:{digest}:{url}"
+
+
+def page_size(lines, links, forms) -> int:
+    """Approximate memory held by a rendered page"""
+    return (sum(map(len, lines)) + 56 * len(lines)
+            + 200 * len(links) + 500 * len(forms) + 256)
+
+
+def blocks_size(blocks, links, forms) -> int:
+    """Approximate memory held by a converted page"""
+    return (sum(len(block[2]) for block in blocks) + 120 * len(blocks)
+            + 200 * len(links) + 500 * len(forms) + 256)
+
+
+class PageCache:
+    """LRU of converted pages, in memory and optionally on disk"""
+
+    def __init__(self, directory: str = None, memory_bytes: int = DEFAULT_MEMORY_BYTES,
+                 disk_bytes: int = DEFAULT_DISK_BYTES):
+        self.memory_bytes = memory_bytes
+        self.disk = DiskLRU(directory, disk_bytes, suffix='.page') if directory else None
+
+        self._memory = OrderedDict()  # key -> (blocks, links, forms, size)
+        self._memory_used = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _memory_put(self, key: str, blocks, links, forms):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_used -= old[3]
+        size = blocks_size(blocks, links, forms)
+        if size > self.memory_bytes:
+            return
+        self._memory[key] = (blocks, links, forms, size)
+        self._memory_used += size
+        while self._memory_used > self.memory_bytes:
+            evicted = self._memory.popitem(last=False)[1]
+            self._memory_used -= evicted[3]
+            self.evictions += 1
+
+    def get(self, key: str):
+        """Return a copy of (blocks, links, forms) for key, or None"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            elif self.disk is not None:
+                data = self.disk.read(self.disk.name_for(key))
+                if data is not None:
+                    try:
+                        stored_key, blocks, links, forms = json.loads(zlib.decompress(data))
+                    except (ValueError, zlib.error):
+                        stored_key = None
+                    if stored_key == key:
+                        blocks = [tuple(block) for block in blocks]
+                        self._memory_put(key, blocks, links, forms)
+                        entry = (blocks, links, forms)
+
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        # Callers get their own copies; the cached page may be shared
+        blocks, links, forms = entry[:3]
+        return list(blocks), [dict(link) for link in links], copy.deepcopy(forms)
+
+    def put(self, key: str, blocks, links, forms):
+        """Store a converted page (copies are taken)"""
+        blocks = list(blocks)
+        links = [dict(link) for link in links]
+        forms = copy.deepcopy(forms)
+        with self._lock:
+            self._memory_put(key, blocks, links, forms)
+            if self.disk is not None:
+                data = zlib.compress(json.dumps([key, blocks, links, forms]).encode('utf-8'), 1)
+                self.disk.write(self.disk.name_for(key), data)
+
+    def stats(self) -> dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions + (self.disk.evictions if self.disk else 0),
+            'memory_entries': len(self._memory),
+            'memory_bytes': self._memory_used,
+            'disk_entries': len(self.disk) if self.disk else 0,
+            'disk_bytes': self.disk.used if self.disk else 0,
+        }
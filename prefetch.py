@@ -0,0 +1,229 @@
+"""
+Link prefetching for DBBasic TextBrowser
+
+While a page is being read, a few worker threads fetch the pages behind
+its first numbered links into a bounded in-memory store, and optionally
+render them into the page cache, so following a link shows the page at
+once. Prefetching stays on the page's own site, obeys robots.txt, stops
+at a byte budget per page and is abandoned as soon as the user navigates.
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+from fetcher import USER_AGENT
+
+
+DEFAULT_LINKS = 10
+DEFAULT_WORKERS = 2
+
+# Downloaded per page being read, across all of its prefetches
+DEFAULT_BUDGET_BYTES = 2 * 1024 * 1024
+
+# Larger pages are left for a real load
+DEFAULT_PAGE_BYTES = 512 * 1024
+
+DEFAULT_STORE_BYTES = 8 * 1024 * 1024
+
+
+def origin(url: str) -> str:
+    """scheme://host[:port] of url"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+class Prefetcher:
+    """Background fetches of a page's links into an LRU store"""
+
+    def __init__(self, fetcher, max_links: int = DEFAULT_LINKS,
+                 workers: int = DEFAULT_WORKERS, budget_bytes: int = DEFAULT_BUDGET_BYTES,
+                 page_bytes: int = DEFAULT_PAGE_BYTES, store_bytes: int = DEFAULT_STORE_BYTES,
+                 same_origin: bool = True, respect_robots: bool = True):
+        self.fetcher = fetcher
+        self.max_links = max_links
+        self.budget_bytes = budget_bytes
+        self.page_bytes = page_bytes
+        self.store_bytes = store_bytes
+        self.same_origin = same_origin
+        self.respect_robots = respect_robots
+
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix='prefetch')
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._futures = []
+        self._spent = 0
+        self._store = OrderedDict()  # url -> html, least recent first
+        self._store_used = 0
+        self._robots = {}            # origin -> RobotFileParser, or None to allow all
+        self._robots_lock = threading.Lock()
+
+        self.fetched = 0
+        self.hits = 0
+        self.skipped = 0
+        self.aborted = 0
+        self.evictions = 0
+
+    # Scheduling
+
+    def start(self, page_url: str, urls, render=None) -> int:
+        """Prefetch the first max_links of urls for the page at page_url
+
+        render(html, url), if given, runs on the worker after each fetch.
+        Returns the number of fetches queued.
+        """
+        self.cancel()
+        with self._lock:
+            generation = self._generation
+            self._spent = 0
+
+        queued = []
+        for url in urls:
+            if len(queued) >= self.max_links:
+                break
+            if url in queued or not self.allowed(page_url, url):
+                continue
+            with self._lock:
+                if url in self._store:
+                    continue
+            queued.append(url)
+
+        futures = [self._executor.submit(self._prefetch, generation, url, render)
+                   for url in queued]
+        with self._lock:
+            if generation == self._generation:
+                self._futures = futures
+        return len(queued)
+
+    def cancel(self):
+        """Abandon queued and running prefetches"""
+        with self._lock:
+            self._generation += 1
+            futures, self._futures = self._futures, []
+        for future in futures:
+            future.cancel()
+
+    def wait(self, timeout: float = None):
+        """Block until the current prefetches finish (for tests and benchmarks)"""
+        with self._lock:
+            futures = list(self._futures)
+        for future in futures:
+            try:
+                future.result(timeout)
+            except Exception:
+                pass
+
+    def allowed(self, page_url: str, url: str) -> bool:
+        """Whether policy lets url be prefetched from page_url"""
+        if not url.startswith(('http://', 'https://')):
+            return False
+        if self.same_origin and origin(url) != origin(page_url):
+            return False
+        return True
+
+    # Workers
+
+    def _current(self, generation: int) -> bool:
+        return generation == self._generation
+
+    def _spend(self, generation: int, size: int) -> bool:
+        """Charge size bytes to the page's budget; False once it is used up"""
+        with self._lock:
+            if generation != self._generation or self._spent + size > self.budget_bytes:
+                return False
+            self._spent += size
+            return True
+
+    def _robots_allow(self, url: str) -> bool:
+        site = origin(url)
+        # One robots.txt fetch per site, even with several workers asking
+        with self._robots_lock:
+            if site not in self._robots:
+                robots = RobotFileParser(site + '/robots.txt')
+                try:
+                    response = self.fetcher.get(site + '/robots.txt')
+                    if response.status_code >= 500:
+                        robots.disallow_all = True
+                    elif response.status_code >= 400:
+                        robots = None  # No robots.txt: everything is allowed
+                    else:
+                        robots.parse(response.text.splitlines())
+                except Exception:
+                    robots.disallow_all = True
+                self._robots[site] = robots
+            robots = self._robots[site]
+        return robots is None or robots.can_fetch(USER_AGENT, url)
+
+    def _prefetch(self, generation: int, url: str, render):
+        if not self._current(generation):
+            return
+        if self.respect_robots and not self._robots_allow(url):
+            self.skipped += 1
+            return
+
+        response = self.fetcher.get(url, stream=True)
+        try:
+            content_type = response.headers.get('Content-Type', 'text/html')
+            if response.status_code != 200 or 'html' not in content_type:
+                self.skipped += 1
+                return
+
+            chunks = []
+            size = 0
+            for chunk in self.fetcher.iter_content(response):
+                size += len(chunk)
+                if size > self.page_bytes or not self._spend(generation, len(chunk)):
+                    self.aborted += 1
+                    return
+                chunks.append(chunk)
+        finally:
+            response.close()
+
+        html = b''.join(chunks).decode(response.encoding or 'utf-8', 'replace')
+        if render is not None and self._current(generation):
+            render(html, url)
+        self._put(url, html)
+        self.fetched += 1
+
+    # Store
+
+    def _put(self, url: str, html: str):
+        with self._lock:
+            old = self._store.pop(url, None)
+            if old is not None:
+                self._store_used -= len(old)
+            if len(html) > self.store_bytes:
+                return
+            self._store[url] = html
+            self._store_used += len(html)
+            while self._store_used > self.store_bytes:
+                evicted = self._store.popitem(last=False)[1]
+                self._store_used -= len(evicted)
+                self.evictions += 1
+
+    def take(self, url: str):
+        """Remove and return the prefetched HTML for url, or None"""
+        with self._lock:
+            html = self._store.pop(url, None)
+            if html is not None:
+                self._store_used -= len(html)
+                self.hits += 1
+            return html
+
+    def stats(self) -> dict:
+        return {
+            'fetched': self.fetched,
+            'hits': self.hits,
+            'skipped': self.skipped,
+            'aborted': self.aborted,
+            'evictions': self.evictions,
+            'stored': len(self._store),
+            'stored_bytes': self._store_used,
+        }
+
+    def close(self):
+        self.cancel()
+        self._executor.shutdown(wait=False)
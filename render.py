@@ -0,0 +1,188 @@
+"""
+Headless batch rendering for DBBasic TextBrowser
+
+Converts many URLs or HTML files to the numbered-link text the browser
+shows, without a terminal. Pages are fetched and converted concurrently
+(up to --jobs at once) through BrowserCores sharing one connection pool
+and page cache, and each page is written as soon as it is ready, as JSON
+lines or plain text.
+
+Usage:
+    dbbasic-textbrowser render [--input FILE] [--jobs N] [--format jsonl|text]
+                               [--width W] [URL or FILE ...]
+
+Targets are read from --input (one per line, - for stdin) and the command
+line; with neither, from stdin.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from convertpool import ConversionPool
+from core import BrowserCore, DEFAULT_WIDTH
+from fetcher import Fetcher
+from httpcache import HTTPCache, default_cache_dir
+from pagecache import PageCache
+
+
+DEFAULT_JOBS = 8
+
+
+def read_targets(lines) -> list:
+    """URLs and paths from lines, skipping blanks and # comments"""
+    targets = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            targets.append(line)
+    return targets
+
+
+def target_url(target: str) -> str:
+    """URL for a target: files that exist become file:// URLs"""
+    if '://' not in target and os.path.isfile(target):
+        return 'file://' + os.path.abspath(target)
+    return target
+
+
+class Renderer:
+    """Renders pages concurrently, writing each one as it finishes"""
+
+    def __init__(self, out, jobs: int = DEFAULT_JOBS, width: int = DEFAULT_WIDTH,
+                 output_format: str = 'jsonl', fetcher: Fetcher = None,
+                 page_cache: PageCache = None, converter: ConversionPool = None):
+        self.out = out
+        self.jobs = jobs
+        self.width = width
+        self.output_format = output_format
+        self.owns_fetcher = fetcher is None
+        if fetcher is None:
+            cache_dir = os.getenv('TEXTBROWSER_CACHE_DIR', default_cache_dir())
+            fetcher = Fetcher(pool_maxsize=max(10, jobs),
+                              cache=HTTPCache(os.path.join(cache_dir, 'http') if cache_dir else None))
+        self.fetcher = fetcher
+        if page_cache is None:
+            page_cache = PageCache(os.getenv('TEXTBROWSER_PAGE_CACHE_DIR') or None)
+        self.page_cache = page_cache
+        self.converter = converter
+        self.executor = ThreadPoolExecutor(jobs, thread_name_prefix='render')
+
+        self.rendered = 0
+        self.failed = 0
+        self.lines = 0
+
+    async def render(self, index: int, target: str, limit: asyncio.Semaphore) -> dict:
+        """Fetch and convert one target, returning its output record"""
+        async with limit:
+            core = BrowserCore(self.fetcher, self.page_cache, self.width, self.converter)
+            if core.prefetcher is not None:
+                core.prefetcher.close()
+                core.prefetcher = None
+            core.executor = self.executor
+            start = time.monotonic()
+            ok = await core.open(target_url(target))
+            if ok:
+                # Huge pages are converted lazily: finish them for the output
+                await asyncio.get_running_loop().run_in_executor(self.executor, core.complete_page)
+            lines = list(core.page_content)
+
+        record = {
+            'index': index,
+            'url': target,
+            'final_url': core.current_url if ok else None,
+            'ok': ok,
+            'partial': core.partial,
+            'seconds': round(time.monotonic() - start, 3),
+            'links': [link['url'] for link in core.links] if ok else [],
+            'forms': len(core.forms) if ok else 0,
+            'text': '\n'.join(lines),
+        }
+        if not ok:
+            record['error'] = str(core.last_error)
+            self.failed += 1
+        else:
+            self.rendered += 1
+            self.lines += len(lines)
+        return record
+
+    def write(self, record: dict):
+        if self.output_format == 'jsonl':
+            self.out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        else:
+            status = '' if record['ok'] else f" (failed: {record['error']})"
+            self.out.write(f"==> {record['url']}{status} <==\n{record['text']}\n\n")
+        self.out.flush()
+
+    async def run(self, targets: list):
+        """Render every target, writing JSON lines as they finish or text in input order"""
+        limit = asyncio.Semaphore(self.jobs)
+        tasks = [asyncio.ensure_future(self.render(index, target, limit))
+                 for index, target in enumerate(targets)]
+        if self.output_format == 'jsonl':
+            for task in asyncio.as_completed(tasks):
+                self.write(await task)
+        else:
+            for task in tasks:
+                self.write(await task)
+
+    def close(self):
+        self.executor.shutdown()
+        if self.owns_fetcher:
+            self.fetcher.close()
+
+
+def main(argv=None, stdin=None, stdout=None, stderr=None) -> int:
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+
+    parser = argparse.ArgumentParser(prog='dbbasic-textbrowser render',
+                                     description='Convert web pages or HTML files to text')
+    parser.add_argument('targets', nargs='*', metavar='URL',
+                        help='URLs or HTML files to render')
+    parser.add_argument('-i', '--input', metavar='FILE',
+                        help='file listing targets one per line (- for stdin)')
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_JOBS,
+                        help=f"pages fetched and converted at once (default {DEFAULT_JOBS})")
+    parser.add_argument('-f', '--format', choices=('jsonl', 'text'), default='jsonl',
+                        help='JSON lines as pages finish, or text in input order (default jsonl)')
+    parser.add_argument('-w', '--width', type=int, default=DEFAULT_WIDTH,
+                        help=f"wrap width (default {DEFAULT_WIDTH})")
+    parser.add_argument('--convert-workers', type=int, default=0,
+                        help='processes converting big pages (default 0: on the fetch threads)')
+    parser.add_argument('--stats', action='store_true',
+                        help='print a timing summary to stderr')
+    args = parser.parse_args(argv)
+
+    targets = list(args.targets)
+    if args.input == '-' or (args.input is None and not targets):
+        targets += read_targets(stdin)
+    elif args.input:
+        with open(args.input) as f:
+            targets += read_targets(f)
+
+    converter = ConversionPool(args.convert_workers) if args.convert_workers > 0 else None
+    renderer = Renderer(stdout, max(1, args.jobs), args.width, args.format, converter=converter)
+    start = time.monotonic()
+    try:
+        asyncio.run(renderer.run(targets))
+    finally:
+        renderer.close()
+        if converter is not None:
+            converter.close()
+
+    if args.stats:
+        elapsed = time.monotonic() - start
+        stderr.write(f"{renderer.rendered} pages rendered, {renderer.failed} failed, "
+                     f"{renderer.lines} lines in {elapsed:.2f}s "
+                     f"({len(targets) / elapsed if elapsed else 0:.1f} pages/s, {args.jobs} jobs)\n")
+    return 1 if renderer.failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Frame-diffing screen output for DBBasic TextBrowser
+
+The browser describes each frame as a list of rows, one tuple of
+(x, text, attr) runs per screen line. Screen remembers the last frame and
+only rewrites rows that changed; a scroll moves the page area with the
+terminal's scroll region and redraws just the rows it exposes. Output is
+batched with noutrefresh/doupdate, so a one-line scroll over SSH or telnet
+costs a few bytes rather than a full screen.
+"""
+
+import curses
+
+
+class Screen:
+    """Draws frames of styled rows to a curses window, sending only changes"""
+
+    def __init__(self, window, term=curses):
+        self.window = window
+        self.term = term  # Provides doupdate(): curses, or a virtual terminal
+        self.rows = None  # Runs per row as last drawn; None forces a full redraw
+        self.size = None
+        self.rows_drawn = 0
+        self.scrolls = 0
+        try:
+            window.idlok(True)  # Let curses use insert/delete line and scroll regions
+        except curses.error:
+            pass
+
+    def invalidate(self):
+        """Forget the last frame so the next one is drawn from scratch"""
+        self.rows = None
+
+    def touch(self):
+        """Repair the screen after another window drew over it"""
+        self.window.touchwin()
+
+    def scroll(self, top: int, bottom: int, lines: int):
+        """Scroll rows top..bottom up by lines (down if negative) ahead of the next frame"""
+        if self.rows is None or not lines or abs(lines) > bottom - top:
+            return
+        window = self.window
+        try:
+            window.setscrreg(top, bottom)
+            window.scrollok(True)
+            window.scroll(lines)
+            window.scrollok(False)
+            window.setscrreg(0, self.size[0] - 1)
+        except curses.error:
+            self.invalidate()
+            return
+
+        # The rows moved with the text; only the exposed ones differ now
+        region = self.rows[top:bottom + 1]
+        blank = [()] * abs(lines)
+        region = region[lines:] + blank if lines > 0 else blank + region[:lines]
+        self.rows[top:bottom + 1] = region
+        self.scrolls += 1
+
+    def draw(self, frame: list):
+        """Bring the window up to date with frame and push it to the terminal"""
+        window = self.window
+        size = window.getmaxyx()
+        if self.rows is None or size != self.size or len(self.rows) != len(frame):
+            window.clear()
+            self.rows = [()] * len(frame)
+            self.size = size
+
+        for y, row in enumerate(frame):
+            if row == self.rows[y]:
+                continue
+            try:
+                window.move(y, 0)
+                window.clrtoeol()
+            except curses.error:
+                pass
+            for x, text, attr in row:
+                try:
+                    window.addstr(y, x, text, attr)
+                except curses.error:
+                    pass  # Writing the bottom-right cell
+            self.rows[y] = row
+            self.rows_drawn += 1
+
+        window.noutrefresh()
+        self.term.doupdate()
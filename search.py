@@ -0,0 +1,110 @@
+"""
+In-page search for DBBasic TextBrowser
+
+A PageIndex holds a page's lines as shown (color markers removed),
+lowercased and joined into one buffer, with the offset where each line
+starts. Built once per page, it answers every keystroke of a
+find-as-you-type search with str.find/rfind/count over the buffer and a
+bisect from offset to line, so searching a 100,000-line page costs
+milliseconds rather than a Python loop over its lines.
+"""
+
+import bisect
+from itertools import accumulate
+
+from htmltext import COLOR_MARKER
+
+
+def display_text(line: str) -> str:
+    """A page line as it appears on screen"""
+    if '«' in line:
+        return COLOR_MARKER.sub('', line)
+    return line
+
+
+def line_matches(line: str, query: str) -> list:
+    """(start, end) columns of query in a page line, ignoring case"""
+    text = display_text(line).lower()
+    query = query.lower()
+    spans = []
+    if not query:
+        return spans
+    start = text.find(query)
+    while start >= 0:
+        spans.append((start, start + len(query)))
+        start = text.find(query, start + len(query))
+    return spans
+
+
+class PageIndex:
+    """Lowercased text of a page's lines in one buffer, with line offsets"""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.width = getattr(lines, 'width', None)
+        texts = [display_text(line).lower() for line in lines]
+        self.count = len(texts)
+        self.buffer = '\n'.join(texts)
+        # Offset of each line in the buffer: its length plus a newline per line before it
+        self.starts = [0]
+        self.starts.extend(accumulate(len(text) + 1 for text in texts))
+        self._totals = {}  # query -> matches, for the queries of the current search
+
+    def covers(self, lines) -> bool:
+        """Whether the index is still that of lines (not grown or re-wrapped since)"""
+        return (self.lines is lines and self.count == len(lines)
+                and self.width == getattr(lines, 'width', None))
+
+    def line_of(self, offset: int) -> int:
+        return bisect.bisect_right(self.starts, offset) - 1
+
+    def offset_of(self, line: int) -> int:
+        return self.starts[min(line, self.count)]
+
+    def find(self, query: str, start: int = 0, backwards: bool = False):
+        """Offset of the first match at or after start (before it, backwards), wrapping around
+
+        None if the query is nowhere on the page.
+        """
+        query = query.lower()
+        if not query or '\n' in query:
+            return None
+        if self.total(query) == 0:
+            return None
+        buffer = self.buffer
+        # Search one side of start, then wrap around to the other
+        end = max(start, 0) + len(query) - 1
+        if backwards:
+            found = buffer.rfind(query, 0, end)
+            if found < 0:
+                found = buffer.rfind(query, start)
+        else:
+            found = buffer.find(query, start)
+            if found < 0:
+                found = buffer.find(query, 0, end)
+        return found if found >= 0 else None
+
+    def total(self, query: str) -> int:
+        """Matches of query on the page"""
+        query = query.lower()
+        if not query:
+            return 0
+        totals = self._totals
+        if query not in totals:
+            # Typing on past a query with no matches cannot find any
+            if any(totals.get(query[:end]) == 0 for end in range(1, len(query))):
+                totals[query] = 0
+            else:
+                if len(totals) >= 256:
+                    totals.clear()
+                totals[query] = self.buffer.count(query)
+        return totals[query]
+
+    def ordinal(self, query: str, offset: int) -> int:
+        """Which match (from 1) the one at offset is"""
+        query = query.lower()
+        overlaps = any(query[:n] == query[-n:] for n in range(1, len(query)))
+        if offset > len(self.buffer) // 2 and not overlaps:
+            # Count the shorter side: matches from offset on, taken from the total
+            return self.total(query) - self.buffer.count(query, offset) + 1
+        return self.buffer.count(query, 0, offset) + 1
@@ -22,7 +22,7 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/askrobots/dbbasic-textbrowser",
     packages=find_packages(),
-    py_modules=["browser"],
+    py_modules=["aicache", "aicontext", "browser", "convertpool", "core", "document", "fetcher", "gateway", "history", "htmltext", "httpcache", "metrics", "pagecache", "prefetch", "render", "search", "screen", "terminal", "textindex"],
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Developers",
@@ -45,6 +45,16 @@ setup(
         "dev": [
             "pytest>=7.0.0",
         ],
+        # html5-parser is not listed: its wheels bundle a libxml2 that must
+        # match lxml's, so it only imports alongside an lxml built from source
+        "fast": [
+            "lxml>=4.9.0",
+            "selectolax>=0.3.0",
+        ],
+        "bench": [
+            "beautifulsoup4>=4.12.0",
+            "html2text>=2020.1.16",
+        ],
     },
     entry_points={
         "console_scripts": [
@@ -0,0 +1,417 @@
+"""
+Virtual terminals for DBBasic TextBrowser gateway sessions
+
+A Terminal stands in for the curses module, and its Windows for curses
+windows, so a Browser can run against a network connection instead of the
+local tty. Windows draw into cell buffers; doupdate() compares the screen
+with what the client was last sent and writes only the difference as ANSI
+escape sequences (with the terminal's scroll region for scrolls), the way
+ncurses would. Keys arrive as bytes through feed() and come out of getch()
+as curses key codes.
+"""
+
+import curses
+import queue
+import threading
+
+
+DEFAULT_ROWS = 24
+DEFAULT_COLS = 80
+
+# color_pair(n) keeps n in these bits, as ncurses does
+COLOR_SHIFT = 8
+COLOR_MASK = 0xff << COLOR_SHIFT
+
+BLANK = (' ', 0)
+
+BOX_CHARS = '┌┐└┘─│'
+
+# Escape sequences sent by common terminals, and the curses keys they mean
+ESCAPE_KEYS = {
+    b'[A': 'KEY_UP', b'[B': 'KEY_DOWN', b'[C': 'KEY_RIGHT', b'[D': 'KEY_LEFT',
+    b'OA': 'KEY_UP', b'OB': 'KEY_DOWN', b'OC': 'KEY_RIGHT', b'OD': 'KEY_LEFT',
+    b'[5~': 'KEY_PPAGE', b'[6~': 'KEY_NPAGE',
+    b'[H': 'KEY_HOME', b'OH': 'KEY_HOME', b'[1~': 'KEY_HOME', b'[7~': 'KEY_HOME',
+    b'[F': 'KEY_END', b'OF': 'KEY_END', b'[4~': 'KEY_END', b'[8~': 'KEY_END',
+    b'[3~': 'KEY_DC',
+}
+
+
+class KeyDecoder:
+    """Turns terminal input bytes into getch() values
+
+    Like curses, other bytes come through one at a time (UTF-8 included).
+    """
+
+    def __init__(self):
+        self._pending = b''
+
+    def feed(self, data: bytes) -> list:
+        data = self._pending + data
+        self._pending = b''
+        keys = []
+        i = 0
+        while i < len(data):
+            byte = data[i]
+            if byte == 0x1b:
+                if i + 1 == len(data) or data[i + 1] not in b'[O':
+                    keys.append(27)  # A lone Esc
+                    i += 1
+                    continue
+                # SS3 sequences are one byte longer, CSI ones end at a final byte
+                end = i + 2
+                if data[i + 1] == ord('['):
+                    while end < len(data) and not 0x40 <= data[end] <= 0x7e:
+                        end += 1
+                if end >= len(data):
+                    self._pending = data[i:]  # The rest is still on its way
+                    break
+                name = ESCAPE_KEYS.get(data[i + 1:end + 1])
+                if name is not None:
+                    keys.append(getattr(curses, name))
+                i = end + 1
+                continue
+            if byte == 0x0d:
+                keys.append(10)
+                if data[i + 1:i + 2] in (b'\n', b'\x00'):
+                    i += 1
+            elif byte in (0x7f, 0x08):
+                keys.append(curses.KEY_BACKSPACE)
+            elif byte:
+                keys.append(byte)
+            i += 1
+        return keys
+
+
+class Window:
+    """A curses-like window drawing into a Terminal"""
+
+    def __init__(self, term: 'Terminal', rows: int, cols: int, y: int = 0, x: int = 0):
+        self.term = term
+        self.y = y
+        self.x = x
+        self._timeout = -1
+        self._scroll_region = None
+        self.resize(rows, cols)
+
+    def resize(self, rows: int, cols: int):
+        self.rows = max(rows, 1)
+        self.cols = max(cols, 1)
+        self.cells = [[BLANK] * self.cols for _ in range(self.rows)]
+        self.dirty = set(range(self.rows))  # Rows to copy on the next noutrefresh
+        self.cursor = (0, 0)
+
+    # Drawing
+
+    def getmaxyx(self):
+        return self.rows, self.cols
+
+    def getyx(self):
+        return self.cursor
+
+    def move(self, y: int, x: int):
+        self.cursor = (min(max(y, 0), self.rows - 1), min(max(x, 0), self.cols - 1))
+
+    def addstr(self, *args):
+        """addstr([y, x,] text[, attr]), clipped to the window"""
+        if isinstance(args[0], str):
+            (y, x), args = self.cursor, args
+        else:
+            y, x, args = args[0], args[1], args[2:]
+        text = args[0]
+        attr = args[1] if len(args) > 1 else 0
+        if not 0 <= y < self.rows:
+            return
+        row = self.cells[y]
+        for char in text:
+            if x >= self.cols:
+                break
+            if x >= 0 and char not in '\r\n':
+                row[x] = (char, attr)
+            x += 1
+        self.dirty.add(y)
+        self.cursor = (y, min(x, self.cols - 1))
+
+    def clrtoeol(self):
+        y, x = self.cursor
+        self.cells[y][x:] = [BLANK] * (self.cols - x)
+        self.dirty.add(y)
+
+    def erase(self):
+        self.cells = [[BLANK] * self.cols for _ in range(self.rows)]
+        self.dirty = set(range(self.rows))
+        self.cursor = (0, 0)
+
+    def clear(self):
+        """Erase, and repaint the whole terminal on the next update"""
+        self.erase()
+        self.term.clear_screen = True
+
+    def box(self):
+        tl, tr, bl, br, h, v = BOX_CHARS
+        self.cells[0] = [(tl, 0)] + [(h, 0)] * (self.cols - 2) + [(tr, 0)]
+        self.cells[-1] = [(bl, 0)] + [(h, 0)] * (self.cols - 2) + [(br, 0)]
+        for row in self.cells[1:-1]:
+            row[0] = row[-1] = (v, 0)
+        self.touchwin()
+
+    def setscrreg(self, top: int, bottom: int):
+        self._scroll_region = (top, bottom)
+
+    def scroll(self, lines: int = 1):
+        """Scroll the scroll region; the terminal does the same to its copy"""
+        top, bottom = self._scroll_region or (0, self.rows - 1)
+        region = self.cells[top:bottom + 1]
+        count = min(abs(lines), len(region))
+        blank = [[BLANK] * self.cols for _ in range(count)]
+        region = region[count:] + blank if lines > 0 else blank + region[:-count]
+        self.cells[top:bottom + 1] = region
+        if self.x == 0 and self.cols == self.term.cols:
+            self.term.scroll(self.y + top, self.y + bottom, lines)
+        else:
+            self.dirty.update(range(top, bottom + 1))
+
+    def touchwin(self):
+        self.dirty = set(range(self.rows))
+
+    # No-ops that curses needs
+    def idlok(self, flag):
+        pass
+
+    def scrollok(self, flag):
+        pass
+
+    def keypad(self, flag):
+        pass
+
+    def noutrefresh(self):
+        """Copy changed rows to the terminal's screen"""
+        screen = self.term.screen
+        for y in self.dirty:
+            target = self.y + y
+            if 0 <= target < self.term.rows:
+                row = screen[target]
+                width = max(0, min(self.cols, self.term.cols - self.x))
+                row[self.x:self.x + width] = self.cells[y][:width]
+        self.dirty = set()
+        self.term.cursor = (self.y + self.cursor[0], self.x + self.cursor[1])
+
+    def refresh(self):
+        self.noutrefresh()
+        self.term.doupdate()
+
+    # Input
+
+    def timeout(self, ms: int):
+        self._timeout = ms
+
+    def nodelay(self, flag: bool):
+        self._timeout = 0 if flag else -1
+
+    def getch(self) -> int:
+        return self.term.read_key(self._timeout)
+
+    def getstr(self, *args) -> bytes:
+        """getstr([y, x,] [n]): read a line, echoing it if echo() is on"""
+        if len(args) >= 2:
+            self.move(args[0], args[1])
+            args = args[2:]
+        limit = args[0] if args else self.cols
+        y, x = self.cursor
+        data = bytearray()
+        self.refresh()
+        while True:
+            key = self.term.read_key(-1)
+            if key in (-1, 10):
+                break
+            if key == curses.KEY_BACKSPACE:
+                text = data.decode('utf-8', 'ignore')[:-1]
+                data = bytearray(text.encode('utf-8'))
+            elif isinstance(key, int) and 32 <= key < 256:
+                data.append(key)
+            else:
+                continue
+            text = data.decode('utf-8', 'ignore')
+            if len(text) > limit:
+                data = bytearray(text[:limit].encode('utf-8'))
+                text = text[:limit]
+            if self.term.echoing:
+                self.addstr(y, x, text + ' ')
+                self.move(y, x + len(text))
+                self.refresh()
+        return bytes(data)
+
+
+class Terminal:
+    """A curses stand-in for one remote terminal
+
+    write(data) is called with the bytes to send to the client.
+    """
+
+    def __init__(self, write, rows: int = DEFAULT_ROWS, cols: int = DEFAULT_COLS):
+        self.write = write
+        self.rows = rows
+        self.cols = cols
+        self.screen = [[BLANK] * cols for _ in range(rows)]  # As windows last drew it
+        self.sent = None  # As the client shows it; None before the first update
+        self.clear_screen = True
+        self.pending_scrolls = []
+        self.cursor = (0, 0)
+        self.cursor_visible = True
+        self.echoing = False
+        self.pairs = {0: (-1, -1)}  # The terminal's own colors
+        self.closed = False
+        self.bytes_sent = 0
+        self._new_size = None
+        self._keys = queue.Queue()
+        self._decoder = KeyDecoder()
+        self._lock = threading.Lock()
+        self.stdscr = Window(self, rows, cols)
+
+    # curses module functions
+
+    def color_pair(self, pair: int) -> int:
+        return pair << COLOR_SHIFT
+
+    def init_pair(self, pair: int, fg: int, bg: int):
+        self.pairs[pair] = (fg, bg)
+
+    def curs_set(self, visibility: int):
+        self.cursor_visible = bool(visibility)
+
+    def echo(self):
+        self.echoing = True
+
+    def noecho(self):
+        self.echoing = False
+
+    def newwin(self, rows: int, cols: int, y: int = 0, x: int = 0) -> Window:
+        return Window(self, rows, cols, y, x)
+
+    def doupdate(self):
+        """Send the client whatever changed since the last update"""
+        with self._lock:
+            out = self._update()
+        if out:
+            data = out.encode('utf-8')
+            self.bytes_sent += len(data)
+            self.write(data)
+
+    # Input
+
+    def feed(self, data: bytes):
+        """Bytes typed by the client"""
+        for key in self._decoder.feed(data):
+            self._keys.put(key)
+
+    def read_key(self, timeout_ms: int) -> int:
+        if self.closed:
+            return -1
+        try:
+            if timeout_ms < 0:
+                key = self._keys.get()
+            elif timeout_ms:
+                key = self._keys.get(timeout=timeout_ms / 1000)
+            else:
+                key = self._keys.get_nowait()
+        except queue.Empty:
+            return -1
+        if key == curses.KEY_RESIZE:
+            self._apply_size()
+        return key
+
+    def scroll(self, top: int, bottom: int, lines: int):
+        """Scroll screen rows top..bottom, to be sent as a scroll region"""
+        with self._lock:
+            region = self.screen[top:bottom + 1]
+            count = min(abs(lines), len(region))
+            blank = [[BLANK] * self.cols for _ in range(count)]
+            region = region[count:] + blank if lines > 0 else blank + region[:-count]
+            self.screen[top:bottom + 1] = region
+            self.pending_scrolls.append((top, bottom, lines))
+
+    def resize(self, rows: int, cols: int):
+        """The client's window changed size: getch() returns KEY_RESIZE"""
+        self._new_size = (max(rows, 2), max(cols, 10))
+        self._keys.put(curses.KEY_RESIZE)
+
+    def _apply_size(self):
+        # On the session's thread, so nothing is drawing meanwhile
+        size, self._new_size = self._new_size, None
+        if size is None or size == (self.rows, self.cols):
+            return
+        with self._lock:
+            self.rows, self.cols = size
+            self.screen = [[BLANK] * self.cols for _ in range(self.rows)]
+            self.sent = None
+            self.pending_scrolls = []
+        self.stdscr.resize(*size)
+
+    def close(self):
+        """The client went away: wake up anything waiting for a key"""
+        self.closed = True
+        self._keys.put(-1)
+
+    # Output
+
+    def _sgr(self, attr: int) -> str:
+        fg, bg = self.pairs.get((attr & COLOR_MASK) >> COLOR_SHIFT, self.pairs[0])
+        codes = ['0']
+        if attr & curses.A_BOLD:
+            codes.append('1')
+        codes.append(str(30 + fg if 0 <= fg < 8 else 39))
+        codes.append(str(40 + bg if 0 <= bg < 8 else 49))
+        return f"\x1b[{';'.join(codes)}m"
+
+    def _update(self) -> str:
+        parts = []
+        if self.clear_screen or self.sent is None:
+            parts.append('\x1b[0m\x1b[H\x1b[2J')
+            self.sent = [[BLANK] * self.cols for _ in range(self.rows)]
+            self.clear_screen = False
+            self.pending_scrolls = []
+
+        # Scroll the client's copy the way the window scrolled
+        for top, bottom, lines in self.pending_scrolls:
+            count = min(abs(lines), bottom - top + 1)
+            parts.append(f"\x1b[0m\x1b[{top + 1};{bottom + 1}r")
+            parts.append(f"\x1b[{count}S" if lines > 0 else f"\x1b[{count}T")
+            parts.append('\x1b[r')
+            region = self.sent[top:bottom + 1]
+            blank = [[BLANK] * self.cols for _ in range(count)]
+            region = region[count:] + blank if lines > 0 else blank + region[:-count]
+            self.sent[top:bottom + 1] = region
+        self.pending_scrolls = []
+
+        attr = None
+        for y, row in enumerate(self.screen):
+            sent = self.sent[y]
+            if row == sent:
+                continue
+            changed = [x for x in range(self.cols) if row[x] != sent[x]]
+            first, last = changed[0], changed[-1]
+            end = self.cols
+            while end > first and row[end - 1] == BLANK:
+                end -= 1
+            stop = min(last + 1, end)
+            if y == self.rows - 1:
+                stop = min(stop, self.cols - 1)  # The last cell would scroll the terminal
+
+            parts.append(f"\x1b[{y + 1};{first + 1}H")
+            for x in range(first, stop):
+                char, cell_attr = row[x]
+                if cell_attr != attr:
+                    parts.append(self._sgr(cell_attr))
+                    attr = cell_attr
+                parts.append(char)
+            if end <= last:
+                parts.append('\x1b[0m\x1b[K')  # Blank to the end of the line
+                attr = None
+            self.sent[y] = list(row)
+
+        if parts:
+            parts.append('\x1b[0m')
+            y, x = self.cursor
+            parts.append(f"\x1b[{y + 1};{x + 1}H")
+            parts.append('\x1b[?25h' if self.cursor_visible else '\x1b[?25l')
+        return ''.join(parts)
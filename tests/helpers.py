@@ -0,0 +1,69 @@
+"""
+Helpers shared by the test modules
+"""
+
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from unittest.mock import Mock, patch
+
+import requests
+
+
+COLORS = ['BLACK', 'RED', 'GREEN', 'YELLOW', 'BLUE', 'MAGENTA', 'CYAN', 'WHITE']
+
+
+def patch_curses_colors(curses_module):
+    """Patcher giving curses_module real color numbers and attributes
+
+    Tests that draw need them whichever curses mock the browser was
+    imported with.
+    """
+    return patch.multiple(curses_module, A_NORMAL=0, A_BOLD=0x200000,
+                          **{f"COLOR_{name}": n for n, name in enumerate(COLORS)})
+
+
+def html_response(html: str, url: str = "https://example.com") -> requests.Response:
+    """A complete HTML response, as the fetcher's pooled session returns it"""
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['Content-Type'] = 'text/html; charset=utf-8'
+    response.encoding = 'utf-8'
+    response.url = url
+    response._content = html.encode('utf-8')
+    response._content_consumed = True
+    return response
+
+
+def stream_chunk(content=None, tool_call=None):
+    """A chunk of a streamed chat completion; tool_call is (index, name, arguments)"""
+    delta = Mock()
+    delta.content = content
+    delta.tool_calls = None
+    if tool_call is not None:
+        call = Mock()
+        call.index, call.function.name, call.function.arguments = tool_call
+        delta.tool_calls = [call]
+    choice = Mock()
+    choice.delta = delta
+    chunk = Mock()
+    chunk.choices = [choice]
+    return chunk
+
+
+class LocalServerTestCase(unittest.TestCase):
+    """Runs the class's handler on a free local port at base_url"""
+
+    handler = None  # BaseHTTPRequestHandler subclass
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), cls.handler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
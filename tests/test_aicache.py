@@ -0,0 +1,254 @@
+"""
+Tests for reusing AI answers
+"""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock curses before importing with proper key constants
+mock_curses = MagicMock()
+mock_curses.KEY_UP = 259
+mock_curses.KEY_DOWN = 258
+mock_curses.KEY_LEFT = 260
+mock_curses.KEY_RIGHT = 261
+mock_curses.KEY_PPAGE = 339
+mock_curses.KEY_NPAGE = 338
+mock_curses.KEY_HOME = 262
+mock_curses.KEY_END = 360
+mock_curses.KEY_DC = 330
+mock_curses.KEY_BACKSPACE = 263
+mock_curses.KEY_RESIZE = 410
+mock_curses.A_NORMAL = 0
+mock_curses.A_BOLD = 0x200000
+sys.modules['curses'] = mock_curses
+
+import browser as browser_module
+from aicache import AICache, ai_key, normalize_command, open_ai_cache
+from browser import Browser
+from gateway import Gateway
+from pagecache import PageCache
+from terminal import Terminal
+from tests.helpers import patch_curses_colors, stream_chunk
+
+
+class TestKeys(unittest.TestCase):
+    """Test what makes two requests the same"""
+
+    def test_normalized_commands(self):
+        """Test that case, spacing and trailing punctuation do not matter"""
+        self.assertEqual(normalize_command('  Summarize   this PAGE. '), 'summarize this page')
+        self.assertEqual(normalize_command('What is it?!'), 'what is it')
+        self.assertEqual(ai_key('m', 'Summarize this page.', 'page'), ai_key('m', 'summarize this page', 'page'))
+
+    def test_context_and_model(self):
+        """Test that another page, prompt or model is another key"""
+        key = ai_key('gpt-5-nano', 'summarize', 'system', 'page one')
+        self.assertNotEqual(key, ai_key('gpt-5-nano', 'summarize', 'system', 'page two'))
+        self.assertNotEqual(key, ai_key('gpt-5-nano', 'summarize', 'other system', 'page one'))
+        self.assertNotEqual(key, ai_key('gpt-5-mini', 'summarize', 'system', 'page one'))
+        self.assertNotEqual(ai_key('m', 'summarize', 'ab', 'c'), ai_key('m', 'summarize', 'a', 'bc'))
+
+
+class TestAICache(unittest.TestCase):
+    """Test storing, expiring and evicting answers"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        """Test that text and tool calls come back as stored"""
+        cache = AICache()
+        calls = [('navigate_to_url', '{"url": "https://example.com"}')]
+        cache.put('key', 'An answer.', calls)
+        answer = cache.get('key')
+        self.assertEqual(answer.text, 'An answer.')
+        self.assertEqual(answer.tool_calls, calls)
+        self.assertIsNone(cache.get('other'))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_expiry(self):
+        """Test that answers older than the TTL are not reused"""
+        cache = AICache(os.path.join(self.tmp.name, 'ai'), ttl=60)
+        cache.put('key', 'Old answer.', [], now=1000.0)
+        self.assertIsNotNone(cache.get('key', now=1059.0))
+        self.assertIsNone(cache.get('key', now=1061.0))
+        self.assertEqual(cache.stats()['memory_entries'], 0)
+        self.assertEqual(cache.stats()['disk_entries'], 0)
+
+    def test_bounded_memory(self):
+        """Test that the least recently used answers go first"""
+        cache = AICache(memory_bytes=3000)
+        for n in range(5):
+            cache.put(f"key{n}", 'x' * 700, [])
+            cache.get('key0')
+        self.assertLessEqual(cache.stats()['memory_bytes'], 3000)
+        self.assertIsNotNone(cache.get('key0'))
+        self.assertIsNone(cache.get('key1'))
+        self.assertIsNotNone(cache.get('key4'))
+
+    def test_shared_directory(self):
+        """Test that another process's cache sees answers stored on disk"""
+        directory = os.path.join(self.tmp.name, 'ai')
+        AICache(directory).put('key', 'From another session.', [('navigate_to_url', '{}')])
+        answer = AICache(directory).get('key')
+        self.assertEqual(answer.text, 'From another session.')
+        self.assertEqual(answer.tool_calls, [('navigate_to_url', '{}')])
+
+        # A damaged file is a miss, not an error
+        cache = AICache(directory)
+        with open(os.path.join(directory, cache.disk.name_for('key')), 'w') as f:
+            f.write('{not json')
+        self.assertIsNone(cache.get('key'))
+
+    def test_settings(self):
+        """Test TEXTBROWSER_AI_CACHE_TTL and the cache directory"""
+        with patch.dict(os.environ, {'TEXTBROWSER_AI_CACHE_TTL': '0'}):
+            self.assertIsNone(open_ai_cache())
+        with patch.dict(os.environ, {'TEXTBROWSER_AI_CACHE_TTL': '90', 'TEXTBROWSER_CACHE_DIR': ''}):
+            cache = open_ai_cache()
+            self.assertEqual(cache.ttl, 90)
+            self.assertIsNone(cache.disk)
+        with patch.dict(os.environ, {'TEXTBROWSER_AI_CACHE_TTL': '', 'TEXTBROWSER_CACHE_DIR': self.tmp.name}):
+            self.assertEqual(open_ai_cache().disk.directory, os.path.join(self.tmp.name, 'ai'))
+
+
+class TestCachedAnswers(unittest.TestCase):
+    """Test the browser answering repeated requests from the cache"""
+
+    def setUp(self):
+        self.env = patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key', 'TEXTBROWSER_CACHE_DIR': '',
+                                           'TEXTBROWSER_PREFETCH': '', 'TEXTBROWSER_AI_CACHE_TTL': ''})
+        self.env.start()
+        self.colors = patch_curses_colors(browser_module.curses)
+        self.colors.start()
+        openai = patch('browser.OpenAI')
+        self.client = openai.start().return_value
+        self.addCleanup(openai.stop)
+        self.client.chat.completions.create.side_effect = lambda **kwargs: iter([
+            stream_chunk(content="Otters "), stream_chunk(content="hold hands.")])
+
+    def tearDown(self):
+        self.colors.stop()
+        self.env.stop()
+
+    def new_browser(self, ai_cache=None) -> Browser:
+        terminal = Terminal(lambda data: None, 24, 80)
+        browser = Browser(terminal.stdscr, page_cache=PageCache(), term=terminal, ai_cache=ai_cache)
+        browser.set_page_lines(["# Otters", "", "Sea otters are marine mammals."])
+        browser.current_url = 'https://example.com/otters'
+        return browser
+
+    def text(self, browser) -> str:
+        return '\n'.join(browser.page_content)
+
+    def test_repeated_request(self):
+        """Test that the same request on the same page is answered without the model"""
+        browser = self.new_browser()
+        browser.process_ai_command('Tell me about otters')
+        self.assertEqual(self.client.chat.completions.create.call_count, 1)
+        first = self.text(browser)
+
+        start = time.perf_counter()
+        browser.process_ai_command('tell me about   otters.')
+        elapsed = time.perf_counter() - start
+        self.assertEqual(self.client.chat.completions.create.call_count, 1)
+        self.assertLess(elapsed, 0.05)
+        self.assertIn('Otters hold hands.', self.text(browser))
+        self.assertIn('Saved answer from 0 min ago', self.text(browser))
+        self.assertNotIn('Saved answer', first)
+        browser.render()
+        self.assertIn('read', browser.last_timings.stages)
+        self.assertNotIn('wait', browser.last_timings.stages)
+
+    def test_changed_page(self):
+        """Test that the same request on a changed page asks the model again"""
+        browser = self.new_browser()
+        browser.process_ai_command('tell me about otters')
+        browser.set_page_lines(["# Otters", "", "Sea otters use tools."])
+        browser.process_ai_command('tell me about otters')
+        self.assertEqual(self.client.chat.completions.create.call_count, 2)
+
+    def test_asking_again(self):
+        """Test that ! skips the saved answer and replaces it"""
+        browser = self.new_browser()
+        browser.process_ai_command('tell me about otters')
+        self.client.chat.completions.create.side_effect = lambda **kwargs: iter([
+            stream_chunk(content="Otters sleep on water.")])
+        browser.process_ai_command('!tell me about otters')
+        self.assertEqual(self.client.chat.completions.create.call_count, 2)
+        self.assertIn('AI Response to: tell me about otters', self.text(browser))
+        browser.process_ai_command('tell me about otters')
+        self.assertIn('Otters sleep on water.', self.text(browser))
+        self.assertEqual(self.client.chat.completions.create.call_count, 2)
+
+    def test_navigation_replayed(self):
+        """Test that a saved navigate_to_url call is followed again"""
+        self.client.chat.completions.create.side_effect = lambda **kwargs: iter([
+            stream_chunk(tool_call=(0, "navigate_to_url", '{"url": "https://en.wikipedia.org/wiki/Otter", ')),
+            stream_chunk(tool_call=(0, None, '"reason": "Otters"}')),
+        ])
+        browser = self.new_browser()
+        with patch.object(browser, 'fetch_page') as fetch_page:
+            browser.process_ai_command('go to wikipedia for otters')
+            browser.process_ai_command('go to wikipedia for otters')
+        self.assertEqual(self.client.chat.completions.create.call_count, 1)
+        self.assertEqual(fetch_page.call_count, 2)
+        fetch_page.assert_called_with('https://en.wikipedia.org/wiki/Otter')
+
+    def test_failures_not_saved(self):
+        """Test that errors and stopped answers are asked again"""
+        self.client.chat.completions.create.side_effect = RuntimeError('model overloaded')
+        browser = self.new_browser()
+        browser.process_ai_command('tell me about otters')
+        self.assertEqual(browser.page_content[0], 'AI Error!')
+        self.assertEqual(browser.ai_cache.stats()['memory_entries'], 0)
+
+    def test_malformed_tool_call_not_saved(self):
+        """Test that a tool call cut short shows an error and is asked again"""
+        self.client.chat.completions.create.side_effect = lambda **kwargs: iter([
+            stream_chunk(tool_call=(0, "navigate_to_url", '{"url": "https://exa'))])
+        browser = self.new_browser()
+        with patch.object(browser, 'fetch_page') as fetch_page:
+            browser.process_ai_command('go to example')
+            self.assertEqual(browser.page_content[0], 'AI Error!')
+            self.assertEqual(browser.ai_cache.stats()['memory_entries'], 0)
+            browser.process_ai_command('go to example')
+        self.assertEqual(self.client.chat.completions.create.call_count, 2)
+        fetch_page.assert_not_called()
+
+    def test_turned_off(self):
+        """Test TEXTBROWSER_AI_CACHE_TTL=0"""
+        with patch.dict(os.environ, {'TEXTBROWSER_AI_CACHE_TTL': '0'}):
+            browser = self.new_browser()
+        self.assertIsNone(browser.ai_cache)
+        browser.process_ai_command('tell me about otters')
+        browser.process_ai_command('tell me about otters')
+        self.assertEqual(self.client.chat.completions.create.call_count, 2)
+
+    def test_gateway_sessions_share(self):
+        """Test that an answer given in one gateway session is reused in another"""
+        gateway = Gateway(page_cache=PageCache())
+        first = gateway.new_browser(Terminal(lambda data: None, 24, 80))
+        second = gateway.new_browser(Terminal(lambda data: None, 24, 80))
+        self.assertIs(first.ai_cache, second.ai_cache)
+        for browser in (first, second):
+            browser.set_page_lines(["# Otters", "", "Sea otters are marine mammals."])
+            browser.current_url = 'https://example.com/otters'
+            browser.process_ai_command('tell me about otters')
+        self.assertEqual(self.client.chat.completions.create.call_count, 1)
+        self.assertIn('Otters hold hands.', self.text(second))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+"""
+Tests for choosing the page context sent with AI requests
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, Mock, patch
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock curses before importing with proper key constants
+mock_curses = MagicMock()
+mock_curses.KEY_UP = 259
+mock_curses.KEY_DOWN = 258
+mock_curses.KEY_LEFT = 260
+mock_curses.KEY_RIGHT = 261
+mock_curses.KEY_PPAGE = 339
+mock_curses.KEY_NPAGE = 338
+mock_curses.KEY_HOME = 262
+mock_curses.KEY_END = 360
+mock_curses.KEY_DC = 330
+mock_curses.KEY_BACKSPACE = 263
+mock_curses.KEY_RESIZE = 410
+mock_curses.A_NORMAL = 0
+mock_curses.A_BOLD = 0x200000
+sys.modules['curses'] = mock_curses
+
+from aicontext import OMITTED, bm25_scores, build_context, estimate_tokens, page_chunks, terms
+from browser import Browser
+from core import BrowserCore
+from pagecache import PageCache
+
+TOPICS = ['History', 'Habitat', 'Diet', 'Behaviour', 'Reproduction', 'Conservation']
+
+
+def otter_page(paragraphs: int = 12) -> str:
+    """A long page: a menu of links, then a section per topic, then the link list"""
+    menu = '\n'.join(f"[{n}] Menu item {n}" for n in range(40))
+    sections = []
+    for topic in TOPICS:
+        text = '\n\n'.join(
+            f"Paragraph {k} on {topic.lower()} has words about {topic.lower()} [{k + 50}] "
+            f"and enough other text to make the section a realistic length."
+            for k in range(paragraphs))
+        sections.append(f"## {topic}\n\n{text}")
+    links = '\n'.join(f"[{n}] https://example.com/{n}" for n in range(60))
+    return (f"# Sea otter\n\n{menu}\n\n" + '\n\n'.join(sections)
+            + f"\n\n{'=' * 40}\nLinks:\n{links}")
+
+
+def headings(context: str) -> list:
+    return [line for line in context.split('\n') if line.startswith('#') or line == OMITTED]
+
+
+class TestChunks(unittest.TestCase):
+    """Test cutting a page into sections"""
+
+    def test_headings_and_rules(self):
+        """Test that headings start chunks and rule lines end them"""
+        chunks = page_chunks(otter_page())
+        self.assertEqual(chunks[0].heading, 'Sea otter')
+        self.assertTrue(chunks[0].navigation)
+        self.assertIn('## History', chunks[1].text)
+        self.assertFalse(chunks[1].navigation)
+        self.assertTrue(chunks[-1].navigation)  # The link list
+        self.assertFalse(any('=' * 40 in chunk.text for chunk in chunks))
+
+    def test_long_sections_split(self):
+        """Test that a long section is cut at paragraph breaks and keeps its heading"""
+        chunks = page_chunks(otter_page(), max_chars=600)
+        diet = [chunk for chunk in chunks if chunk.heading == 'Diet']
+        self.assertGreater(len(diet), 1)
+        self.assertTrue(diet[0].text.startswith('## Diet'))
+        self.assertTrue(diet[1].text.startswith('# Diet (continued)'))
+        self.assertTrue(all(len(chunk.text) < 1200 for chunk in chunks if not chunk.navigation))
+
+    def test_terms(self):
+        """Test that stopwords and instructions are not search terms"""
+        self.assertEqual(terms('What do sea otters eat? Summarize the page.'), ['sea', 'otters', 'eat'])
+
+
+class TestBuildContext(unittest.TestCase):
+    """Test ranking sections against a request and packing them into a budget"""
+
+    def test_small_page_whole(self):
+        """Test that a page within the budget is sent as it is"""
+        context, complete = build_context("# Otters\n\n«red»Sea«/red» otters float.", 'what do they eat')
+        self.assertTrue(complete)
+        self.assertEqual(context, "# Otters\n\nSea otters float.")
+
+    def test_relevant_section(self):
+        """Test that a question gets the section that answers it"""
+        context, complete = build_context(otter_page(), 'What do sea otters eat? Tell me about their diet',
+                                          max_tokens=1500)
+        self.assertFalse(complete)
+        self.assertIn('## Diet', context)
+        self.assertNotIn('## Conservation', context)
+        self.assertNotIn('Menu item', context)
+        self.assertLess(estimate_tokens(context), 1500)
+        # The page's opening comes along, everything in page order
+        self.assertEqual(headings(context), [OMITTED, '## History', OMITTED, '## Diet', OMITTED])
+
+    def test_general_request(self):
+        """Test that a request with no telling words gets content from the top, not the menu"""
+        context, complete = build_context(otter_page(), 'summarize this page', max_tokens=1500)
+        self.assertFalse(complete)
+        self.assertNotIn('Menu item', context)
+        self.assertEqual(headings(context)[:3], [OMITTED, '## History', '## Habitat'])
+        self.assertEqual(headings(context)[-1], OMITTED)
+        self.assertLessEqual(estimate_tokens(context), 1500 + 10)
+
+    def test_budget(self):
+        """Test that the context fits the budget it was given"""
+        for budget in (300, 800, 3000):
+            context, complete = build_context(otter_page(), 'reproduction habitat', max_tokens=budget)
+            self.assertLessEqual(estimate_tokens(context), budget + 10)
+            self.assertIn('reproduction', context)
+
+    def test_common_words_ignored(self):
+        """Test that words found in most sections do not decide the ranking"""
+        chunks = page_chunks(otter_page())
+        scores = bm25_scores(chunks, terms('paragraph conservation'))
+        best = max(range(len(chunks)), key=scores.__getitem__)
+        self.assertEqual(chunks[best].heading, 'Conservation')
+        self.assertEqual(bm25_scores(chunks, terms('paragraph')), [0.0] * len(chunks))
+
+
+class TestPageContext(unittest.TestCase):
+    """Test the context of the current page in the browser"""
+
+    def test_budget_setting(self):
+        """Test TEXTBROWSER_AI_CONTEXT_TOKENS"""
+        with patch.dict(os.environ, {'TEXTBROWSER_AI_CONTEXT_TOKENS': '400'}):
+            core = BrowserCore(page_cache=PageCache())
+        core.page_text = otter_page()
+        context, complete = core.ai_context('diet')
+        self.assertFalse(complete)
+        self.assertLessEqual(estimate_tokens(context), 410)
+        self.assertIn('diet', context)
+
+        core.page_text = "A short page."
+        self.assertEqual(core.ai_context('diet'), ("A short page.", True))
+
+    @patch('browser.OpenAI')
+    def test_prompt(self, mock_openai_class):
+        """Test that the prompt carries the relevant section and says what was left out"""
+        with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key', 'TEXTBROWSER_CACHE_DIR': '',
+                                     'TEXTBROWSER_PREFETCH': ''}):
+            mock_client = Mock()
+            mock_openai_class.return_value = mock_client
+            mock_client.chat.completions.create.return_value = iter([])
+            stdscr = Mock()
+            stdscr.getmaxyx.return_value = (24, 80)
+            browser = Browser(stdscr)
+            browser.page_text = otter_page(30)
+            browser.current_url = 'https://example.com/otters'
+            browser.process_ai_command('what is in their diet?')
+
+        messages = mock_client.chat.completions.create.call_args.kwargs['messages']
+        prompt = messages[-1]['content']
+        self.assertIn('## Diet', prompt)
+        self.assertIn('[...] marks sections left out', prompt)
+        self.assertNotIn('## Behaviour', prompt)
+        self.assertLess(len(prompt), len(otter_page(30)) // 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,228 @@
+"""
+Tests for streamed AI answers, against a local fake of the chat completions API
+"""
+
+import json
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+from http.server import BaseHTTPRequestHandler
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock curses before importing with proper key constants
+mock_curses = MagicMock()
+mock_curses.KEY_UP = 259
+mock_curses.KEY_DOWN = 258
+mock_curses.KEY_LEFT = 260
+mock_curses.KEY_RIGHT = 261
+mock_curses.KEY_PPAGE = 339
+mock_curses.KEY_NPAGE = 338
+mock_curses.KEY_HOME = 262
+mock_curses.KEY_END = 360
+mock_curses.KEY_DC = 330
+mock_curses.KEY_BACKSPACE = 263
+mock_curses.KEY_RESIZE = 410
+mock_curses.A_NORMAL = 0
+mock_curses.A_BOLD = 0x200000
+sys.modules['curses'] = mock_curses
+
+import browser as browser_module
+from browser import Browser
+from pagecache import PageCache
+from terminal import Terminal
+from tests.helpers import LocalServerTestCase, patch_curses_colors
+
+
+def chunk(delta: dict) -> bytes:
+    """One server-sent event of a streamed chat completion"""
+    data = {'id': 'chatcmpl-test', 'object': 'chat.completion.chunk', 'created': 0,
+            'model': 'gpt-5-nano', 'choices': [{'index': 0, 'delta': delta, 'finish_reason': None}]}
+    return f"data: {json.dumps(data)}\n\n".encode('utf-8')
+
+
+class FakeAIHandler(BaseHTTPRequestHandler):
+    """Streams the server's script, waiting on its gate where the script says 'gate'"""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append(body)
+        if self.server.status != 200:
+            error = json.dumps({'error': {'message': 'model overloaded', 'type': 'invalid_request_error'}})
+            self.send_response(self.server.status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(error)))
+            self.end_headers()
+            self.wfile.write(error.encode('utf-8'))
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        try:
+            for step in self.server.script:
+                if step == 'gate':
+                    self.server.gate.wait(5)
+                    continue
+                self.wfile.write(chunk(step))
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+        except ConnectionError:
+            pass  # The browser stopped reading
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestStreamedAnswers(LocalServerTestCase):
+    """Test answers appearing as they stream in, and stopping them"""
+
+    handler = FakeAIHandler
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.status = 200
+        self.server.gate = threading.Event()
+        self.server.script = [{'role': 'assistant', 'content': ''}, {'content': 'Otters '},
+                              {'content': 'hold hands.\nThey'}, 'gate',
+                              {'content': ' sleep on water.'}]
+        self.env = patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key', 'OPENAI_BASE_URL': self.base_url + '/v1',
+                                           'TEXTBROWSER_CACHE_DIR': '', 'TEXTBROWSER_PREFETCH': ''})
+        self.env.start()
+        self.colors = patch_curses_colors(browser_module.curses)
+        self.colors.start()
+        self.terminal = Terminal(lambda data: None, 24, 80)
+        self.browser = Browser(self.terminal.stdscr, page_cache=PageCache(), term=self.terminal)
+        self.browser.set_page_lines(["# Otters", "", "Sea otters are marine mammals."])
+        self.browser.current_url = 'https://example.com/otters'
+
+    def tearDown(self):
+        self.server.gate.set()
+        self.browser.close()
+        self.colors.stop()
+        self.env.stop()
+
+    def poll_until(self, condition, timeout: float = 5.0):
+        """Run the main loop's polling until condition() holds"""
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "timed out")
+            self.browser.poll_ai()
+            time.sleep(0.005)
+
+    def text(self) -> str:
+        return '\n'.join(self.browser.page_content)
+
+    def test_words_appear_before_the_end(self):
+        """Test that the answer is shown line by line while it is still streaming"""
+        browser = self.browser
+        browser.background_loads = True
+        browser.process_ai_command('tell me about otters')
+        self.assertIn('Please wait...', browser.page_content)
+        status = ''.join(text for x, text, attr in browser.frame(24, 80)[0])
+        self.assertIn('Esc: Stop', status)
+
+        self.poll_until(lambda: 'They' in browser.page_content)
+        browser.render()
+        self.assertFalse(browser.ai_request.done.is_set())
+        self.assertIn('Otters hold hands.', browser.page_content)
+        self.assertNotIn('Please wait...', browser.page_content)
+        self.assertIn('AI answering', ''.join(text for x, text, attr in browser.frame(24, 80)[0]))
+
+        self.server.gate.set()
+        self.poll_until(lambda: browser.ai_request is None)
+        self.assertIn('They sleep on water.', browser.page_content)
+        # The line drawn while it was still arriving is drawn again in full
+        rows = [''.join(text for x, text, attr in row) for row in browser.frame(24, 80)]
+        self.assertIn('They sleep on water.', rows)
+        self.assertEqual(browser.page_content[-1], 'Press Ctrl-K to enter a new command or URL')
+        browser.render()  # Timings are recorded once the answer is on screen
+        self.assertEqual(browser.last_timings.action, 'ai')
+        self.assertIn('wait', browser.last_timings.stages)
+        self.assertGreater(browser.last_timings.bytes['response'], 20)
+
+        request = self.server.requests[0]
+        self.assertTrue(request['stream'])
+        self.assertIn('Sea otters are marine mammals.', request['messages'][1]['content'])
+
+    def test_escape_stops_the_answer(self):
+        """Test that Esc stops mid-stream, keeping the words already shown"""
+        browser = self.browser
+        browser.background_loads = True
+        browser.process_ai_command('tell me about otters')
+        self.poll_until(lambda: 'They' in browser.page_content)
+        request = browser.ai_request
+
+        browser.handle_input(27)
+        self.assertIsNone(browser.ai_request)
+        self.assertIn('Otters hold hands.', browser.page_content)
+        self.assertIn('[Stopped]', browser.page_content)
+        self.assertTrue(request.done.wait(1))  # The connection is shut, not left to run on
+        self.assertIsNone(request.error)
+        self.assertNotIn('sleep on water', self.text())
+
+    def test_navigating_away_drops_the_answer(self):
+        """Test that an answer still streaming is abandoned when the page changes"""
+        browser = self.browser
+        browser.background_loads = True
+        browser.navigate(browser.process_ai_command, 'tell me about otters')
+        request = browser.ai_request
+        browser.go_back()
+        self.assertEqual(browser.current_url, 'https://example.com/otters')
+        browser.poll_ai()
+        self.assertIsNone(browser.ai_request)
+        self.assertTrue(request.cancelled.is_set())
+        self.assertIn('Sea otters are marine mammals.', browser.page_content)
+
+    def test_blocking_answer(self):
+        """Test the whole answer at once outside the interactive loop"""
+        self.server.gate.set()
+        self.browser.process_ai_command('tell me about otters')
+        self.assertIsNone(self.browser.ai_request)
+        self.assertIn('Otters hold hands.\nThey sleep on water.', self.text())
+
+    def test_streamed_navigation(self):
+        """Test a navigate_to_url call arriving in pieces"""
+        self.server.gate.set()
+        self.server.script = [
+            {'role': 'assistant', 'tool_calls': [{'index': 0, 'id': 'call_1', 'type': 'function',
+                                                  'function': {'name': 'navigate_to_url', 'arguments': ''}}]},
+            {'tool_calls': [{'index': 0, 'function': {'arguments': '{"url": "https://en.wikipedia.org/wiki/Otter", '}}]},
+            {'tool_calls': [{'index': 0, 'function': {'arguments': '"reason": "Otters"}'}}]},
+        ]
+        with patch.object(self.browser, 'fetch_page') as fetch_page:
+            self.browser.process_ai_command('go to wikipedia for otters')
+        fetch_page.assert_called_once_with('https://en.wikipedia.org/wiki/Otter')
+
+    def test_truncated_tool_call(self):
+        """Test that tool call arguments cut short show an AI error rather than crash"""
+        self.server.gate.set()
+        self.server.script = [
+            {'role': 'assistant', 'tool_calls': [{'index': 0, 'id': 'call_1', 'type': 'function',
+                                                  'function': {'name': 'navigate_to_url', 'arguments': ''}}]},
+            {'tool_calls': [{'index': 0, 'function': {'arguments': '{"url": "https://exa'}}]},
+        ]
+        self.browser.background_loads = True
+        with patch.object(self.browser, 'fetch_page') as fetch_page:
+            self.browser.process_ai_command('go to example')
+            self.poll_until(lambda: self.browser.ai_request is None)
+        fetch_page.assert_not_called()
+        self.assertEqual(self.browser.page_content[0], 'AI Error!')
+        self.assertIn('Malformed tool call', self.text())
+
+    def test_api_error(self):
+        """Test that a refused request is shown as an AI error"""
+        self.server.status = 400
+        self.browser.background_loads = True
+        self.browser.process_ai_command('tell me about otters')
+        self.poll_until(lambda: self.browser.ai_request is None)
+        self.assertEqual(self.browser.page_content[0], 'AI Error!')
+        self.assertIn('model overloaded', self.text())
+
+
+if __name__ == '__main__':
+    unittest.main()
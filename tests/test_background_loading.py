@@ -0,0 +1,179 @@
+"""
+Tests for non-blocking page loads on a worker thread
+"""
+
+import unittest
+from unittest.mock import Mock, MagicMock, patch
+import sys
+import os
+import threading
+from http.server import BaseHTTPRequestHandler
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock curses before importing with proper key constants
+mock_curses = MagicMock()
+mock_curses.KEY_UP = 259
+mock_curses.KEY_DOWN = 258
+mock_curses.KEY_PPAGE = 339
+mock_curses.KEY_NPAGE = 338
+mock_curses.KEY_HOME = 262
+mock_curses.KEY_END = 360
+sys.modules['curses'] = mock_curses
+
+from browser import Browser
+from tests.helpers import LocalServerTestCase
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    """Holds /slow responses until the test releases the gate"""
+
+    protocol_version = 'HTTP/1.1'
+    gate = threading.Event()
+
+    def do_GET(self):
+        if self.path.startswith('/slow'):
+            self.gate.wait(5)
+        if self.path.startswith('/missing'):
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = (f"<html><body><h1>{self.path}</h1>"
+                + "".join(f"<p>Paragraph {n}</p>" for n in range(20))
+                + "</body></html>").encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestBackgroundLoading(LocalServerTestCase):
+    """Test that loads run off the UI thread and can be cancelled"""
+
+    handler = SlowHandler
+
+    @classmethod
+    def tearDownClass(cls):
+        SlowHandler.gate.set()
+        super().tearDownClass()
+
+    def setUp(self):
+        SlowHandler.gate.clear()
+        self.mock_stdscr = Mock()
+        self.mock_stdscr.getmaxyx.return_value = (24, 80)
+        self.env = patch.dict(os.environ, {'OPENAI_API_KEY': '', 'TEXTBROWSER_CACHE_DIR': ''})
+        self.env.start()
+        self.browser = Browser(self.mock_stdscr)
+        self.browser.background_loads = True
+        self.browser.set_page_lines([f"Old line {i}" for i in range(100)])
+        self.browser.current_url = self.base_url + '/old'
+
+    def tearDown(self):
+        SlowHandler.gate.set()
+        self.env.stop()
+
+    def wait_for_load(self):
+        load = self.browser.loading
+        self.assertIsNotNone(load)
+        self.assertTrue(load.done.wait(5))
+
+    def test_old_page_usable_while_loading(self):
+        """Test that fetch_page returns at once and scrolling still works"""
+        old_content = self.browser.page_content
+        self.browser.navigate(self.browser.fetch_page, self.base_url + '/slow')
+
+        self.assertIsNotNone(self.browser.loading)
+        self.assertIs(self.browser.page_content, old_content)
+        self.browser.handle_input(258)  # Down arrow
+        self.assertEqual(self.browser.scroll_offset, 1)
+        self.assertFalse(self.browser.poll_load())
+
+        SlowHandler.gate.set()
+        self.wait_for_load()
+        self.assertTrue(self.browser.poll_load())
+
+        self.assertIsNone(self.browser.loading)
+        self.assertEqual(self.browser.current_url, self.base_url + '/slow')
+        self.assertIn('# /slow', self.browser.page_content)
+        self.assertEqual(self.browser.scroll_offset, 0)
+        self.assertEqual(self.browser.history.back_stack[-1].url, self.base_url + '/old')
+
+    def test_escape_cancels(self):
+        """Test that Esc abandons the load and keeps the old page"""
+        old_content = self.browser.page_content
+        self.browser.fetch_page(self.base_url + '/slow')
+        load = self.browser.loading
+
+        self.browser.handle_input(27)  # Esc
+        self.assertIsNone(self.browser.loading)
+        self.assertTrue(load.cancelled.is_set())
+
+        SlowHandler.gate.set()
+        self.assertTrue(load.done.wait(5))
+        self.assertFalse(self.browser.poll_load())
+        self.assertIs(self.browser.page_content, old_content)
+        self.assertEqual(self.browser.current_url, self.base_url + '/old')
+
+    def test_new_load_replaces_pending(self):
+        """Test that starting another load cancels the first"""
+        self.browser.fetch_page(self.base_url + '/slow')
+        first = self.browser.loading
+        self.browser.fetch_page(self.base_url + '/fast')
+
+        self.assertTrue(first.cancelled.is_set())
+        self.wait_for_load()
+        self.browser.poll_load()
+        self.assertEqual(self.browser.current_url, self.base_url + '/fast')
+
+    def test_other_page_cancels_load(self):
+        """Test that showing help while a page loads abandons the load"""
+        old_content = self.browser.page_content
+        self.browser.navigate(self.browser.fetch_page, self.base_url + '/slow')
+        load = self.browser.loading
+
+        self.browser.handle_input(ord('h'))
+        self.assertIsNone(self.browser.loading)
+        self.assertTrue(load.cancelled.is_set())
+        help_page = self.browser.page_content
+
+        SlowHandler.gate.set()
+        self.assertTrue(load.done.wait(5))
+        self.assertFalse(self.browser.poll_load())
+        self.assertIs(self.browser.page_content, help_page)
+        self.assertEqual(len(self.browser.history.back_stack), 1)
+        self.browser.go_back()
+        self.assertIs(self.browser.page_content, old_content)
+
+    def test_unchanged_page_keeps_load(self):
+        """Test that an action that leaves the page alone does not cancel the load"""
+        self.browser.fetch_page(self.base_url + '/slow')
+        load = self.browser.loading
+        self.browser.navigate(lambda: None)
+        self.assertIs(self.browser.loading, load)
+        self.assertFalse(load.cancelled.is_set())
+
+    def test_error_shown_when_load_fails(self):
+        """Test that HTTP errors surface when the load completes"""
+        self.browser.fetch_page(self.base_url + '/missing')
+        self.wait_for_load()
+        self.browser.poll_load()
+        self.assertIn('Error loading page', self.browser.page_content[0])
+
+    def test_status_bar_progress(self):
+        """Test that render shows a loading indicator"""
+        self.browser.fetch_page(self.base_url + '/slow')
+        self.browser.render()
+
+        status = self.mock_stdscr.addstr.call_args_list[0].args[2]
+        self.assertIn('Loading', status)
+        self.assertIn('Esc: Cancel', status)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -21,6 +21,7 @@ mock_curses.KEY_END = 360
 sys.modules['curses'] = mock_curses
 
 from browser import Browser
+from tests.helpers import html_response
 
 
 class TestURLDetection(unittest.TestCase):
@@ -175,17 +176,14 @@ class TestPageFetching(unittest.TestCase):
         self.mock_stdscr = Mock()
         self.mock_stdscr.getmaxyx.return_value = (24, 80)
 
-    @patch('browser.requests.get')
+    @patch('fetcher.requests.Session.get')
     def test_fetch_page_with_protocol(self, mock_get):
         """Test fetching a page with https protocol"""
         with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
             browser = Browser(self.mock_stdscr)
 
             # Mock response
-            mock_response = Mock()
-            mock_response.text = "<html><body><h1>Test Page</h1></body></html>"
-            mock_response.raise_for_status = Mock()
-            mock_get.return_value = mock_response
+            mock_get.return_value = html_response("<html><body><h1>Test Page</h1></body></html>")
 
             # Fetch page
             result = browser.fetch_page("https://example.com")
@@ -194,17 +192,14 @@ class TestPageFetching(unittest.TestCase):
             mock_get.assert_called_once()
             self.assertTrue(result)
 
-    @patch('browser.requests.get')
+    @patch('fetcher.requests.Session.get')
     def test_fetch_page_adds_protocol(self, mock_get):
         """Test that https:// is added to URLs without protocol"""
         with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
             browser = Browser(self.mock_stdscr)
 
             # Mock response
-            mock_response = Mock()
-            mock_response.text = "<html><body><h1>Test Page</h1></body></html>"
-            mock_response.raise_for_status = Mock()
-            mock_get.return_value = mock_response
+            mock_get.return_value = html_response("<html><body><h1>Test Page</h1></body></html>")
 
             # Fetch page without protocol
             browser.fetch_page("example.com")
@@ -0,0 +1,139 @@
+"""
+Tests for converting pages in worker processes
+"""
+
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from convertpool import ConversionPool, ConversionError, ConversionTimeout, PageTooLarge
+from core import BrowserCore, COLOR_MAP
+from htmltext import convert_blocks
+from pagecache import PageCache
+
+
+def page(paragraphs: int) -> str:
+    parts = ['<html><body><h1>Pooled</h1>',
+             '<form action="/s" method="post"><input name="q" placeholder="Search"></form>']
+    for n in range(paragraphs):
+        parts.append(f'<p>Paragraph {n} with <b>bold</b>, <span style="color: red">red</span> '
+                     f'and a <a href="/p/{n}">link {n}</a>. Ünïcødé text too.</p>')
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+class TestConversionPool(unittest.TestCase):
+    """Test the worker processes"""
+
+    def setUp(self):
+        self.pool = ConversionPool(2, min_bytes=1024)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_same_as_converting_here(self):
+        """Test that a worker returns what converting in-process gives"""
+        html = page(200)
+        expected = convert_blocks(html, 'https://example.com/', COLOR_MAP)
+        blocks, links, forms = self.pool.convert(html, 'https://example.com/', COLOR_MAP)
+        self.assertEqual(blocks, expected[0])
+        self.assertEqual(links, expected[1])
+        self.assertEqual(forms, expected[2])
+        self.assertEqual(links[3]['url'], 'https://example.com/p/3')
+        self.assertEqual(self.pool.stats()['jobs'], 1)
+
+    def test_size_limit(self):
+        """Test that pages over max_bytes are refused without using a worker"""
+        self.pool.max_bytes = 10 * 1024
+        with self.assertRaises(PageTooLarge):
+            self.pool.convert(page(200))
+        self.assertEqual(self.pool.stats()['refused'], 1)
+        self.assertEqual(self.pool.stats()['jobs'], 0)
+
+    def test_workers_recycled(self):
+        """Test that workers are replaced after max_jobs pages"""
+        self.pool.max_jobs = 2
+        for _ in range(6):
+            self.pool.convert(page(5))
+        self.assertEqual(self.pool.stats()['recycled'], 3)
+        self.assertEqual(self.pool._idle.qsize(), 2)
+
+    def test_timeout_replaces_worker(self):
+        """Test that a job past the timeout is abandoned and its worker replaced"""
+        self.pool.timeout = 0.001
+        with self.assertRaises(ConversionTimeout):
+            self.pool.convert(page(5000))
+        self.pool.timeout = 10
+        blocks, links, forms = self.pool.convert(page(5))
+        self.assertEqual(len(links), 5)
+        self.assertEqual(self.pool.stats()['timeouts'], 1)
+
+    def test_closed(self):
+        """Test that a closed pool refuses work"""
+        self.pool.close()
+        with self.assertRaises(ConversionError):
+            self.pool.convert(page(5))
+
+
+class TestCoreWithPool(unittest.TestCase):
+    """Test that the browser core sends only big pages to the pool"""
+
+    def setUp(self):
+        self.pool = ConversionPool(1, min_bytes=16 * 1024)
+        self.env = patch.dict(os.environ, {'TEXTBROWSER_CACHE_DIR': ''})
+        self.env.start()
+        self.core = BrowserCore(page_cache=PageCache(), width=60, converter=self.pool)
+
+    def tearDown(self):
+        self.core.close()
+        self.pool.close()
+        self.env.stop()
+
+    def test_big_pages_only(self):
+        """Test that small pages convert in-process and revisits use the page cache"""
+        small, big = page(10), page(300)
+        lines, links, forms = self.core.render_html(small, 'https://example.com/small', 60)
+        self.assertEqual(self.pool.stats()['jobs'], 0)
+        lines, links, forms = self.core.render_html(big, 'https://example.com/big', 60)
+        self.assertEqual(self.pool.stats()['jobs'], 1)
+        self.assertEqual(len(links), 300)
+        self.assertIn('# Pooled', lines)
+
+        # Revisits come from the page cache, not the pool
+        self.core.render_html(big, 'https://example.com/big', 80)
+        self.assertEqual(self.pool.stats()['jobs'], 1)
+
+    def test_huge_pages(self):
+        """Test that pages over lazy_bytes are converted in the pool, not on this thread"""
+        huge = page(300)
+        self.core.lazy_bytes = len(huge) - 1
+        with patch('core.lazy_document') as lazy_document:
+            lines, links, forms = self.core.render_html(huge, 'https://example.com/huge', 60)
+        lazy_document.assert_not_called()
+        self.assertEqual(self.pool.stats()['jobs'], 1)
+        self.assertTrue(lines.lazy)
+        self.assertEqual(len(links), 300)
+        self.assertIn('# Pooled', lines)
+        self.assertEqual(self.core.page_cache.stats()['memory_entries'], 0)
+
+    def test_pool_failure(self):
+        """Test that pages still render when the pool times out or fails"""
+        big, huge = page(300), page(600)
+        self.core.lazy_bytes = len(huge) - 1
+        for error in (ConversionTimeout('page took over 10s to convert'),
+                      ConversionError('conversion pool is closed')):
+            with self.subTest(error=type(error).__name__):
+                with patch.object(self.pool, 'convert', side_effect=error):
+                    lines, links, forms = self.core.render_html(big, f'https://example.com/{id(error)}', 60)
+                    self.assertEqual(len(links), 300)
+                    self.assertIn('# Pooled', lines)
+                    lines, links, forms = self.core.render_html(huge, 'https://example.com/huge', 60)
+                    self.assertIn('# Pooled', lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
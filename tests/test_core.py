@@ -0,0 +1,150 @@
+"""
+Tests for the UI-free browser core driven from an asyncio event loop
+"""
+
+import asyncio
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import subprocess
+import time
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# Add parent directory to path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from core import BrowserCore
+from fetcher import Fetcher
+from pagecache import PageCache
+from tests.helpers import LocalServerTestCase
+
+
+SLOW = 0.3  # Seconds the server takes to answer /slow
+
+
+class CoreHandler(BaseHTTPRequestHandler):
+    """Pages with links and a search form, one of them slow"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/slow':
+            time.sleep(SLOW)
+        query = parse_qs(url.query).get('q', [''])[0]
+        body = (f"<html><body><h1>Page {url.path}</h1>"
+                + ''.join(f"<p>Line {n} of {url.path}</p>" for n in range(12))
+                + (f"<p>You searched for {query}</p>" if query else '')
+                + '<a href="/a">First</a> <a href="/b">Second</a>'
+                + '<form action="/search"><input name="q"></form>'
+                + "</body></html>").encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestBrowserCore(LocalServerTestCase):
+    """Test fetching pages through awaited BrowserCores"""
+
+    handler = CoreHandler
+
+    def setUp(self):
+        self.env = patch.dict(os.environ, {'TEXTBROWSER_CACHE_DIR': '', 'TEXTBROWSER_PREFETCH': ''})
+        self.env.start()
+        self.fetcher = Fetcher(pool_maxsize=20)
+
+    def tearDown(self):
+        self.fetcher.close()
+        self.env.stop()
+
+    def core(self) -> BrowserCore:
+        return BrowserCore(self.fetcher, PageCache(), width=60)
+
+    def test_no_curses(self):
+        """Test that the core imports without curses"""
+        result = subprocess.run(
+            [sys.executable, '-c', "import sys; import core; print('curses' in sys.modules)"],
+            cwd=ROOT, capture_output=True, text=True)
+        self.assertEqual(result.stdout.strip(), 'False', result.stderr)
+
+    def test_open_and_history(self):
+        """Test opening pages, following a link and going back"""
+        core = self.core()
+
+        async def browse():
+            self.assertTrue(await core.open(self.base_url + '/a'))
+            self.assertIn('# Page /a', core.page_content)
+            self.assertEqual([link['text'] for link in core.links], ['First', 'Second'])
+            self.assertTrue(await core.open(core.links[1]['url']))
+
+        asyncio.run(browse())
+        self.assertEqual(core.current_url, self.base_url + '/b')
+        self.assertTrue(all(len(line) <= 60 for line in core.page_content))
+        core.go_back()
+        self.assertEqual(core.current_url, self.base_url + '/a')
+        self.assertIn('# Page /a', core.page_content)
+
+    def test_many_cores_one_loop(self):
+        """Test that slow loads in many cores overlap on one event loop"""
+        cores = [self.core() for _ in range(20)]
+
+        async def browse():
+            start = time.monotonic()
+            results = await asyncio.gather(*[core.open(self.base_url + '/slow') for core in cores])
+            return results, time.monotonic() - start
+
+        results, elapsed = asyncio.run(browse())
+        self.assertEqual(results, [True] * 20)
+        self.assertLess(elapsed, 20 * SLOW / 2)
+        for core in cores:
+            self.assertIn('# Page /slow', core.page_content)
+            self.assertIsNone(core.loading)
+
+    def test_cancel_open(self):
+        """Test that cancelling the awaiting task abandons the load"""
+        core = self.core()
+
+        async def browse():
+            await core.open(self.base_url + '/a')
+            task = asyncio.ensure_future(core.open(self.base_url + '/slow'))
+            await asyncio.sleep(SLOW / 3)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(browse())
+        self.assertEqual(core.current_url, self.base_url + '/a')
+        self.assertIsNone(core.loading)
+        self.assertFalse(core.history.can_go_back)
+
+    def test_submit_form(self):
+        """Test submitting a form and going back to it"""
+        core = self.core()
+
+        async def browse():
+            await core.open(self.base_url + '/a')
+            return await core.submit(core.forms[0], {'q': 'gophers'})
+
+        self.assertTrue(asyncio.run(browse()))
+        self.assertEqual(core.current_url, self.base_url + '/search?q=gophers')
+        self.assertIn('You searched for gophers', core.page_content)
+        core.go_back()
+        self.assertEqual(core.current_url, self.base_url + '/a')
+
+    def test_load_error(self):
+        """Test that a failed load shows the error as the page"""
+        core = self.core()
+        self.assertFalse(asyncio.run(core.open('http://127.0.0.1:1/nothing')))
+        self.assertTrue(core.page_content[0].startswith('Error loading page'))
+
+
+if __name__ == '__main__':
+    unittest.main()
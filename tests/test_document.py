@@ -0,0 +1,172 @@
+"""
+Tests for lazily converted and wrapped documents
+"""
+
+import unittest
+from unittest.mock import Mock, MagicMock, patch
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock curses before importing with proper key constants
+mock_curses = MagicMock()
+mock_curses.KEY_UP = 259
+mock_curses.KEY_DOWN = 258
+mock_curses.KEY_PPAGE = 339
+mock_curses.KEY_NPAGE = 338
+mock_curses.KEY_HOME = 262
+mock_curses.KEY_END = 360
+sys.modules['curses'] = mock_curses
+
+import browser as browser_module
+from browser import Browser
+from document import Document, lazy_document
+from htmltext import StreamConverter, convert_html
+
+
+def long_page(sections=2000):
+    """A page of several thousand blocks"""
+    parts = ["<html><body><h1>Changelog</h1>"]
+    for n in range(sections):
+        parts.append(f"<h2>Release {n}</h2><p>Fixed <a href=\"/bug/{n}\">bug {n}</a> in the "
+                     f"parser, which is a long enough sentence to wrap over more than one "
+                     f"line at narrow widths.</p><pre>code {n}\n\n  indented</pre>")
+    parts.append('<form action="/s"><input name="q"></form></body></html>')
+    return ''.join(parts)
+
+
+class TestDocument(unittest.TestCase):
+    """Test that a Document reads like the eagerly wrapped lines"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.html = long_page()
+        cls.lines, cls.links, cls.forms = convert_html(cls.html, 'https://example.com/', 60)
+
+    def document(self):
+        stream = StreamConverter('https://example.com/', 60)
+        stream.feed(self.html)
+        stream.close()
+        return Document(stream.blocks, 60)
+
+    def test_same_lines(self):
+        """Test iteration, indexing and slicing against the eager lines"""
+        doc = self.document()
+        self.assertEqual(list(doc), self.lines)
+        self.assertEqual(len(doc), len(self.lines))
+        for i in (0, 1, 500, 9999, len(self.lines) - 1):
+            self.assertEqual(doc[i], self.lines[i])
+        self.assertEqual(doc[100:250], self.lines[100:250])
+        self.assertEqual(doc[-3:], self.lines[-3:])
+        self.assertEqual(doc[-1], self.lines[-1])
+        with self.assertRaises(IndexError):
+            doc[len(self.lines)]
+
+    def test_window_of_wrapped_lines(self):
+        """Test that only a window of chunks stays wrapped"""
+        doc = self.document()
+        doc.finish()
+        for i in range(0, len(doc), 200):
+            doc[i]
+        self.assertLessEqual(len(doc._chunks), doc.window)
+        doc.release()
+        self.assertEqual(doc[1234], self.lines[1234])
+
+    def test_lazy_conversion(self):
+        """Test that reading the top converts only the top"""
+        doc, links, forms = lazy_document(self.html, 'https://example.com/', 60)
+        self.assertEqual(doc[0:20], self.lines[0:20])
+        self.assertFalse(doc.complete)
+        self.assertLess(len(doc.blocks), len(self.document().blocks) // 2)
+        self.assertLess(len(links), len(self.links))
+        self.assertEqual(forms, [])
+
+        doc.finish()
+        self.assertTrue(doc.complete)
+        self.assertEqual(list(doc), self.lines)
+        self.assertEqual(links, self.links)
+        self.assertEqual(forms, self.forms)
+
+    def test_text_on_demand(self):
+        """Test that text() stops converting at max_chars"""
+        doc, links, forms = lazy_document(self.html, 'https://example.com/', 60)
+        text = doc.text(1000)
+        self.assertTrue('\n'.join(self.lines).startswith(text))
+        self.assertFalse(doc.complete)
+
+    def test_footer(self):
+        """Test that footer lines follow the last block"""
+        doc, links, forms = lazy_document(self.html, 'https://example.com/', 60,
+                                          footer=lambda: ['', 'LINKS: many'])
+        self.assertNotIn('LINKS: many', doc[0:50])
+        self.assertEqual(doc[-1], 'LINKS: many')
+
+        small = Document([('', '', 'Body', True)], 60)
+        small.add_footer(lambda: ['Footer'])
+        self.assertEqual(list(small), ['Body', 'Footer'])
+
+
+class TestBrowserLazyPages(unittest.TestCase):
+    """Test huge pages in the browser"""
+
+    def setUp(self):
+        self.mock_stdscr = Mock()
+        self.mock_stdscr.getmaxyx.return_value = (24, 80)
+        with patch.dict(os.environ, {'OPENAI_API_KEY': '', 'TEXTBROWSER_LAZY_BYTES': '10000'}):
+            self.browser = Browser(self.mock_stdscr)
+        self.html = long_page()
+        with patch.object(Browser, 'read_page', return_value=(self.html, 'https://example.com/log')):
+            self.browser.navigate(self.browser.fetch_page, 'https://example.com/log')
+
+    def test_page_is_lazy(self):
+        """Test that a huge page becomes a partly converted Document"""
+        doc = self.browser.page_content
+        self.assertIsInstance(doc, Document)
+        self.assertFalse(doc.complete)
+        self.browser.render()
+        self.assertEqual(self.mock_stdscr.addstr.call_args_list[1].args[2], '# Changelog')
+
+    def test_scrolling_converts_ahead(self):
+        """Test that paging down keeps finding more lines"""
+        known = len(self.browser.page_content)
+        for _ in range(30):
+            self.browser.handle_input(browser_module.curses.KEY_NPAGE)
+            self.browser.render()
+        self.assertEqual(self.browser.scroll_offset, 30 * 22)
+        self.assertGreater(len(self.browser.page_content), known)
+
+    def test_end_and_forms_complete_the_page(self):
+        """Test that End shows the footer and forms are found"""
+        self.browser.handle_input(browser_module.curses.KEY_END)
+        doc = self.browser.page_content
+        self.assertTrue(doc.complete)
+        self.assertEqual(self.browser.scroll_offset, len(doc) - 22)
+        self.assertIn('FORMS DETECTED: 1 form(s) found', doc[-10:])
+        self.assertEqual(len(self.browser.links), 2000)
+
+    def test_ai_excerpt(self):
+        """Test that the AI context only converts what it needs"""
+        text, truncated = self.browser.page_excerpt(500)
+        self.assertTrue(text.startswith('# Changelog'))
+        self.assertTrue(truncated)
+        self.assertFalse(self.browser.page_content.complete)
+
+    def test_history(self):
+        """Test that a lazy page survives a trip through the history"""
+        doc = self.browser.page_content
+        self.browser.navigate(self.browser.load_html, '<p>Other</p>', 'https://example.com/other')
+        entry = self.browser.history.back_stack[-1]
+        self.assertIs(entry.lines, doc)
+        entry.size  # Sized without converting the rest
+        entry.pack()
+        self.assertFalse(doc.complete)
+
+        self.browser.go_back()
+        self.assertIs(self.browser.page_content, doc)
+        self.assertEqual(self.browser.page_content[0], '# Changelog')
+
+
+if __name__ == '__main__':
+    unittest.main()
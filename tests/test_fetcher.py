@@ -0,0 +1,169 @@
+"""
+Tests for pooled HTTP fetching against a local http.server
+"""
+
+import unittest
+from unittest.mock import Mock, MagicMock, patch
+import sys
+import os
+import tempfile
+from http.server import BaseHTTPRequestHandler
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock curses before importing with proper key constants
+mock_curses = MagicMock()
+mock_curses.KEY_UP = 259
+mock_curses.KEY_DOWN = 258
+mock_curses.KEY_PPAGE = 339
+mock_curses.KEY_NPAGE = 338
+mock_curses.KEY_HOME = 262
+mock_curses.KEY_END = 360
+sys.modules['curses'] = mock_curses
+
+from browser import Browser
+from fetcher import Fetcher, USER_AGENT, shared_fetcher
+from tests.helpers import LocalServerTestCase
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """Keep-alive server that sets a cookie and echoes what it received"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = (f"<html><body><p>path={self.path}</p>"
+                f"<p>cookie={self.headers.get('Cookie', '')}</p>"
+                f"<p>agent={self.headers.get('User-Agent', '')}</p>"
+                f"<a href=\"/next\">Next</a></body></html>").encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if self.path == '/login':
+            self.send_header('Set-Cookie', 'session=abc123; Max-Age=3600; Path=/')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PageServerTestCase(LocalServerTestCase):
+    """Runs PageHandler on a free local port"""
+
+    handler = PageHandler
+
+
+class TestConnectionReuse(PageServerTestCase):
+    """Test keep-alive connection pooling"""
+
+    def test_connection_reused(self):
+        """Test that consecutive requests share one connection"""
+        fetcher = Fetcher()
+        for path in ('/a', '/b', '/c'):
+            response = fetcher.get(self.base_url + path)
+            self.assertEqual(response.status_code, 200)
+
+        stats = fetcher.stats()
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['connections'], 1)
+        self.assertEqual(stats['reused'], 2)
+        fetcher.close()
+
+    def test_keep_alive_disabled(self):
+        """Test that keep_alive=False opens a connection per request"""
+        fetcher = Fetcher(keep_alive=False)
+        fetcher.get(self.base_url + '/a')
+        fetcher.get(self.base_url + '/b')
+
+        self.assertEqual(fetcher.stats()['reused'], 0)
+        fetcher.close()
+
+    def test_host_pool_size(self):
+        """Test that per-host adapters are mounted for configured hosts"""
+        host = self.base_url.replace('http://', '')
+        fetcher = Fetcher(host_pool_sizes={host: 2})
+        adapter = fetcher.session.get_adapter(self.base_url + '/a')
+        self.assertIsNot(adapter, fetcher._adapters[0])
+        self.assertEqual(adapter._pool_maxsize, 2)
+
+        fetcher.get(self.base_url + '/a')
+        self.assertEqual(fetcher.stats()['requests'], 1)
+        fetcher.close()
+
+    def test_user_agent(self):
+        """Test that the Lynx user agent is sent"""
+        fetcher = Fetcher()
+        response = fetcher.get(self.base_url + '/')
+        self.assertIn(f"agent={USER_AGENT}", response.text)
+        fetcher.close()
+
+    def test_browser_pages_reuse_connection(self):
+        """Test that following links in the browser reuses the connection"""
+        mock_stdscr = Mock()
+        mock_stdscr.getmaxyx.return_value = (24, 80)
+        with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
+            browser = Browser(mock_stdscr)
+            self.assertTrue(browser.fetch_page(self.base_url + '/first'))
+            self.assertTrue(browser.fetch_page(browser.links[0]['url']))
+
+            self.assertEqual(browser.current_url, self.base_url + '/next')
+            self.assertEqual(browser.fetcher.stats()['reused'], 1)
+            browser.fetcher.close()
+
+    def test_shared_fetcher(self):
+        """Test that browsers can share a process-wide fetcher"""
+        mock_stdscr = Mock()
+        mock_stdscr.getmaxyx.return_value = (24, 80)
+        with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
+            fetcher = shared_fetcher()
+            first = Browser(mock_stdscr, fetcher=fetcher)
+            second = Browser(mock_stdscr, fetcher=shared_fetcher())
+            self.assertIs(first.fetcher, second.fetcher)
+            self.assertFalse(first.owns_fetcher)
+
+
+class TestCookies(PageServerTestCase):
+    """Test cookie handling"""
+
+    def test_cookies_sent_back(self):
+        """Test that cookies persist for the session"""
+        fetcher = Fetcher()
+        fetcher.get(self.base_url + '/login')
+        response = fetcher.get(self.base_url + '/page')
+        self.assertIn('cookie=session=abc123', response.text)
+        fetcher.close()
+
+    def test_fork_keeps_cookies_apart(self):
+        """Test that a fork shares connections but not cookies"""
+        fetcher = Fetcher()
+        fork = fetcher.fork()
+        fork.get(self.base_url + '/login')
+        response = fork.get(self.base_url + '/page')
+        self.assertIn('cookie=session=abc123', response.text)
+
+        response = fetcher.get(self.base_url + '/page')
+        self.assertNotIn('abc123', response.text)
+        self.assertEqual(fetcher.stats()['requests'], 3)
+        self.assertEqual(fetcher.stats()['connections'], 1)
+        fetcher.close()
+
+    def test_cookie_file(self):
+        """Test that cookies survive into a new Fetcher via cookie_file"""
+        with tempfile.TemporaryDirectory() as tmp:
+            cookie_file = os.path.join(tmp, 'cookies.txt')
+
+            fetcher = Fetcher(cookie_file=cookie_file)
+            fetcher.get(self.base_url + '/login')
+            fetcher.close()
+            self.assertTrue(os.path.exists(cookie_file))
+
+            fetcher = Fetcher(cookie_file=cookie_file)
+            response = fetcher.get(self.base_url + '/page')
+            self.assertIn('cookie=session=abc123', response.text)
+            fetcher.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
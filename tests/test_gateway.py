@@ -0,0 +1,321 @@
+"""
+Tests for virtual terminals and the multi-session telnet gateway
+"""
+
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+import tempfile
+import threading
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock curses before importing with proper key constants
+mock_curses = MagicMock()
+mock_curses.KEY_UP = 259
+mock_curses.KEY_DOWN = 258
+mock_curses.KEY_LEFT = 260
+mock_curses.KEY_RIGHT = 261
+mock_curses.KEY_PPAGE = 339
+mock_curses.KEY_NPAGE = 338
+mock_curses.KEY_HOME = 262
+mock_curses.KEY_END = 360
+mock_curses.KEY_DC = 330
+mock_curses.KEY_BACKSPACE = 263
+mock_curses.KEY_RESIZE = 410
+mock_curses.A_NORMAL = 0
+mock_curses.A_BOLD = 0x200000
+sys.modules['curses'] = mock_curses
+
+import browser as browser_module
+from gateway import Gateway, TelnetParser, IAC, DO, NAWS, SB, SE, WILL
+from pagecache import PageCache
+from terminal import KeyDecoder, Terminal
+from tests.helpers import patch_curses_colors
+
+
+def naws(rows, cols):
+    return bytes([IAC, SB, NAWS, cols >> 8, cols & 0xff, rows >> 8, rows & 0xff, IAC, SE])
+
+
+class TestKeyDecoder(unittest.TestCase):
+    """Test turning terminal input into curses keys"""
+
+    def test_keys(self):
+        """Test arrows, paging, Enter, Backspace and plain bytes"""
+        keys = KeyDecoder().feed(b'q\x1b[A\x1bOB\x1b[6~\r\n\r\x00\x7f\x0b')
+        self.assertEqual(keys, [ord('q'), 259, 258, 338, 10, 10, 263, 11])
+
+    def test_split_sequence(self):
+        """Test an escape sequence split across reads"""
+        decoder = KeyDecoder()
+        self.assertEqual(decoder.feed(b'\x1b['), [])
+        self.assertEqual(decoder.feed(b'5~x'), [339, ord('x')])
+
+    def test_lone_escape(self):
+        """Test that Esc on its own is a key"""
+        self.assertEqual(KeyDecoder().feed(b'\x1b'), [27])
+
+    def test_utf8_bytes(self):
+        """Test that non-ASCII text arrives byte by byte, as from curses"""
+        self.assertEqual(KeyDecoder().feed('é'.encode('utf-8')), [0xc3, 0xa9])
+
+
+class TestTelnetParser(unittest.TestCase):
+    """Test telnet command handling"""
+
+    def test_strips_commands(self):
+        """Test that negotiation is removed and IAC IAC is a 255 byte"""
+        parser = TelnetParser()
+        typed = parser.feed(bytes([IAC, WILL, NAWS]) + b'ab' + bytes([IAC, IAC, IAC, DO, 1]) + b'c')
+        self.assertEqual(typed, b'ab\xffc')
+
+    def test_window_size(self):
+        """Test NAWS reports, also split across reads"""
+        parser = TelnetParser()
+        report = naws(40, 132)
+        self.assertEqual(parser.feed(report[:4]), b'')
+        self.assertEqual(parser.feed(report[4:] + b'x'), b'x')
+        self.assertEqual(parser.size, (40, 132))
+
+
+class TestTerminal(unittest.TestCase):
+    """Test drawing to a virtual terminal"""
+
+    def setUp(self):
+        self.sent = []
+        self.term = Terminal(self.sent.append, 6, 20)
+        self.window = self.term.stdscr
+
+    def update(self):
+        self.window.noutrefresh()
+        self.term.doupdate()
+        return self.sent[-1] if self.sent else b''
+
+    def test_only_changes_sent(self):
+        """Test that an unchanged screen sends nothing and a change sends one row"""
+        self.window.addstr(0, 0, 'title')
+        self.window.addstr(3, 2, 'body text', self.term.color_pair(2))
+        first = self.update()
+        self.assertIn(b'\x1b[2J', first)
+        self.assertIn(b'body text', first)
+
+        self.sent.clear()
+        self.window.addstr(0, 0, 'title')
+        self.window.noutrefresh()
+        self.term.doupdate()
+        self.assertEqual(self.sent, [])
+
+        self.window.addstr(3, 2, 'body test', self.term.color_pair(2))
+        changed = self.update()
+        self.assertNotIn(b'title', changed)
+        self.assertNotIn(b'\x1b[2J', changed)
+        self.assertIn(b'\x1b[4;10H', changed)
+        self.assertNotIn(b'body', changed)
+
+    def test_colors_and_bold(self):
+        """Test that color pairs and bold become SGR codes"""
+        self.term.init_pair(4, 5, 0)
+        self.window.addstr(0, 0, 'Heading', self.term.color_pair(4) | mock_curses.A_BOLD)
+        self.assertIn(b'\x1b[0;1;35;40mHeading', self.update())
+
+    def test_scroll_region(self):
+        """Test that a scroll is sent as a scroll of the region"""
+        for y in range(6):
+            self.window.addstr(y, 0, f"line {y}")
+        self.update()
+        self.window.setscrreg(1, 4)
+        self.window.scroll(1)
+        self.window.addstr(4, 0, 'line 9')
+        out = self.update()
+        self.assertIn(b'\x1b[2;5r\x1b[1S', out)
+        self.assertNotIn(b'line 2', out)
+        self.assertIn(b'line 9', out)
+        self.assertEqual(self.term.sent, self.term.screen)
+
+    def test_resize_on_getch(self):
+        """Test that a resize takes effect when the session reads KEY_RESIZE"""
+        self.term.resize(30, 100)
+        self.assertEqual(self.window.getmaxyx(), (6, 20))
+        self.assertEqual(self.window.getch(), 410)
+        self.assertEqual(self.window.getmaxyx(), (30, 100))
+        self.assertIn(b'\x1b[2J', self.update())
+
+    def test_getstr_echo_and_backspace(self):
+        """Test line input with echo and Backspace"""
+        popup = self.term.newwin(3, 18, 1, 1)
+        self.term.echo()
+        self.term.feed('héllo'.encode('utf-8') + b'\x7fp\r')
+        self.assertEqual(popup.getstr(1, 1, 10), 'héllp'.encode('utf-8'))
+        self.assertIn('héllp', ''.join(char for char, attr in self.term.sent[2]))
+
+    def test_close_wakes_getch(self):
+        """Test that a closed terminal stops waiting for keys"""
+        self.term.close()
+        self.assertEqual(self.window.getch(), -1)
+        self.assertEqual(self.window.getstr(), b'')
+
+
+class TestGateway(unittest.TestCase):
+    """Test serving browser sessions to telnet clients"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.page = os.path.join(self.tmp.name, 'start.html')
+        with open(self.page, 'w') as f:
+            f.write('<html><body><h1>Gateway Start</h1>'
+                    + '<p>Paragraph of text for telnet users.</p>' * 40
+                    + '<a href="/next">Next</a></body></html>')
+        self.env = patch.dict(os.environ, {'OPENAI_API_KEY': '', 'TEXTBROWSER_CACHE_DIR': ''})
+        self.env.start()
+        self.colors = patch_curses_colors(browser_module.curses)
+        self.colors.start()
+
+    def tearDown(self):
+        self.colors.stop()
+        self.env.stop()
+        self.tmp.cleanup()
+
+    async def read_until(self, reader, marker: bytes, timeout: float = 10) -> bytes:
+        seen = b''
+        while marker not in seen:
+            data = await asyncio.wait_for(reader.read(65536), timeout)
+            if not data:
+                break
+            seen += data
+        return seen
+
+    def run_clients(self, gateway, client, count):
+        async def main():
+            server = await gateway.serve('127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                return await asyncio.gather(*[client(port) for _ in range(count)])
+            finally:
+                server.close()
+                await server.wait_closed()
+        return asyncio.run(main())
+
+    def test_sessions_share_caches(self):
+        """Test several users browsing at once with one page cache"""
+        gateway = Gateway(f"file://{self.page}", page_cache=PageCache())
+
+        async def client(port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(naws(30, 90))
+            first = await self.read_until(reader, b'Gateway Start')
+            writer.write(b'\x1b[B')
+            scrolled = await self.read_until(reader, b"S")
+            writer.write(b'q')
+            rest = await self.read_until(reader, b'never sent')
+            writer.close()
+            return first, scrolled, rest
+
+        results = self.run_clients(gateway, client, 3)
+        for first, scrolled, rest in results:
+            self.assertIn(b'Gateway Start', first)
+            self.assertIn(b'\x1b[2;29r', scrolled)  # Scrolled with the region, 30 rows tall
+
+        self.assertEqual(gateway.served, 3)
+        self.assertEqual(gateway.errors, 0)
+        self.assertEqual(gateway.page_cache.stats()['memory_entries'], 1)
+        self.assertEqual(gateway.sessions, set())
+
+    def test_local_files_refused(self):
+        """Test that sessions can't read the server's files, only the bundled and start pages"""
+        secret = os.path.join(self.tmp.name, 'secret.html')
+        with open(secret, 'w') as f:
+            f.write('<p>Server secret</p>')
+        gateway = Gateway(f"file://{self.page}", page_cache=PageCache())
+        browser = gateway.new_browser(Terminal(lambda data: None, 24, 80))
+        relative = os.path.relpath(secret, os.path.dirname(browser_module.__file__))
+        for url in (f"file://{secret}", relative):
+            self.assertFalse(browser.fetch_page(url))
+            self.assertNotIn('Server secret', '\n'.join(browser.page_content))
+            self.assertIsInstance(browser.last_error, PermissionError)
+
+        self.assertTrue(browser.fetch_page(f"file://{self.page}"))
+        self.assertIn('Gateway Start', '\n'.join(browser.page_content))
+        self.assertTrue(browser.fetch_page('help.html'))
+
+        # A browser of one's own still reads local files
+        terminal = Terminal(lambda data: None, 24, 80)
+        local = browser_module.Browser(terminal.stdscr, page_cache=PageCache(), term=terminal)
+        self.assertTrue(local.fetch_page(f"file://{secret}"))
+        self.assertIn('Server secret', '\n'.join(local.page_content))
+
+    def test_idle_sessions_hold_no_thread(self):
+        """Test that connected sessions waiting for keys don't each keep a thread"""
+        gateway = Gateway(f"file://{self.page}", page_cache=PageCache())
+        count = 20
+        drawn = []
+        all_drawn = asyncio.Event()
+        threads = []
+
+        async def client(port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(naws(24, 80))
+            await self.read_until(reader, b'Gateway Start')
+            drawn.append(writer)
+            if len(drawn) == count:
+                await asyncio.sleep(0.3)  # Let the page loader threads finish
+                threads.append(threading.active_count())
+                all_drawn.set()
+            await all_drawn.wait()
+            writer.write(b'q')
+            await self.read_until(reader, b'never sent')
+            writer.close()
+
+        before = threading.active_count()
+        self.run_clients(gateway, client, count)
+        self.assertLess(threads[0] - before, count // 2)
+        self.assertEqual(gateway.served, count)
+        self.assertEqual(gateway.errors, 0)
+        gateway.close()
+
+    def test_prompt(self):
+        """Test that a prompt reads the keys typed after the one that opened it"""
+        gateway = Gateway(f"file://{self.page}", page_cache=PageCache())
+
+        async def client(port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(naws(24, 80))
+            await self.read_until(reader, b'Gateway Start')
+            writer.write(b'\x0b')  # Ctrl-K
+            await asyncio.sleep(0.2)
+            writer.write(b'about:perf\r')
+            data = await self.read_until(reader, b'Performance: last')
+            writer.write(b'q')
+            await self.read_until(reader, b'never sent')
+            writer.close()
+            return data
+
+        data, = self.run_clients(gateway, client, 1)
+        self.assertIn(b'Performance: last', data)
+        self.assertEqual(gateway.errors, 0)
+        gateway.close()
+
+    def test_session_limit(self):
+        """Test that connections over max_sessions are turned away"""
+        gateway = Gateway(f"file://{self.page}", max_sessions=1)
+
+        async def client(port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(naws(24, 80))
+            data = await self.read_until(reader, b'Gateway Start', 5)
+            await asyncio.sleep(0.2)
+            writer.write(b'q')
+            data += await self.read_until(reader, b'never sent')
+            writer.close()
+            return data
+
+        results = self.run_clients(gateway, client, 2)
+        self.assertEqual(sum(b'Too many users' in data for data in results), 1)
+        self.assertEqual(gateway.refused, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
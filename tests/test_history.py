@@ -0,0 +1,204 @@
+"""
+Tests for back/forward history
+"""
+
+import unittest
+from unittest.mock import Mock, MagicMock, patch
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock curses before importing with proper key constants
+mock_curses = MagicMock()
+mock_curses.KEY_UP = 259
+mock_curses.KEY_DOWN = 258
+mock_curses.KEY_PPAGE = 339
+mock_curses.KEY_NPAGE = 338
+mock_curses.KEY_HOME = 262
+mock_curses.KEY_END = 360
+sys.modules['curses'] = mock_curses
+
+import browser as browser_module
+from browser import Browser
+from document import Document
+from history import History, HistoryEntry
+
+
+def entry(name, lines=None):
+    lines = lines or [f"{name} line {i}" for i in range(10)]
+    return HistoryEntry(f"https://example.com/{name}", lines, lines,
+                        [{'url': f"https://example.com/{name}/next", 'text': 'next'}], [], 3)
+
+
+class TestHistory(unittest.TestCase):
+    """Test the history stacks"""
+
+    def test_back_and_forward(self):
+        """Test stepping back and forward between entries"""
+        history = History()
+        history.visit(entry('a'))
+        history.visit(entry('b'))
+
+        previous = history.back(entry('c'))
+        self.assertEqual(previous.url, 'https://example.com/b')
+        self.assertTrue(history.can_go_forward)
+
+        following = history.forward(previous)
+        self.assertEqual(following.url, 'https://example.com/c')
+        self.assertFalse(history.can_go_forward)
+
+    def test_visit_clears_forward(self):
+        """Test that a new visit drops the forward stack"""
+        history = History()
+        history.visit(entry('a'))
+        history.back(entry('b'))
+        history.visit(entry('a'))
+        self.assertFalse(history.can_go_forward)
+
+    def test_nothing_to_go_back_to(self):
+        """Test that back and forward return None at the ends"""
+        history = History()
+        self.assertIsNone(history.back(entry('a')))
+        self.assertIsNone(history.forward(entry('a')))
+
+    def test_old_entries_packed(self):
+        """Test that entries beyond keep_unpacked are compressed and restore intact"""
+        history = History(keep_unpacked=2)
+        for name in 'abcde':
+            history.visit(entry(name))
+
+        packed = [e.packed is not None for e in history.back_stack]
+        self.assertEqual(packed, [True, True, True, False, False])
+
+        current = entry('f')
+        for name in 'edcba':
+            current = history.back(current)
+            self.assertEqual(current.url, f"https://example.com/{name}")
+            self.assertEqual(current.lines[0], f"{name} line 0")
+            self.assertIs(current.text, current.lines)
+
+    def test_document_text_packed(self):
+        """Test that a Document kept as the AI text packs and restores as its blocks"""
+        text = Document([('', '', 'Page text for the AI.', False)], 40)
+        history = History(keep_unpacked=1)
+        history.visit(HistoryEntry('https://example.com/js', ['Warning'], text, [], []))
+        history.visit(entry('b'))
+        self.assertIsNotNone(history.back_stack[0].packed)
+
+        current = history.back(history.back(entry('c')))
+        self.assertEqual(current.lines, ['Warning'])
+        self.assertIsInstance(current.text, Document)
+        self.assertEqual(current.text.text(), 'Page text for the AI.')
+
+    def test_memory_budget(self):
+        """Test that the oldest entries are dropped to stay in budget"""
+        history = History(max_bytes=20000, keep_unpacked=100)
+        for n in range(30):
+            history.visit(entry(str(n), [f"{n} {'x' * 60}"] * 20))
+
+        self.assertLessEqual(history.used_bytes(), 20000)
+        self.assertLess(len(history), 30)
+        self.assertEqual(history.back_stack[-1].url, 'https://example.com/29')
+
+
+class TestBrowserHistory(unittest.TestCase):
+    """Test back/forward in the browser"""
+
+    def setUp(self):
+        self.mock_stdscr = Mock()
+        self.mock_stdscr.getmaxyx.return_value = (24, 80)
+
+    def page(self, name):
+        return f"<html><body><h1>{name}</h1><a href=\"/{name}/next\">next</a></body></html>"
+
+    def test_back_restores_without_network(self):
+        """Test that back and forward restore pages instantly and offline"""
+        with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
+            browser = Browser(self.mock_stdscr)
+            browser.load_html(self.page('one'), 'https://example.com/one')
+            browser.current_url = 'https://example.com/one'
+            browser.scroll_offset = 5
+
+            browser.navigate(browser.load_html, self.page('two'), 'https://example.com/two')
+            browser.current_url = 'https://example.com/two'
+            self.assertIn('# two', browser.page_content)
+
+            with patch.object(browser.fetcher, 'get') as mock_get:
+                start = time.perf_counter()
+                browser.handle_input(ord('b'))
+                elapsed = time.perf_counter() - start
+                mock_get.assert_not_called()
+
+            self.assertLess(elapsed, 0.01)
+            self.assertEqual(browser.current_url, 'https://example.com/one')
+            self.assertIn('# one', browser.page_content)
+            self.assertIn('# one', browser.page_text)
+            self.assertEqual(browser.scroll_offset, 5)
+            self.assertEqual(browser.links[0]['url'], 'https://example.com/one/next')
+
+            browser.handle_input(browser_module.curses.KEY_RIGHT)
+            self.assertEqual(browser.current_url, 'https://example.com/two')
+            self.assertIn('# two', browser.page_content)
+
+    def test_link_navigation_recorded(self):
+        """Test that following a numbered link adds a history entry"""
+        with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
+            browser = Browser(self.mock_stdscr)
+            browser.load_html(self.page('one'), 'https://example.com/one')
+            browser.current_url = 'https://example.com/one'
+
+            def fake_fetch(url):
+                browser.load_html(self.page('next'), url)
+                browser.current_url = url
+                return True
+
+            with patch.object(browser, 'fetch_page', side_effect=fake_fetch):
+                browser.handle_input(ord('0'))
+
+            self.assertEqual(browser.current_url, 'https://example.com/one/next')
+            self.assertTrue(browser.history.can_go_back)
+            browser.go_back()
+            self.assertEqual(browser.current_url, 'https://example.com/one')
+
+    def test_unchanged_page_not_recorded(self):
+        """Test that actions that do not change the page leave history alone"""
+        with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
+            browser = Browser(self.mock_stdscr)
+            browser.load_html(self.page('one'), 'https://example.com/one')
+            browser.navigate(lambda: None)
+            self.assertFalse(browser.history.can_go_back)
+
+    def test_javascript_page_in_history(self):
+        """Test that a page shown as a JavaScript warning survives being packed"""
+        with patch.dict(os.environ, {'OPENAI_API_KEY': '', 'TEXTBROWSER_PREFETCH': ''}):
+            browser = Browser(self.mock_stdscr)
+            browser.fetch_page = lambda url: True
+            browser.show_fetched_page('https://example.com/app', *browser.render_html(
+                '<html><body><div id="app"></div></body></html>', 'https://example.com/app', 76))
+            self.assertIn('JAVASCRIPT-HEAVY SITE DETECTED', browser.page_text)
+            for n in range(8):
+                browser.navigate(browser.load_html, self.page(str(n)), f"https://example.com/{n}")
+                browser.current_url = f"https://example.com/{n}"
+            for n in range(8):
+                browser.go_back()
+            self.assertEqual(browser.current_url, 'https://example.com/app')
+            self.assertIn('⚠️  JAVASCRIPT-HEAVY SITE DETECTED', browser.page_content)
+
+    def test_ai_text_kept_for_ai_pages(self):
+        """Test that going back from an AI answer keeps the page's AI text"""
+        with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
+            browser = Browser(self.mock_stdscr)
+            browser.load_html(self.page('one'), 'https://example.com/one')
+            browser.navigate(browser.process_ai_command, 'summarize')
+
+            self.assertIn('AI features are not enabled!', browser.page_content)
+            self.assertIn('# one', browser.page_text)
+            browser.go_back()
+            self.assertIn('# one', browser.page_content)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+Unit tests for the single-pass HTML to text converter
+"""
+
+import unittest
+import sys
+import os
+
+# Add parent directory to path to import htmltext module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from htmltext import convert_html, style_runs, wrap
+
+
+class TestWrap(unittest.TestCase):
+    """Test word wrapping"""
+
+    def test_short_text_unchanged(self):
+        """Test that text shorter than the width is a single line"""
+        self.assertEqual(wrap("hello world", 20), ["hello world"])
+
+    def test_wraps_with_prefixes(self):
+        """Test that wrapped lines use first/rest prefixes"""
+        lines = wrap("one two three four", 10, "* ", "  ")
+        self.assertEqual(lines, ["* one two", "  three", "  four"])
+        self.assertTrue(all(len(line) <= 10 for line in lines))
+
+    def test_long_words_not_broken(self):
+        """Test that a word longer than the width stays whole"""
+        self.assertEqual(wrap("a " + "x" * 30, 10), ["a", "x" * 30])
+
+
+class TestConvertHTML(unittest.TestCase):
+    """Test conversion of HTML to lines, links and forms"""
+
+    def test_links_numbered_inline(self):
+        """Test that links are numbered in the text and the link table"""
+        html = """
+        <p>See <a href="/one">first <b>link</b></a> and
+        <a href="https://other.org/">second</a>.</p>
+        <a href="#top">Top</a> <a href="mailto:a@b.c">Mail</a>
+        <a href="/empty"></a>
+        """
+        lines, links, forms = convert_html(html, "https://example.com/dir/page")
+
+        self.assertEqual(len(links), 2)
+        self.assertEqual(links[0], {'url': 'https://example.com/one', 'text': 'first link'})
+        self.assertEqual(links[1]['url'], 'https://other.org/')
+        text = '\n'.join(lines)
+        self.assertIn("See [0] first link and [1] second.", text)
+        self.assertNotIn("[2]", text)
+
+    def test_forms_extracted(self):
+        """Test that forms and their visible fields are collected"""
+        html = """
+        <form action="/search"><input name="q" placeholder="Search">
+        <input type="hidden" name="t" value="1"><input type="submit"></form>
+        <form method="post"><input type="submit"></form>
+        <form method="post" action="/c"><textarea name="body"></textarea></form>
+        """
+        lines, links, forms = convert_html(html)
+
+        self.assertEqual(len(forms), 2)
+        self.assertEqual(forms[0]['method'], 'GET')
+        self.assertEqual(forms[0]['fields'], [
+            {'name': 'q', 'type': 'text', 'placeholder': 'Search', 'value': ''}
+        ])
+        self.assertEqual(forms[1]['index'], 2)
+        self.assertEqual(forms[1]['method'], 'POST')
+        self.assertEqual(forms[1]['fields'][0]['name'], 'body')
+
+    def test_font_colors_and_skipped_content(self):
+        """Test color markers and removal of script/style/title"""
+        html = """
+        <html><head><title>T</title><style>p {}</style></head>
+        <body><script>var x = 1;</script>
+        <font color="Red">Error</font> <font color="nope">Plain</font>
+        </body></html>
+        """
+        lines, links, forms = convert_html(html, colors={'red'})
+
+        self.assertEqual(lines, ["«red»Error«/red» Plain"])
+
+    def test_block_structure(self):
+        """Test headings, lists, code blocks and paragraph spacing"""
+        html = """
+        <h2>Title</h2><p>Para</p>
+        <ul><li>a</li><li>b<ul><li>c</li></ul></li></ul>
+        <ol><li>x</li><li>y</li></ol>
+        <pre>code
+  indented</pre>
+        """
+        lines, links, forms = convert_html(html)
+
+        self.assertEqual(lines, [
+            "## Title", "", "Para", "",
+            "  * a", "  * b", "    * c", "",
+            "  1. x", "  2. y", "",
+            "[code]", "code", "  indented", "[/code]",
+        ])
+
+    def test_wraps_to_width(self):
+        """Test that paragraphs are wrapped to the requested width"""
+        html = "<p>" + "word " * 50 + "</p>"
+        lines, links, forms = convert_html(html, width=30)
+
+        self.assertGreater(len(lines), 1)
+        self.assertTrue(all(len(line) <= 30 for line in lines))
+
+
+class TestStyleRuns(unittest.TestCase):
+    """Test splitting lines into styled runs"""
+
+    def test_color_markers_removed(self):
+        """Test that «color» spans become runs at display positions"""
+        self.assertEqual(style_runs("Status: «red»Error«/red» and «green»OK«/green»"), (
+            (0, "Status: ", None), (8, "Error", 'red'), (13, " and ", None), (18, "OK", 'green')))
+
+    def test_whole_line_styles(self):
+        """Test headings, links, bold, emphasis and rules"""
+        self.assertEqual(style_runs("# Title"), ((0, "# Title", 'heading'),))
+        self.assertEqual(style_runs("see [x](y)")[0][2], 'link')
+        self.assertEqual(style_runs("a **b**")[0][2], 'bold')
+        self.assertEqual(style_runs("snake_case")[0][2], 'emphasis')
+        self.assertEqual(style_runs("=" * 10)[0][2], 'rule')
+        self.assertEqual(style_runs("plain"), ((0, "plain", None),))
+        self.assertEqual(style_runs(""), ())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,241 @@
+"""
+Tests for the HTTP response cache against a local http.server
+"""
+
+import unittest
+from unittest.mock import Mock, MagicMock, patch
+import sys
+import os
+import tempfile
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock curses before importing with proper key constants
+mock_curses = MagicMock()
+mock_curses.KEY_UP = 259
+mock_curses.KEY_DOWN = 258
+mock_curses.KEY_PPAGE = 339
+mock_curses.KEY_NPAGE = 338
+mock_curses.KEY_HOME = 262
+mock_curses.KEY_END = 360
+sys.modules['curses'] = mock_curses
+
+from browser import Browser
+from fetcher import Fetcher
+from httpcache import HTTPCache, freshness_lifetime, parse_cache_control
+from tests.helpers import LocalServerTestCase
+
+
+class CachingHandler(BaseHTTPRequestHandler):
+    """Serves pages with different caching headers and counts full responses"""
+
+    protocol_version = 'HTTP/1.1'
+    full_responses = {}
+    not_modified = {}
+
+    ETAG = '"v1"'
+    LAST_MODIFIED = formatdate(0, usegmt=True)
+
+    def do_GET(self):
+        path = self.path
+        headers = {}
+        if path.startswith('/fresh'):
+            headers['Cache-Control'] = 'max-age=60'
+        elif path.startswith('/etag'):
+            headers['Cache-Control'] = 'no-cache'
+            headers['ETag'] = self.ETAG
+            if self.headers.get('If-None-Match') == self.ETAG:
+                return self.send_not_modified(path, headers)
+        elif path.startswith('/lastmod'):
+            headers['Cache-Control'] = 'max-age=0'
+            headers['Last-Modified'] = self.LAST_MODIFIED
+            if self.headers.get('If-Modified-Since') == self.LAST_MODIFIED:
+                return self.send_not_modified(path, headers)
+        elif path.startswith('/nostore'):
+            headers['Cache-Control'] = 'no-store'
+        elif path.startswith('/private'):
+            headers['Cache-Control'] = 'private, max-age=60'
+
+        type(self).full_responses[path] = type(self).full_responses.get(path, 0) + 1
+        body = (f"<html><body><h1>{path}</h1>"
+                + "<p>Some cached content on this page.</p>" * 12
+                + "</body></html>").encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_not_modified(self, path, headers):
+        type(self).not_modified[path] = type(self).not_modified.get(path, 0) + 1
+        self.send_response(304)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CacheServerTestCase(LocalServerTestCase):
+    """Runs CachingHandler on a free local port"""
+
+    handler = CachingHandler
+
+    def setUp(self):
+        CachingHandler.full_responses.clear()
+        CachingHandler.not_modified.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, 'http')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+
+class TestFreshness(unittest.TestCase):
+    """Test Cache-Control and Expires handling"""
+
+    def test_parse_cache_control(self):
+        """Test that directives and arguments are parsed"""
+        cc = parse_cache_control('public, Max-Age=300, no-cache="set-cookie"')
+        self.assertEqual(cc, {'public': True, 'max-age': '300', 'no-cache': 'set-cookie'})
+
+    def test_lifetimes(self):
+        """Test freshness lifetime rules"""
+        now = 1000000.0
+        date = formatdate(now, usegmt=True)
+        self.assertEqual(freshness_lifetime({'Cache-Control': 'max-age=60', 'Date': date}, now), 60)
+        self.assertEqual(freshness_lifetime({'Cache-Control': 'max-age=60', 'Age': '50'}, now), 10)
+        self.assertEqual(freshness_lifetime({'Cache-Control': 'no-cache, max-age=60'}, now), 0)
+        self.assertIsNone(freshness_lifetime({'Cache-Control': 'no-store'}, now))
+        self.assertIsNone(freshness_lifetime({'Vary': '*'}, now))
+        self.assertEqual(freshness_lifetime(
+            {'Date': date, 'Expires': formatdate(now + 120, usegmt=True)}, now), 120)
+        self.assertEqual(freshness_lifetime(
+            {'Date': date, 'Last-Modified': formatdate(now - 1000, usegmt=True)}, now), 100)
+        self.assertEqual(freshness_lifetime({}, now), 0)
+
+
+class TestHTTPCache(CacheServerTestCase):
+    """Test caching and revalidation through a Fetcher"""
+
+    def test_fresh_hit(self):
+        """Test that a fresh response is served without the network"""
+        fetcher = Fetcher(cache=HTTPCache(self.cache_dir))
+        first = fetcher.get(self.base_url + '/fresh')
+        second = fetcher.get(self.base_url + '/fresh')
+
+        self.assertEqual(first.text, second.text)
+        self.assertTrue(second.from_cache)
+        self.assertEqual(CachingHandler.full_responses['/fresh'], 1)
+        stats = fetcher.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        fetcher.close()
+
+    def test_etag_revalidation(self):
+        """Test that a no-cache response is revalidated with If-None-Match"""
+        fetcher = Fetcher(cache=HTTPCache(self.cache_dir))
+        first = fetcher.get(self.base_url + '/etag')
+        second = fetcher.get(self.base_url + '/etag')
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.text, second.text)
+        self.assertEqual(CachingHandler.full_responses['/etag'], 1)
+        self.assertEqual(CachingHandler.not_modified['/etag'], 1)
+        self.assertEqual(fetcher.cache.stats()['revalidated'], 1)
+        fetcher.close()
+
+    def test_not_modified_closed(self):
+        """Test that a 304 response is closed once the cached copy is refreshed"""
+        fetcher = Fetcher(cache=HTTPCache())
+        fetcher.get(self.base_url + '/etag')
+        with patch('requests.Response.close', autospec=True) as close:
+            fetcher.get(self.base_url + '/etag')
+
+        closed = [call.args[0].status_code for call in close.call_args_list]
+        self.assertIn(304, closed)
+        fetcher.close()
+
+    def test_last_modified_revalidation(self):
+        """Test that a stale response is revalidated with If-Modified-Since"""
+        fetcher = Fetcher(cache=HTTPCache())
+        fetcher.get(self.base_url + '/lastmod')
+        response = fetcher.get(self.base_url + '/lastmod')
+
+        self.assertIn('/lastmod', response.text)
+        self.assertEqual(CachingHandler.not_modified['/lastmod'], 1)
+        fetcher.close()
+
+    def test_no_store(self):
+        """Test that no-store responses are never cached"""
+        fetcher = Fetcher(cache=HTTPCache(self.cache_dir))
+        fetcher.get(self.base_url + '/nostore')
+        fetcher.get(self.base_url + '/nostore')
+
+        self.assertEqual(CachingHandler.full_responses['/nostore'], 2)
+        self.assertEqual(fetcher.cache.stats()['stores'], 0)
+        fetcher.close()
+
+    def test_shared_cache_skips_private(self):
+        """Test that a cache shared between users keeps private pages out"""
+        fetcher = Fetcher(cache=HTTPCache(shared=True))
+        fetcher.get(self.base_url + '/private')
+        fetcher.get(self.base_url + '/private')
+        fetcher.get(self.base_url + '/fresh')
+        fetcher.get(self.base_url + '/fresh')
+
+        self.assertEqual(CachingHandler.full_responses['/private'], 2)
+        self.assertEqual(CachingHandler.full_responses['/fresh'], 1)
+        fetcher.close()
+
+    def test_disk_cache_survives_restart(self):
+        """Test that a new cache on the same directory serves stored pages"""
+        fetcher = Fetcher(cache=HTTPCache(self.cache_dir))
+        fetcher.get(self.base_url + '/fresh')
+        fetcher.close()
+
+        fetcher = Fetcher(cache=HTTPCache(self.cache_dir))
+        response = fetcher.get(self.base_url + '/fresh')
+        self.assertTrue(response.from_cache)
+        self.assertEqual(CachingHandler.full_responses['/fresh'], 1)
+        fetcher.close()
+
+    def test_lru_eviction(self):
+        """Test that the byte budgets evict least recently used entries"""
+        cache = HTTPCache(self.cache_dir, memory_bytes=2500, disk_bytes=2500)
+        fetcher = Fetcher(cache=cache)
+        for name in ('a', 'b', 'c'):
+            fetcher.get(f"{self.base_url}/fresh-{name}")
+
+        stats = cache.stats()
+        self.assertLessEqual(stats['memory_bytes'], 2500)
+        self.assertLessEqual(stats['disk_bytes'], 2500)
+        self.assertGreater(stats['evictions'], 0)
+        self.assertIsNone(cache.lookup(f"{self.base_url}/fresh-a"))
+        self.assertIsNotNone(cache.lookup(f"{self.base_url}/fresh-c"))
+        fetcher.close()
+
+    def test_browser_back_to_cached_page(self):
+        """Test that revisiting a page in the browser is a cache hit"""
+        mock_stdscr = Mock()
+        mock_stdscr.getmaxyx.return_value = (24, 80)
+        with patch.dict(os.environ, {'OPENAI_API_KEY': '', 'TEXTBROWSER_CACHE_DIR': self.tmp.name}):
+            browser = Browser(mock_stdscr)
+            browser.fetch_page(self.base_url + '/fresh')
+            browser.fetch_page(self.base_url + '/etag')
+            browser.fetch_page(self.base_url + '/fresh')
+
+            self.assertIn('# /fresh', browser.page_content)
+            self.assertEqual(CachingHandler.full_responses['/fresh'], 1)
+            self.assertEqual(browser.fetcher.cache.stats()['hits'], 1)
+            browser.fetcher.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
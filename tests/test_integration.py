@@ -22,7 +22,7 @@ mock_curses.KEY_END = 360
 sys.modules['curses'] = mock_curses
 
 from browser import Browser
-from bs4 import BeautifulSoup
+from tests.helpers import html_response, stream_chunk
 
 
 class TestFormSubmission(unittest.TestCase):
@@ -33,7 +33,7 @@ class TestFormSubmission(unittest.TestCase):
         self.mock_stdscr = Mock()
         self.mock_stdscr.getmaxyx.return_value = (24, 80)
 
-    @patch('browser.requests.get')
+    @patch('fetcher.requests.Session.get')
     def test_form_detection(self, mock_get):
         """Test that forms are detected on pages"""
         with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
@@ -51,10 +51,7 @@ class TestFormSubmission(unittest.TestCase):
             </html>
             """
 
-            mock_response = Mock()
-            mock_response.text = html_content
-            mock_response.raise_for_status = Mock()
-            mock_get.return_value = mock_response
+            mock_get.return_value = html_response(html_content)
 
             # Fetch page
             browser.fetch_page("https://example.com")
@@ -66,7 +63,7 @@ class TestFormSubmission(unittest.TestCase):
             self.assertEqual(len(browser.forms[0]['fields']), 1)
             self.assertEqual(browser.forms[0]['fields'][0]['name'], 'q')
 
-    @patch('browser.requests.get')
+    @patch('fetcher.requests.Session.get')
     def test_form_submission_get(self, mock_get):
         """Test that GET form submission works"""
         with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
@@ -83,11 +80,7 @@ class TestFormSubmission(unittest.TestCase):
             </html>
             """
 
-            mock_response = Mock()
-            mock_response.text = html_content
-            mock_response.url = "https://example.com"
-            mock_response.raise_for_status = Mock()
-            mock_get.return_value = mock_response
+            mock_get.return_value = html_response(html_content, "https://example.com")
 
             browser.fetch_page("https://example.com")
 
@@ -97,8 +90,7 @@ class TestFormSubmission(unittest.TestCase):
 
             # Mock the result page
             result_html = "<html><body><h1>Search Results</h1></body></html>"
-            mock_response.text = result_html
-            mock_response.url = "https://example.com/search?q=test+query"
+            mock_get.return_value = html_response(result_html, "https://example.com/search?q=test+query")
 
             # Submit form
             browser.submit_form(form, form_values)
@@ -109,7 +101,7 @@ class TestFormSubmission(unittest.TestCase):
             self.assertIn('params', last_call.kwargs)
             self.assertEqual(last_call.kwargs['params'], form_values)
 
-    @patch('browser.requests.post')
+    @patch('fetcher.requests.Session.post')
     def test_form_submission_post(self, mock_post):
         """Test that POST form submission works"""
         with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
@@ -128,11 +120,7 @@ class TestFormSubmission(unittest.TestCase):
             browser.forms = [form]
 
             # Mock POST response
-            mock_response = Mock()
-            mock_response.text = "<html><body><h1>Welcome</h1></body></html>"
-            mock_response.url = "https://example.com/dashboard"
-            mock_response.raise_for_status = Mock()
-            mock_post.return_value = mock_response
+            mock_post.return_value = html_response("<html><body><h1>Welcome</h1></body></html>", "https://example.com/dashboard")
 
             # Submit form
             form_values = {'username': 'testuser', 'password': 'testpass'}
@@ -153,7 +141,7 @@ class TestLinkNavigation(unittest.TestCase):
         self.mock_stdscr = Mock()
         self.mock_stdscr.getmaxyx.return_value = (24, 80)
 
-    @patch('browser.requests.get')
+    @patch('fetcher.requests.Session.get')
     def test_link_extraction(self, mock_get):
         """Test that links are properly extracted from HTML"""
         with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
@@ -172,10 +160,7 @@ class TestLinkNavigation(unittest.TestCase):
             </html>
             """
 
-            mock_response = Mock()
-            mock_response.text = html_content
-            mock_response.raise_for_status = Mock()
-            mock_get.return_value = mock_response
+            mock_get.return_value = html_response(html_content)
 
             # Fetch page
             browser.fetch_page("https://example.com")
@@ -186,7 +171,7 @@ class TestLinkNavigation(unittest.TestCase):
             self.assertEqual(browser.links[0]['url'], 'https://example.com/page1')
             self.assertEqual(browser.links[1]['url'], 'https://example.com/page2')
 
-    @patch('browser.requests.get')
+    @patch('fetcher.requests.Session.get')
     def test_link_navigation(self, mock_get):
         """Test that clicking a link navigates to that URL"""
         with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
@@ -201,16 +186,13 @@ class TestLinkNavigation(unittest.TestCase):
             </html>
             """
 
-            mock_response = Mock()
-            mock_response.text = html_content
-            mock_response.raise_for_status = Mock()
-            mock_get.return_value = mock_response
+            mock_get.return_value = html_response(html_content)
 
             browser.fetch_page("https://example.com")
 
             # Navigate to first link
             next_page_html = "<html><body><h1>Next Page</h1></body></html>"
-            mock_response.text = next_page_html
+            mock_get.return_value = html_response(next_page_html)
 
             link_url = browser.links[0]['url']
             browser.fetch_page(link_url)
@@ -218,7 +200,7 @@ class TestLinkNavigation(unittest.TestCase):
             # Verify we navigated
             self.assertEqual(browser.current_url, link_url)
 
-    @patch('browser.requests.get')
+    @patch('fetcher.requests.Session.get')
     def test_relative_url_handling(self, mock_get):
         """Test that relative URLs are converted to absolute"""
         with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
@@ -233,10 +215,7 @@ class TestLinkNavigation(unittest.TestCase):
             </html>
             """
 
-            mock_response = Mock()
-            mock_response.text = html_content
-            mock_response.raise_for_status = Mock()
-            mock_get.return_value = mock_response
+            mock_get.return_value = html_response(html_content)
 
             browser.fetch_page("https://example.com/current/page")
 
@@ -272,23 +251,16 @@ class TestAICommands(unittest.TestCase):
     @patch('browser.OpenAI')
     def test_ai_command_with_key(self, mock_openai_class):
         """Test that AI commands work with API key"""
-        with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'}):
+        with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key', 'TEXTBROWSER_CACHE_DIR': ''}):
             # Setup mock OpenAI client
             mock_client = Mock()
             mock_openai_class.return_value = mock_client
 
-            # Mock response
-            mock_message = Mock()
-            mock_message.content = "This page is about testing."
-            mock_message.tool_calls = None
-
-            mock_choice = Mock()
-            mock_choice.message = mock_message
-
-            mock_response = Mock()
-            mock_response.choices = [mock_choice]
-
-            mock_client.chat.completions.create.return_value = mock_response
+            # Streamed response, a few words per chunk
+            mock_client.chat.completions.create.return_value = iter([
+                stream_chunk(content="This page "),
+                stream_chunk(content="is about testing."),
+            ])
 
             browser = Browser(self.mock_stdscr)
             browser.page_text = "Some page content about testing"
@@ -297,8 +269,9 @@ class TestAICommands(unittest.TestCase):
             # Process AI command
             browser.process_ai_command("summarize this page")
 
-            # Verify OpenAI was called
+            # Verify OpenAI was called for a streamed answer
             mock_client.chat.completions.create.assert_called_once()
+            self.assertTrue(mock_client.chat.completions.create.call_args.kwargs['stream'])
 
             # Verify response was displayed
             page_text = '\n'.join(browser.page_content)
@@ -307,27 +280,16 @@ class TestAICommands(unittest.TestCase):
     @patch('browser.OpenAI')
     def test_ai_navigation_function_call(self, mock_openai_class):
         """Test that AI can navigate using function calling"""
-        with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'}):
+        with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key', 'TEXTBROWSER_CACHE_DIR': ''}):
             # Setup mock OpenAI client
             mock_client = Mock()
             mock_openai_class.return_value = mock_client
 
-            # Mock function call response
-            mock_tool_call = Mock()
-            mock_tool_call.function.name = "navigate_to_url"
-            mock_tool_call.function.arguments = '{"url": "https://wikipedia.org", "reason": "Looking up WebDAV"}'
-
-            mock_message = Mock()
-            mock_message.content = None
-            mock_message.tool_calls = [mock_tool_call]
-
-            mock_choice = Mock()
-            mock_choice.message = mock_message
-
-            mock_response = Mock()
-            mock_response.choices = [mock_choice]
-
-            mock_client.chat.completions.create.return_value = mock_response
+            # Streamed function call: the name, then the arguments in pieces
+            mock_client.chat.completions.create.return_value = iter([
+                stream_chunk(tool_call=(0, "navigate_to_url", '{"url": "https://wikipedia.org", ')),
+                stream_chunk(tool_call=(0, None, '"reason": "Looking up WebDAV"}')),
+            ])
 
             browser = Browser(self.mock_stdscr)
 
@@ -348,7 +310,7 @@ class TestPageRendering(unittest.TestCase):
         self.mock_stdscr.getmaxyx.return_value = (24, 80)
         self.mock_stdscr.addstr = Mock()
         self.mock_stdscr.clear = Mock()
-        self.mock_stdscr.refresh = Mock()
+        self.mock_stdscr.noutrefresh = Mock()
 
     def test_render_basic_page(self):
         """Test that basic pages render without errors"""
@@ -360,9 +322,9 @@ class TestPageRendering(unittest.TestCase):
             # Render should not raise
             browser.render()
 
-            # Verify screen was cleared and refreshed
+            # Verify the first frame cleared the screen and was sent out
             self.mock_stdscr.clear.assert_called()
-            self.mock_stdscr.refresh.assert_called()
+            self.mock_stdscr.noutrefresh.assert_called()
 
     def test_scroll_handling(self):
         """Test that scrolling works correctly"""
@@ -476,7 +438,7 @@ class TestColorRendering(unittest.TestCase):
         self.mock_stdscr.getmaxyx.return_value = (24, 80)
         self.mock_stdscr.addstr = Mock()
 
-    @patch('browser.requests.get')
+    @patch('fetcher.requests.Session.get')
     def test_font_color_parsing(self, mock_get):
         """Test that <font color> tags are parsed correctly"""
         with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
@@ -493,10 +455,7 @@ class TestColorRendering(unittest.TestCase):
             </html>
             """
 
-            mock_response = Mock()
-            mock_response.text = html_content
-            mock_response.raise_for_status = Mock()
-            mock_get.return_value = mock_response
+            mock_get.return_value = html_response(html_content)
 
             browser.fetch_page("https://example.com")
 
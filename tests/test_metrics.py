@@ -0,0 +1,298 @@
+"""
+Tests for per-stage timings, the about:perf page and Prometheus export
+"""
+
+import asyncio
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+import threading
+from http.server import BaseHTTPRequestHandler
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock curses before importing with proper key constants
+mock_curses = MagicMock()
+mock_curses.KEY_UP = 259
+mock_curses.KEY_DOWN = 258
+mock_curses.KEY_LEFT = 260
+mock_curses.KEY_RIGHT = 261
+mock_curses.KEY_PPAGE = 339
+mock_curses.KEY_NPAGE = 338
+mock_curses.KEY_HOME = 262
+mock_curses.KEY_END = 360
+mock_curses.KEY_DC = 330
+mock_curses.KEY_BACKSPACE = 263
+mock_curses.KEY_RESIZE = 410
+mock_curses.A_NORMAL = 0
+mock_curses.A_BOLD = 0x200000
+sys.modules['curses'] = mock_curses
+
+import browser as browser_module
+import metrics
+from browser import Browser
+from core import BrowserCore
+from fetcher import Fetcher
+from gateway import Gateway
+from metrics import Metrics, Timings, stage, timing
+from pagecache import PageCache
+from terminal import Terminal
+from tests.helpers import LocalServerTestCase, patch_curses_colors
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """A page and a form target"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def respond(self):
+        body = ("<html><body><h1>Timed</h1>" + "<p>Some text to convert.</p>" * 50
+                + '<form action="/search" method="post"><input name="q"></form>'
+                + "</body></html>").encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.respond()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestTimings(unittest.TestCase):
+    """Test timing stages of one action"""
+
+    def test_nested_stages_exclusive(self):
+        """Test that an inner stage's time is not counted in the outer one"""
+        timings = Timings('load')
+        with timings.stage('download'):
+            time.sleep(0.02)
+            with timings.stage('convert'):
+                time.sleep(0.03)
+        timings.finish()
+        self.assertGreaterEqual(timings.stages['convert'], 0.03)
+        self.assertGreaterEqual(timings.stages['download'], 0.02)
+        self.assertLess(timings.stages['download'], 0.03)
+        self.assertAlmostEqual(sum(timings.stages.values()), timings.total, delta=0.005)
+
+    def test_current_thread_only(self):
+        """Test that stage() charges the action running on this thread, if any"""
+        timings = Timings('form')
+        with stage('request'):
+            pass  # No current action: not recorded anywhere
+        with timing(timings):
+            with stage('request'):
+                pass
+            other = threading.Thread(target=lambda: stage('convert').__enter__())
+            other.start()
+            other.join()
+        self.assertEqual(list(timings.stages), ['request'])
+        self.assertIsNone(metrics.current())
+
+    def test_summary(self):
+        """Test the status bar line: stages in order and bytes received"""
+        timings = Timings('load')
+        timings.add('convert', 0.012)
+        timings.add('wait', 0.030)
+        timings.count('received', 2048)
+        timings.total = 0.045
+        self.assertEqual(timings.summary(), 'load 45ms: wait 30 convert 12 | 2 KB')
+
+
+class TestMetrics(unittest.TestCase):
+    """Test the registry of finished actions"""
+
+    def record(self, registry, action, **stages):
+        timings = Timings(action)
+        for name, seconds in stages.items():
+            timings.add(name, seconds)
+        timings.total = sum(stages.values())
+        timings.count('received', 1000)
+        registry.record(timings)
+
+    def test_prometheus(self):
+        """Test counters and cumulative histograms in the text format"""
+        registry = Metrics()
+        self.record(registry, 'load', wait=0.004, convert=0.2)
+        self.record(registry, 'load', wait=0.04, convert=0.002)
+        text = registry.prometheus()
+
+        self.assertIn('# TYPE textbrowser_stage_seconds histogram', text)
+        self.assertIn('textbrowser_actions_total{action="load"} 2', text)
+        self.assertIn('textbrowser_stage_seconds_bucket{action="load",stage="wait",le="0.005"} 1', text)
+        self.assertIn('textbrowser_stage_seconds_bucket{action="load",stage="wait",le="0.05"} 2', text)
+        self.assertIn('textbrowser_stage_seconds_bucket{action="load",stage="convert",le="+Inf"} 2', text)
+        self.assertIn('textbrowser_stage_seconds_count{action="load",stage="total"} 2', text)
+        self.assertIn('textbrowser_stage_seconds_sum{action="load",stage="convert"} 0.202000', text)
+        self.assertIn('textbrowser_bytes_total{action="load",kind="received"} 2000', text)
+        self.assertTrue(text.endswith('\n'))
+
+    def test_rolling_window(self):
+        """Test that about:perf covers only the latest actions"""
+        registry = Metrics(window=3)
+        for _ in range(5):
+            self.record(registry, 'load', wait=0.01)
+        self.record(registry, 'ai', ai=1.5)
+        page = registry.perf_page()
+        self.assertEqual(len(registry.recent), 3)
+        self.assertTrue(page[0].startswith('Performance: last 3 actions'))
+        self.assertIn('## ai: 1 in window, median 1500 ms, p95 1500 ms', page)
+        self.assertIn('## load: 2 in window, median 10 ms, p95 10 ms', page)
+        # Cumulative histograms are not windowed
+        self.assertIn('textbrowser_actions_total{action="load"} 5', registry.prometheus())
+
+    def test_empty_page(self):
+        """Test about:perf before anything was measured"""
+        self.assertIn('Nothing measured yet: load a page and come back.', Metrics().perf_page())
+
+
+class TestInstrumentedLoads(LocalServerTestCase):
+    """Test the breakdowns recorded for real loads, forms and frames"""
+
+    handler = PageHandler
+
+    def setUp(self):
+        self.env = patch.dict(os.environ, {'TEXTBROWSER_CACHE_DIR': '', 'TEXTBROWSER_PREFETCH': '',
+                                           'OPENAI_API_KEY': ''})
+        self.env.start()
+        self.colors = patch_curses_colors(browser_module.curses)
+        self.colors.start()
+        self.fetcher = Fetcher()
+        self.metrics = Metrics()
+
+    def tearDown(self):
+        self.fetcher.close()
+        self.colors.stop()
+        self.env.stop()
+
+    def core(self) -> BrowserCore:
+        core = BrowserCore(self.fetcher, PageCache(), width=60)
+        core.metrics = self.metrics
+        return core
+
+    def test_open_breakdown(self):
+        """Test the stages of a streamed load, from connecting to converting"""
+        core = self.core()
+        self.assertTrue(asyncio.run(core.open(self.base_url + '/page')))
+        timings = core.last_timings
+        self.assertEqual(timings.action, 'load')
+        for name in ('connect', 'wait', 'download', 'convert'):
+            self.assertIn(name, timings.stages)
+        self.assertGreater(timings.bytes['received'], 1000)
+        self.assertLessEqual(sum(timings.stages.values()), timings.total)
+        self.assertEqual(list(self.metrics.recent), [timings])
+
+    def test_submit_breakdown(self):
+        """Test that a form submission is timed as its own action"""
+        core = self.core()
+
+        async def browse():
+            await core.open(self.base_url + '/page')
+            await core.submit(core.forms[0], {'q': 'timings'})
+
+        asyncio.run(browse())
+        self.assertEqual([timings.action for timings in self.metrics.recent], ['load', 'form'])
+        self.assertIn('request', core.last_timings.stages)
+        self.assertIn('convert', core.last_timings.stages)
+        self.assertNotIn('connect', core.last_timings.stages)  # The pooled connection was reused
+
+    def test_first_frame_timed(self):
+        """Test that the browser adds the first frame of a page to its load"""
+        terminal = Terminal(lambda data: None, 24, 80)
+        browser = Browser(terminal.stdscr, self.fetcher, PageCache(), term=terminal)
+        browser.metrics = self.metrics
+        browser.fetch_page(self.base_url + '/page')
+        self.assertEqual(len(self.metrics.recent), 0)  # Not before it is on screen
+
+        browser.render()
+        timings = browser.last_timings
+        self.assertIn('render', timings.stages)
+        self.assertEqual(list(self.metrics.recent), [timings])
+        browser.render()
+        self.assertEqual(len(self.metrics.recent), 1)
+
+    def test_status_bar_toggle(self):
+        """Test that T shows and hides the breakdown in the status bar"""
+        # Wide enough for the readout however many stages were slow enough to show
+        terminal = Terminal(lambda data: None, 24, 160)
+        browser = Browser(terminal.stdscr, self.fetcher, PageCache(), term=terminal)
+        browser.metrics = self.metrics
+        browser.fetch_page(self.base_url + '/page')
+        browser.render()
+
+        status = lambda: ''.join(text for x, text, attr in browser.frame(24, 160)[0])
+        self.assertNotIn('load ', status())
+        browser.handle_input(ord('t'))
+        self.assertIn(browser.last_timings.summary(), status())
+        browser.handle_input(ord('T'))
+        self.assertNotIn('load ', status())
+
+    def test_about_perf(self):
+        """Test the about:perf page, from the core and the Ctrl-K box"""
+        core = self.core()
+        asyncio.run(core.open(self.base_url + '/page'))
+        self.assertTrue(asyncio.run(core.open('about:perf')))
+        self.assertEqual(core.current_url, 'about:perf')
+        self.assertTrue(core.page_content[0].startswith('Performance: last 1 actions'))
+        self.assertEqual(core.links, [])
+        core.go_back()
+        self.assertEqual(core.current_url, self.base_url + '/page')
+
+        terminal = Terminal(lambda data: None, 24, 80)
+        browser = Browser(terminal.stdscr, self.fetcher, PageCache(), term=terminal)
+        browser.show_command_box = lambda: 'about:perf'
+        browser.handle_input(11)
+        self.assertEqual(browser.current_url, 'about:perf')
+        browser.show_command_box = lambda: 'about:nothing'
+        browser.handle_input(11)
+        self.assertEqual(browser.page_content[0], 'Unknown page: about:nothing')
+
+
+class TestGatewayMetrics(unittest.TestCase):
+    """Test the gateway's Prometheus endpoint"""
+
+    def test_metrics_endpoint(self):
+        """Test scraping /metrics over HTTP"""
+        gateway = Gateway(page_cache=PageCache())
+        timings = Timings('load')
+        timings.add('wait', 0.01)
+        metrics.METRICS.record(timings)
+
+        async def scrape(path):
+            server = await gateway.serve_metrics('127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode('ascii'))
+            response = await reader.read()
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return response.decode('utf-8')
+
+        try:
+            response = asyncio.run(scrape('/metrics'))
+            missing = asyncio.run(scrape('/'))
+        finally:
+            gateway.close()
+
+        head, body = response.split('\r\n\r\n', 1)
+        self.assertTrue(head.startswith('HTTP/1.1 200 OK'))
+        self.assertIn('Content-Type: text/plain; version=0.0.4', head)
+        self.assertIn('textbrowser_sessions 0\n', body)
+        self.assertIn('# TYPE textbrowser_sessions_refused_total counter', body)
+        self.assertIn('textbrowser_stage_seconds_count{action="load",stage="wait"}', body)
+        self.assertTrue(missing.startswith('HTTP/1.1 404'))
+
+
+if __name__ == '__main__':
+    unittest.main()
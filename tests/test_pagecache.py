@@ -0,0 +1,138 @@
+"""
+Tests for the converted-page cache
+"""
+
+import unittest
+from unittest.mock import Mock, MagicMock, patch
+import sys
+import os
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock curses before importing with proper key constants
+mock_curses = MagicMock()
+mock_curses.KEY_UP = 259
+mock_curses.KEY_DOWN = 258
+mock_curses.KEY_PPAGE = 339
+mock_curses.KEY_NPAGE = 338
+mock_curses.KEY_HOME = 262
+mock_curses.KEY_END = 360
+sys.modules['curses'] = mock_curses
+
+import core as core_module
+from browser import Browser
+from pagecache import PageCache, page_key
+
+PAGE = """
+<html><body><h1>Cached</h1>
+<p>Read the <a href="/docs">docs</a> or <font color="red">search</font>.</p>
+<form action="/s"><input name="q"></form>
+</body></html>
+"""
+
+
+A = ('', '', 'a', False)
+B = ('', '', 'b', False)
+
+
+class TestPageKey(unittest.TestCase):
+    """Test cache keys"""
+
+    def test_key_depends_on_content(self):
+        """Test that URL and HTML change the key"""
+        key = page_key('https://a.org/', PAGE)
+        self.assertEqual(key, page_key('https://a.org/', PAGE))
+        self.assertNotEqual(key, page_key('https://b.org/', PAGE))
+        self.assertNotEqual(key, page_key('https://a.org/', PAGE + ' '))
+
+
+class TestPageCache(unittest.TestCase):
+    """Test the in-memory and on-disk stores"""
+
+    def test_returns_copies(self):
+        """Test that callers cannot modify the cached page"""
+        cache = PageCache()
+        cache.put('k', [A, B], [{'url': 'u', 'text': 't'}],
+                  [{'index': 0, 'fields': [{'name': 'q'}]}])
+        blocks, links, forms = cache.get('k')
+        blocks.append(('', '', 'footer', True))
+        links[0]['url'] = 'changed'
+        forms[0]['fields'].clear()
+
+        self.assertEqual(cache.get('k'), ([A, B], [{'url': 'u', 'text': 't'}],
+                                          [{'index': 0, 'fields': [{'name': 'q'}]}]))
+        self.assertEqual(cache.stats()['hits'], 2)
+
+    def test_memory_budget(self):
+        """Test that old pages are evicted to stay within the budget"""
+        cache = PageCache(memory_bytes=4000)
+        for n in range(10):
+            cache.put(f"k{n}", [('', '', 'x' * 40, False)] * 10, [], [])
+
+        stats = cache.stats()
+        self.assertLessEqual(stats['memory_bytes'], 4000)
+        self.assertGreater(stats['evictions'], 0)
+        self.assertIsNone(cache.get('k0'))
+        self.assertIsNotNone(cache.get('k9'))
+
+    def test_disk_shared_between_caches(self):
+        """Test that a second cache on the same directory sees stored pages"""
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = PageCache(tmp)
+            block = ('  ', '  ', 'line «red»x«/red»', False)
+            writer.put('k', [block], [{'url': 'u', 'text': 't'}], [])
+
+            reader = PageCache(tmp)
+            self.assertEqual(reader.get('k'), ([block], [{'url': 'u', 'text': 't'}], []))
+            self.assertTrue(os.listdir(tmp)[0].endswith('.page'))
+
+
+class TestBrowserPageCache(unittest.TestCase):
+    """Test that the browser skips conversion for cached pages"""
+
+    def setUp(self):
+        self.mock_stdscr = Mock()
+        self.mock_stdscr.getmaxyx.return_value = (24, 80)
+
+    def test_revisit_skips_conversion(self):
+        """Test that loading the same HTML again does not convert it"""
+        with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
+            browser = Browser(self.mock_stdscr)
+            browser.load_html(PAGE, 'https://example.com/')
+            first = (list(browser.page_content), browser.links, browser.forms)
+
+            with patch.object(core_module, 'convert_blocks') as mock_convert:
+                browser.load_html(PAGE, 'https://example.com/')
+                mock_convert.assert_not_called()
+
+            self.assertEqual((browser.page_content, browser.links, browser.forms), first)
+
+    def test_width_change_rewraps_without_converting(self):
+        """Test that a different terminal width reuses the converted page"""
+        with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
+            browser = Browser(self.mock_stdscr)
+            browser.load_html(PAGE, 'https://example.com/')
+
+            self.mock_stdscr.getmaxyx.return_value = (24, 120)
+            with patch.object(core_module, 'convert_blocks') as mock_convert:
+                browser.load_html(PAGE, 'https://example.com/')
+                mock_convert.assert_not_called()
+            self.assertEqual(browser.page_content.width, 116)
+
+    def test_shared_between_browsers(self):
+        """Test that gateway sessions can share one page cache"""
+        with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
+            shared = PageCache()
+            first = Browser(self.mock_stdscr, page_cache=shared)
+            second = Browser(self.mock_stdscr, page_cache=shared)
+            first.load_html(PAGE, 'https://example.com/')
+            second.load_html(PAGE, 'https://example.com/')
+
+            self.assertEqual(shared.stats()['hits'], 1)
+            self.assertEqual(first.page_content, second.page_content)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+"""
+Tests for page size limits and refusing content that is not a page
+"""
+
+import asyncio
+import io
+import json
+import unittest
+from unittest.mock import Mock, patch
+import sys
+import os
+import tempfile
+from http.server import BaseHTTPRequestHandler
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core import BrowserCore
+from fetcher import Fetcher, NotAPage, sniff_content
+from httpcache import HTTPCache
+from pagecache import PageCache
+from render import main as render_main
+from tests.helpers import LocalServerTestCase
+
+
+PARAGRAPH = "<p>A line of a very long server log, repeated over and over.</p>\n"
+
+
+class LimitHandler(BaseHTTPRequestHandler):
+    """A huge page, a small one, an image and a mislabelled binary"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/huge':
+            # 2 MB, sent with a length so the note can give the full size
+            body = ("<html><body><h1>Log dump</h1>" + PARAGRAPH * 32000).encode('utf-8')
+            content_type = 'text/html; charset=utf-8'
+        elif path == '/image.png':
+            body = b'\x89PNG\r\n\x1a\n' + bytes(4096)
+            content_type = 'image/png'
+        elif path == '/mislabelled':
+            body = b'PK\x03\x04' + bytes(4096)
+            content_type = 'text/html'
+        else:
+            body = ("<html><body><h1>Small page</h1>" + PARAGRAPH * 12
+                    + '<form action="/huge"><input name="q"></form></body></html>').encode('utf-8')
+            content_type = 'text/html; charset=utf-8'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'max-age=600')
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except ConnectionError:
+            pass  # The browser stopped reading at its limit
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestSniffing(unittest.TestCase):
+    """Test deciding from headers and first bytes whether a response is a page"""
+
+    def test_content_types(self):
+        """Test that text types pass and others are refused before the body"""
+        for content_type in ('text/html; charset=utf-8', 'text/plain', 'application/xhtml+xml',
+                             'application/rss+xml', '', 'application/octet-stream'):
+            self.assertIsNone(sniff_content(content_type), content_type)
+        for content_type in ('image/png', 'application/pdf', 'video/mp4', 'application/zip'):
+            self.assertEqual(sniff_content(content_type), content_type)
+
+    def test_binary_bodies(self):
+        """Test that binaries claiming to be text are caught by their first bytes"""
+        self.assertIsNone(sniff_content('text/html', b'<!DOCTYPE html><html>'))
+        self.assertIsNone(sniff_content('', b'\xef\xbb\xbf<html>caf\xc3\xa9'))
+        self.assertIsNotNone(sniff_content('text/html', b'%PDF-1.7\n'))
+        self.assertIsNotNone(sniff_content('application/octet-stream', b'\x1f\x8b\x08\x00'))
+        self.assertIsNotNone(sniff_content('text/plain', b'abc\x00\x00\x01'))
+
+
+class TestPageLimits(LocalServerTestCase):
+    """Test that pages are cut off at the limit and binaries are refused"""
+
+    LIMIT = 256 * 1024
+
+    handler = LimitHandler
+
+    def setUp(self):
+        self.env = patch.dict(os.environ, {'TEXTBROWSER_CACHE_DIR': '', 'TEXTBROWSER_PREFETCH': '',
+                                           'TEXTBROWSER_MAX_PAGE_BYTES': str(self.LIMIT)})
+        self.env.start()
+        self.fetcher = Fetcher(cache=HTTPCache())
+
+    def tearDown(self):
+        self.fetcher.close()
+        self.env.stop()
+
+    def core(self) -> BrowserCore:
+        return BrowserCore(self.fetcher, PageCache(), width=60)
+
+    def assertPartial(self, core):
+        self.assertTrue(core.partial)
+        core.complete_page()
+        text = '\n'.join(core.page_content)
+        self.assertIn('**Partial page:** only the first 256 KB of 2.0 MB', text)
+        self.assertLess(text.count('repeated over and over'), self.LIMIT // len(PARAGRAPH) + 1)
+
+    def test_streamed_load_truncated(self):
+        """Test a background load stopping at the limit, shown as partial"""
+        core = self.core()
+        self.assertEqual(core.max_page_bytes, self.LIMIT)
+        self.assertTrue(asyncio.run(core.open(self.base_url + '/huge')))
+        self.assertLessEqual(core.last_timings.bytes['received'], self.LIMIT)
+        self.assertPartial(core)
+        # Cut-off bodies are not cached as if they were the whole page
+        self.assertIsNone(self.fetcher.cache.lookup(self.base_url + '/huge'))
+
+        self.assertTrue(asyncio.run(core.open(self.base_url + '/small')))
+        self.assertFalse(core.partial)
+        self.assertIsNotNone(self.fetcher.cache.lookup(self.base_url + '/small'))
+
+    def test_fetch_page_truncated(self):
+        """Test the blocking fetch_page path and a form response"""
+        core = self.core()
+        self.assertTrue(core.fetch_page(self.base_url + '/huge'))
+        self.assertPartial(core)
+
+        core.fetch_page(self.base_url + '/small')
+        self.assertTrue(asyncio.run(core.submit(core.forms[0], {'q': 'logs'})))
+        self.assertIn('**Partial page:**', '\n'.join(core.page_content))
+
+    def test_converter_path_truncated(self):
+        """Test that pages bound for the conversion pool are cut off too"""
+        core = self.core()
+        core.converter = Mock(wants=lambda html: False)
+        self.assertTrue(asyncio.run(core.open(self.base_url + '/huge')))
+        self.assertPartial(core)
+
+    def test_local_file_truncated(self):
+        """Test that huge local files are cut off as well"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'dump.html')
+            with open(path, 'w') as f:
+                f.write("<html><body><h1>Log dump</h1>" + PARAGRAPH * 32000)
+            core = self.core()
+            self.assertTrue(core.fetch_page('file://' + path))
+        self.assertPartial(core)
+
+    def test_binary_refused(self):
+        """Test that an image and a mislabelled archive are refused, not shown"""
+        core = self.core()
+        self.assertFalse(asyncio.run(core.open(self.base_url + '/image.png')))
+        self.assertIsInstance(core.last_error, NotAPage)
+        self.assertEqual(core.page_content[0], 'Error loading page: Not a web page: image/png (4 KB)')
+        self.assertEqual(core.last_timings.bytes.get('received'), 0)
+
+        self.assertFalse(core.fetch_page(self.base_url + '/mislabelled'))
+        self.assertIn('binary data labelled text/html', core.page_content[0])
+
+    def test_render_reports_partial(self):
+        """Test the partial flag in headless render output"""
+        out = io.StringIO()
+        status = render_main([self.base_url + '/huge', self.base_url + '/small'],
+                             stdin=io.StringIO(), stdout=out, stderr=io.StringIO())
+        self.assertEqual(status, 0)
+        records = {record['url']: record for record in map(json.loads, out.getvalue().splitlines())}
+        self.assertTrue(records[self.base_url + '/huge']['partial'])
+        self.assertFalse(records[self.base_url + '/small']['partial'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,229 @@
+"""
+Conformance tests: every installed parser backend must convert pages identically
+"""
+
+import re
+import unittest
+from unittest.mock import Mock, MagicMock, patch
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock curses before importing with proper key constants
+mock_curses = MagicMock()
+mock_curses.KEY_UP = 259
+mock_curses.KEY_DOWN = 258
+mock_curses.KEY_PPAGE = 339
+mock_curses.KEY_NPAGE = 338
+mock_curses.KEY_HOME = 262
+mock_curses.KEY_END = 360
+sys.modules['curses'] = mock_curses
+
+from browser import Browser
+from htmltext import available_parsers, best_parser, convert_html
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+COLORS = ('red', 'green', 'blue', 'yellow')
+
+DOCUMENTS = {
+    'article': """
+        <!DOCTYPE html>
+        <html><head><title>Article</title>
+        <style>body { color: red }</style>
+        <script>var tracking = "<a href='/x'>x</a>";</script></head>
+        <body>
+        <!-- navigation -->
+        <nav><a href="/">Home</a> | <a href="/about">About &amp; more</a></nav>
+        <h1>The <em>Main</em> Title</h1>
+        <p>First paragraph with a <a href="https://other.org/page">link to
+        another site</a>, some <b>bold</b> and <i>italic</i> text, and an
+        entity &eacute; plus a <code>code span</code>. It is long enough to wrap
+        across several lines at the configured width.</p>
+        <blockquote><p>Quoted text</p></blockquote>
+        <ul><li>One <a href="item1">item</a></li>
+            <li>Two<ol><li>Nested a</li><li>Nested b</li></ol></li></ul>
+        <pre>def f(x):
+    return x * 2</pre>
+        <table><tr><th>Name</th><th>Value</th></tr>
+               <tr><td>alpha</td><td><font color="red">1</font></td></tr></table>
+        <hr>
+        <p>Line one<br>Line two</p>
+        <a href="#top">Top</a> <a href="javascript:void(0)">JS</a>
+        <a href="mailto:x@example.com">Mail</a>
+        </body></html>
+    """,
+    'forms': """
+        <html><body>
+        <form action="/search" method="get">
+            <input type="text" name="q" placeholder="Search...">
+            <input type="hidden" name="src" value="top">
+            <input type="submit" value="Go">
+        </form>
+        <form action="/login" method="post">
+            <input name="user"><input type="password" name="pass">
+            <textarea name="note"></textarea>
+        </form>
+        <form><input type="button" value="Nothing"></form>
+        </body></html>
+    """,
+    'colors': """
+        <html><body>
+        <font color="red">Error</font>
+        <font color="GREEN">Success</font>
+        <p><font color="blue">Info <b>bold</b></font> and
+        <font color="unknown">plain</font></p>
+        </body></html>
+    """,
+    'fragment': '<p>No html or body tags, just a <a href="/p">paragraph</a></p>',
+    'comments': '<p>Before</p><!-- note --> text after a comment<p>Last</p>',
+    'unclosed links': """
+        <table><tr><td><a href="/1">one<a href="/2">two</td><td>cell</td></tr></table>
+        <ul><li><a href="/3">item</li></ul>
+        <a href="/4"><p>Block</p><p>link</p></a>
+        <p>Last <a href="/5">three<a href="/6">four</p>
+    """,
+    'textarea': """
+        <form action="/post"><textarea name="body">Some <b>raw</b> &amp; text
+        <a href="/x">not a link</a></textarea></form>
+    """,
+}
+
+# Misnested markup has no single right answer: each parser repairs the tree
+# its own way. lxml closes <i> at </b>, selectolax reopens formatting and
+# links in the next block as HTML5 says, html.parser keeps tags as written.
+# The backends must still show the same words, in the same order, linking
+# to the same places; styling, line breaks and link numbering may differ.
+MISNESTED = {
+    'bold italic': '<p><b><i>bold italic</b> italic?</i> plain</p><p>next</p>',
+    'link across paragraphs': '<p>A <a href="/1">link that</p><p>spans paragraphs</a> after</p>',
+    'unclosed link': '<p><a href="/1">one<a href="/2">two</p><p>after</p>',
+    'unclosed cell': '<table><tr><td>cell<b>bold</td><td>two</td></tr></table>after',
+    'font around block': '<font color="red"><p>red para</font> still?</p>',
+}
+
+# Link markers and styling, which misnested markup may move
+MARKUP = re.compile(r'\[\d+\] ?|\*\*|_|«/?\w+»')
+
+
+def local_pages():
+    """The pages shipped with the browser"""
+    pages = {}
+    for name in ('homepage.html', 'help.html', 'demo.html'):
+        with open(os.path.join(ROOT, name), 'r') as f:
+            pages[name] = f.read()
+    return pages
+
+
+class TestParserSelection(unittest.TestCase):
+    """Test picking a parser backend"""
+
+    def test_html_parser_always_available(self):
+        """Test that the stdlib parser is always the last resort"""
+        self.assertEqual(available_parsers()[-1], 'html.parser')
+
+    def test_best_parser_fallback(self):
+        """Test that unknown or missing backends fall back to the fastest installed"""
+        self.assertEqual(best_parser('html.parser'), 'html.parser')
+        self.assertEqual(best_parser('no-such-parser'), available_parsers()[0])
+        self.assertEqual(best_parser(), available_parsers()[0])
+
+    def test_browser_uses_env_parser(self):
+        """Test that TEXTBROWSER_PARSER selects the backend"""
+        mock_stdscr = Mock()
+        mock_stdscr.getmaxyx.return_value = (24, 80)
+        with patch.dict(os.environ, {'OPENAI_API_KEY': '', 'TEXTBROWSER_PARSER': 'html.parser'}):
+            browser = Browser(mock_stdscr)
+            self.assertEqual(browser.parser, 'html.parser')
+
+
+class TestParserConformance(unittest.TestCase):
+    """Test that all backends give the same links, forms and text"""
+
+    def assert_conforms(self, html, base_url='https://example.com/dir/page', width=60):
+        expected = convert_html(html, base_url, width, COLORS, 'html.parser')
+        for parser in available_parsers():
+            with self.subTest(parser=parser):
+                lines, links, forms = convert_html(html, base_url, width, COLORS, parser)
+                self.assertEqual(links, expected[1])
+                self.assertEqual(forms, expected[2])
+                self.assertEqual(lines, expected[0])
+
+    def test_documents(self):
+        """Test the conformance documents"""
+        for name, html in DOCUMENTS.items():
+            with self.subTest(document=name):
+                self.assert_conforms(html)
+
+    def test_local_pages(self):
+        """Test the homepage, help and demo pages"""
+        for name, html in local_pages().items():
+            with self.subTest(page=name):
+                self.assert_conforms(html, f"file://{os.path.join(ROOT, name)}", 76)
+
+    def test_empty_document(self):
+        """Test that an empty document converts to nothing everywhere"""
+        for parser in available_parsers():
+            with self.subTest(parser=parser):
+                self.assertEqual(convert_html('', parser=parser), ([], [], []))
+
+    def test_unclosed_link(self):
+        """Test that a link left open ends with its paragraph"""
+        # HTML5 parsers such as selectolax reopen it in the next paragraph
+        html = '<p><a href="/1">one<a href="/2">two</p><p>after</p>'
+        for parser in ('html.parser', 'lxml'):
+            if parser in available_parsers():
+                with self.subTest(parser=parser):
+                    lines, links, forms = convert_html(html, 'https://example.com/', 60, COLORS, parser)
+                    self.assertEqual(lines, ['[0] one[1] two', '', 'after'])
+                    self.assertEqual(len(links), 2)
+
+    def test_misnested_markup(self):
+        """Test that repaired misnested markup keeps its words and link targets"""
+        for name, html in MISNESTED.items():
+            expected = convert_html(html, 'https://example.com/', 60, COLORS, 'html.parser')
+            for parser in available_parsers():
+                with self.subTest(document=name, parser=parser):
+                    lines, links, forms = convert_html(html, 'https://example.com/', 60, COLORS, parser)
+                    self.assertEqual(MARKUP.sub('', ' '.join(lines)).split(),
+                                     MARKUP.sub('', ' '.join(expected[0])).split())
+                    self.assertEqual(list(dict.fromkeys(link['url'] for link in links)),
+                                     list(dict.fromkeys(link['url'] for link in expected[1])))
+                    self.assertEqual(forms, expected[2])
+
+    def test_link_reopened_by_html5(self):
+        """Test the expected link numbering difference of HTML5 parsers"""
+        # selectolax (and html5-parser) reopen a link cut off by </p> in the
+        # next paragraph, so its text there gets a second number
+        html = MISNESTED['link across paragraphs']
+        expected = {
+            'html.parser': ['A [0] link that', '', 'spans paragraphs after'],
+            'lxml': ['A [0] link that', '', 'spans paragraphs after'],
+            'selectolax': ['A [0] link that', '', '[1] spans paragraphs after'],
+            'html5-parser': ['A [0] link that', '', '[1] spans paragraphs after'],
+        }
+        for parser in available_parsers():
+            with self.subTest(parser=parser):
+                lines, links, forms = convert_html(html, 'https://example.com/', 60, COLORS, parser)
+                self.assertEqual(lines, expected[parser])
+                self.assertEqual({link['url'] for link in links}, {'https://example.com/1'})
+
+    def test_reference_output(self):
+        """Test the shared output against known values"""
+        lines, links, forms = convert_html(DOCUMENTS['article'], 'https://example.com/dir/page',
+                                           60, COLORS, 'html.parser')
+        self.assertEqual([link['url'] for link in links], [
+            'https://example.com/',
+            'https://example.com/about',
+            'https://other.org/page',
+            'https://example.com/dir/item1',
+        ])
+        self.assertIn('# The _Main_ Title', lines)
+        self.assertIn('alpha | «red»1«/red»', lines)
+        self.assertEqual(len(forms), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,250 @@
+"""
+Tests for background prefetching of numbered links
+"""
+
+import unittest
+from unittest.mock import Mock, MagicMock, patch
+import sys
+import os
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock curses before importing with proper key constants
+mock_curses = MagicMock()
+mock_curses.KEY_UP = 259
+mock_curses.KEY_DOWN = 258
+mock_curses.KEY_PPAGE = 339
+mock_curses.KEY_NPAGE = 338
+mock_curses.KEY_HOME = 262
+mock_curses.KEY_END = 360
+sys.modules['curses'] = mock_curses
+
+from browser import Browser
+from fetcher import Fetcher
+from prefetch import Prefetcher, origin
+from tests.helpers import LocalServerTestCase
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    """Small site with a robots.txt, counting requests per path"""
+
+    protocol_version = 'HTTP/1.1'
+    hits = Counter()
+    gate = threading.Event()
+
+    def do_GET(self):
+        self.hits[self.path] += 1
+        if self.path == '/robots.txt':
+            body = b"User-agent: *\nDisallow: /private\n"
+            content_type = 'text/plain'
+        elif self.path == '/big':
+            body = b"<html><body>" + b"<p>filler</p>" * 10000 + b"</body></html>"
+            content_type = 'text/html'
+        elif self.path == '/image.png':
+            body = b"\x89PNG"
+            content_type = 'image/png'
+        else:
+            if self.path == '/slow':
+                self.gate.wait(5)
+            body = (f"<html><body><h1>Page {self.path}</h1>"
+                    + "".join(f"<p>Paragraph {n} of {self.path}</p>" for n in range(12))
+                    + "</body></html>").encode('utf-8')
+            content_type = 'text/html; charset=utf-8'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PrefetchTestCase(LocalServerTestCase):
+    """Runs SiteHandler on a free local port"""
+
+    handler = SiteHandler
+
+    @classmethod
+    def tearDownClass(cls):
+        SiteHandler.gate.set()
+        super().tearDownClass()
+
+    def setUp(self):
+        SiteHandler.hits.clear()
+        SiteHandler.gate.clear()
+        self.fetcher = Fetcher()
+        self.prefetcher = Prefetcher(self.fetcher, max_links=3)
+
+    def tearDown(self):
+        SiteHandler.gate.set()
+        self.prefetcher.close()
+        self.fetcher.close()
+
+    def url(self, path):
+        return self.base_url + path
+
+
+class TestPrefetcher(PrefetchTestCase):
+    """Test the prefetch policies and store"""
+
+    def test_prefetches_first_links(self):
+        """Test that only the first max_links pages are fetched"""
+        urls = [self.url(f'/p{n}') for n in range(6)]
+        self.assertEqual(self.prefetcher.start(self.url('/'), urls), 3)
+        self.prefetcher.wait(5)
+
+        self.assertEqual(SiteHandler.hits['/p0'], 1)
+        self.assertEqual(SiteHandler.hits['/p3'], 0)
+        self.assertIn('Page /p1', self.prefetcher.take(self.url('/p1')))
+        self.assertIsNone(self.prefetcher.take(self.url('/p1')))  # Taken once
+        self.assertIsNone(self.prefetcher.take(self.url('/p4')))
+        self.assertEqual(self.prefetcher.stats()['hits'], 1)
+
+    def test_same_origin_only(self):
+        """Test that links to other sites and schemes are skipped"""
+        urls = ['http://other.invalid/page', 'ftp://127.0.0.1/file', self.url('/local')]
+        self.assertEqual(self.prefetcher.start(self.url('/'), urls), 1)
+        self.prefetcher.wait(5)
+        self.assertIsNotNone(self.prefetcher.take(self.url('/local')))
+
+        self.assertEqual(origin('HTTP://Example.com:8080/a?b'), 'http://example.com:8080')
+
+    def test_respects_robots(self):
+        """Test that robots.txt is fetched once and obeyed"""
+        urls = [self.url('/private/secret'), self.url('/public')]
+        self.prefetcher.start(self.url('/'), urls)
+        self.prefetcher.wait(5)
+
+        self.assertEqual(SiteHandler.hits['/robots.txt'], 1)
+        self.assertEqual(SiteHandler.hits['/private/secret'], 0)
+        self.assertEqual(SiteHandler.hits['/public'], 1)
+        self.assertEqual(self.prefetcher.stats()['skipped'], 1)
+
+    def test_byte_budget(self):
+        """Test that pages over the per-page or total budget are dropped"""
+        prefetcher = Prefetcher(self.fetcher, page_bytes=64 * 1024, respect_robots=False)
+        prefetcher.start(self.url('/'), [self.url('/big'), self.url('/small')])
+        prefetcher.wait(5)
+        self.assertIsNone(prefetcher.take(self.url('/big')))
+        self.assertIsNotNone(prefetcher.take(self.url('/small')))
+        self.assertEqual(prefetcher.stats()['aborted'], 1)
+        prefetcher.close()
+
+        prefetcher = Prefetcher(self.fetcher, budget_bytes=600, respect_robots=False)
+        prefetcher.start(self.url('/'), [self.url('/one'), self.url('/two')])
+        prefetcher.wait(5)
+        self.assertEqual(prefetcher.stats()['fetched'], 1)
+        prefetcher.close()
+
+    def test_skips_non_html(self):
+        """Test that images and other downloads are not stored"""
+        self.prefetcher.start(self.url('/'), [self.url('/image.png')])
+        self.prefetcher.wait(5)
+        self.assertIsNone(self.prefetcher.take(self.url('/image.png')))
+
+    def test_cancel(self):
+        """Test that cancelling drops queued fetches and discards the running one"""
+        prefetcher = Prefetcher(self.fetcher, workers=1, respect_robots=False)
+        prefetcher.start(self.url('/'), [self.url('/slow'), self.url('/queued')])
+        time.sleep(0.1)
+        prefetcher.cancel()
+        SiteHandler.gate.set()
+        prefetcher._executor.shutdown(wait=True)
+
+        self.assertEqual(SiteHandler.hits['/queued'], 0)
+        self.assertEqual(prefetcher.stats()['fetched'], 0)
+
+    def test_render_callback(self):
+        """Test that pages are pre-rendered on the worker"""
+        rendered = []
+        self.prefetcher.start(self.url('/'), [self.url('/r')],
+                              render=lambda html, url: rendered.append(url))
+        self.prefetcher.wait(5)
+        self.assertEqual(rendered, [self.url('/r')])
+
+    def test_store_budget(self):
+        """Test that the store evicts least recently stored pages"""
+        prefetcher = Prefetcher(self.fetcher, store_bytes=1000)
+        prefetcher._put('a', 'x' * 600)
+        prefetcher._put('b', 'x' * 600)
+        self.assertIsNone(prefetcher.take('a'))
+        self.assertIsNotNone(prefetcher.take('b'))
+        self.assertEqual(prefetcher.stats()['evictions'], 1)
+        prefetcher.close()
+
+
+class TestBrowserPrefetch(PrefetchTestCase):
+    """Test that following a prefetched link skips the network"""
+
+    def setUp(self):
+        super().setUp()
+        self.mock_stdscr = Mock()
+        self.mock_stdscr.getmaxyx.return_value = (24, 80)
+        self.env = patch.dict(os.environ, {'OPENAI_API_KEY': '', 'TEXTBROWSER_PREFETCH': '5'})
+        self.env.start()
+        self.browser = Browser(self.mock_stdscr, fetcher=self.fetcher)
+
+    def tearDown(self):
+        self.browser.prefetcher.close()
+        self.env.stop()
+        super().tearDown()
+
+    def test_env_enables_prefetch(self):
+        """Test that TEXTBROWSER_PREFETCH sets the number of links"""
+        self.assertEqual(self.browser.prefetcher.max_links, 5)
+        with patch.dict(os.environ, {'TEXTBROWSER_PREFETCH': ''}):
+            self.assertIsNone(Browser(self.mock_stdscr, fetcher=self.fetcher).prefetcher)
+
+    def test_follow_prefetched_link(self):
+        """Test that a prefetched page is shown without a request or conversion"""
+        html = '<html><body>' + ''.join(
+            f'<p><a href="/next{n}">Next {n}</a></p>' for n in range(3)) + '</body></html>'
+        with patch.object(Browser, 'read_page', return_value=(html, self.url('/start'))):
+            self.browser.fetch_page(self.url('/start'))
+        self.browser.prefetcher.wait(5)
+        self.assertEqual(SiteHandler.hits['/next1'], 1)
+        misses = self.browser.page_cache.misses
+
+        self.browser.navigate(self.browser.fetch_page, self.browser.links[1]['url'])
+
+        self.assertEqual(SiteHandler.hits['/next1'], 1)
+        self.assertEqual(self.browser.page_cache.misses, misses)
+        self.assertEqual(self.browser.current_url, self.url('/next1'))
+        self.assertEqual(self.browser.page_content[0], '# Page /next1')
+        self.assertEqual(self.browser.history.back_stack[-1].url, self.url('/start'))
+
+    def test_navigation_cancels_prefetch(self):
+        """Test that going back abandons prefetches for the page being left"""
+        self.browser.set_page_lines(['Old'])
+        self.browser.current_url = self.url('/old')
+        html = '<html><body><a href="/slow">Slow</a> <a href="/later">Later</a></body></html>'
+        with patch.object(Browser, 'read_page', return_value=(html, self.url('/start'))):
+            self.browser.navigate(self.browser.fetch_page, self.url('/start'))
+        self.browser.prefetcher.wait(0.2)
+
+        self.browser.go_back()
+        SiteHandler.gate.set()
+        self.browser.prefetcher._executor.shutdown(wait=True)
+        self.assertIsNone(self.browser.prefetcher.take(self.url('/slow')))
+        self.assertEqual(self.browser.prefetcher.stats()['aborted'], 1)
+
+
+    def test_other_page_cancels_prefetch(self):
+        """Test that showing help abandons prefetches for the page being left"""
+        html = '<html><body><a href="/slow">Slow</a> <a href="/later">Later</a></body></html>'
+        with patch.object(Browser, 'read_page', return_value=(html, self.url('/start'))):
+            self.browser.navigate(self.browser.fetch_page, self.url('/start'))
+        with patch.object(self.browser.prefetcher, 'cancel') as cancel:
+            self.browser.navigate(self.browser.show_help)
+        cancel.assert_called_once_with()
+        SiteHandler.gate.set()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+Tests for re-wrapping pages when the terminal is resized
+"""
+
+import unittest
+from unittest.mock import Mock, MagicMock, patch
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock curses before importing with proper key constants
+mock_curses = MagicMock()
+mock_curses.KEY_UP = 259
+mock_curses.KEY_DOWN = 258
+mock_curses.KEY_PPAGE = 339
+mock_curses.KEY_NPAGE = 338
+mock_curses.KEY_HOME = 262
+mock_curses.KEY_END = 360
+mock_curses.KEY_RESIZE = 410
+sys.modules['curses'] = mock_curses
+
+import core as core_module
+from browser import Browser
+from document import Document
+from htmltext import convert_blocks, convert_html
+
+
+def article(paragraphs=300):
+    """A page of long paragraphs that wrap differently at each width"""
+    parts = ["<html><body><h1>Article</h1>"]
+    for n in range(paragraphs):
+        parts.append(f"<p>Paragraph {n} says something long enough to wrap over several "
+                     f"lines on a narrow terminal and fewer on a wide one, see "
+                     f"<a href=\"/note/{n}\">note {n}</a>.</p>")
+    parts.append("</body></html>")
+    return ''.join(parts)
+
+
+class TestDocumentReflow(unittest.TestCase):
+    """Test re-wrapping a Document from its blocks"""
+
+    def setUp(self):
+        self.html = article()
+        self.blocks, _, _ = convert_blocks(self.html, 'https://example.com/')
+
+    def test_reflow_matches_converting_at_the_new_width(self):
+        """Test that re-wrapped lines are the lines a fresh conversion gives"""
+        doc = Document(list(self.blocks), 60)
+        doc.reflow(100)
+        self.assertEqual(list(doc), convert_html(self.html, 'https://example.com/', 100)[0])
+        self.assertEqual(len(doc), len(list(doc)))
+
+    def test_anchor_keeps_the_paragraph(self):
+        """Test that the top line stays in the same paragraph across widths"""
+        doc = Document(list(self.blocks), 40)
+        top = next(i for i, line in enumerate(doc) if line.startswith('Paragraph 150 '))
+        for width in (100, 25, 60, 40):
+            top = doc.reflow(width, top)
+            self.assertTrue(doc[top].startswith('Paragraph 150 '), (width, doc[top]))
+
+    def test_anchor_inside_a_paragraph(self):
+        """Test that a top line partway through a paragraph stays in it"""
+        doc = Document(list(self.blocks), 30)
+        start = next(i for i, line in enumerate(doc) if line.startswith('Paragraph 200 '))
+        top = doc.reflow(50, start + 2)
+        block, offset = doc.block_at(top)
+        self.assertIn('Paragraph 200 ', doc.blocks[block][2])
+        self.assertEqual(offset, 2)
+
+
+class TestBrowserResize(unittest.TestCase):
+    """Test that resizing the terminal re-wraps the current page"""
+
+    def setUp(self):
+        self.mock_stdscr = Mock()
+        self.mock_stdscr.getmaxyx.return_value = (24, 80)
+        with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
+            self.browser = Browser(self.mock_stdscr)
+        self.html = article()
+        with patch.object(Browser, 'read_page', return_value=(self.html, 'https://example.com/a')):
+            self.browser.navigate(self.browser.fetch_page, 'https://example.com/a')
+
+    def resize(self, width):
+        self.mock_stdscr.getmaxyx.return_value = (24, width)
+        self.browser.handle_input(mock_curses.KEY_RESIZE)
+        self.browser.render()
+
+    def test_resize_without_fetch_or_parse(self):
+        """Test that a resize neither fetches nor converts the page"""
+        browser = self.browser
+        with patch.object(Browser, 'read_page') as mock_read, \
+                patch.object(core_module, 'convert_blocks') as mock_convert, \
+                patch.object(core_module, 'StreamConverter') as mock_stream:
+            self.resize(120)
+            mock_read.assert_not_called()
+            mock_convert.assert_not_called()
+            mock_stream.assert_not_called()
+
+        self.assertEqual(browser.page_content.width, 116)
+        self.assertTrue(all(len(line) <= 116 for line in browser.page_content))
+        self.assertIn('[0] note 0', browser.page_content)
+
+    def test_resize_keeps_scroll_paragraph(self):
+        """Test that the line at the top of the screen stays in its paragraph"""
+        browser = self.browser
+        browser.scroll_offset = next(i for i, line in enumerate(browser.page_content)
+                                     if line.startswith('Paragraph 120 '))
+        self.resize(50)
+        self.assertTrue(browser.page_content[browser.scroll_offset].startswith('Paragraph 120 '))
+        self.resize(140)
+        self.assertTrue(browser.page_content[browser.scroll_offset].startswith('Paragraph 120 '))
+
+    def test_resize_redraws_everything(self):
+        """Test that the next frame is drawn from scratch"""
+        self.browser.render()
+        self.mock_stdscr.clear.reset_mock()
+        self.resize(100)
+        self.mock_stdscr.clear.assert_called_once()
+        self.mock_stdscr.scroll.assert_not_called()
+
+    def test_history_page_fits_new_width(self):
+        """Test that going back re-wraps a page left at another width"""
+        browser = self.browser
+        with patch.object(Browser, 'read_page',
+                          return_value=('<p>Second page</p>', 'https://example.com/b')):
+            browser.navigate(browser.fetch_page, 'https://example.com/b')
+        browser.history.back_stack[-1].pack()
+        self.resize(60)
+        browser.go_back()
+        browser.render()
+        self.assertIsInstance(browser.page_content, Document)
+        self.assertEqual(browser.page_content.width, 56)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+Tests for the headless render command
+"""
+
+import io
+import json
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core import BrowserCore
+from render import main, read_targets
+from tests.helpers import LocalServerTestCase
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+    """Numbered pages that each take a moment to arrive"""
+
+    protocol_version = 'HTTP/1.1'
+    delay = 0.2
+
+    def do_GET(self):
+        if self.path == '/missing':
+            self.send_error(404)
+            return
+        time.sleep(self.delay)
+        body = (f"<html><body><h1>Intranet {self.path}</h1>"
+                + ''.join(f"<p>Paragraph {n} on {self.path}.</p>" for n in range(12))
+                + '<a href="/home">Home</a> <a href="/about">About</a>'
+                + "</body></html>").encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestRender(LocalServerTestCase):
+    """Test rendering batches of pages to JSON lines and text"""
+
+    handler = RenderHandler
+
+    def setUp(self):
+        self.env = patch.dict(os.environ, {'TEXTBROWSER_CACHE_DIR': '', 'TEXTBROWSER_PREFETCH': ''})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+
+    def render(self, argv, stdin=''):
+        out, err = io.StringIO(), io.StringIO()
+        status = main(argv, stdin=io.StringIO(stdin), stdout=out, stderr=err)
+        return status, out.getvalue(), err.getvalue()
+
+    def test_jsonl_matches_browser_text(self):
+        """Test that each record holds the text the browser shows for the page"""
+        urls = [f"{self.base_url}/page{n}" for n in range(3)]
+        status, out, err = self.render(['--width', '50'] + urls)
+        self.assertEqual(status, 0)
+        records = sorted((json.loads(line) for line in out.splitlines()), key=lambda r: r['index'])
+        self.assertEqual([record['url'] for record in records], urls)
+
+        core = BrowserCore(width=50)
+        core.fetch_page(urls[1])
+        self.assertEqual(records[1]['text'], '\n'.join(core.page_content))
+        self.assertIn('[0] Home', records[1]['text'])
+        self.assertEqual(records[1]['links'], [self.base_url + '/home', self.base_url + '/about'])
+        self.assertTrue(all(record['ok'] for record in records))
+
+    def test_parallel_fetches(self):
+        """Test that pages are fetched concurrently, up to --jobs at once"""
+        targets = '\n'.join(f"{self.base_url}/p{n}" for n in range(8))
+        start = time.monotonic()
+        status, out, err = self.render(['--jobs', '8', '--stats'], stdin=targets)
+        elapsed = time.monotonic() - start
+        self.assertEqual(len(out.splitlines()), 8)
+        self.assertLess(elapsed, 8 * RenderHandler.delay / 2)
+        self.assertIn('8 pages rendered, 0 failed', err)
+
+    def test_text_in_input_order_with_files(self):
+        """Test plain text output, local files and an input list with comments"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'local.html')
+            with open(path, 'w') as f:
+                f.write('<h1>Local file</h1>' + '<p>Text.</p>' * 12)
+            listing = os.path.join(tmp, 'targets.txt')
+            with open(listing, 'w') as f:
+                f.write(f"# intranet\n{self.base_url}/slow\n\n{path}\n")
+            status, out, err = self.render(['--format', 'text', '--input', listing])
+
+        self.assertEqual(status, 0)
+        self.assertLess(out.index(f"==> {self.base_url}/slow <=="), out.index(f"==> {path} <=="))
+        self.assertIn('# Local file', out)
+
+    def test_failures(self):
+        """Test that a failed page is reported and sets the exit status"""
+        status, out, err = self.render([self.base_url + '/missing', self.base_url + '/ok'])
+        self.assertEqual(status, 1)
+        records = {record['url']: record for record in map(json.loads, out.splitlines())}
+        self.assertFalse(records[self.base_url + '/missing']['ok'])
+        self.assertIn('404', records[self.base_url + '/missing']['error'])
+        self.assertTrue(records[self.base_url + '/ok']['ok'])
+
+    def test_read_targets(self):
+        """Test skipping blank lines and comments"""
+        self.assertEqual(read_targets(['a.html\n', '\n', '# note\n', ' https://x.org \n']),
+                         ['a.html', 'https://x.org'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+"""
+Tests for frame-diffing screen output
+"""
+
+import unittest
+from unittest.mock import Mock, MagicMock, patch
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock curses before importing with proper key constants
+mock_curses = MagicMock()
+mock_curses.KEY_UP = 259
+mock_curses.KEY_DOWN = 258
+mock_curses.KEY_PPAGE = 339
+mock_curses.KEY_NPAGE = 338
+mock_curses.KEY_HOME = 262
+mock_curses.KEY_END = 360
+sys.modules['curses'] = mock_curses
+
+import browser as browser_module
+from browser import Browser
+from screen import Screen
+
+
+def frame(*texts):
+    return [((0, text, 0),) if text else () for text in texts]
+
+
+class TestScreen(unittest.TestCase):
+    """Test that only changed rows are written"""
+
+    def setUp(self):
+        self.window = Mock()
+        self.window.getmaxyx.return_value = (4, 20)
+        self.screen = Screen(self.window)
+
+    def drawn_rows(self):
+        rows = [c.args[0] for c in self.window.addstr.call_args_list]
+        self.window.reset_mock()
+        return rows
+
+    def test_first_frame_draws_everything(self):
+        """Test that the first frame clears and draws every row"""
+        self.screen.draw(frame('a', 'b', 'c', 'd'))
+        self.window.clear.assert_called_once()
+        self.window.noutrefresh.assert_called_once()
+        self.assertEqual(self.drawn_rows(), [0, 1, 2, 3])
+
+    def test_unchanged_frame_sends_nothing(self):
+        """Test that redrawing the same frame writes no rows"""
+        self.screen.draw(frame('a', 'b', 'c', 'd'))
+        self.drawn_rows()
+        self.screen.draw(frame('a', 'b', 'c', 'd'))
+        self.assertEqual(self.drawn_rows(), [])
+        self.window.clear.assert_not_called()
+
+    def test_only_changed_rows(self):
+        """Test that a changed row is cleared and rewritten alone"""
+        self.screen.draw(frame('a', 'b', 'c', 'd'))
+        self.drawn_rows()
+        self.screen.draw(frame('a', 'B', 'c', 'd'))
+        self.window.clrtoeol.assert_called_once()
+        self.assertEqual(self.drawn_rows(), [1])
+
+    def test_scroll_redraws_exposed_rows(self):
+        """Test that scrolling uses the scroll region and draws the new row"""
+        self.screen.draw(frame('status', 'one', 'two', 'help'))
+        self.drawn_rows()
+
+        self.screen.scroll(1, 2, 1)
+        self.window.setscrreg.assert_any_call(1, 2)
+        self.window.scroll.assert_called_once_with(1)
+        self.screen.draw(frame('status', 'two', 'three', 'help'))
+        self.assertEqual(self.drawn_rows(), [2])
+
+        self.screen.scroll(1, 2, -1)
+        self.screen.draw(frame('status', 'one', 'two', 'help'))
+        self.assertEqual(self.drawn_rows(), [1])
+
+    def test_large_scroll_is_a_redraw(self):
+        """Test that scrolling past the region just redraws it"""
+        self.screen.draw(frame('status', 'one', 'two', 'help'))
+        self.window.reset_mock()
+        self.screen.scroll(1, 2, 5)
+        self.window.scroll.assert_not_called()
+
+    def test_invalidate_and_resize(self):
+        """Test that invalidating or resizing draws from scratch"""
+        self.screen.draw(frame('a', 'b', 'c', 'd'))
+        self.screen.invalidate()
+        self.window.reset_mock()
+        self.screen.draw(frame('a', 'b', 'c', 'd'))
+        self.assertEqual(len(self.drawn_rows()), 4)
+
+        self.window.getmaxyx.return_value = (5, 20)
+        self.screen.draw(frame('a', 'b', 'c', 'd', 'e'))
+        self.window.clear.assert_called_once()
+
+    def test_touch(self):
+        """Test that touch marks the window for repair after a popup"""
+        self.screen.touch()
+        self.window.touchwin.assert_called_once()
+
+
+class TestBrowserRendering(unittest.TestCase):
+    """Test what the browser sends per key press"""
+
+    def setUp(self):
+        self.mock_stdscr = Mock()
+        self.mock_stdscr.getmaxyx.return_value = (24, 80)
+        with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
+            self.browser = Browser(self.mock_stdscr)
+        self.browser.set_page_lines([f"Line {i}" for i in range(100)])
+        self.browser.render()
+        self.mock_stdscr.reset_mock()
+
+    def test_scroll_one_line(self):
+        """Test that the down arrow scrolls and draws one page row plus the indicator"""
+        self.browser.handle_input(browser_module.curses.KEY_DOWN)
+        self.browser.render()
+
+        self.mock_stdscr.scroll.assert_called_once_with(1)
+        self.mock_stdscr.clear.assert_not_called()
+        rows = [c.args[0] for c in self.mock_stdscr.addstr.call_args_list]
+        self.assertEqual(sorted(set(rows)), [22, 23])
+        self.assertEqual(self.mock_stdscr.addstr.call_args_list[0].args[2], 'Line 22')
+
+    def test_idle_frame_sends_nothing(self):
+        """Test that an unchanged frame writes nothing"""
+        self.browser.render()
+        self.mock_stdscr.addstr.assert_not_called()
+
+    def test_new_page_redraws_rows(self):
+        """Test that a new page is drawn without a scroll"""
+        self.browser.set_page_lines(["Other"])
+        self.browser.render()
+        self.mock_stdscr.scroll.assert_not_called()
+        self.assertTrue(self.mock_stdscr.addstr.called)
+
+    def test_lines_styled_once_per_page(self):
+        """Test that scrolling back over lines reuses their styled runs"""
+        with patch('browser.style_runs', wraps=browser_module.style_runs) as styled:
+            for _ in range(5):
+                self.browser.handle_input(browser_module.curses.KEY_DOWN)
+                self.browser.render()
+            for _ in range(5):
+                self.browser.handle_input(browser_module.curses.KEY_UP)
+                self.browser.render()
+        self.assertEqual(styled.call_count, 5)  # Only the newly exposed lines
+
+        self.browser.page_content.extend(["Streamed"])
+        self.assertEqual(self.browser.page_runs(100, 101, 80)[0][0][1], "Streamed")
+
+    def test_line_runs(self):
+        """Test splitting color markers into attribute runs"""
+        runs = self.browser.line_runs("«red»Error«/red» done", 80)
+        self.assertEqual([(x, text) for x, text, attr in runs], [(0, 'Error'), (5, ' done')])
+        self.assertEqual(self.browser.line_runs("", 80), ())
+        self.assertEqual(self.browser.line_runs("# Title", 4)[0][1], "# Ti")
+        clipped = self.browser.line_runs("«red»Error«/red» done", 7)
+        self.assertEqual([text for x, text, attr in clipped], ['Error', ' d'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,238 @@
+"""
+Tests for indexed in-page search
+"""
+
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock curses before importing with proper key constants
+mock_curses = MagicMock()
+mock_curses.KEY_UP = 259
+mock_curses.KEY_DOWN = 258
+mock_curses.KEY_LEFT = 260
+mock_curses.KEY_RIGHT = 261
+mock_curses.KEY_PPAGE = 339
+mock_curses.KEY_NPAGE = 338
+mock_curses.KEY_HOME = 262
+mock_curses.KEY_END = 360
+mock_curses.KEY_DC = 330
+mock_curses.KEY_BACKSPACE = 263
+mock_curses.KEY_RESIZE = 410
+mock_curses.A_NORMAL = 0
+mock_curses.A_BOLD = 0x200000
+sys.modules['curses'] = mock_curses
+
+import browser as browser_module
+import terminal as terminal_module
+from browser import Browser
+from document import Document
+from pagecache import PageCache
+from search import PageIndex, line_matches
+from terminal import Terminal
+from tests.helpers import patch_curses_colors
+
+
+class TestPageIndex(unittest.TestCase):
+    """Test finding text in a page's lines"""
+
+    def setUp(self):
+        self.lines = [
+            "# Gophers",
+            "",
+            "The «red»Gopher«/red» protocol predates the web.",
+            "Gophers dig tunnels; gopher holes are everywhere.",
+            "Nothing to see here.",
+        ]
+        self.index = PageIndex(self.lines)
+
+    def test_find_and_lines(self):
+        """Test matches ignoring case, mapped back to their lines"""
+        first = self.index.find('GOPHER')
+        self.assertEqual(self.index.line_of(first), 0)
+        second = self.index.find('gopher', first + 1)
+        self.assertEqual(self.index.line_of(second), 2)
+        # Color markers are not part of the text searched
+        self.assertEqual(second - self.index.offset_of(2), 4)
+        self.assertEqual(self.index.total('gopher'), 4)
+        self.assertEqual(self.index.ordinal('gopher', second), 2)
+
+    def test_wrap_around(self):
+        """Test that searching past the last match starts again at the top"""
+        last = self.index.find('gopher', self.index.offset_of(3) + 10)
+        self.assertEqual(self.index.line_of(last), 3)
+        self.assertEqual(self.index.find('gopher', last + 1), self.index.find('gopher'))
+
+    def test_backwards(self):
+        """Test finding the previous match, wrapping to the last one"""
+        first = self.index.find('gopher')
+        second = self.index.find('gopher', first + 1)
+        self.assertEqual(self.index.find('gopher', second, backwards=True), first)
+        last = self.index.find('gopher', first, backwards=True)
+        self.assertEqual(self.index.line_of(last), 3)
+        self.assertEqual(self.index.ordinal('gopher', last), 4)
+
+    def test_not_found(self):
+        """Test queries that match nothing, or would span lines"""
+        self.assertIsNone(self.index.find('ferret'))
+        self.assertIsNone(self.index.find('web.\nGophers'))
+        self.assertIsNone(self.index.find(''))
+        self.assertEqual(self.index.total('ferret'), 0)
+
+    def test_counting_from_the_end(self):
+        """Test match numbers past the middle, also for queries that overlap themselves"""
+        index = PageIndex(["abab ab", "x" * 20, "ababab abab", "aaaa aa"])
+        last = index.find('ab', index.offset_of(3), backwards=True)
+        self.assertEqual(index.ordinal('ab', last), index.total('ab'))
+        self.assertEqual(index.ordinal('aba', index.find('aba', index.offset_of(2))), 2)
+        self.assertEqual(index.ordinal('aa', index.find('aa', index.offset_of(3) + 5)), 3)
+        # Typing on from a query with no matches
+        self.assertEqual(index.total('zz'), 0)
+        self.assertIsNone(index.find('zzab'))
+
+    def test_line_matches(self):
+        """Test the columns highlighted in one line"""
+        self.assertEqual(line_matches(self.lines[3], 'GOPHER'), [(0, 6), (21, 27)])
+        self.assertEqual(line_matches(self.lines[2], 'gopher'), [(4, 10)])
+        self.assertEqual(line_matches(self.lines[4], 'gopher'), [])
+
+    def test_covers(self):
+        """Test that a grown or re-wrapped page needs a new index"""
+        lines = list(self.lines)
+        index = PageIndex(lines)
+        self.assertTrue(index.covers(lines))
+        self.assertFalse(index.covers(list(lines)))
+        lines.append("Streamed in later.")
+        self.assertFalse(index.covers(lines))
+
+        document = Document([('p', '', "A paragraph about gophers. " * 20, False)], 40)
+        index = PageIndex(document)
+        self.assertTrue(index.covers(document))
+        document.reflow(60)
+        self.assertFalse(index.covers(document))
+
+    def test_big_page_keystrokes(self):
+        """Test that each keystroke on a 100,000-line page takes well under a frame"""
+        lines = [f"Line {n}: some text about item {n % 977} and more words" for n in range(100000)]
+        lines[99990] = "The needle is here."
+        index = PageIndex(lines)
+        start = time.perf_counter()
+        for query in ('n', 'ne', 'nee', 'need', 'needl', 'needle'):
+            found = index.find(query, 0)
+            index.ordinal(query, found)
+            index.total(query)
+        per_key = (time.perf_counter() - start) / 6
+        self.assertEqual(index.line_of(found), 99990)
+        self.assertLess(per_key, 0.05)
+
+
+class TestBrowserSearch(unittest.TestCase):
+    """Test the / prompt, n/N and highlighting in the browser"""
+
+    def setUp(self):
+        self.env = patch.dict(os.environ, {'OPENAI_API_KEY': '', 'TEXTBROWSER_CACHE_DIR': '',
+                                           'TEXTBROWSER_PREFETCH': ''})
+        self.env.start()
+        self.colors = patch_curses_colors(browser_module.curses)
+        self.colors.start()
+        # The same backspace key code for the terminal and the browser
+        self.keys = patch.object(terminal_module.curses, 'KEY_BACKSPACE', browser_module.curses.KEY_BACKSPACE)
+        self.keys.start()
+        self.terminal = Terminal(lambda data: None, 24, 80)
+        self.browser = Browser(self.terminal.stdscr, page_cache=PageCache(), term=self.terminal)
+        self.browser.set_page_lines([f"Line {n} of the page" for n in range(200)]
+                                    + ["A needle in the haystack", "Another NEEDLE below"]
+                                    + [f"Line {n} after" for n in range(50)])
+
+    def tearDown(self):
+        self.keys.stop()
+        self.colors.stop()
+        self.env.stop()
+
+    def search(self, typed: bytes):
+        self.terminal.feed(typed)
+        self.browser.handle_input(ord('/'))
+
+    def highlighted(self) -> list:
+        """(row, text) of every highlighted run on screen"""
+        attr = self.terminal.color_pair(8)
+        frame = self.browser.frame(24, 80)
+        return [(y, text) for y, row in enumerate(frame) for x, text, run_attr in row
+                if run_attr == attr]
+
+    def test_find_as_you_type(self):
+        """Test typing a query, jumping to and highlighting the match"""
+        self.search(b'needle\r')
+        browser = self.browser
+        self.assertEqual(browser.search_query, 'needle')
+        self.assertIsNone(browser.search_prompt)
+        self.assertTrue(browser.scroll_offset <= 200 < browser.scroll_offset + 22)
+        row = 200 - browser.scroll_offset + 1
+        self.assertEqual(self.highlighted(), [(row, 'needle'), (row + 1, 'NEEDLE')])
+        self.assertIn('n/N: Next/Prev match', ''.join(text for x, text, attr in browser.frame(24, 80)[-1]))
+
+    def test_prompt_status(self):
+        """Test the match count shown while typing, and backspace"""
+        browser = self.browser
+        statuses = []
+        render = browser.render
+
+        def record():
+            render()
+            statuses.append(browser.search_status())
+        browser.render = record
+        self.search(b'needlex\x7f\r')
+        self.assertIn(' /needle  match 1 of 2', statuses)
+        self.assertIn(' /needlex  not found', statuses)
+        self.assertEqual(browser.search_query, 'needle')
+
+    def test_next_and_previous(self):
+        """Test n and N moving between matches and wrapping around"""
+        browser = self.browser
+        self.search(b'needle\r')
+        index = browser.page_index()
+        self.assertEqual(index.line_of(browser.search_match), 200)
+        browser.handle_input(ord('n'))
+        self.assertEqual(index.line_of(browser.search_match), 201)
+        browser.handle_input(ord('n'))
+        self.assertEqual(index.line_of(browser.search_match), 200)
+        browser.handle_input(ord('N'))
+        self.assertEqual(index.line_of(browser.search_match), 201)
+
+    def test_escape_goes_back(self):
+        """Test that Esc in the prompt returns to where the search started"""
+        browser = self.browser
+        browser.scroll_offset = 10
+        self.search(b'needle\x1b')
+        self.assertEqual(browser.scroll_offset, 10)
+        self.assertEqual(browser.search_query, '')
+        self.assertEqual(self.highlighted(), [])
+
+    def test_escape_clears_highlight(self):
+        """Test that Esc after a search removes the highlight"""
+        self.search(b'line 1\r')
+        self.assertTrue(self.highlighted())
+        self.browser.handle_input(27)
+        self.assertEqual(self.highlighted(), [])
+
+    def test_index_built_once(self):
+        """Test that the page is indexed once, and again only when it changes"""
+        browser = self.browser
+        with patch('core.PageIndex', wraps=PageIndex) as index_class:
+            self.search(b'line\r')
+            browser.handle_input(ord('n'))
+            browser.handle_input(ord('n'))
+            self.assertEqual(index_class.call_count, 1)
+            browser.set_page_lines(["A new page about lines"])
+            browser.handle_input(ord('n'))
+            self.assertEqual(index_class.call_count, 2)
+        self.assertEqual(browser.search_match, len('A new page about '))
+
+
+if __name__ == '__main__':
+    unittest.main()
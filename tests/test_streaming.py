@@ -0,0 +1,227 @@
+"""
+Tests for streaming pages: incremental conversion while the body downloads
+"""
+
+import unittest
+from unittest.mock import Mock, MagicMock, patch
+import sys
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock curses before importing with proper key constants
+mock_curses = MagicMock()
+mock_curses.KEY_UP = 259
+mock_curses.KEY_DOWN = 258
+mock_curses.KEY_PPAGE = 339
+mock_curses.KEY_NPAGE = 338
+mock_curses.KEY_HOME = 262
+mock_curses.KEY_END = 360
+sys.modules['curses'] = mock_curses
+
+from browser import Browser
+from fetcher import Fetcher
+from httpcache import HTTPCache
+from htmltext import StreamConverter, available_parsers, convert_html
+from tests.helpers import LocalServerTestCase
+
+
+SAMPLE_HTML = """
+<html><head><title>T</title><style>p { color: red }</style></head><body>
+<h1>Streaming &amp; more</h1>
+<p>First <b>bold</b> paragraph with <a href="/one">a link</a> and caf&eacute;.</p>
+<!-- a comment --> tail text
+<ul><li>One</li><li>Two <a href="two.html">second</a></li></ul>
+<pre>code line 1
+  code line 2</pre>
+<blockquote><p>Quoted</p></blockquote>
+<p><font color="red">Red</font> text</p>
+<form action="/search"><input name="q" placeholder="Search"></form>
+</body></html>
+"""
+
+HEAD = "<html><body><h1>Top of page</h1>" + "".join(
+    f"<p>Early paragraph {n}</p>" for n in range(200))
+TAIL = "".join(f"<p>Late paragraph {n}</p>" for n in range(200)) + \
+    '<a href="/end">End link</a></body></html>'
+
+
+class StreamingHandler(BaseHTTPRequestHandler):
+    """Sends the head of a page, then the rest once the gate opens"""
+
+    protocol_version = 'HTTP/1.0'
+    gate = threading.Event()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Cache-Control', 'max-age=60')
+        self.end_headers()
+        self.wfile.write(HEAD.encode('utf-8'))
+        self.wfile.flush()
+        self.gate.wait(5)
+        self.wfile.write(TAIL.encode('utf-8'))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestStreamConverter(unittest.TestCase):
+    """Test that feeding a document in pieces matches converting it whole"""
+
+    def test_matches_convert_html(self):
+        """Test identical output for every backend and chunk size"""
+        for parser in available_parsers():
+            expected = convert_html(SAMPLE_HTML, 'http://example.com/', 60, ('red',), parser)
+            for size in (1, 7, 64, len(SAMPLE_HTML)):
+                with self.subTest(parser=parser, size=size):
+                    stream = StreamConverter('http://example.com/', 60, ('red',), parser)
+                    for i in range(0, len(SAMPLE_HTML), size):
+                        stream.feed(SAMPLE_HTML[i:i + size])
+                    self.assertEqual(stream.close(), expected)
+
+    def test_lines_available_before_close(self):
+        """Test that finished blocks appear while the document is incomplete"""
+        stream = StreamConverter(width=60)
+        stream.feed(HEAD)
+        self.assertIn('# Top of page', stream.lines)
+        self.assertIn('Early paragraph 10', stream.lines)
+
+    def test_empty_document(self):
+        """Test closing without any input"""
+        self.assertEqual(StreamConverter().close(), ([], [], []))
+
+
+class TestStreamingLoads(LocalServerTestCase):
+    """Test that the browser shows the top of a page before it has downloaded"""
+
+    handler = StreamingHandler
+
+    @classmethod
+    def tearDownClass(cls):
+        StreamingHandler.gate.set()
+        super().tearDownClass()
+
+    def setUp(self):
+        StreamingHandler.gate.clear()
+        self.mock_stdscr = Mock()
+        self.mock_stdscr.getmaxyx.return_value = (24, 80)
+        self.env = patch.dict(os.environ, {'OPENAI_API_KEY': ''})
+        self.env.start()
+        self.fetcher = Fetcher(cache=HTTPCache())
+        self.browser = Browser(self.mock_stdscr, fetcher=self.fetcher)
+        self.browser.background_loads = True
+        self.browser.set_page_lines(["Old page"])
+        self.browser.current_url = self.base_url + '/old'
+
+    def tearDown(self):
+        StreamingHandler.gate.set()
+        self.fetcher.close()
+        self.env.stop()
+
+    def poll_until(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "timed out")
+            self.browser.poll_load()
+            time.sleep(0.01)
+
+    def test_top_of_page_before_download_completes(self):
+        """Test that lines show up while the server is still sending"""
+        self.browser.navigate(self.browser.fetch_page, self.base_url + '/page')
+        self.poll_until(lambda: 'Early paragraph 20' in self.browser.page_content)
+
+        self.assertIsNotNone(self.browser.loading)
+        self.assertEqual(self.browser.page_content[0], '# Top of page')
+        self.assertEqual(self.browser.current_url, self.base_url + '/page')
+        self.assertNotIn('Late paragraph 0', self.browser.page_content)
+        self.assertEqual(self.browser.history.back_stack[-1].url, self.base_url + '/old')
+
+        # Reading on while the rest arrives
+        self.browser.handle_input(258)  # Down arrow
+        StreamingHandler.gate.set()
+        self.poll_until(lambda: self.browser.loading is None)
+
+        self.assertIn('Late paragraph 199', self.browser.page_content)
+        self.assertIn('LINKS: 1 link(s) found', self.browser.page_content)
+        self.assertEqual(self.browser.links[0]['url'], self.base_url + '/end')
+        self.assertEqual(self.browser.scroll_offset, 1)
+        self.assertEqual(len(self.browser.history.back_stack), 1)
+
+    def test_complete_body_cached(self):
+        """Test that a streamed page is stored in the HTTP and page caches"""
+        StreamingHandler.gate.set()
+        self.browser.fetch_page(self.base_url + '/cached')
+        self.poll_until(lambda: self.browser.loading is None)
+        expected = list(self.browser.page_content)
+
+        self.assertEqual(self.fetcher.cache.stores, 1)
+        self.assertEqual(self.browser.page_cache.stats()['memory_entries'], 1)
+
+        self.browser.fetch_page(self.base_url + '/cached')
+        self.poll_until(lambda: self.browser.loading is None)
+        self.assertEqual(self.fetcher.cache.hits, 1)
+        self.assertEqual(self.browser.page_cache.hits, 1)
+        self.assertEqual(self.browser.page_content, expected)
+
+    def test_cancel_keeps_partial_page(self):
+        """Test that Esc stops the download and leaves what arrived"""
+        self.browser.fetch_page(self.base_url + '/stopped')
+        self.poll_until(lambda: 'Early paragraph 20' in self.browser.page_content)
+
+        self.browser.handle_input(27)  # Esc
+        StreamingHandler.gate.set()
+        self.assertIsNone(self.browser.loading)
+        self.assertFalse(self.browser.poll_load())
+        self.assertNotIn('Late paragraph 0', self.browser.page_content)
+        self.assertEqual(self.fetcher.cache.stores, 0)
+
+    def test_other_page_mid_stream(self):
+        """Test that help shown while a page streams in stays, and the load is dropped"""
+        self.browser.navigate(self.browser.fetch_page, self.base_url + '/help')
+        self.poll_until(lambda: 'Early paragraph 20' in self.browser.page_content)
+        load = self.browser.loading
+
+        self.browser.handle_input(ord('h'))
+        help_page = self.browser.page_content
+        StreamingHandler.gate.set()
+        self.assertTrue(load.done.wait(5))
+        self.assertFalse(self.browser.poll_load())
+        self.assertIs(self.browser.page_content, help_page)
+        self.assertIsNone(self.browser.loading)
+
+    def test_page_replaced_mid_stream(self):
+        """Test that a streamed page replaced outside navigate is not appended to"""
+        self.browser.fetch_page(self.base_url + '/replaced')
+        self.poll_until(lambda: 'Early paragraph 20' in self.browser.page_content)
+        load = self.browser.loading
+
+        self.browser.load_html('<html><body><h1>Other</h1></body></html>', self.base_url + '/other')
+        other = self.browser.page_content
+        self.assertFalse(self.browser.poll_load())
+        self.assertIsNone(self.browser.loading)
+        self.assertTrue(load.cancelled.is_set())
+        StreamingHandler.gate.set()
+        self.assertTrue(load.done.wait(5))
+        self.assertFalse(self.browser.poll_load())
+        self.assertIs(self.browser.page_content, other)
+        self.assertNotIn('Early paragraph 20', other)
+
+    def test_iter_content_on_cached_response(self):
+        """Test that a cached response can be streamed too"""
+        StreamingHandler.gate.set()
+        response = self.fetcher.get(self.base_url + '/body', stream=True)
+        body = b''.join(self.fetcher.iter_content(response))
+        self.assertEqual(body, (HEAD + TAIL).encode('utf-8'))
+
+        cached = self.fetcher.get(self.base_url + '/body', stream=True)
+        self.assertTrue(cached.from_cache)
+        self.assertEqual(b''.join(self.fetcher.iter_content(cached)), body)
+
+
+if __name__ == '__main__':
+    unittest.main()
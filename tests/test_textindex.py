@@ -0,0 +1,259 @@
+"""
+Tests for the full-text index of visited pages
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock curses before importing with proper key constants
+mock_curses = MagicMock()
+mock_curses.KEY_UP = 259
+mock_curses.KEY_DOWN = 258
+mock_curses.KEY_LEFT = 260
+mock_curses.KEY_RIGHT = 261
+mock_curses.KEY_PPAGE = 339
+mock_curses.KEY_NPAGE = 338
+mock_curses.KEY_HOME = 262
+mock_curses.KEY_END = 360
+mock_curses.KEY_DC = 330
+mock_curses.KEY_BACKSPACE = 263
+mock_curses.KEY_RESIZE = 410
+mock_curses.A_NORMAL = 0
+mock_curses.A_BOLD = 0x200000
+sys.modules['curses'] = mock_curses
+
+import browser as browser_module
+from browser import Browser
+from core import BrowserCore
+from pagecache import PageCache
+from terminal import Terminal
+from textindex import (MATCH_END, MATCH_START, TextIndex, fts_query, open_text_index,
+                       page_parts, visited_query, visited_url)
+from tests.helpers import patch_curses_colors
+
+
+def article(title: str, words: str) -> str:
+    """A page long enough not to be taken for a JavaScript-only site"""
+    paragraphs = ''.join(f"<p>Paragraph {n} says {words}.</p>" for n in range(12))
+    return f"<html><body><h1>{title}</h1>{paragraphs}<a href='/next'>Next</a></body></html>"
+
+
+class TestQueries(unittest.TestCase):
+    """Test turning what was typed into an FTS5 query"""
+
+    def test_fts_query(self):
+        """Test words, phrases, prefixes and punctuation"""
+        self.assertEqual(fts_query('rust async'), '"rust" "async"')
+        self.assertEqual(fts_query('"event loop" asyn*'), '"event loop" "asyn"*')
+        self.assertEqual(fts_query('c++ AND NOT(x)'), '"c++" "AND" "NOT(x)"')
+        self.assertEqual(fts_query('say "hi'), '"say" "hi"')
+        self.assertEqual(fts_query('  "" * '), '')
+
+    def test_visited_urls(self):
+        """Test the about: URL for a query and back"""
+        url = visited_url(' rust & "async" ')
+        self.assertTrue(url.startswith('about:visited?q='))
+        self.assertEqual(visited_query(url), 'rust & "async"')
+        self.assertEqual(visited_query('about:visited'), '')
+
+    def test_page_parts(self):
+        """Test titles from the first heading, without colors or link numbers"""
+        title, text = page_parts([('', '', '[0] Home', False), ('', '', '# The «red»Big«/red» Title', True),
+                                  ('', '', 'Body text', False)])
+        self.assertEqual(title, 'The Big Title')
+        self.assertEqual(text, 'Home\n# The Big Title\nBody text')
+        self.assertEqual(page_parts(['', 'First line', 'second'])[0], 'First line')
+
+    def test_turned_off(self):
+        """Test that an empty cache directory or zero budget turns the index off"""
+        with patch.dict(os.environ, {'TEXTBROWSER_CACHE_DIR': ''}):
+            self.assertIsNone(open_text_index())
+        with tempfile.TemporaryDirectory() as tmp:
+            with patch.dict(os.environ, {'TEXTBROWSER_CACHE_DIR': tmp, 'TEXTBROWSER_INDEX_BYTES': '0'}):
+                self.assertIsNone(open_text_index())
+            with patch.dict(os.environ, {'TEXTBROWSER_CACHE_DIR': tmp, 'TEXTBROWSER_INDEX_BYTES': ''}):
+                index = open_text_index()
+                self.assertEqual(index.path, os.path.join(tmp, 'visited.sqlite3'))
+                index.close()
+
+
+class TestTextIndex(unittest.TestCase):
+    """Test storing, ranking and forgetting pages"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'index', 'visited.sqlite3')
+        self.index = TextIndex(self.path)
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def add(self, url, *lines, index=None):
+        (index or self.index).add(url, list(lines))
+
+    def test_ranked_hits(self):
+        """Test that matches come best first, titles counting more than text"""
+        self.add('https://a.example/', '# Gardening', 'Tomatoes like sun. Tomatoes need water.')
+        self.add('https://b.example/', '# Tomatoes', 'A page about growing them.')
+        self.add('https://c.example/', '# Cars', 'Nothing about vegetables.')
+        self.index.flush()
+        self.assertIsNone(self.index.error)
+
+        results = self.index.search('tomatoes')
+        self.assertEqual([url for url, title, snippet, visited in results],
+                         ['https://b.example/', 'https://a.example/'])
+        self.assertEqual(results[0][1], 'Tomatoes')
+        self.assertIn(f"{MATCH_START}Tomatoes{MATCH_END}", results[1][2])
+        self.assertEqual(self.index.search('tomat*')[0][0], 'https://b.example/')
+        self.assertEqual(self.index.search('tomatoes cars'), [])
+        self.assertEqual(self.index.search('"need water"')[0][0], 'https://a.example/')
+
+    def test_revisits(self):
+        """Test that a revisited page is replaced, not added again"""
+        self.add('https://a.example/', '# News', 'Old story about otters.')
+        self.index.flush()
+        self.add('https://a.example/', '# News', 'New story about beavers.')
+        self.index.flush()
+        self.assertEqual(self.index.search('otters'), [])
+        self.assertEqual(len(self.index.search('beavers')), 1)
+        self.assertEqual(self.index.stats()['pages'], 1)
+
+    def test_across_sessions(self):
+        """Test that pages are still found after closing and reopening"""
+        self.add('https://a.example/', '# Recipes', 'Lentil soup with cumin.')
+        self.index.close()
+        self.index = TextIndex(self.path)
+        self.assertEqual(self.index.search('cumin')[0][0], 'https://a.example/')
+
+    def test_bounded_size(self):
+        """Test that the pages visited longest ago are forgotten first"""
+        index = TextIndex(os.path.join(self.tmp.name, 'small.sqlite3'), max_bytes=4000)
+        for n in range(20):
+            self.add(f"https://example.com/{n}", f"# Page {n}", f"word{n} " + 'filler ' * 60, index=index)
+            index.flush()
+        stats = index.stats()
+        self.assertLessEqual(stats['bytes'], 4000)
+        self.assertLess(stats['pages'], 20)
+        self.assertEqual(index.search('word0'), [])
+        self.assertEqual(len(index.search('word19')), 1)
+        index.close()
+
+    def test_writes_do_not_block(self):
+        """Test that add() returns while the writer is still busy"""
+        release = threading.Event()
+        store = self.index._store
+
+        def slow_store(*args):
+            release.wait(5)
+            store(*args)
+        self.index._store = slow_store
+        start = time.perf_counter()
+        for n in range(50):
+            self.add(f"https://example.com/{n}", '# Slow', f"Page number{n}")
+        self.assertLess(time.perf_counter() - start, 0.5)
+        release.set()
+        self.index.flush()
+        self.assertEqual(len(self.index.search('number49')), 1)
+
+    def test_search_in_milliseconds(self):
+        """Test ranked queries over a few thousand pages"""
+        words = ['alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf', 'hotel']
+        for n in range(3000):
+            text = ' '.join(words[(n * k) % len(words)] for k in range(1, 200))
+            self.add(f"https://example.com/{n}", f"# Page {n} {words[n % 8]}", text)
+        self.index.flush()
+        start = time.perf_counter()
+        for query in ('alpha', 'bravo delta', 'hot*', '"echo foxtrot"'):
+            self.index.search(query)
+        self.assertLess((time.perf_counter() - start) / 4, 0.1)
+
+    def test_unusable_index(self):
+        """Test that an index that cannot be opened is left alone"""
+        with patch('textindex.sqlite3.connect', side_effect=sqlite3.OperationalError('no fts5')):
+            index = TextIndex(os.path.join(self.tmp.name, 'broken.sqlite3'))
+        self.assertIsNotNone(index.error)
+        index.add('https://example.com/', ['text'])
+        self.assertEqual(index.search('text'), [])
+        self.assertIn('unavailable', index.results_html('text'))
+        index.close()
+
+
+class TestVisitedPages(unittest.TestCase):
+    """Test pages being indexed as they are shown, and ^words in Ctrl-K"""
+
+    def setUp(self):
+        self.env = patch.dict(os.environ, {'OPENAI_API_KEY': '', 'TEXTBROWSER_CACHE_DIR': '',
+                                           'TEXTBROWSER_PREFETCH': ''})
+        self.env.start()
+        self.colors = patch_curses_colors(browser_module.curses)
+        self.colors.start()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = TextIndex(os.path.join(self.tmp.name, 'visited.sqlite3'))
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+        self.colors.stop()
+        self.env.stop()
+
+    def page_file(self, name: str, html: str) -> str:
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w') as f:
+            f.write(html)
+        return 'file://' + path
+
+    def test_fetched_pages_indexed(self):
+        """Test that shown pages are indexed and about:visited lists them as links"""
+        core = BrowserCore(page_cache=PageCache(), width=60, text_index=self.index)
+        otters = self.page_file('otters.html', article('Sea Otters', 'otters hold hands while sleeping'))
+        empty = self.page_file('empty.html', '<html><body><div id="app"></div>otters</body></html>')
+        self.assertTrue(core.fetch_page(otters))
+        self.assertTrue(core.fetch_page(empty))  # Looks JavaScript-only: not indexed
+        self.index.flush()
+
+        core.fetch_page(visited_url('otters sleeping'))
+        self.assertEqual(core.current_url, 'about:visited?q=otters+sleeping')
+        text = '\n'.join(core.page_content)
+        self.assertIn('Visited pages: otters sleeping', text)
+        self.assertIn('Sea Otters', text)
+        self.assertEqual([link['url'] for link in core.links][:1], [otters])
+        self.assertEqual(len(self.index.search('otters')), 1)
+
+        core.fetch_page(visited_url('walruses'))
+        self.assertIn('No visited page matches', '\n'.join(core.page_content))
+
+    def test_turned_off(self):
+        """Test about:visited without an index"""
+        core = BrowserCore(page_cache=PageCache(), width=60)
+        core.fetch_page(visited_url('otters'))
+        self.assertIn('turned off', '\n'.join(core.page_content))
+
+    def test_command_box(self):
+        """Test ^words in the Ctrl-K box, and following a hit"""
+        terminal = Terminal(lambda data: None, 24, 80)
+        browser = Browser(terminal.stdscr, page_cache=PageCache(), term=terminal, text_index=self.index)
+        otters = self.page_file('otters.html', article('Sea Otters', 'otters hold hands'))
+        browser.fetch_page(otters)
+        self.index.flush()
+
+        browser.show_command_box = lambda: '^otters'
+        browser.handle_input(11)
+        self.assertEqual(browser.current_url, 'about:visited?q=otters')
+        browser.handle_input(ord('0'))
+        self.assertEqual(browser.current_url, otters)
+        browser.handle_input(browser_module.curses.KEY_LEFT)
+        self.assertEqual(browser.current_url, 'about:visited?q=otters')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,298 @@
+"""
+Full-text index of visited pages for DBBasic TextBrowser
+
+Every page shown is added to an SQLite FTS5 index on disk, so "that page I
+read last week" can be found again from Ctrl-K without the network:
+^words lists the best matches, ranked by BM25 with titles weighted above
+body text. Writes go through a queue to one background thread, in a
+transaction per batch, so indexing never holds up the page. The index
+keeps at most a budget of text, forgetting the pages visited longest ago.
+"""
+
+import hashlib
+import html
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import quote_plus, unquote_plus
+
+from htmltext import COLOR_MARKER
+from httpcache import default_cache_dir
+
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # Page text kept, across all pages
+MAX_PAGE_CHARS = 256 * 1024           # Text indexed per page
+DEFAULT_RESULTS = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    url TEXT UNIQUE NOT NULL,
+    title TEXT NOT NULL,
+    visited REAL NOT NULL,
+    bytes INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_visited ON pages (visited);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages_text USING fts5(
+    title, body, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# Marks around matched terms in snippets, replaced once the text is escaped
+MATCH_START, MATCH_END = '\x02', '\x03'
+
+QUERY_TERM = re.compile(r'"[^"]*"?|[^\s"]+')
+LINK_NUMBER = re.compile(r'\[\d+\] ?')
+
+
+def open_text_index():
+    """The index under the cache directory, or None if it is turned off
+
+    TEXTBROWSER_CACHE_DIR= (empty) or TEXTBROWSER_INDEX_BYTES=0 turns it off.
+    """
+    cache_dir = os.getenv('TEXTBROWSER_CACHE_DIR', default_cache_dir())
+    try:
+        max_bytes = int(os.getenv('TEXTBROWSER_INDEX_BYTES') or DEFAULT_MAX_BYTES)
+    except ValueError:
+        max_bytes = DEFAULT_MAX_BYTES
+    if not cache_dir or max_bytes <= 0:
+        return None
+    return TextIndex(os.path.join(cache_dir, 'visited.sqlite3'), max_bytes)
+
+
+def visited_url(query: str) -> str:
+    """about: URL of the local results for query"""
+    return 'about:visited?q=' + quote_plus(query.strip())
+
+
+def visited_query(url: str) -> str:
+    """Query of an about:visited URL"""
+    query = url.partition('?')[2]
+    return unquote_plus(query[2:]) if query.startswith('q=') else ''
+
+
+def fts_query(text: str) -> str:
+    """An FTS5 query matching all words of text
+
+    "Quoted phrases" stay phrases and word* matches prefixes; everything
+    else is quoted, so punctuation cannot break the query syntax.
+    """
+    terms = []
+    for term in QUERY_TERM.findall(text):
+        prefix = term.endswith('*') and not term.startswith('"')
+        term = term.strip('"').rstrip('*') if prefix else term.strip('"')
+        if term.strip():
+            terms.append('"' + term.replace('"', '""') + '"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+def page_parts(parts) -> tuple:
+    """(title, text) of a page from its lines or converted blocks"""
+    title = ''
+    texts = []
+    size = 0
+    for part in parts:
+        text = part[2] if isinstance(part, tuple) else part
+        if '«' in text:
+            text = COLOR_MARKER.sub('', text)
+        if '[' in text:
+            text = LINK_NUMBER.sub('', text)
+        if not title and text.startswith('# '):
+            title = text
+        texts.append(text)
+        size += len(text) + 1
+        if size > MAX_PAGE_CHARS:
+            break
+    text = '\n'.join(texts)[:MAX_PAGE_CHARS]
+    if not title:
+        title = next((line for line in text.splitlines() if line.strip()), '')
+    return title.strip().lstrip('#').strip()[:200], text
+
+
+class TextIndex:
+    """SQLite FTS5 index of visited pages, written on a background thread"""
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.error = None  # Why the index cannot be used, if it cannot
+        self._queue = queue.Queue()
+        self._writer = None
+        self._reader = None
+        self._lock = threading.Lock()
+        self._used = None  # Bytes of text indexed, counted by the writer
+
+        directory = os.path.dirname(path)
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._connect() as db:
+                db.executescript(SCHEMA)
+            db.close()
+        except (OSError, sqlite3.Error) as e:
+            self.error = e  # No FTS5 in this SQLite, or nowhere to write
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        return db
+
+    # Writing
+
+    def add(self, url: str, parts):
+        """Queue a page (its lines or converted blocks) to be indexed"""
+        if self.error is not None:
+            return
+        self._queue.put((url, parts, time.time()))
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name='textindex', daemon=True)
+            self._writer.start()
+
+    def _write_loop(self):
+        db = None
+        while True:
+            batch = [self._queue.get()]
+            # Whatever else is waiting goes into the same transaction
+            while batch[-1] is not None:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            pages = [item for item in batch if item is not None]
+            try:
+                if pages:
+                    if db is None:
+                        db = self._connect()
+                    with db:
+                        for url, parts, visited in pages:
+                            self._store(db, url, parts, visited)
+                        self._evict(db)
+            except sqlite3.Error as e:
+                self.error = e
+                self._used = None  # Rolled back: count again next time
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if batch[-1] is None:
+                if db is not None:
+                    db.close()
+                return
+
+    def _store(self, db, url: str, parts, visited: float):
+        title, text = page_parts(parts)
+        if not text.strip():
+            return
+        digest = hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+        size = len(text.encode('utf-8', 'surrogatepass')) + len(title)
+        if self._used is None:
+            self._used = db.execute('SELECT COALESCE(SUM(bytes), 0) FROM pages').fetchone()[0]
+
+        row = db.execute('SELECT id, bytes, digest FROM pages WHERE url = ?', (url,)).fetchone()
+        if row is not None and row[2] == digest:
+            # Revisited and unchanged: only the visit time moves
+            db.execute('UPDATE pages SET visited = ? WHERE id = ?', (visited, row[0]))
+            return
+        if row is not None:
+            db.execute('DELETE FROM pages_text WHERE rowid = ?', (row[0],))
+            db.execute('UPDATE pages SET title = ?, visited = ?, bytes = ?, digest = ? WHERE id = ?',
+                       (title, visited, size, digest, row[0]))
+            page_id = row[0]
+            self._used -= row[1]
+        else:
+            page_id = db.execute(
+                'INSERT INTO pages (url, title, visited, bytes, digest) VALUES (?, ?, ?, ?, ?)',
+                (url, title, visited, size, digest)).lastrowid
+        db.execute('INSERT INTO pages_text (rowid, title, body) VALUES (?, ?, ?)',
+                   (page_id, title, text))
+        self._used += size
+
+    def _evict(self, db):
+        """Forget the pages visited longest ago until the text fits the budget"""
+        while self._used > self.max_bytes:
+            oldest = db.execute('SELECT id, bytes FROM pages ORDER BY visited LIMIT 32').fetchall()
+            if not oldest:
+                self._used = 0
+                return
+            for page_id, size in oldest:
+                db.execute('DELETE FROM pages WHERE id = ?', (page_id,))
+                db.execute('DELETE FROM pages_text WHERE rowid = ?', (page_id,))
+                self._used -= size
+                if self._used <= self.max_bytes:
+                    break
+
+    def flush(self):
+        """Wait for queued pages to be written"""
+        self._queue.join()
+
+    # Querying
+
+    def search(self, text: str, limit: int = DEFAULT_RESULTS) -> list:
+        """Best matches for text as (url, title, snippet, visited), best first
+
+        Snippets mark matched terms with MATCH_START and MATCH_END.
+        """
+        query = fts_query(text)
+        if not query or self.error is not None:
+            return []
+        with self._lock:
+            if self._reader is None:
+                self._reader = self._connect()
+            try:
+                return self._reader.execute(
+                    "SELECT pages.url, pages.title, "
+                    "snippet(pages_text, 1, ?, ?, ' … ', 16), pages.visited "
+                    "FROM pages_text JOIN pages ON pages.id = pages_text.rowid "
+                    "WHERE pages_text MATCH ? ORDER BY bm25(pages_text, 5.0, 1.0) LIMIT ?",
+                    (MATCH_START, MATCH_END, query, limit)).fetchall()
+            except sqlite3.Error:
+                return []
+
+    def stats(self) -> dict:
+        if self.error is not None:
+            return {'pages': 0, 'bytes': 0}
+        with self._lock:
+            if self._reader is None:
+                self._reader = self._connect()
+            pages, used = self._reader.execute(
+                'SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM pages').fetchone()
+        return {'pages': pages, 'bytes': used}
+
+    def results_html(self, text: str) -> str:
+        """A page of the matches for text, each linked to its page"""
+        start = time.perf_counter()
+        results = self.search(text)
+        elapsed = (time.perf_counter() - start) * 1000
+        title = html.escape(text.strip())
+        parts = [f"<html><body><h1>Visited pages: {title}</h1>"]
+        if self.error is not None:
+            parts.append(f"<p>The local index is unavailable: {html.escape(str(self.error))}</p>")
+        elif not results:
+            parts.append("<p>No visited page matches. Words must all appear; "
+                         "end one with * to match its beginning, "
+                         "or put a phrase in \"quotes\".</p>")
+        else:
+            parts.append(f"<p>{len(results)} best matches in {elapsed:.1f} ms</p>")
+        for url, page_title, snippet, visited in results:
+            snippet = (html.escape(snippet).replace(MATCH_START, '<strong>')
+                       .replace(MATCH_END, '</strong>'))
+            day = time.strftime('%Y-%m-%d', time.localtime(visited))
+            parts.append(f'<p><a href="{html.escape(url)}">{html.escape(page_title or url)}</a>'
+                         f"<br>{html.escape(url)} ({day})<br>{snippet}</p>")
+        parts.append("</body></html>")
+        return '\n'.join(parts)
+
+    def close(self):
+        """Write what is queued and stop the writer"""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join(timeout=10)
+            self._writer = None
+        with self._lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None